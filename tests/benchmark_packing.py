@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分段装箱基准：对比 greedy 与 compact 装箱的页数（每页消耗一次频率配额）
+
+用法（在项目根目录执行）：
+    python -m tests.benchmark_packing                # 使用内置的示例报告
+    python -m tests.benchmark_packing reports/       # 使用目录下的 *.md 报告
+
+输出每份报告在两种装箱模式下的页数，以及整体减少的请求数。
+"""
+import sys
+from pathlib import Path
+
+from wecom_notifier.core.segmenter import MessageSegmenter
+from tests.benchmark_segmenter import build_markdown, build_code_heavy
+
+
+def build_table_report(rows: int) -> str:
+    """生成以大表格为主的日报（表格前后各有一段说明）"""
+    table = "| 服务 | 状态 | P99 延迟 | 错误率 |\n|------|------|------|------|\n" + "\n".join(
+        f"| svc-{i:03d} | {'正常' if i % 7 else '降级'} | {i * 13 % 900}ms | {i % 5 * 0.01:.2f}% |"
+        for i in range(rows)
+    )
+    return f"## 每日巡检\n\n共巡检 {rows} 个服务。\n\n{table}\n\n> 降级服务已自动创建工单。"
+
+
+def build_incident_report(events: int) -> str:
+    """生成按时间线排列的故障复盘（大量短段落和小标题）"""
+    parts = ["# 故障复盘"]
+    for i in range(events):
+        parts.append(f"### {i // 60:02d}:{i % 60:02d} 事件 {i}")
+        parts.append(f"值班同学确认告警，影响范围：{i % 9 + 1} 个集群。" * (i % 4 + 1))
+    return "\n\n".join(parts)
+
+
+def builtin_corpus():
+    """内置示例报告"""
+    return [
+        ("status 64KB", build_markdown(64 * 1024)),
+        ("status 256KB", build_markdown(256 * 1024)),
+        ("code blocks 64KB", build_code_heavy(64 * 1024)),
+        ("table 300 rows", build_table_report(300)),
+        ("table 2000 rows", build_table_report(2000)),
+        ("incident 200", build_incident_report(200)),
+    ]
+
+
+def main():
+    if len(sys.argv) > 1:
+        corpus = [(p.name, p.read_text(encoding='utf-8')) for p in sorted(Path(sys.argv[1]).glob("*.md"))]
+    else:
+        corpus = builtin_corpus()
+
+    greedy = MessageSegmenter()
+    compact = MessageSegmenter(packing="compact")
+
+    print(f"{'report':>20} {'size':>8} {'greedy':>8} {'compact':>8} {'saved':>8}")
+    total_greedy = total_compact = 0
+    for name, content in corpus:
+        g = len(greedy.segment(content, "markdown_v2"))
+        c = len(compact.segment(content, "markdown_v2"))
+        total_greedy += g
+        total_compact += c
+        size = len(content.encode('utf-8')) // 1024
+        print(f"{name:>20} {size:>6}KB {g:>8} {c:>8} {(g - c) / g:>8.1%}")
+
+    if total_greedy:
+        print(
+            f"\n{'total':>20} {'':>8} {total_greedy:>8} {total_compact:>8} "
+            f"{(total_greedy - total_compact) / total_greedy:>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分段器性能基准：验证 MessageSegmenter 的耗时随输入大小线性增长
+
+用法（在项目根目录执行）：
+    python -m tests.benchmark_segmenter
+
+分别对 Markdown 报告、大量小代码块的 Markdown 和纯中文文本，在 128KB ~ 1MB 的输入上测量分段耗时，
+输出每 MB 耗时。线性实现下各规模的"每 MB 耗时"应基本持平。
+最后测量 5MB 单行文本（如压缩的 JSON、base64 日志）的强制截断耗时。
+"""
+import time
+
+from wecom_notifier.core.segmenter import MessageSegmenter
+
+
+def build_markdown(target_bytes: int) -> str:
+    """生成包含标题、列表、表格和代码块的 Markdown 报告"""
+    section = (
+        "## 服务状态\n\n"
+        "- 接口成功率：99.95%\n- 平均延迟：120ms\n- 告警数量：3\n\n"
+        "| 服务 | 状态 | 延迟 |\n|------|------|------|\n"
+        + "\n".join(f"| svc-{i} | 正常 | {i * 7 % 300}ms |" for i in range(20))
+        + "\n\n```python\n"
+        + "\n".join(f"print('line {i}')" for i in range(15))
+        + "\n```\n\n"
+        "本节总结：所有服务运行正常，无需人工介入。" * 3
+    )
+    repeat = target_bytes // len(section.encode('utf-8')) + 1
+    return "\n\n".join([section] * repeat)
+
+
+def build_code_heavy(target_bytes: int) -> str:
+    """生成以大量小代码块为主的 Markdown（如逐条贴出的命令输出）"""
+    block = "执行结果：\n\n```bash\n$ systemctl status app\nactive (running)\n```"
+    repeat = target_bytes // len(block.encode('utf-8')) + 1
+    return "\n\n".join([block] * repeat)
+
+
+def build_cjk_text(target_bytes: int) -> str:
+    """生成多行纯中文文本"""
+    line = "企业微信机器人消息分段性能测试，中文字符每个占三个字节。"
+    repeat = target_bytes // len(line.encode('utf-8')) + 1
+    return "\n".join([line] * repeat)
+
+
+def measure(segmenter: MessageSegmenter, content: str, msg_type: str, rounds: int = 3) -> float:
+    """返回多次分段中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        segmenter.segment(content, msg_type)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    segmenter = MessageSegmenter()
+    sizes = [128 * 1024, 256 * 1024, 512 * 1024, 1024 * 1024]
+
+    for name, builder, msg_type in [
+        ("markdown", build_markdown, "markdown_v2"),
+        ("code blocks", build_code_heavy, "markdown_v2"),
+        ("cjk text", build_cjk_text, "text"),
+    ]:
+        print(f"\n{name} ({msg_type})")
+        print(f"{'size':>10} {'segments':>10} {'time(ms)':>10} {'ms/MB':>10}")
+        for size in sizes:
+            content = builder(size)
+            actual = len(content.encode('utf-8'))
+            elapsed = measure(segmenter, content, msg_type)
+            count = len(segmenter.segment(content, msg_type))
+            print(
+                f"{actual // 1024:>8}KB {count:>10} {elapsed * 1000:>10.1f} "
+                f"{elapsed * 1000 / (actual / 1024 / 1024):>10.1f}"
+            )
+
+    print("\nsingle line (force split)")
+    for name, line in [
+        ("ascii 5MB", "eyJhbGciOiJIUzI1NiJ9" * (5 * 1024 * 1024 // 20)),
+        ("cjk 5MB", "中" * (5 * 1024 * 1024 // 3)),
+    ]:
+        elapsed = measure(segmenter, line, "text")
+        count = len(segmenter.segment(line, "text"))
+        print(f"{name:>10} {count:>10} segments {elapsed * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
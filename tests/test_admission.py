@@ -0,0 +1,164 @@
+"""
+准入控制与 ETA 估算测试
+"""
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class TestPermitTimeEstimation:
+    """测试 RateLimiter 的配额时间估算"""
+
+    def test_permit_time_with_free_quota(self):
+        """测试有空闲配额时立即可用"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=3, time_window=60)
+        now = time.time()
+
+        assert limiter.estimate_permit_time(0) <= now + 0.01
+        assert limiter.estimate_permit_time(2) <= now + 0.01
+        # 第4个配额需要等待一个窗口
+        assert limiter.estimate_permit_time(3) >= now + 59
+
+    def test_permit_time_after_acquire(self):
+        """测试占用配额后的估算"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=2, time_window=60)
+        limiter.acquire()
+        limiter.acquire()
+        now = time.time()
+
+        assert limiter.estimate_permit_time(0) >= now + 59
+        assert limiter.estimate_permit_time(2) >= now + 119
+
+    def test_count_permits_until(self):
+        """测试累计配额计数"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=20, time_window=60)
+        now = time.time()
+
+        assert limiter.count_permits_until(now + 1) == 20
+        assert limiter.count_permits_until(now + 61) == 40
+
+    def test_pool_delivery_time(self):
+        """测试多个限制器合计配额"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+        from wecom_notifier.core.admission import estimate_delivery_time
+
+        limiters = [RateLimiter(max_count=20, time_window=60) for _ in range(3)]
+        now = time.time()
+
+        # 60 个分段在3个webhook上可以立即发出
+        assert estimate_delivery_time(limiters, 60) <= time.time() + 0.2
+        # 61 个分段需要等待下一个窗口
+        assert estimate_delivery_time(limiters, 61, now=now) >= now + 59
+
+    def test_aggregate_matches_search(self):
+        """测试合并槽位的估算与二分查找一致，获得配额后缓存重建"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+        from wecom_notifier.core.admission import AggregatePermitEstimate, estimate_delivery_time
+
+        limiters = [RateLimiter(max_count=3, time_window=60) for _ in range(3)]
+        limiters[0].acquire()
+        limiters[1].acquire()
+        limiters[1].acquire()
+        aggregate = AggregatePermitEstimate()
+        now = time.time()
+
+        for segments in (1, 4, 5, 9, 10, 20, 50):
+            expected = estimate_delivery_time(limiters, segments, now=now)
+            cached = estimate_delivery_time(limiters, segments, now=now, aggregate=aggregate)
+            assert abs(cached - expected) <= 0.1
+
+        get_slot_times = RateLimiter.get_slot_times
+        with patch.object(RateLimiter, "get_slot_times", autospec=True, side_effect=get_slot_times) as slot_times:
+            estimate_delivery_time(limiters, 10, now=now, aggregate=aggregate)
+            assert slot_times.call_count == 0
+            limiters[2].acquire()
+            assert estimate_delivery_time(limiters, 6, aggregate=aggregate) >= now + 59
+            assert slot_times.call_count == 3
+
+    def test_segment_count_cached_on_message(self):
+        """测试消息的分段数只估算一次"""
+        from wecom_notifier.core.models import Message
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.platforms.wecom.manager import WebhookManager
+        from wecom_notifier.platforms.wecom.sender import Sender
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        manager = WebhookManager("https://example.com/hook", Sender(), MessageSegmenter(), RateLimiter())
+        message = Message(content="line\n" * 2000, msg_type="text")
+
+        try:
+            with patch.object(MessageSegmenter, "estimate_segment_count", return_value=3) as estimate:
+                manager.estimate_eta(message)
+                manager.estimate_eta(message)
+                assert manager._estimate_message_cost(message) == 3
+                assert estimate.call_count == 1
+        finally:
+            manager.stop()
+
+
+class TestAdmissionControl:
+    """测试入队准入控制"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_eta_available_on_result(self, mock_send):
+        """测试 SendResult 上的 ETA"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+
+        result = notifier.send_text("https://example.com/webhook-eta", "Hello")
+        assert result.eta is not None
+        assert result.estimated_delay is not None
+        assert result.wait(timeout=5)
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_reject_when_quota_exhausted(self, mock_send):
+        """测试配额耗尽时超出 max_delay 的消息被立即拒绝"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-admission"
+
+        limiter = notifier._get_or_create_rate_limiter(url)
+        for _ in range(limiter.max_count):
+            limiter.acquire()
+
+        result = notifier.send_text(url, "Late alert", max_delay=5)
+
+        assert result.wait(timeout=0)
+        assert result.is_rejected()
+        assert result.status == "rejected"
+        assert not mock_send.called
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_accept_within_max_delay(self, mock_send):
+        """测试预计可按时送达的消息正常入队"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+
+        result = notifier.send_text(
+            ["https://example.com/pool-a", "https://example.com/pool-b"],
+            "On time",
+            max_delay=30,
+            async_send=False
+        )
+
+        assert result.is_success()
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
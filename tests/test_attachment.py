@@ -0,0 +1,169 @@
+"""
+素材上传与超长内容转附件测试
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+WEBHOOK_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=test"
+
+
+def _report(rows: int = 400) -> str:
+    """生成需要分段的 Markdown 表格"""
+    return "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | 数据{i} |" for i in range(rows))
+
+
+def _fake_post(calls):
+    """记录请求的 requests.post 替身：上传接口返回 media_id，其他接口返回成功"""
+    def post(url, json=None, files=None, **kwargs):
+        calls.append((url, json, files))
+        if "upload_media" in url:
+            return Mock(json=lambda: {"errcode": 0, "errmsg": "ok", "type": "file", "media_id": "m-1"})
+        return Mock(json=lambda: {"errcode": 0, "errmsg": "ok"})
+    return post
+
+
+class TestSenderUpload:
+    """测试 Sender 的素材上传和文件消息"""
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_send_media(self, mock_post):
+        """测试先上传文件，再发送 file 消息"""
+        from wecom_notifier.sender import Sender
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+
+        success, error = Sender().send_media(WEBHOOK_URL, "file", "报告内容".encode('utf-8'), "report.md")
+
+        assert success and error is None
+        upload_url, _, files = calls[0]
+        assert upload_url == "https://qyapi.weixin.qq.com/cgi-bin/webhook/upload_media?key=test&type=file"
+        assert files["media"][0] == "report.md"
+        assert calls[1] == (WEBHOOK_URL, {"msgtype": "file", "file": {"media_id": "m-1"}}, None)
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_upload_size_limits(self, mock_post):
+        """测试文件大小超出范围时不发起请求"""
+        from wecom_notifier.sender import Sender
+
+        media_id, error = Sender().upload_media(WEBHOOK_URL, b"abc", "tiny.txt")
+
+        assert media_id is None and "out of range" in error
+        mock_post.assert_not_called()
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_upload_error(self, mock_post):
+        """测试上传失败时不发送文件消息"""
+        from wecom_notifier.sender import Sender
+
+        mock_post.return_value = Mock(json=lambda: {"errcode": 40058, "errmsg": "invalid media"})
+
+        success, error = Sender().send_media(WEBHOOK_URL, "file", b"hello world", "a.txt")
+
+        assert not success and error.startswith("Upload failed")
+        assert mock_post.call_count == 1
+
+
+class TestAttachmentPolicy:
+    """测试 AttachmentPolicy"""
+
+    def test_apply(self):
+        """测试超过阈值时替换为附件分段，消息类型改为 file"""
+        import hashlib
+        from wecom_notifier.core.models import SegmentInfo
+        from wecom_notifier.platforms.wecom import AttachmentPolicy, Message
+
+        policy = AttachmentPolicy({"max_pages": 2, "filename": "report"})
+        segments = [SegmentInfo(f"page {i}") for i in range(3)]
+
+        short = Message(content="x", msg_type="markdown_v2")
+        assert policy.apply(short, segments[:2]) == segments[:2]
+
+        message = Message(content=_report(), msg_type="markdown_v2")
+        attached = policy.apply(message, segments)
+
+        filename, data, digest = attached[0].content
+        assert filename == "report.md"
+        assert data.decode('utf-8') == _report()
+        assert digest == hashlib.sha256(_report().encode('utf-8')).hexdigest()
+        assert message.msg_type == "file"
+        assert policy.get_stats() == {"attached": 1, "skipped": 0}
+
+    def test_not_applicable(self):
+        """测试不适用的消息类型和单独 @ 用户的文本消息保持分页"""
+        from wecom_notifier.core.models import SegmentInfo
+        from wecom_notifier.platforms.wecom import AttachmentPolicy, Message
+
+        policy = AttachmentPolicy({"max_pages": 1, "msg_types": ["markdown_v2"]})
+        segments = [SegmentInfo("a"), SegmentInfo("b")]
+
+        assert policy.apply(Message(content="a b", msg_type="text"), segments) == segments
+        mentioned = Message(content="a b", msg_type="text", mentioned_list=["zhangsan"])
+        assert AttachmentPolicy({"max_pages": 1}).apply(mentioned, segments) == segments
+
+    def test_invalid_config(self):
+        """测试无效配置"""
+        from wecom_notifier.platforms.wecom import AttachmentPolicy
+
+        with pytest.raises(ValueError):
+            AttachmentPolicy({"max_pages": 0})
+        with pytest.raises(ValueError):
+            AttachmentPolicy({"msg_types": ["image"]})
+
+
+class TestNotifierAttachment:
+    """测试通知器的超长内容转附件"""
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_single_and_pool_mode(self, mock_post):
+        """测试单 webhook 和池模式下超长消息只发送上传和 file 两个请求"""
+        from wecom_notifier import WeComNotifier
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+        notifier = WeComNotifier(attachment_config={"max_pages": 2})
+        try:
+            single = notifier.send_markdown(WEBHOOK_URL, _report(), async_send=False)
+            pooled = notifier.send_text(
+                [WEBHOOK_URL, WEBHOOK_URL.replace("test", "other")], _report(), async_send=False
+            )
+        finally:
+            notifier.stop_all()
+
+        assert single.is_success() and pooled.is_success()
+        assert single.segment_count == pooled.segment_count == 1
+        assert len(calls) == 4
+        assert calls[0][2]["media"][0] == "message.md"
+        assert calls[2][2]["media"][0] == "message.txt"
+        assert notifier.attachment_policy.get_stats()["attached"] == 2
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_below_threshold_paged(self, mock_post):
+        """测试分段数未超过阈值时照常分页发送"""
+        from wecom_notifier import WeComNotifier
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+        notifier = WeComNotifier(attachment_config={"max_pages": 10})
+        try:
+            result = notifier.send_markdown(WEBHOOK_URL, _report(), async_send=False)
+        finally:
+            notifier.stop_all()
+
+        assert result.is_success()
+        assert result.segment_count == len(calls) > 1
+        assert all("upload_media" not in url for url, _, _ in calls)
+
+    def test_disabled_by_default(self):
+        """测试默认不启用"""
+        from wecom_notifier import WeComNotifier
+
+        notifier = WeComNotifier()
+        assert notifier.attachment_policy is None
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
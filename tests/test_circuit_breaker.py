@@ -0,0 +1,200 @@
+"""
+WebhookResource 熔断器测试
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class TestCircuitBreaker:
+    """测试熔断器状态流转"""
+
+    def _resource(self, base=0.05, max_cooldown=0.2):
+        from wecom_notifier.core.rate_limiter import RateLimiter
+        from wecom_notifier.platforms.wecom.resource import WebhookResource
+
+        resource = WebhookResource("https://example.com/hook", RateLimiter())
+        resource.COOLDOWN_BASE = base
+        resource.COOLDOWN_MAX = max_cooldown
+        return resource
+
+    def test_open_after_failure(self):
+        """测试失败后熔断"""
+        from wecom_notifier.platforms.wecom.resource import CIRCUIT_OPEN
+
+        resource = self._resource()
+        resource.mark_failure()
+
+        assert resource.state == CIRCUIT_OPEN
+        assert not resource.is_available()
+        assert not resource.try_acquire()
+
+    def test_half_open_single_probe(self):
+        """测试半开状态只允许一个探测"""
+        from wecom_notifier.platforms.wecom.resource import CIRCUIT_HALF_OPEN
+
+        resource = self._resource()
+        resource.mark_failure()
+        time.sleep(0.08)
+
+        grants = []
+        barrier = threading.Barrier(8)
+
+        def contend():
+            barrier.wait()
+            grants.append(resource.try_acquire())
+
+        threads = [threading.Thread(target=contend) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert grants.count(True) == 1
+        assert resource.state == CIRCUIT_HALF_OPEN
+        assert not resource.is_available()
+
+    def test_probe_success_closes(self):
+        """测试探测成功后闭合"""
+        from wecom_notifier.platforms.wecom.resource import CIRCUIT_CLOSED
+
+        resource = self._resource()
+        resource.mark_failure()
+        time.sleep(0.08)
+
+        assert resource.try_acquire()
+        resource.mark_success()
+
+        assert resource.state == CIRCUIT_CLOSED
+        assert resource.consecutive_failures == 0
+        assert resource.try_acquire()
+        assert resource.try_acquire()
+
+    def test_probe_failure_reopens_with_longer_cooldown(self):
+        """测试探测失败后重新熔断且冷却时间递增"""
+        from wecom_notifier.platforms.wecom.resource import CIRCUIT_OPEN
+
+        resource = self._resource()
+        resource.mark_failure()
+        first_cooldown = resource._calculate_cooldown()
+        time.sleep(0.08)
+
+        assert resource.try_acquire()
+        resource.mark_failure()
+
+        assert resource.state == CIRCUIT_OPEN
+        assert resource._calculate_cooldown() > first_cooldown
+        assert not resource.try_acquire()
+
+    def test_probe_timeout(self):
+        """测试探测超时未记录结果时允许重新探测"""
+        resource = self._resource()
+        resource.PROBE_TIMEOUT = 0.05
+        resource.mark_failure()
+        time.sleep(0.08)
+
+        assert resource.try_acquire()
+        assert not resource.is_available()
+        assert 0 < resource.get_probe_remaining() <= 0.05
+
+        time.sleep(0.08)
+        assert resource.is_available()
+        assert resource.try_acquire()
+
+    def test_dead_webhook(self):
+        """测试永久失效"""
+        resource = self._resource()
+        resource.mark_dead("Invalid webhook: not exist")
+
+        assert resource.is_dead()
+        assert not resource.is_available()
+        assert not resource.try_acquire()
+        assert resource.get_cooldown_remaining() == float("inf")
+
+        # 失效后不会因成功/失败而恢复
+        resource.mark_success()
+        assert resource.is_dead()
+
+
+class TestPoolPermanentFailure:
+    """测试池对无效 webhook 的处理"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_invalid_webhook_marked_dead(self, mock_send):
+        """测试返回 93000 的 webhook 被永久剔除"""
+        from wecom_notifier import WeComNotifier
+
+        dead_url = "https://example.com/pool-dead"
+        ok_url = "https://example.com/pool-ok"
+        calls = []
+
+        def send(url, content, **kwargs):
+            calls.append(url)
+            if url == dead_url:
+                return False, "Invalid webhook: invalid webhook url"
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier()
+        pool = notifier._get_or_create_pool([dead_url, ok_url])
+        # 让无效的 webhook 先被选中
+        notifier.rate_limiters[ok_url].acquire()
+
+        for i in range(3):
+            result = notifier.send_text([dead_url, ok_url], f"message {i}", async_send=False)
+            assert result.is_success()
+
+        dead = next(r for r in pool.resources if r.url == dead_url)
+        assert dead.is_dead()
+        assert calls.count(dead_url) == 1
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_send_raises_while_half_open(self, mock_send):
+        """测试半开探测时发送抛出异常，探测名额被释放，webhook 冷却后恢复调度"""
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.platforms.wecom.resource import CIRCUIT_OPEN
+
+        urls = ["https://example.com/pool-raise-a", "https://example.com/pool-raise-b"]
+        mock_send.side_effect = [RuntimeError("boom"), RuntimeError("boom"), (True, None)]
+        notifier = WeComNotifier()
+        pool = notifier._get_or_create_pool(urls)
+        for resource in pool.resources:
+            resource.COOLDOWN_BASE = 0.05
+            resource.mark_failure()
+        time.sleep(0.08)
+
+        try:
+            result = notifier.send_text(urls, "first", async_send=False)
+            assert not result.is_success()
+            for resource in pool.resources:
+                assert resource.state == CIRCUIT_OPEN
+                assert resource.get_probe_remaining() == 0.0
+
+            # 冷却结束后重新探测成功
+            result = notifier.send_text(urls, "second", async_send=False)
+            assert result.is_success()
+        finally:
+            notifier.stop_all()
+
+    def test_all_dead_raises(self):
+        """测试所有 webhook 失效时立即报错而不是等待"""
+        from unittest.mock import Mock
+        from wecom_notifier.core.pool_base import AllWebhooksUnavailableError
+        from wecom_notifier.core.rate_limiter import RateLimiter
+        from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
+        from wecom_notifier.platforms.wecom.resource import WebhookResource
+
+        resource = WebhookResource("https://example.com/hook", RateLimiter())
+        resource.mark_dead("Invalid webhook")
+        pool = WeComWebhookPool(resources=[resource], sender=Mock(), segmenter=Mock())
+
+        with pytest.raises(AllWebhooksUnavailableError):
+            pool._select_best_webhook()
+        pool.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
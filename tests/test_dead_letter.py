@@ -0,0 +1,305 @@
+"""
+死信队列测试
+"""
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class TestDeadLetterQueue:
+    """测试 DeadLetterQueue"""
+
+    def _entry(self, message_id, **kwargs):
+        from wecom_notifier.core.dead_letter import DeadLetter
+
+        return DeadLetter(
+            message_id=message_id,
+            target="https://example.com/hook",
+            msg_type="text",
+            content=f"content {message_id}",
+            error="errcode 500",
+            **kwargs
+        )
+
+    def test_add_and_pop_in_order(self):
+        """测试按失败顺序取出"""
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        dlq = DeadLetterQueue()
+        for i in range(3):
+            dlq.add(self._entry(f"m{i}"))
+
+        assert len(dlq) == 3
+        assert [e.message_id for e in dlq.pop(2)] == ["m0", "m1"]
+        assert [e.message_id for e in dlq.pop()] == ["m2"]
+        assert len(dlq) == 0
+
+    def test_same_message_overwrites(self):
+        """测试同一消息再次失败时覆盖旧记录"""
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        dlq = DeadLetterQueue()
+        dlq.add(self._entry("m1"))
+        dlq.add(self._entry("m1", attempts=2))
+
+        assert len(dlq) == 1
+        assert dlq.list()[0].attempts == 2
+
+    def test_bounded(self):
+        """测试超过容量时丢弃最早的死信"""
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        dlq = DeadLetterQueue({"max_size": 2})
+        for i in range(3):
+            dlq.add(self._entry(f"m{i}"))
+
+        assert [e.message_id for e in dlq.list()] == ["m1", "m2"]
+        assert dlq.dropped_count == 1
+
+    def test_jsonl_persistence(self, tmp_path):
+        """测试 JSONL 持久化与恢复"""
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        dlq = DeadLetterQueue(config)
+        dlq.add(self._entry("m1", segments=["page 1", "page 2"], delivered_segments=1))
+        dlq.add(self._entry("m2"))
+        dlq.remove("m2")
+
+        restored = DeadLetterQueue(config).list()
+        assert [e.message_id for e in restored] == ["m1"]
+        assert [s.content for s in restored[0].segments] == ["page 1", "page 2"]
+        assert restored[0].delivered_segments == 1
+
+    def test_persistence_keeps_segment_fields(self, tmp_path):
+        """测试 JSON 往返后图片内容仍为元组，分段保留首尾标记和页码"""
+        from wecom_notifier.core.dead_letter import DeadLetter, DeadLetterQueue
+        from wecom_notifier.core.models import SegmentInfo
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        image = ("aW1hZ2U=", "md5")
+        DeadLetterQueue(config).add(DeadLetter(
+            message_id="img",
+            target="https://example.com/hook",
+            msg_type="image",
+            content=image,
+            error="errcode 500",
+            segments=[SegmentInfo(content=image, is_first=True, is_last=True)],
+        ))
+        DeadLetterQueue(config).add(self._entry(
+            "doc",
+            segments=[
+                SegmentInfo(content="a", is_first=True, page_number=1, total_pages=2),
+                SegmentInfo(content="b", is_last=True, page_number=2, total_pages=2),
+            ],
+        ))
+
+        restored = {e.message_id: e for e in DeadLetterQueue(config).list()}
+        assert restored["img"].content == image
+        assert restored["img"].segments == [SegmentInfo(content=image, is_first=True, is_last=True)]
+        assert restored["doc"].segments[1] == SegmentInfo(content="b", is_last=True, page_number=2, total_pages=2)
+
+    def test_persistence_keeps_file_bytes(self, tmp_path):
+        """测试文件/语音内容的原始字节经 JSON 往返后不变"""
+        from wecom_notifier.core.dead_letter import DeadLetter, DeadLetterQueue
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        content = ("daily.pdf", b"%PDF-1.4\x00\xff", "sha-daily")
+        DeadLetterQueue(config).add(DeadLetter(
+            message_id="f1", target="https://example.com/hook", msg_type="file", content=content, error="errcode 500"
+        ))
+
+        assert DeadLetterQueue(config).list()[0].content == content
+
+    def test_removal_appends_instead_of_rewriting(self, tmp_path):
+        """测试取出和删除只追加删除标记，日志过长时压缩"""
+        from wecom_notifier.core import dead_letter
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        dlq = DeadLetterQueue(config)
+        for i in range(5):
+            dlq.add(self._entry(f"m{i}"))
+
+        with patch.object(DeadLetterQueue, "_rewrite") as rewrite:
+            dlq.pop(2)
+            dlq.remove("m4")
+            assert not rewrite.called
+        assert [e.message_id for e in DeadLetterQueue(config).list()] == ["m2", "m3"]
+
+        with patch.object(dead_letter, "COMPACT_MIN_LINES", 2):
+            dlq.discard(dlq.list()[0])
+        lines = (tmp_path / "dead_letters.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        assert [e.message_id for e in DeadLetterQueue(config).list()] == ["m3"]
+
+    def test_discard_keeps_newer_record(self):
+        """测试重放期间写入的新记录不会被旧记录的删除覆盖"""
+        from wecom_notifier.core.dead_letter import DeadLetterQueue
+
+        dlq = DeadLetterQueue()
+        old = self._entry("m1")
+        dlq.add(old)
+        dlq.add(self._entry("m1", attempts=2))
+
+        assert not dlq.discard(old)
+        assert dlq.get("m1").attempts == 2
+
+
+class TestNotifierDeadLetters:
+    """测试 WeComNotifier 的死信与重放"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_failed_message_dead_lettered_and_replayed(self, mock_send):
+        """测试失败消息进入死信队列，恢复后重放"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (False, "errcode 500")
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-dlq"
+
+        results = [notifier.send_text(url, f"alert {i}", async_send=False) for i in range(3)]
+        assert not any(r.is_success() for r in results)
+        assert len(notifier.dead_letters) == 3
+        assert notifier.dead_letters.list()[0].error.endswith("errcode 500")
+
+        # webhook 恢复后重放
+        mock_send.return_value = (True, None)
+        start = time.time()
+        replayed = notifier.replay_dead_letters(rate=600)
+
+        assert len(replayed) == 3
+        assert all(r.wait(timeout=5) and r.is_success() for r in replayed)
+        assert [r.message_id for r in replayed] == [r.message_id for r in results]
+        # 600条/分钟 → 每条间隔0.1秒
+        assert time.time() - start >= 0.2
+        assert len(notifier.dead_letters) == 0
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_replay_failure_increments_attempts(self, mock_send):
+        """测试重放再次失败时尝试次数递增"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (False, "errcode 500")
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-dlq-again"
+
+        notifier.send_text(url, "alert", async_send=False)
+        replayed = notifier.replay_dead_letters(rate=None)
+        assert replayed[0].wait(timeout=5)
+
+        entries = notifier.dead_letters.list()
+        assert len(entries) == 1
+        assert entries[0].attempts == 2
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_non_resumable_failure_dead_lettered(self, mock_send):
+        """测试不可续传的失败（发送时抛出异常）也进入死信队列"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.side_effect = RuntimeError("connection reset")
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-dlq-internal"
+
+        result = notifier.send_text(url, "alert", async_send=False)
+        assert not result.is_success()
+        assert len(notifier.dead_letters) == 1
+
+        mock_send.side_effect = None
+        mock_send.return_value = (True, None)
+        replayed = notifier.replay_dead_letters(rate=None)
+        assert replayed[0].wait(timeout=5) and replayed[0].is_success()
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_dropped_messages_not_dead_lettered(self, mock_send):
+        """测试被取代、过期和准入拒绝的消息不进入死信队列"""
+        from wecom_notifier import WeComNotifier
+
+        def slow_send(*args, **kwargs):
+            time.sleep(0.3)
+            return True, None
+
+        mock_send.side_effect = slow_send
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-dlq-dropped"
+
+        notifier.send_text(url, "blocker")
+        time.sleep(0.05)
+        stale = notifier.send_text(url, "deploy 10%", conflate_key="deploy")
+        latest = notifier.send_text(url, "deploy 90%", conflate_key="deploy")
+        expired = notifier.send_text(url, "stale alert", deadline=time.time() - 1)
+
+        full_url = "https://example.com/webhook-dlq-full"
+        limiter = notifier._get_or_create_rate_limiter(full_url)
+        for _ in range(limiter.max_count):
+            limiter.acquire()
+        rejected = notifier.send_text(full_url, "late alert", max_delay=0)
+
+        assert latest.wait(timeout=5) and latest.is_success()
+        assert stale.is_superseded() and expired.is_expired() and rejected.is_rejected()
+        assert len(notifier.dead_letters) == 0
+        assert notifier.replay_dead_letters(rate=None) == []
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_replay_keeps_letter_while_waiting(self, mock_send):
+        """测试重放等待配额期间死信仍在队列中，重新入队后才删除"""
+        import threading
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.platforms.wecom import notifier as notifier_module
+
+        mock_send.return_value = (False, "errcode 500")
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-dlq-wait"
+        notifier.send_text(url, "alert 1", async_send=False)
+        notifier.send_text(url, "alert 2", async_send=False)
+
+        mock_send.return_value = (True, None)
+        queued_during_wait = []
+        real_sleep = time.sleep
+
+        def record_sleep(seconds):
+            # 只记录重放线程的等待（time 模块是共享的，后台线程也会调用）
+            if threading.current_thread() is threading.main_thread():
+                queued_during_wait.append(len(notifier.dead_letters))
+            else:
+                real_sleep(seconds)
+
+        with patch.object(notifier_module.time, "sleep", side_effect=record_sleep):
+            replayed = notifier.replay_dead_letters(rate=60)
+
+        # 第二条等待（速率间隔和配额）期间，第一条已删除，第二条仍在队列中
+        assert queued_during_wait and all(n == 1 for n in queued_during_wait)
+        assert all(r.wait(timeout=5) and r.is_success() for r in replayed)
+        assert len(notifier.dead_letters) == 0
+        notifier.stop_all()
+
+    def test_restore_message_from_dead_letter(self):
+        """测试从持久化的死信重建消息（保留检查点）"""
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.core.dead_letter import DeadLetter
+
+        entry = DeadLetter(
+            message_id="m1",
+            target="https://example.com/hook",
+            msg_type="markdown_v2",
+            content="# report",
+            error="errcode 500",
+            segments=["page 1", "page 2", "page 3"],
+            delivered_segments=2,
+            options={"mention_all": True},
+        )
+
+        message = WeComNotifier._restore_dead_letter_message(entry)
+        assert message.id == "m1"
+        assert message.mention_all
+        assert message.delivered_segments == 2
+        assert [s.content for s in message.segments] == ["page 1", "page 2", "page 3"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
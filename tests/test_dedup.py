@@ -0,0 +1,194 @@
+"""
+重复消息去重测试
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class TestDedupCache:
+    """测试 DedupCache"""
+
+    def test_duplicate_within_window(self):
+        """测试窗口内的重复消息被抑制"""
+        from wecom_notifier.core.dedup import DedupCache
+
+        cache = DedupCache({"window": 60})
+
+        assert cache.check("hook", "text", "disk full", "m1") == (False, None, 0)
+        assert cache.check("hook", "text", "disk full", "m2") == (True, "m1", 0)
+        assert cache.check("hook", "text", "disk full", "m3") == (True, "m1", 0)
+        assert cache.suppressed_total == 2
+
+    def test_key_includes_target_and_type(self):
+        """测试不同目标、不同消息类型不视为重复"""
+        from wecom_notifier.core.dedup import DedupCache
+
+        cache = DedupCache()
+        cache.check("hook-a", "text", "same", "m1")
+
+        assert not cache.check("hook-b", "text", "same", "m2")[0]
+        assert not cache.check("hook-a", "markdown_v2", "same", "m3")[0]
+        assert not cache.check("hook-a", "text", "different", "m4")[0]
+
+    def test_repeat_count_after_window(self):
+        """测试窗口结束后返回被抑制的次数"""
+        from wecom_notifier.core.dedup import DedupCache
+
+        cache = DedupCache({"window": 0.05})
+        cache.check("hook", "text", "alert", "m1")
+        cache.check("hook", "text", "alert", "m2")
+        cache.check("hook", "text", "alert", "m3")
+
+        time.sleep(0.1)
+        is_dup, _, repeated = cache.check("hook", "text", "alert", "m4")
+        assert not is_dup
+        assert repeated == 2
+        assert cache.format_suffix(repeated) == "\n\n(repeated 2 times)"
+        assert cache.format_suffix(0) == ""
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        from wecom_notifier.core.dedup import DedupCache
+
+        cache = DedupCache({"max_size": 2})
+        cache.check("hook", "text", "a", "m1")
+        cache.check("hook", "text", "b", "m2")
+        cache.check("hook", "text", "a", "m3")  # 命中，a 变为最近使用
+        cache.check("hook", "text", "c", "m4")  # 淘汰 b
+
+        stats = cache.get_stats()
+        assert stats["size"] == 2
+        assert stats["evicted_total"] == 1
+        assert cache.check("hook", "text", "a", "m5")[0]
+        assert not cache.check("hook", "text", "b", "m6")[0]
+
+    def test_duplicates_follow_original(self):
+        """测试重复消息随原始消息完成；原始消息失败时条目被释放"""
+        from wecom_notifier.core.dedup import DedupCache
+        from wecom_notifier.core.models import SendResult
+
+        cache = DedupCache()
+        early = SendResult("m2")
+        cache.check("hook", "text", "alert", "m1")
+        assert cache.check("hook", "text", "alert", "m2", early)[0]
+
+        original = SendResult("m1")
+        cache.bind("m1", original)
+        late = SendResult("m3")
+        assert cache.check("hook", "text", "alert", "m3", late)[0]
+        assert not early.is_done() and not late.is_done()
+
+        original.mark_failed("network down")
+        for duplicate in (early, late):
+            assert duplicate.is_done() and not duplicate.is_success()
+            assert duplicate.duplicate_of == "m1"
+        assert cache.check("hook", "text", "alert", "m4") == (False, None, 0)
+
+    def test_invalid_config(self):
+        """测试非法配置"""
+        from wecom_notifier.core.dedup import DedupCache
+
+        with pytest.raises(ValueError):
+            DedupCache({"window": 0})
+        with pytest.raises(ValueError):
+            DedupCache({"max_size": 0})
+
+
+class TestNotifierDedup:
+    """测试 WeComNotifier 的去重集成"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_duplicates_not_sent(self, mock_send):
+        """测试重复消息不会发送"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier(enable_dedup=True)
+        url = "https://example.com/webhook-dedup"
+
+        first = notifier.send_text(url, "CPU > 90%", async_send=False)
+        second = notifier.send_text(url, "CPU > 90%", async_send=False)
+
+        assert first.is_success()
+        assert second.is_success()
+        assert second.is_duplicate()
+        assert second.status == "duplicate"
+        assert second.duplicate_of == first.message_id
+        assert mock_send.call_count == 1
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_repeat_suffix_on_next_copy(self, mock_send):
+        """测试下一次发送附加重复次数提示"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier(enable_dedup=True, dedup_config={"window": 0.1})
+        url = "https://example.com/webhook-dedup-suffix"
+
+        notifier.send_text(url, "Disk full", async_send=False)
+        notifier.send_text(url, "Disk full", async_send=False)
+        notifier.send_text(url, "Disk full", async_send=False)
+        time.sleep(0.15)
+        notifier.send_text(url, "Disk full", async_send=False)
+
+        assert mock_send.call_count == 2
+        last_content = mock_send.call_args[0][1]
+        assert last_content.endswith("(repeated 2 times)")
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_original_fails(self, mock_send):
+        """测试原始消息发送失败时，重复消息不报告成功，下一份副本正常发送"""
+        from wecom_notifier import WeComNotifier
+
+        release = threading.Event()
+
+        def send(url, content, **kwargs):
+            release.wait(5)
+            return False, "network down"
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier(enable_dedup=True)
+        url = "https://example.com/webhook-dedup-fail"
+
+        try:
+            first = notifier.send_text(url, "CPU > 90%")
+            second = notifier.send_text(url, "CPU > 90%")
+            assert not second.is_done()
+
+            release.set()
+            assert second.wait(5)
+            assert not first.is_success()
+            assert not second.is_success() and second.duplicate_of == first.message_id
+
+            mock_send.side_effect = None
+            mock_send.return_value = (True, None)
+            third = notifier.send_text(url, "CPU > 90%", async_send=False)
+            assert third.is_success() and not third.is_duplicate()
+            assert mock_send.call_count == 2
+        finally:
+            notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_dedup_disabled_by_default(self, mock_send):
+        """测试默认不去重"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-no-dedup"
+
+        notifier.send_text(url, "same", async_send=False)
+        notifier.send_text(url, "same", async_send=False)
+
+        assert notifier.dedup_cache is None
+        assert mock_send.call_count == 2
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,192 @@
+"""
+摘要聚合测试
+"""
+import gc
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class _Msg:
+    """测试用的最小消息对象"""
+
+    def __init__(self, content, group, deadline=None):
+        self.id = f"msg-{content}"
+        self.content = content
+        self.digest_group = group
+        self.deadline = deadline
+
+
+class TestDigestAggregator:
+    """测试 DigestAggregator"""
+
+    def _make(self, config):
+        from wecom_notifier.core.digest import DigestAggregator
+        from wecom_notifier.core.models import SendResult
+
+        sent = []
+
+        def flush(target, content, items):
+            result = SendResult(f"digest-{len(sent)}")
+            sent.append((target, content, items, result))
+            return result
+
+        return DigestAggregator(flush, config), sent
+
+    def test_flush_after_window(self):
+        """测试窗口到期后发送汇总"""
+        aggregator, sent = self._make({"window": 0.1})
+
+        results = [aggregator.add("hook", "hook", _Msg(f"alert {i}", "disk")) for i in range(3)]
+        assert not sent
+
+        time.sleep(0.3)
+        assert len(sent) == 1
+        _, content, items, digest_result = sent[0]
+        assert "disk（3 条）" in content
+        assert len(items) == 3
+
+        digest_result.mark_success()
+        assert all(r.is_success() for r in results)
+        assert results[0].digest_id == "digest-0"
+        aggregator.stop()
+
+    def test_flush_on_byte_budget(self):
+        """测试字节预算填满时立即发送"""
+        aggregator, sent = self._make({"window": 60, "max_bytes": 20})
+
+        aggregator.add("hook", "hook", _Msg("0123456789", "g"))
+        assert not sent
+        aggregator.add("hook", "hook", _Msg("abcdefghij", "g"))
+        assert len(sent) == 1
+        aggregator.stop()
+
+    def test_default_renderer(self):
+        """测试默认渲染：计数、前 K 条样例、链接"""
+        aggregator, sent = self._make({"window": 60, "max_samples": 2, "link_template": "https://ops/{group}"})
+
+        for i in range(5):
+            aggregator.add("hook", "hook", _Msg(f"cpu {i}", "cpu"))
+        aggregator.add("hook", "hook", _Msg("mem 0", "mem"))
+        aggregator.flush_all()
+
+        content = sent[0][1]
+        assert "共 6 条" in content
+        assert "cpu（5 条）" in content
+        assert "- cpu 0" in content and "- cpu 1" in content
+        assert "cpu 2" not in content
+        assert "其余 3 条已省略" in content
+        assert "[查看详情](https://ops/cpu)" in content
+        aggregator.stop()
+
+    def test_custom_renderer(self):
+        """测试自定义渲染函数"""
+        def renderer(groups, start, end):
+            return ",".join(f"{g}={len(items)}" for g, items in groups.items())
+
+        aggregator, sent = self._make({"renderer": renderer})
+        aggregator.add("hook", "hook", _Msg("a", "x"))
+        aggregator.add("hook", "hook", _Msg("b", "y"))
+        aggregator.stop()
+
+        assert sent[0][1] == "x=1,y=1"
+
+    def test_failed_digest_fails_members(self):
+        """测试汇总发送失败时成员结果失败"""
+        aggregator, sent = self._make({"window": 60})
+        result = aggregator.add("hook", "hook", _Msg("a", "x"))
+        aggregator.stop()
+
+        sent[0][3].mark_failed("network error")
+        assert not result.is_success()
+        assert "network error" in result.error
+
+    def test_member_deadline_flushes_early(self):
+        """测试成员截止时间早于窗口时提前发送，汇总过期时成员结果为 expired"""
+        aggregator, sent = self._make({"window": 60})
+
+        aggregator.add("hook", "hook", _Msg("a", "x"))
+        result = aggregator.add("hook", "hook", _Msg("b", "x", deadline=time.time() + 0.1))
+
+        time.sleep(0.4)
+        assert len(sent) == 1
+        sent[0][3].mark_expired()
+        assert result.is_expired()
+        aggregator.stop()
+
+
+class TestNotifierDigest:
+    """测试 WeComNotifier 的摘要集成"""
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_alert_storm_collapsed(self, mock_text, mock_markdown):
+        """测试告警风暴合并为一条汇总消息"""
+        from wecom_notifier import WeComNotifier
+
+        mock_text.return_value = (True, None)
+        mock_markdown.return_value = (True, None)
+        # 先回收之前测试遗留的通知器（析构时会等待线程退出），避免拖慢下面的突发发送
+        gc.collect()
+        notifier = WeComNotifier(digest_config={"window": 2.0})
+        url = "https://example.com/webhook-digest"
+
+        results = [
+            notifier.send_text(url, f"Disk usage {90 + i % 10}% on host-{i}", digest_group="disk")
+            for i in range(50)
+        ]
+
+        assert results[-1].wait(timeout=10)
+        assert all(r.is_success() for r in results)
+        assert not mock_text.called
+        assert mock_markdown.call_count == 1
+        assert "共 50 条" in mock_markdown.call_args[0][1]
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_digest_keeps_earliest_deadline(self, mock_text, mock_markdown):
+        """测试汇总消息沿用成员中最早的截止时间"""
+        from wecom_notifier import WeComNotifier
+
+        mock_text.return_value = (True, None)
+        mock_markdown.return_value = (True, None)
+        notifier = WeComNotifier(digest_config={"window": 60})
+        url = "https://example.com/webhook-digest-ttl"
+
+        with patch.object(notifier, "_dispatch", wraps=notifier._dispatch) as dispatch:
+            notifier.send_text(url, "a", digest_group="g", ttl=30)
+            notifier.send_text(url, "b", digest_group="g", ttl=10)
+            notifier.send_text(url, "c", digest_group="g")
+            expected = time.time() + 10
+            notifier.digest_aggregator.flush_all()
+
+            digest_message = dispatch.call_args[0][1]
+            assert digest_message.deadline == pytest.approx(expected, abs=1)
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_mentions_bypass_digest(self, mock_text, mock_markdown):
+        """测试 @指定成员的消息不参与汇总，直接发送"""
+        from wecom_notifier import WeComNotifier
+
+        mock_text.return_value = (True, None)
+        mock_markdown.return_value = (True, None)
+        notifier = WeComNotifier(digest_config={"window": 60})
+        url = "https://example.com/webhook-digest-mention"
+
+        result = notifier.send_text(
+            url, "disk full", digest_group="disk", mentioned_list=["ops"], async_send=False
+        )
+
+        assert result.is_success()
+        assert result.digest_id is None
+        assert mock_text.call_count == 1
+        assert not mock_markdown.called
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,302 @@
+"""
+公平消息队列测试
+
+验证 FairMessageQueue 的加权赤字轮转调度，以及在 WeComNotifier 中的集成
+"""
+import queue
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class _Msg:
+    """测试用的最小消息对象"""
+
+    def __init__(self, tenant=None, cost=1, name="", deadline=None, conflate_key=None):
+        self.tenant = tenant
+        self.cost = cost
+        self.name = name
+        self.deadline = deadline
+        self.conflate_key = conflate_key
+
+
+class TestFairMessageQueue:
+    """测试 FairMessageQueue 调度行为"""
+
+    def test_fifo_within_single_tenant(self):
+        """测试单租户时保持 FIFO 顺序"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        for i in range(5):
+            q.put(_Msg(name=str(i)))
+
+        assert [q.get_nowait().name for _ in range(5)] == ["0", "1", "2", "3", "4"]
+        assert q.empty()
+
+    def test_burst_does_not_starve_other_tenant(self):
+        """测试突发租户不会饿死其他租户"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        for i in range(100):
+            q.put(_Msg(tenant="noisy", name=f"n{i}"))
+        q.put(_Msg(tenant="quiet", name="q0"))
+
+        order = [q.get_nowait().name for _ in range(3)]
+        assert "q0" in order
+
+    def test_weighted_share(self):
+        """测试按权重分配吞吐份额"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue(weights={"a": 3, "b": 1})
+        for _ in range(40):
+            q.put(_Msg(tenant="a"))
+            q.put(_Msg(tenant="b"))
+
+        first = [q.get_nowait().tenant for _ in range(20)]
+        assert first.count("a") == 15
+        assert first.count("b") == 5
+
+    def test_cost_function_counts_segments(self):
+        """测试成本函数（大消息消耗更多额度）"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue(cost_func=lambda m: m.cost)
+        for _ in range(10):
+            q.put(_Msg(tenant="big", cost=4))
+            q.put(_Msg(tenant="small", cost=1))
+
+        first = [q.get_nowait().tenant for _ in range(10)]
+        # small 每条成本为1，应获得更多出队次数
+        assert first.count("small") > first.count("big")
+
+    def test_get_timeout_raises_empty(self):
+        """测试超时抛出 queue.Empty"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        start = time.time()
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.1)
+        assert time.time() - start >= 0.1
+
+    def test_blocking_get_wakes_on_put(self):
+        """测试阻塞的 get 在 put 后被唤醒"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        threading.Timer(0.05, lambda: q.put(_Msg(name="late"))).start()
+        assert q.get(timeout=2).name == "late"
+
+    def test_invalid_weight(self):
+        """测试非法权重"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        with pytest.raises(ValueError):
+            FairMessageQueue(weights={"a": 0})
+
+    def test_task_done_and_join(self):
+        """测试 task_done / join 语义与 queue.Queue 一致"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        q.put(_Msg())
+        q.get_nowait()
+        q.task_done()
+        q.join()
+
+        with pytest.raises(ValueError):
+            q.task_done()
+
+
+class TestDeadlineExpiry:
+    """测试消息截止时间（TTL）"""
+
+    def test_expired_messages_are_skipped(self):
+        """测试过期消息不会出队，并触发回调"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        expired = []
+        q = FairMessageQueue(on_expired=expired.append)
+        q.put(_Msg(name="stale", deadline=time.time() + 0.05))
+        q.put(_Msg(name="fresh"))
+
+        time.sleep(0.1)
+        assert q.get_nowait().name == "fresh"
+        assert [m.name for m in expired] == ["stale"]
+        assert q.expired_count == 1
+        assert q.empty()
+
+    def test_large_backlog_purge(self):
+        """测试大量积压消息过期清理"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        deadline = time.time() + 1.0
+        for i in range(100000):
+            q.put(_Msg(tenant=f"t{i % 7}", deadline=deadline))
+        q.put(_Msg(name="keep"))
+
+        time.sleep(max(0.0, deadline - time.time()) + 0.05)
+        start = time.time()
+        assert q.get_nowait().name == "keep"
+        assert time.time() - start < 2
+        assert q.expired_count == 100000
+        assert q.empty()
+
+    def test_send_result_expired_status(self):
+        """测试 SendResult 的 expired 状态"""
+        from wecom_notifier.core.models import SendResult
+
+        result = SendResult("msg-1")
+        result.mark_expired()
+
+        assert result.wait(timeout=0)
+        assert not result.is_success()
+        assert result.is_expired()
+        assert result.status == "expired"
+
+    def test_message_ttl_to_deadline(self):
+        """测试 ttl 转换为截止时间"""
+        from wecom_notifier.models import Message
+
+        message = Message(content="hi", msg_type="text", ttl=10)
+        assert message.deadline is not None
+        assert not message.is_expired()
+
+        message = Message(content="hi", msg_type="text", ttl=10, deadline=time.time() - 1)
+        assert message.is_expired()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_expired_message_not_sent(self, mock_send):
+        """测试已过期的消息不会消耗配额"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+
+        notifier = WeComNotifier()
+        result = notifier.send_text(
+            webhook_url="https://example.com/webhook-ttl",
+            content="stale alert",
+            deadline=time.time() - 1,
+            async_send=False
+        )
+
+        assert result.is_expired()
+        assert not mock_send.called
+        limiter = notifier.rate_limiters["https://example.com/webhook-ttl"]
+        assert limiter.get_available_count() == limiter.max_count
+        notifier.stop_all()
+
+
+class TestConflation:
+    """测试最新值优先的消息合并"""
+
+    def test_newer_message_replaces_in_place(self):
+        """测试新消息原地替换旧消息并保留排队位置"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        superseded = []
+        q = FairMessageQueue(on_superseded=lambda old, new: superseded.append((old.name, new.name)))
+        q.put(_Msg(name="progress-10", conflate_key="deploy"))
+        q.put(_Msg(name="other"))
+        q.put(_Msg(name="progress-40", conflate_key="deploy"))
+        q.put(_Msg(name="progress-90", conflate_key="deploy"))
+
+        assert q.qsize() == 2
+        assert superseded == [("progress-10", "progress-40"), ("progress-40", "progress-90")]
+        assert [q.get_nowait().name for _ in range(2)] == ["progress-90", "other"]
+
+        # 已出队后，同 key 的新消息重新排队
+        q.put(_Msg(name="progress-100", conflate_key="deploy"))
+        assert q.get_nowait().name == "progress-100"
+
+    def test_conflation_scoped_to_tenant(self):
+        """测试不同租户的相同 key 不互相替换，成本计入各自租户"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        superseded = []
+        q = FairMessageQueue(
+            cost_func=lambda m: m.cost,
+            on_superseded=lambda old, new: superseded.append((old.name, new.name))
+        )
+        q.put(_Msg(tenant="a", name="a-1", conflate_key="status"))
+        q.put(_Msg(tenant="b", name="b-1", cost=5, conflate_key="status"))
+        q.put(_Msg(tenant="b", name="b-2", cost=5, conflate_key="status"))
+
+        assert superseded == [("b-1", "b-2")]
+        assert q.qsize() == 2
+        assert q.pending_cost() == 6
+        assert sorted(q.get_nowait().name for _ in range(2)) == ["a-1", "b-2"]
+
+    def test_replaced_deadline_is_respected(self):
+        """测试替换后按新消息的截止时间判断过期"""
+        from wecom_notifier.core.fair_queue import FairMessageQueue
+
+        q = FairMessageQueue()
+        q.put(_Msg(name="old", conflate_key="k", deadline=time.time() + 0.05))
+        q.put(_Msg(name="new", conflate_key="k"))
+
+        time.sleep(0.1)
+        assert q.get_nowait().name == "new"
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_notifier_superseded_results(self, mock_send):
+        """测试被取代消息的 SendResult 状态为 superseded"""
+        from wecom_notifier import WeComNotifier
+
+        def slow_send(*args, **kwargs):
+            time.sleep(0.3)
+            return True, None
+
+        mock_send.side_effect = slow_send
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-conflate"
+
+        blocker = notifier.send_text(url, "blocker")
+        time.sleep(0.05)
+        results = [
+            notifier.send_text(url, f"queue depth now {n}", conflate_key="queue-depth")
+            for n in (10, 20, 30)
+        ]
+
+        assert results[-1].wait(timeout=5)
+        assert blocker.is_success()
+        assert results[0].is_superseded()
+        assert results[1].is_superseded()
+        assert results[1].superseded_by == results[2].message_id
+        assert results[2].is_success()
+        assert mock_send.call_count == 2
+        notifier.stop_all()
+
+
+class TestNotifierTenantIntegration:
+    """测试 WeComNotifier 的租户参数"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_send_with_tenant(self, mock_send):
+        """测试带租户标识发送"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+
+        notifier = WeComNotifier(tenant_weights={"team-a": 2})
+        result = notifier.send_text(
+            webhook_url="https://example.com/webhook-tenant",
+            content="Hello",
+            tenant="team-a",
+            async_send=False
+        )
+
+        assert result.is_success()
+        manager = notifier.webhook_managers["https://example.com/webhook-tenant"]
+        assert manager.message_queue.get_weight("team-a") == 2
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
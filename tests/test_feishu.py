@@ -284,6 +284,88 @@ class TestFeishuNotifier:
         notifier = FeishuNotifier(secret="test_secret")
         assert notifier.sender.secret == "test_secret"
 
+    @patch('wecom_notifier.platforms.feishu.sender.FeishuSender.send_text')
+    def test_streaming_page_indicators(self, mock_send):
+        """测试流式页码模式下边分段边发送"""
+        from wecom_notifier.platforms.feishu import FeishuNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = FeishuNotifier(page_indicator_mode="streaming")
+        content = "\n".join(f"{i}. " + "日志内容" * 50 for i in range(100))
+
+        result = notifier.send_text("https://example.com/feishu-streaming", content, async_send=False)
+
+        sent = [c.args[1] for c in mock_send.call_args_list]
+        assert result.is_success()
+        assert result.segment_count == len(sent) > 1
+        assert sent[0].startswith("(Page 1)\n")
+        assert sent[-1].startswith(f"(Page {len(sent)}, end)\n")
+        notifier.stop_all()
+
+
+class TestFeishuWebhookPool:
+    """测试飞书 Webhook 池"""
+
+    def test_pool_inherits_base(self):
+        """测试 FeishuWebhookPool 继承 WebhookPoolBase"""
+        from wecom_notifier.core.pool_base import WebhookPoolBase
+        from wecom_notifier.platforms.feishu import FeishuWebhookPool
+
+        assert issubclass(FeishuWebhookPool, WebhookPoolBase)
+
+    def test_mentions_only_on_first_segment(self):
+        """测试 @ 标签只加在第一个分段"""
+        from unittest.mock import Mock
+        from wecom_notifier.core.resource import WebhookResource
+        from wecom_notifier.platforms.feishu import (
+            DualRateLimiter, FeishuMessage, FeishuWebhookPool,
+        )
+
+        pool = FeishuWebhookPool(
+            resources=[WebhookResource("https://example.com/hook", DualRateLimiter())],
+            sender=Mock(),
+            segmenter=Mock()
+        )
+        message = FeishuMessage("content", "text", mentions=["ou_123"]).to_message()
+
+        _, first, _ = pool._prepare_segment_params(message, Mock(content="page 1"), 0)
+        _, second, _ = pool._prepare_segment_params(message, Mock(content="page 2"), 1)
+        assert first.startswith("<at user_id=\"ou_123\">")
+        assert second == "page 2"
+        pool.stop()
+
+    @patch('wecom_notifier.platforms.feishu.sender.FeishuSender.send_card')
+    def test_send_card_via_pool(self, mock_send):
+        """测试通过 URL 列表负载均衡发送卡片"""
+        from wecom_notifier.platforms.feishu import FeishuNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = FeishuNotifier()
+        urls = ["https://example.com/feishu-a", "https://example.com/feishu-b"]
+
+        results = [
+            notifier.send_card(urls, f"# 告警 {i}", title="告警", template="red", async_send=False)
+            for i in range(4)
+        ]
+
+        assert all(r.is_success() for r in results)
+        used = [c.kwargs["webhook_url"] for c in mock_send.call_args_list]
+        assert set(used) == set(urls)
+        assert mock_send.call_args.kwargs["title"] == "告警"
+        assert mock_send.call_args.kwargs["template"] == "red"
+        # 单 webhook 与池模式共享同一个频率限制器
+        pool = notifier._get_or_create_pool(list(reversed(urls)))
+        assert pool.resources[0].rate_limiter is notifier._rate_limiters[urls[0]]
+        notifier.stop_all()
+
+    def test_empty_list_rejected(self):
+        """测试空的 URL 列表"""
+        from wecom_notifier.platforms.feishu import FeishuNotifier
+
+        notifier = FeishuNotifier()
+        with pytest.raises(ValueError):
+            notifier.send_text([], "hello")
+
 
 class TestExceptionHierarchy:
     """测试异常继承关系"""
@@ -0,0 +1,181 @@
+"""
+幂等键测试
+"""
+import time
+
+import pytest
+from unittest.mock import patch
+
+
+class TestIdempotencyStore:
+    """测试 IdempotencyStore"""
+
+    def test_get_or_create(self):
+        """测试相同 key 只创建一次"""
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        store = IdempotencyStore()
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return SendResult(f"msg-{len(calls)}")
+
+        first, created = store.get_or_create("report", factory)
+        second, created_again = store.get_or_create("report", factory)
+
+        assert created and not created_again
+        assert first is second
+        assert len(calls) == 1
+
+    def test_failed_result_releases_key(self):
+        """测试发送失败后 key 被释放"""
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        store = IdempotencyStore()
+        result, _ = store.get_or_create("report", lambda: SendResult("msg-1"))
+        result.mark_failed("network error")
+
+        assert store.get("report") is None
+        retry, created = store.get_or_create("report", lambda: SendResult("msg-2"))
+        assert created
+        assert retry.message_id == "msg-2"
+
+    def test_retention(self):
+        """测试超过保留时间的 key 失效"""
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        store = IdempotencyStore({"retention": 0.05})
+        store.get_or_create("report", lambda: SendResult("msg-1"))
+
+        time.sleep(0.1)
+        assert store.get("report") is None
+        assert len(store) == 0
+
+    def test_max_size(self):
+        """测试超过容量时淘汰最早的 key"""
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        store = IdempotencyStore({"max_size": 2})
+        for i in range(3):
+            store.get_or_create(f"key-{i}", lambda: SendResult("msg"))
+
+        assert len(store) == 2
+        assert store.get("key-0") is None
+
+    def test_persistence(self, tmp_path):
+        """测试持久化后重启仍然有效"""
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        store = IdempotencyStore(config)
+        result, _ = store.get_or_create("report", lambda: SendResult("msg-1"))
+        result.segment_count = 3
+        result.mark_success()
+
+        restored = IdempotencyStore(config).get("report")
+        assert restored is not None
+        assert restored.message_id == "msg-1"
+        assert restored.is_success()
+        assert restored.segment_count == 3
+
+    def test_persistence_appends_and_compacts(self, tmp_path):
+        """测试每次成功只追加一行，日志过长时压缩为当前条目"""
+        from wecom_notifier.core import idempotency
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        config = {"persist": True, "cache_dir": str(tmp_path), "max_size": 1}
+        store = IdempotencyStore(config)
+        with patch.object(idempotency, "COMPACT_MIN_LINES", 3):
+            for i in range(3):
+                result, _ = store.get_or_create(f"key-{i}", lambda: SendResult(f"msg-{i}"))
+                result.mark_success()
+            assert len((tmp_path / "idempotency.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+
+            result, _ = store.get_or_create("key-3", lambda: SendResult("msg-3"))
+            result.mark_success()
+            # 第4行触发压缩，只保留容量内的条目
+            assert len((tmp_path / "idempotency.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+
+        restored = IdempotencyStore(config)
+        assert restored.get("key-2") is None
+        assert restored.get("key-3").message_id == "msg-3"
+
+    def test_factory_runs_outside_lock(self):
+        """测试 factory 在锁外执行：入队期间其他 key 不被阻塞，相同 key 等待同一结果"""
+        import threading
+        from wecom_notifier.core.idempotency import IdempotencyStore
+        from wecom_notifier.core.models import SendResult
+
+        store = IdempotencyStore()
+        entered = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_factory():
+            calls.append(1)
+            entered.set()
+            release.wait(timeout=5)
+            return SendResult("slow")
+
+        results = []
+        creator = threading.Thread(target=lambda: results.append(store.get_or_create("report", slow_factory)))
+        creator.start()
+        assert entered.wait(timeout=5)
+
+        waiter = threading.Thread(target=lambda: results.append(store.get_or_create("report", slow_factory)))
+        waiter.start()
+        other, created = store.get_or_create("other", lambda: SendResult("other"))
+        assert created and other.message_id == "other"
+
+        release.set()
+        creator.join(timeout=5)
+        waiter.join(timeout=5)
+        assert len(calls) == 1
+        assert results[0][0] is results[1][0]
+        assert sorted(created for _, created in results) == [False, True]
+
+
+class TestNotifierIdempotency:
+    """测试 WeComNotifier 的幂等键"""
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_repeat_returns_original_result(self, mock_send):
+        """测试重复调用返回原始结果且不会重复发送"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-idempotency"
+
+        first = notifier.send_markdown(url, "# Daily report", idempotency_key="report-1", async_send=False)
+        second = notifier.send_markdown(url, "# Daily report", idempotency_key="report-1", async_send=False)
+
+        assert first is second
+        assert first.is_success()
+        assert mock_send.call_count == 1
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_key_scoped_by_target(self, mock_send):
+        """测试不同目标使用相同 key 互不影响"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+
+        notifier.send_markdown("https://example.com/hook-a", "report", idempotency_key="k", async_send=False)
+        notifier.send_markdown("https://example.com/hook-b", "report", idempotency_key="k", async_send=False)
+
+        assert mock_send.call_count == 2
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+"""
+图片准备（流式 base64/MD5）与图片缓存测试
+"""
+import base64
+import hashlib
+import os
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+WEBHOOK_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=group-a"
+OTHER_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=group-b"
+
+
+def _expected(data: bytes):
+    """原实现的结果：整体编码和整体计算 MD5"""
+    return base64.b64encode(data).decode('utf-8'), hashlib.md5(data).hexdigest()
+
+
+class TestPrepareImage:
+    """测试 Sender.prepare_image"""
+
+    @pytest.mark.parametrize("size", [0, 1, 3 * 64 * 1024, 3 * 64 * 1024 + 1, 500 * 1024 + 7])
+    def test_file_matches_whole_encoding(self, tmp_path, size):
+        """测试分块编码的结果与整体编码一致（含空文件和块边界）"""
+        from wecom_notifier.platforms.wecom import Sender
+
+        data = os.urandom(size)
+        image = tmp_path / "chart.png"
+        image.write_bytes(data)
+
+        assert Sender.prepare_image(str(image)) == _expected(data)
+
+    def test_base64_input(self):
+        """测试 base64 输入：分块计算 MD5，带换行的输入按原方式解码"""
+        from wecom_notifier.platforms.wecom import Sender
+
+        data = os.urandom(600 * 1024)
+        encoded, md5 = _expected(data)
+
+        assert Sender.prepare_image(image_base64=encoded) == (encoded, md5)
+        wrapped = base64.encodebytes(data).decode('ascii')
+        assert Sender.prepare_image(image_base64=wrapped) == (wrapped, md5)
+
+    def test_invalid_parameters(self):
+        """测试无效 base64 和缺少参数"""
+        from wecom_notifier.platforms.wecom import Sender
+        from wecom_notifier.exceptions import InvalidParameterError
+
+        with pytest.raises(InvalidParameterError):
+            Sender.prepare_image(image_base64="abc")
+        with pytest.raises(InvalidParameterError):
+            Sender.prepare_image(image_base64="图片")
+        with pytest.raises(InvalidParameterError):
+            Sender.prepare_image()
+
+
+class TestImageCache:
+    """测试 ImageCache"""
+
+    def test_hit_and_invalidate_on_change(self, tmp_path):
+        """测试同一文件只编码一次，文件修改后重新编码"""
+        from wecom_notifier.platforms.wecom import ImageCache, Sender
+
+        image = tmp_path / "chart.png"
+        image.write_bytes(b"version-1")
+        cache = ImageCache()
+
+        with patch.object(Sender, "_encode_image_file", wraps=Sender._encode_image_file) as encode:
+            first = Sender.prepare_image(str(image), cache=cache)
+            assert Sender.prepare_image(str(image), cache=cache) == first
+            assert encode.call_count == 1
+
+            image.write_bytes(b"version-22")
+            assert Sender.prepare_image(str(image), cache=cache) == _expected(b"version-22")
+            assert encode.call_count == 2
+
+        assert cache.get_stats()["hits"] == 1
+
+    def test_invalidate_when_mtime_restored(self, tmp_path):
+        """测试改写为相同大小并回拨修改时间（如 cp -p）后仍然失效"""
+        from wecom_notifier.platforms.wecom import ImageCache, Sender
+
+        image = tmp_path / "chart.png"
+        image.write_bytes(b"version-1")
+        stat = image.stat()
+        cache = ImageCache()
+        Sender.prepare_image(str(image), cache=cache)
+
+        time.sleep(0.01)
+        image.write_bytes(b"version-2")
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert Sender.prepare_image(str(image), cache=cache) == _expected(b"version-2")
+
+    def test_base64_hit(self):
+        """测试相同 base64 输入跳过解码"""
+        from wecom_notifier.platforms.wecom import ImageCache, Sender
+
+        encoded, md5 = _expected(b"screenshot")
+        cache = ImageCache()
+
+        with patch.object(Sender, "_hash_image_base64", wraps=Sender._hash_image_base64) as hash_base64:
+            for _ in range(3):
+                assert Sender.prepare_image(image_base64=encoded, cache=cache) == (encoded, md5)
+            assert hash_base64.call_count == 1
+
+    def test_lru_bounds(self):
+        """测试按条目数和总字符数淘汰，超过上限的单张图片不缓存"""
+        from wecom_notifier.platforms.wecom import ImageCache
+
+        cache = ImageCache({"max_size": 2})
+        cache.put("a", ("aaaa", "m-a"))
+        cache.put("b", ("bbbb", "m-b"))
+        cache.get("a")
+        cache.put("c", ("cccc", "m-c"))
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+
+        cache = ImageCache({"max_chars": 8})
+        cache.put("a", ("aaaa", "m-a"))
+        cache.put("b", ("bbbb", "m-b"))
+        cache.put("c", ("cccc", "m-c"))
+        cache.put("big", ("x" * 12, "m-x"))
+        assert cache.get("a") is None and cache.get("big") is None
+        assert cache.get_stats()["chars"] == 8
+
+    def test_invalid_config(self):
+        """测试无效配置"""
+        from wecom_notifier.platforms.wecom import ImageCache
+
+        with pytest.raises(ValueError):
+            ImageCache({"max_size": 0})
+        with pytest.raises(ValueError):
+            ImageCache({"max_chars": 0})
+
+
+class TestNotifierImageCache:
+    """测试 WeComNotifier.send_image 复用图片准备结果"""
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_send_image_to_groups(self, mock_post, tmp_path):
+        """测试同一截图发到多个群时只编码一次"""
+        from wecom_notifier import WeComNotifier
+
+        mock_post.return_value = Mock(json=lambda: {"errcode": 0, "errmsg": "ok"})
+        image = tmp_path / "dashboard.png"
+        image.write_bytes(b"\x89PNG dashboard")
+
+        notifier = WeComNotifier(enable_image_cache=True)
+        try:
+            results = [
+                notifier.send_image(url, image_path=str(image), async_send=False)
+                for url in (WEBHOOK_URL, OTHER_URL, WEBHOOK_URL + "&debug=1")
+            ]
+        finally:
+            notifier.stop_all()
+
+        assert all(r.is_success() for r in results)
+        assert notifier.image_cache.get_stats()["hits"] == 2
+        encoded, md5 = _expected(b"\x89PNG dashboard")
+        assert mock_post.call_args[1]["json"] == {"msgtype": "image", "image": {"base64": encoded, "md5": md5}}
+
+    def test_disabled_by_default(self):
+        """测试图片缓存默认关闭"""
+        from wecom_notifier import WeComNotifier
+
+        notifier = WeComNotifier()
+        assert notifier.image_cache is None
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,216 @@
+"""
+素材ID缓存与文件/语音消息测试
+"""
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+WEBHOOK_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=group-a"
+OTHER_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=group-b"
+
+
+def _fake_post(calls, send_errors=None):
+    """记录请求的 requests.post 替身：上传返回递增的 media_id，发送依次返回 send_errors 中的错误码"""
+    send_errors = list(send_errors or [])
+
+    def post(url, json=None, files=None, **kwargs):
+        calls.append((url, json, files))
+        if "upload_media" in url:
+            media_id = f"m-{sum(1 for u, _, _ in calls if 'upload_media' in u)}"
+            return Mock(json=lambda: {"errcode": 0, "errmsg": "ok", "media_id": media_id})
+        errcode = send_errors.pop(0) if send_errors else 0
+        return Mock(json=lambda: {"errcode": errcode, "errmsg": "ok" if errcode == 0 else "invalid media_id"})
+    return post
+
+
+def _uploads(calls):
+    return [c for c in calls if "upload_media" in c[0]]
+
+
+class TestMediaCache:
+    """测试 MediaCache"""
+
+    def test_key_scoped_by_webhook(self):
+        """测试不同 webhook、素材类型、文件名或内容的键不同"""
+        from wecom_notifier.platforms.wecom import MediaCache
+
+        key = MediaCache.make_key(WEBHOOK_URL, "file", "sha-data", "a.pdf")
+
+        assert key == MediaCache.make_key(WEBHOOK_URL + "&debug=1", "file", "sha-data", "a.pdf")
+        assert key != MediaCache.make_key(OTHER_URL, "file", "sha-data", "a.pdf")
+        assert key != MediaCache.make_key(WEBHOOK_URL, "voice", "sha-data", "a.pdf")
+        assert key != MediaCache.make_key(WEBHOOK_URL, "file", "sha-data", "b.pdf")
+        assert key != MediaCache.make_key(WEBHOOK_URL, "file", "sha-other", "a.pdf")
+
+    def test_expiry_and_lru(self):
+        """测试过期条目失效，超过容量时淘汰最久未使用的条目"""
+        from wecom_notifier.platforms.wecom import MediaCache
+
+        cache = MediaCache({"ttl": 0.05})
+        cache.put("a", "m-a")
+        assert cache.get("a") == "m-a"
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.expired_total == 1
+
+        cache = MediaCache({"max_size": 2})
+        cache.put("a", "m-a")
+        cache.put("b", "m-b")
+        cache.get("a")
+        cache.put("c", "m-c")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "m-a" and cache.get("c") == "m-c"
+        assert cache.get_stats()["evicted_total"] == 1
+
+    def test_persist(self, tmp_path):
+        """测试持久化后新实例仍可命中"""
+        from wecom_notifier.platforms.wecom import MediaCache
+
+        config = {"persist": True, "cache_dir": str(tmp_path)}
+        cache = MediaCache(config)
+        cache.put("a", "m-a")
+        cache.put("b", "m-b")
+        cache.invalidate("b")
+
+        restored = MediaCache(config)
+        assert restored.get("a") == "m-a"
+        assert restored.get("b") is None
+
+    def test_invalid_config(self):
+        """测试无效配置"""
+        from wecom_notifier.platforms.wecom import MediaCache
+
+        with pytest.raises(ValueError):
+            MediaCache({"ttl": 0})
+        with pytest.raises(ValueError):
+            MediaCache({"max_size": 0})
+
+
+class TestSenderMediaCache:
+    """测试 Sender.send_media 复用 media_id"""
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_reuse_and_stale_media_id(self, mock_post):
+        """测试相同文件只上传一次；media_id 失效（40007）时重新上传"""
+        from wecom_notifier.platforms.wecom import MediaCache, Sender
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls, send_errors=[0, 0, 40007, 0])
+        sender = Sender(media_cache=MediaCache())
+
+        assert sender.send_media(WEBHOOK_URL, "file", b"daily report", "report.pdf") == (True, None)
+        assert sender.send_media(WEBHOOK_URL, "file", b"daily report", "report.pdf") == (True, None)
+        assert len(_uploads(calls)) == 1
+
+        # 第三次发送时缓存的 media_id 已失效
+        assert sender.send_media(WEBHOOK_URL, "file", b"daily report", "report.pdf") == (True, None)
+        assert len(_uploads(calls)) == 2
+        assert calls[-1][1] == {"msgtype": "file", "file": {"media_id": "m-2"}}
+
+
+class TestNotifierMedia:
+    """测试 WeComNotifier.send_file / send_voice"""
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_send_file_to_groups(self, mock_post, tmp_path):
+        """测试同一文件重复发到多个群时，每个群只上传一次"""
+        from wecom_notifier import WeComNotifier
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+        report = tmp_path / "daily.pdf"
+        report.write_bytes(b"%PDF-1.4 daily report")
+
+        notifier = WeComNotifier(enable_media_cache=True)
+        try:
+            results = [
+                notifier.send_file(url, file_path=str(report), async_send=False)
+                for url in (WEBHOOK_URL, OTHER_URL, WEBHOOK_URL, OTHER_URL)
+            ]
+        finally:
+            notifier.stop_all()
+
+        assert all(r.is_success() for r in results)
+        assert len(_uploads(calls)) == 2
+        assert _uploads(calls)[0][2]["media"][0] == "daily.pdf"
+        assert notifier.media_cache.get_stats()["hits"] == 2
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_content_hashed_once(self, mock_post):
+        """测试消息保留原始字节，发送和重试时不再编码/解码或重新计算哈希"""
+        import hashlib
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.platforms.wecom import Sender
+
+        data = b"%PDF-1.4 daily report"
+        filename, content, digest = Sender.prepare_media("file", data=data, filename="daily.pdf")
+        assert content is data
+        assert digest == hashlib.sha256(data).hexdigest()
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+        notifier = WeComNotifier(enable_media_cache=True)
+        try:
+            with patch('wecom_notifier.platforms.wecom.sender.hashlib.sha256', wraps=hashlib.sha256) as sha256:
+                results = [
+                    notifier.send_file(url, file_data=data, filename="daily.pdf", async_send=False)
+                    for url in (WEBHOOK_URL, OTHER_URL)
+                ]
+                # 每次 send_file 在 prepare_media 中计算一次，发送时复用
+                assert sha256.call_count == 2
+        finally:
+            notifier.stop_all()
+
+        assert all(r.is_success() for r in results)
+        assert _uploads(calls)[0][2]["media"][1] == data
+
+    @patch('wecom_notifier.platforms.wecom.sender.requests.post')
+    def test_send_voice(self, mock_post):
+        """测试语音消息上传为 voice 类型"""
+        from wecom_notifier import WeComNotifier
+
+        calls = []
+        mock_post.side_effect = _fake_post(calls)
+        notifier = WeComNotifier()
+        try:
+            result = notifier.send_voice(WEBHOOK_URL, voice_data=b"#!AMR\n...", filename="alert.amr", async_send=False)
+        finally:
+            notifier.stop_all()
+
+        assert result.is_success()
+        assert _uploads(calls)[0][0].endswith("type=voice")
+        assert calls[-1][1] == {"msgtype": "voice", "voice": {"media_id": "m-1"}}
+
+    def test_disabled_by_default(self):
+        """测试素材ID缓存默认关闭"""
+        from wecom_notifier import WeComNotifier
+
+        notifier = WeComNotifier()
+        assert notifier.media_cache is None
+        assert notifier.sender.media_cache is None
+        notifier.stop_all()
+
+    def test_invalid_parameters(self):
+        """测试缺少内容、缺少文件名、语音格式和大小校验"""
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.exceptions import InvalidParameterError
+
+        notifier = WeComNotifier()
+        try:
+            with pytest.raises(InvalidParameterError):
+                notifier.send_file(WEBHOOK_URL)
+            with pytest.raises(InvalidParameterError):
+                notifier.send_file(WEBHOOK_URL, file_data=b"hello world")
+            with pytest.raises(InvalidParameterError):
+                notifier.send_voice(WEBHOOK_URL, voice_data=b"hello world", filename="alert.mp3")
+            with pytest.raises(InvalidParameterError):
+                notifier.send_voice(WEBHOOK_URL, voice_data=b"x" * (2 * 1024 * 1024 + 1), filename="a.amr")
+        finally:
+            notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
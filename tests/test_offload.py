@@ -0,0 +1,183 @@
+"""
+预处理卸载测试
+"""
+import pytest
+from unittest.mock import patch
+
+
+def _report(rows: int = 300) -> str:
+    """生成需要分段的 Markdown 表格"""
+    return "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | 敏感数据{i} |" for i in range(rows))
+
+
+class _FakeModerator:
+    """替换 "敏感"，包含 "禁止" 时拒绝（模块级定义，可传递到子进程）"""
+
+    enabled = True
+
+    def __init__(self):
+        self.logged = []
+
+    def review(self, content):
+        if "禁止" in content:
+            return None, ["禁止"]
+        if "敏感" in content:
+            return content.replace("敏感", "**"), ["敏感"]
+        return content, []
+
+    def log_detection(self, message_id, content, detected_words, msg_type):
+        self.logged.append((message_id, detected_words))
+
+    def create_block_alert(self, content, message_id):
+        return f"blocked {message_id}"
+
+
+class TestPreprocessOffloader:
+    """测试 PreprocessOffloader"""
+
+    def test_threshold(self):
+        """测试只卸载超过阈值的文本"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        offloader = PreprocessOffloader(MessageSegmenter(), config={"min_bytes": 100, "executor": "thread"})
+
+        assert not offloader.should_offload("x" * 99)
+        assert offloader.should_offload("x" * 100)
+        assert offloader.should_offload("中" * 34)  # 102 字节
+        assert not offloader.should_offload(("base64", "md5"))
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_matches_inline_segmentation(self, executor):
+        """测试卸载后的分段和审核结果与工作线程中处理一致"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        moderator = _FakeModerator()
+        segmenter = MessageSegmenter(max_bytes=500)
+        offloader = PreprocessOffloader(segmenter, moderator, {"executor": executor, "max_workers": 1})
+        try:
+            prepared = offloader.prepare(_report(), "markdown_v2", "m1", moderate=True)
+        finally:
+            offloader.shutdown()
+
+        expected = [s.content.replace("敏感", "**") for s in segmenter.segment(_report(), "markdown_v2")]
+        assert [s.content for s in prepared.segments] == expected
+        assert prepared.blocked is None
+        # 敏感消息日志在主进程中记录
+        assert len(moderator.logged) == len(expected)
+        assert offloader.get_stats() == {"offloaded": 1, "fallbacks": 0, "restarts": 0}
+
+    def test_blocked_segment(self):
+        """测试审核拒绝时返回被拒绝的分段"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        offloader = PreprocessOffloader(MessageSegmenter(max_bytes=500), _FakeModerator(), {"executor": "thread"})
+        content = _report() + "\n| 禁止 | 内容 |"
+        prepared = offloader.prepare(content, "markdown_v2", "m1", moderate=True)
+        offloader.shutdown()
+
+        assert "禁止" in prepared.blocked.content
+        assert all("禁止" not in s.content for s in prepared.segments)
+
+    def test_process_results_fill_segment_cache(self):
+        """测试进程池的分段结果写回主进程的分段缓存"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        cache = SegmentCache()
+        offloader = PreprocessOffloader(MessageSegmenter(max_bytes=500, cache=cache), config={"executor": "process"})
+        try:
+            first = offloader.prepare(_report(), "markdown_v2")
+            second = offloader.prepare(_report(), "markdown_v2")
+        finally:
+            offloader.shutdown()
+
+        assert first.segments == second.segments
+        assert cache.hits == 1
+
+    def test_fallback_when_executor_fails(self):
+        """测试执行器异常时回退到当前线程处理"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        segmenter = MessageSegmenter(max_bytes=500)
+        offloader = PreprocessOffloader(segmenter, config={"executor": "thread"})
+
+        with patch.object(offloader, "_run", side_effect=RuntimeError("worker died")):
+            prepared = offloader.prepare(_report(), "markdown_v2")
+
+        assert prepared.segments == segmenter.segment(_report(), "markdown_v2")
+        assert offloader.get_stats() == {"offloaded": 0, "fallbacks": 1, "restarts": 0}
+
+    def test_broken_executor_recreated(self):
+        """测试执行器损坏后当前消息回退处理，下一条消息使用重新创建的执行器"""
+        from concurrent.futures.thread import BrokenThreadPool
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        segmenter = MessageSegmenter(max_bytes=500)
+        offloader = PreprocessOffloader(segmenter, config={"executor": "thread"})
+        try:
+            broken = offloader._get_executor()
+            with patch.object(broken, "submit", side_effect=BrokenThreadPool("worker died")):
+                prepared = offloader.prepare(_report(), "markdown_v2")
+            assert prepared.segments == segmenter.segment(_report(), "markdown_v2")
+
+            again = offloader.prepare(_report(), "markdown_v2")
+            assert again.segments == prepared.segments
+            assert offloader._get_executor() is not broken
+        finally:
+            offloader.shutdown()
+
+        assert offloader.get_stats() == {"offloaded": 1, "fallbacks": 1, "restarts": 1}
+
+    def test_invalid_config(self):
+        """测试无效配置"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.offload import PreprocessOffloader
+
+        with pytest.raises(ValueError):
+            PreprocessOffloader(MessageSegmenter(), config={"executor": "gpu"})
+        with pytest.raises(ValueError):
+            PreprocessOffloader(MessageSegmenter(), config={"max_workers": 0})
+
+
+class TestNotifierOffload:
+    """测试通知器使用卸载器"""
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_single_and_pool_mode(self, mock_send):
+        """测试单 webhook 和池模式的大消息都经过卸载器"""
+        from wecom_notifier import WeComNotifier
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier(offload_config={"executor": "thread", "min_bytes": 1024})
+        try:
+            single = notifier.send_markdown("https://example.com/offload", _report(400), async_send=False)
+            pooled = notifier.send_markdown(
+                ["https://example.com/offload-a", "https://example.com/offload-b"],
+                _report(401),
+                async_send=False
+            )
+            small = notifier.send_markdown("https://example.com/offload", "hello", async_send=False)
+        finally:
+            notifier.stop_all()
+
+        assert single.is_success() and pooled.is_success() and small.is_success()
+        assert single.segment_count > 1
+        assert notifier.offloader.get_stats()["offloaded"] == 2
+
+    def test_disabled_by_default(self):
+        """测试默认不启用卸载"""
+        from wecom_notifier import WeComNotifier
+
+        notifier = WeComNotifier()
+        assert notifier.offloader is None
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -192,23 +192,25 @@ class TestRateLimiterServerFeedback(unittest.TestCase):
         # 验证锁定期已结束
         self.assertLessEqual(limiter.lockout_until, time.time())
 
-    @patch('time.sleep')
-    def test_acquire_during_lockout(self, mock_sleep):
+    def test_acquire_during_lockout(self):
         """
-        测试：锁定期内acquire会等待
+        测试：锁定期内acquire会等待（在条件变量上等待到锁定期结束）
         """
         from wecom_notifier.rate_limiter import RateLimiter
 
         limiter = RateLimiter()
 
-        # 标记为服务端频控（锁定60秒）
-        limiter.mark_server_rate_limited(lockout_duration=60)
+        # 标记为服务端频控（使用较短的锁定期便于测试）
+        limiter.mark_server_rate_limited(lockout_duration=0.5)
+        lockout_until = limiter.lockout_until
 
-        # 尝试获取配额（应该等待）
+        # 尝试获取配额（应该等待到锁定期结束）
+        start = time.time()
         limiter.acquire()
 
-        # 验证sleep被调用
-        self.assertGreater(mock_sleep.call_count, 0)
+        # 验证等待了锁定期，且锁定期结束后才获得配额
+        self.assertGreaterEqual(time.time() - start, 0.4)
+        self.assertGreaterEqual(limiter.timestamps[-1], lockout_until)
 
 
 if __name__ == '__main__':
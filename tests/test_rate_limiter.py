@@ -0,0 +1,75 @@
+"""
+频率限制器公平调度测试
+"""
+import threading
+import time
+
+import pytest
+
+
+def _start_waiters(limiter, count, order, stagger=0.02):
+    """按固定间隔依次启动等待配额的线程"""
+    threads = []
+    for i in range(count):
+        t = threading.Thread(target=lambda i=i: (limiter.acquire(), order.append(i)))
+        t.start()
+        threads.append(t)
+        time.sleep(stagger)
+    return threads
+
+
+class TestRateLimiterFairness:
+    """测试 acquire() 按到达顺序分配配额"""
+
+    def test_fifo_order(self):
+        """测试等待者按到达顺序获得配额"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=1, time_window=0.2)
+        limiter.acquire()
+
+        order = []
+        threads = _start_waiters(limiter, 4, order)
+        assert limiter.get_waiting_count() == 4
+
+        for t in threads:
+            t.join(timeout=5)
+
+        assert order == [0, 1, 2, 3]
+        assert limiter.get_waiting_count() == 0
+
+    def test_reset_wakes_head(self):
+        """测试 reset() 立即唤醒队首"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=1, time_window=60)
+        limiter.acquire()
+
+        order = []
+        threads = _start_waiters(limiter, 2, order)
+        start = time.time()
+        limiter.reset()
+        threads[0].join(timeout=5)
+
+        assert order == [0]
+        assert time.time() - start < 1
+        # 第二个等待者仍需等待窗口释放
+        assert limiter.get_waiting_count() == 1
+        limiter.reset()
+        threads[1].join(timeout=5)
+        assert order == [0, 1]
+
+    def test_lockout_respected(self):
+        """测试服务端频控锁定期内队首继续等待"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_count=5, time_window=60)
+        limiter.mark_server_rate_limited(lockout_duration=0.3)
+
+        start = time.time()
+        limiter.acquire()
+        assert time.time() - start >= 0.25
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
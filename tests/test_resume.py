@@ -0,0 +1,157 @@
+"""
+断点续传测试
+
+验证多分段消息失败后重试时，只发送未送达的分段
+"""
+import pytest
+from unittest.mock import patch
+
+
+def _long_markdown(pages=3):
+    """生成会被分为多页的 Markdown 内容"""
+    line = "这是一行用于测试分段的较长内容，" * 10
+    return "\n".join(f"{i}. {line}" for i in range(pages * 12))
+
+
+class TestResumableDelivery:
+    """测试断点续传"""
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_single_mode_resume(self, mock_send):
+        """测试单 webhook 模式从第一个未送达的分段续传"""
+        from wecom_notifier import WeComNotifier
+
+        sent = []
+        fail_at = {"index": 1}
+
+        def send(url, content):
+            if len(sent) == fail_at["index"]:
+                fail_at["index"] = None
+                return False, "errcode 500"
+            sent.append(content)
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier()
+        url = "https://example.com/webhook-resume"
+
+        result = notifier.send_markdown(url, _long_markdown(), async_send=False)
+        assert not result.is_success()
+        assert result.delivered_segments == 1
+        total_pages = len(notifier.webhook_managers[url]._retryable[result.message_id].segments)
+        assert total_pages >= 3
+
+        retried = notifier.retry(result, async_send=False)
+        assert retried.is_success()
+        assert retried.delivered_segments == total_pages
+        # 每页只送达一次，没有重复页
+        assert len(sent) == total_pages
+        assert len(set(sent)) == total_pages
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_pool_mode_resume(self, mock_send):
+        """测试池模式（所有 webhook 都失败后）续传"""
+        from wecom_notifier import WeComNotifier
+
+        sent = []
+        state = {"recovered": False}
+
+        def send(url, content):
+            if len(sent) >= 2 and not state["recovered"]:
+                return False, "errcode 500"
+            sent.append(content)
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier()
+        urls = ["https://example.com/pool-resume-a", "https://example.com/pool-resume-b"]
+
+        result = notifier.send_markdown(urls, _long_markdown(4), async_send=False)
+        assert not result.is_success()
+        assert result.delivered_segments == 2
+
+        # 恢复 webhook 后续传
+        state["recovered"] = True
+        pool = notifier._get_or_create_pool(urls)
+        for resource in pool.resources:
+            resource.mark_success()
+
+        retried = notifier.retry(result, async_send=False)
+        assert retried.is_success()
+        assert len(sent) == len(set(sent))
+        assert retried.delivered_segments == len(sent)
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_streaming_mode_resume(self, mock_send):
+        """测试流式页码模式下（边分段边发送）失败后续传剩余分段"""
+        from wecom_notifier import WeComNotifier
+
+        sent = []
+        fail_at = {"index": 1}
+
+        def send(url, content):
+            if len(sent) == fail_at["index"]:
+                fail_at["index"] = None
+                return False, "errcode 500"
+            sent.append(content)
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier(page_indicator_mode="streaming")
+        url = "https://example.com/webhook-resume-streaming"
+
+        result = notifier.send_markdown(url, _long_markdown(), async_send=False)
+        assert not result.is_success()
+        assert result.delivered_segments == 1
+        # 失败时剩余分段已补齐，续传不需要重新分段
+        total_pages = len(notifier.webhook_managers[url]._retryable[result.message_id].segments)
+        assert total_pages >= 3
+
+        retried = notifier.retry(result, async_send=False)
+        assert retried.is_success()
+        assert len(sent) == total_pages
+        assert sent[0].startswith("(Page 1)\n")
+        assert sent[-1].startswith(f"(Page {total_pages}, end)\n")
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_markdown')
+    def test_streaming_pool_mode(self, mock_send):
+        """测试流式页码模式下池模式逐页发送"""
+        from wecom_notifier import WeComNotifier
+
+        sent = []
+
+        def send(url, content):
+            sent.append(content)
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier(page_indicator_mode="streaming")
+        urls = ["https://example.com/pool-streaming-a", "https://example.com/pool-streaming-b"]
+
+        result = notifier.send_markdown(urls, _long_markdown(), async_send=False)
+        assert result.is_success()
+        assert result.segment_count == len(sent) >= 3
+        assert sent[-1].startswith(f"(Page {len(sent)}, end)\n")
+        notifier.stop_all()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_retry_successful_message_rejected(self, mock_send):
+        """测试成功的消息不能重试"""
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.exceptions import InvalidParameterError
+
+        mock_send.return_value = (True, None)
+        notifier = WeComNotifier()
+
+        result = notifier.send_text("https://example.com/webhook-resume-ok", "hello", async_send=False)
+        assert result.is_success()
+        with pytest.raises(InvalidParameterError):
+            notifier.retry(result)
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,178 @@
+"""
+Webhook 调度索引测试
+"""
+import time
+
+import pytest
+from unittest.mock import Mock, patch
+
+
+def _resources(n, max_count=20):
+    from wecom_notifier.core.rate_limiter import RateLimiter
+    from wecom_notifier.platforms.wecom.resource import WebhookResource
+
+    return [
+        WebhookResource(f"https://example.com/hook-{i}", RateLimiter(max_count=max_count))
+        for i in range(n)
+    ]
+
+
+class TestWebhookScheduler:
+    """测试 WebhookScheduler"""
+
+    def test_least_recently_used_first(self):
+        """测试有配额时按最久未使用轮转"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(3)
+        scheduler = WebhookScheduler(resources)
+
+        picked = []
+        for _ in range(6):
+            webhook, _ = scheduler.peek()
+            picked.append(webhook)
+            webhook.rate_limiter.acquire()
+            scheduler.mark_used(webhook)
+            time.sleep(0.001)
+
+        assert picked == resources + resources
+
+    def test_exhausted_quota_moves_back(self):
+        """测试配额耗尽的 webhook 排在有配额的之后"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(2, max_count=1)
+        scheduler = WebhookScheduler(resources)
+
+        resources[0].rate_limiter.acquire()
+        scheduler.mark_used(resources[0])
+        resources[1].rate_limiter.acquire()
+        scheduler.mark_used(resources[1])
+
+        webhook, ready_at = scheduler.peek()
+        assert webhook is resources[0]
+        assert ready_at > time.time()
+
+    def test_cooldown_and_dead(self):
+        """测试熔断冷却和永久失效"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(3)
+        scheduler = WebhookScheduler(resources)
+
+        resources[0].mark_dead("Invalid webhook")
+        scheduler.update(resources[0])
+        resources[1].mark_failure()
+        scheduler.update(resources[1])
+
+        assert scheduler.peek()[0] is resources[2]
+        assert scheduler.candidates() == [resources[2], resources[1]]
+        assert scheduler.candidates({resources[2].url}) == [resources[1]]
+        assert not scheduler.all_dead()
+
+    def test_refresh_detects_external_consumption(self):
+        """测试共享限制器被外部消耗后，校验会更新索引"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(2, max_count=1)
+        scheduler = WebhookScheduler(resources)
+
+        webhook, ready_at = scheduler.peek()
+        webhook.rate_limiter.acquire()  # 单 webhook 模式消耗了配额
+
+        assert not scheduler.refresh(webhook, ready_at)
+        assert scheduler.peek()[0] is resources[1]
+
+    def test_candidates_keep_heap(self):
+        """测试 candidates() 按就绪时间排序且不修改堆"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(6)
+        scheduler = WebhookScheduler(resources)
+        for resource in resources[:3]:
+            resource.rate_limiter.acquire()
+            scheduler.mark_used(resource)
+            time.sleep(0.001)
+        resources[4].mark_dead("errcode 93000")
+        scheduler.update(resources[4])
+
+        heap = list(scheduler._heap)
+        candidates = scheduler.candidates({resources[5].url})
+
+        assert candidates == [resources[3]] + resources[:3]
+        assert scheduler._heap == heap
+
+    def test_heap_bounded(self):
+        """测试惰性失效的条目不会无限增长"""
+        from wecom_notifier.core.scheduler import WebhookScheduler
+
+        resources = _resources(3)
+        scheduler = WebhookScheduler(resources)
+        for _ in range(1000):
+            scheduler.update(resources[0])
+
+        assert len(scheduler._heap) <= 4 * len(resources) + 16
+
+
+class TestIndexedPoolSelection:
+    """测试池使用调度索引选择 webhook"""
+
+    def test_selection_does_not_scan_pool(self):
+        """测试大型池中每次选择只查询少量 webhook"""
+        from wecom_notifier.core.rate_limiter import RateLimiter
+        from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
+
+        resources = _resources(200)
+        pool = WeComWebhookPool(resources=resources, sender=Mock(), segmenter=Mock(), selection_policy="ready_time")
+        pool._select_best_webhook()  # 创建索引
+
+        with patch.object(RateLimiter, "get_next_available_time",
+                          autospec=True, side_effect=RateLimiter.get_next_available_time) as spy:
+            for _ in range(50):
+                webhook = pool._select_best_webhook()
+                webhook.rate_limiter.acquire()
+                pool._record_success(webhook)
+
+        # 每次选择：校验堆顶 + 发送后更新，共约 2 次查询，而不是 200 次
+        assert spy.call_count <= 50 * 3
+        pool.stop()
+
+    def test_waits_for_soonest_webhook(self):
+        """测试所有 webhook 都在冷却时等待最早恢复的一个"""
+        from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
+
+        resources = _resources(2)
+        for resource in resources:
+            resource.COOLDOWN_BASE = 0.2
+        resources[0].COOLDOWN_BASE = 0.5
+        pool = WeComWebhookPool(resources=resources, sender=Mock(), segmenter=Mock(), selection_policy="ready_time")
+        for resource in resources:
+            pool._record_failure(resource, "errcode 500")
+
+        start = time.time()
+        webhook = pool._select_best_webhook()
+        assert webhook is resources[1]
+        assert 0.15 <= time.time() - start < 0.45
+        pool.stop()
+
+    def test_default_policy_ranks_by_quota(self):
+        """测试默认的 quota 策略仍按剩余配额选择（不使用调度索引的最久未使用顺序）"""
+        from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
+
+        resources = _resources(2)
+        for _ in range(5):
+            resources[0].rate_limiter.acquire()
+        time.sleep(0.01)
+        resources[1].rate_limiter.acquire()
+
+        pool = WeComWebhookPool(resources=resources, sender=Mock(), segmenter=Mock())
+        for resource in resources:
+            pool._record_success(resource)
+
+        assert pool._select_best_webhook() is resources[1]
+        assert pool._scheduler is None
+        pool.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
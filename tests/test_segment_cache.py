@@ -0,0 +1,139 @@
+"""
+分段结果缓存测试
+"""
+import pytest
+
+
+def _report(rows: int = 200) -> str:
+    """生成需要分段的 Markdown 表格"""
+    return "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | 数据{i} |" for i in range(rows))
+
+
+class TestSegmentCache:
+    """测试 SegmentCache"""
+
+    def test_hit_returns_same_segments(self):
+        """测试相同内容命中缓存，结果与不缓存时一致"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        cache = SegmentCache()
+        segmenter = MessageSegmenter(max_bytes=500, cache=cache)
+
+        first = segmenter.segment(_report(), "markdown_v2")
+        second = segmenter.segment(_report(), "markdown_v2")
+
+        assert first == second == MessageSegmenter(max_bytes=500).segment(_report(), "markdown_v2")
+        assert all(a is b for a, b in zip(first, second))
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    def test_key_includes_type_and_options(self):
+        """测试消息类型、字节上限不同时不共用缓存"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        cache = SegmentCache()
+        MessageSegmenter(max_bytes=500, cache=cache).segment(_report(), "markdown_v2")
+        MessageSegmenter(max_bytes=500, cache=cache).segment(_report(), "text")
+        MessageSegmenter(max_bytes=800, cache=cache).segment(_report(), "markdown_v2")
+        MessageSegmenter(max_bytes=500, packing="compact", cache=cache).segment(_report(), "markdown_v2")
+
+        assert cache.get_stats()["misses"] == 4
+        assert cache.get_stats()["hits"] == 0
+
+    def test_short_content_not_cached(self):
+        """测试不需要分段的内容不经过缓存"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        cache = SegmentCache()
+        MessageSegmenter(cache=cache).segment("hello", "text")
+
+        assert cache.get_stats() == {"size": 0, "chars": 0, "hits": 0, "misses": 0, "evicted_total": 0}
+
+    def test_segments_immutable(self):
+        """测试缓存的分段不可修改"""
+        from dataclasses import FrozenInstanceError
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        segments = MessageSegmenter(max_bytes=500, cache=SegmentCache()).segment(_report(), "markdown_v2")
+
+        with pytest.raises(FrozenInstanceError):
+            segments[0].content = "changed"
+
+    def test_lru_eviction(self):
+        """测试超过容量或字符数上限时淘汰最久未使用的条目"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        cache = SegmentCache({"max_size": 2})
+        segmenter = MessageSegmenter(max_bytes=500, cache=cache)
+        for rows in (100, 101, 100, 102):
+            segmenter.segment(_report(rows), "markdown_v2")
+
+        assert len(cache) == 2
+        assert cache.evicted_total == 1
+        segmenter.segment(_report(100), "markdown_v2")  # 最近使用过，仍在缓存中
+        assert cache.hits == 2
+
+        small = SegmentCache({"max_chars": 100})
+        MessageSegmenter(max_bytes=500, cache=small).segment(_report(), "markdown_v2")
+        assert len(small) == 0
+
+    def test_streaming_iter_segments_cached(self):
+        """测试 streaming 模式逐页产出完成后写入缓存，再次发送直接命中"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        cache = SegmentCache()
+        segmenter = MessageSegmenter(max_bytes=500, page_indicator_mode="streaming", cache=cache)
+
+        first = list(segmenter.iter_segments(_report(), "markdown_v2"))
+        second = list(segmenter.iter_segments(_report(), "markdown_v2"))
+
+        assert first == second
+        assert first[-1].is_last
+        assert cache.hits == 1
+
+    def test_invalid_config(self):
+        """测试无效配置"""
+        from wecom_notifier.core.segment_cache import SegmentCache
+
+        with pytest.raises(ValueError):
+            SegmentCache({"max_size": 0})
+        with pytest.raises(ValueError):
+            SegmentCache({"max_chars": -1})
+
+
+class TestNotifierSegmentCache:
+    """测试通知器共享分段缓存"""
+
+    def test_shared_by_managers_and_pools(self):
+        """测试同一通知器的管理器和池共用一个缓存"""
+        from wecom_notifier import WeComNotifier
+
+        notifier = WeComNotifier(enable_segment_cache=True)
+        try:
+            manager = notifier._get_or_create_manager("https://example.com/hook?key=a")
+            pool = notifier._get_or_create_pool(
+                ["https://example.com/hook?key=b", "https://example.com/hook?key=c"]
+            )
+
+            assert manager.segmenter.cache is notifier.segment_cache
+            assert pool.segmenter.cache is notifier.segment_cache
+        finally:
+            notifier.stop_all()
+
+    def test_disabled_by_default(self):
+        """测试分段缓存默认关闭"""
+        from wecom_notifier import WeComNotifier, FeishuNotifier
+
+        assert WeComNotifier().segmenter.cache is None
+        assert FeishuNotifier().segment_cache is None
+        assert FeishuNotifier(enable_segment_cache=True).segment_cache is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
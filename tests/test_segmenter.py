@@ -0,0 +1,285 @@
+"""
+消息分段器测试
+"""
+import time
+
+import pytest
+
+
+def _report(sections: int) -> str:
+    """生成包含标题、表格和代码块的 Markdown 报告"""
+    section = (
+        "## 服务状态\n\n"
+        "- 接口成功率：99.95%\n- 平均延迟：120ms\n\n"
+        "| 服务 | 状态 |\n|------|------|\n"
+        + "\n".join(f"| svc-{i} | 正常 |" for i in range(20))
+        + "\n\n```python\nprint('hello')\n```"
+    )
+    return "\n\n".join([section] * sections)
+
+
+class TestSegmentLimits:
+    """测试分段结果满足字节限制"""
+
+    @pytest.mark.parametrize("msg_type", ["text", "markdown_v2"])
+    def test_pages_within_limit(self, msg_type):
+        """测试每页（含页码标记）不超过上限"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segmenter = MessageSegmenter(max_bytes=1000)
+        segments = segmenter.segment(_report(30), msg_type)
+
+        assert len(segments) > 1
+        assert all(len(s.content.encode('utf-8')) <= 1000 for s in segments)
+        assert segments[0].content.startswith(f"(Page 1/{len(segments)})")
+
+    def test_table_header_repeated(self):
+        """测试表格跨页时每页都带表头"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        table = "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | 数据{i} |" for i in range(200))
+        segments = MessageSegmenter(max_bytes=500).segment(table, "markdown_v2")
+
+        assert len(segments) > 1
+        assert all("| a | b |\n|---|---|" in s.content for s in segments)
+
+    def test_code_block_kept_whole(self):
+        """测试代码块不会被拆到两页"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        code = "```\n" + "\n".join(f"x = {i}" for i in range(10)) + "\n```"
+        content = "\n\n".join(["说明文字" * 20, code] * 10)
+        segments = MessageSegmenter(max_bytes=400).segment(content, "markdown_v2")
+
+        for segment in segments:
+            assert segment.content.count("```") % 2 == 0
+
+
+class TestMarkdownTokenizer:
+    """测试 Markdown 块切分"""
+
+    def test_block_kinds(self):
+        """测试块类型和字节数"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        content = (
+            "# 标题\n\n- a\n- b\n\n正文\n\n"
+            "| a | b |\n|---|---|\n| 1 | 2 |\n\n"
+            "```\nx = 1\n```"
+        )
+        blocks = MessageSegmenter()._tokenize_markdown(content)
+
+        assert [b.kind for b in blocks] == ["heading", "list", "paragraph", "table", "fence"]
+        assert all(b.nbytes == len(b.text.encode('utf-8')) for b in blocks)
+        assert "\n\n".join(b.text for b in blocks) == content
+
+    def test_code_block_with_blank_lines(self):
+        """测试代码块内部的空行不切分"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        blocks = MessageSegmenter()._tokenize_markdown("前言\n\n```\na\n\nb\n```\n\n结尾")
+
+        assert [b.text for b in blocks] == ["前言", "```\na\n\nb\n```", "结尾"]
+        assert blocks[1].protected
+
+    def test_table_rows_separated_by_blank_lines(self):
+        """测试空行隔开的表格行（含单行代码）被识别为表格续行"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        blocks = MessageSegmenter()._tokenize_markdown(
+            "| a | b |\n|---|---|\n\n| 1 | ```x``` |\n\n| 2 | ```\ny\n``` |"
+        )
+
+        assert blocks[0].table_line == 0
+        assert blocks[1].is_table_row
+        assert blocks[2].is_table_row
+
+
+class TestIterSegments:
+    """测试逐页产出分段"""
+
+    @pytest.mark.parametrize("msg_type", ["text", "markdown_v2"])
+    def test_total_mode_matches_segment(self, msg_type):
+        """测试 total 模式下 iter_segments 与 segment 结果一致"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segmenter = MessageSegmenter(max_bytes=1000)
+        content = _report(10)
+
+        assert list(segmenter.iter_segments(content, msg_type)) == segmenter.segment(content, msg_type)
+
+    def test_streaming_page_indicators(self):
+        """测试流式页码：(Page i)，末页 (Page i, end)"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segments = list(MessageSegmenter(1000, "streaming").iter_segments(_report(10), "markdown_v2"))
+        total = len(segments)
+
+        assert total > 2
+        assert segments[0].content.startswith("(Page 1)\n")
+        assert segments[1].content.startswith("(Page 2)\n")
+        assert segments[-1].content.startswith(f"(Page {total}, end)\n")
+        assert [s.is_last for s in segments] == [False] * (total - 1) + [True]
+        assert segments[0].is_first and segments[-1].total_pages == total
+        assert all(len(s.content.encode('utf-8')) <= 1000 for s in segments)
+
+    def test_streaming_single_page_unmarked(self):
+        """测试流式模式下不需要分段的内容不加页码"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segments = MessageSegmenter(1000, "streaming").segment("hello", "text")
+
+        assert len(segments) == 1
+        assert segments[0].content == "hello"
+
+    def test_streaming_first_page_is_lazy(self):
+        """测试流式模式产出第一页时只处理了前两个分段"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segmenter = MessageSegmenter(1000, "streaming")
+        produced = []
+        raw = segmenter._iter_raw_segments
+
+        def counting(content, msg_type):
+            for seg in raw(content, msg_type):
+                produced.append(seg)
+                yield seg
+
+        segmenter._iter_raw_segments = counting
+        first = next(segmenter.iter_segments(_report(100), "markdown_v2"))
+
+        assert first.page_number == 1
+        assert len(produced) == 2
+
+    def test_unknown_mode_rejected(self):
+        """测试未知页码模式"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        with pytest.raises(ValueError):
+            MessageSegmenter(page_indicator_mode="bogus")
+
+
+class TestCompactPacking:
+    """测试页数最少的装箱模式"""
+
+    @pytest.mark.parametrize("msg_type", ["text", "markdown_v2"])
+    def test_fewer_pages_within_limit(self, msg_type):
+        """测试页数不多于贪心模式，且每页不超过上限"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        content = _report(30)
+        greedy = MessageSegmenter(max_bytes=1000).segment(content, msg_type)
+        compact = MessageSegmenter(max_bytes=1000, packing="compact").segment(content, msg_type)
+
+        assert len(compact) <= len(greedy)
+        assert all(len(s.content.encode('utf-8')) <= 1000 for s in compact)
+        assert compact[-1].content.startswith(f"(Page {len(compact)}/{len(compact)})")
+
+    def test_table_rows_fill_current_page(self):
+        """测试表格行从当前页剩余空间开始续填，换页时重复表头"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        header = "| a | b |\n|---|---|"
+        rows = [f"| {i} | 数据{i} |" for i in range(100)]
+        content = "说明文字" * 20 + "\n\n" + header + "\n" + "\n".join(rows)
+        segments = MessageSegmenter(max_bytes=500, packing="compact").segment(content, "markdown_v2")
+
+        # 第一页同时包含说明文字和表格的前几行
+        assert "说明文字" in segments[0].content and "| 0 |" in segments[0].content
+        assert all(header in s.content for s in segments)
+        body = "\n".join(s.content for s in segments)
+        assert all(row in body for row in rows)
+
+    def test_exact_indicator_reserve(self):
+        """测试页码按实际长度预留，页面可以填到上限附近"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        content = "\n".join("x" * 99 for _ in range(50))
+        segments = MessageSegmenter(max_bytes=512, packing="compact").segment(content, "text")
+
+        # "(Page 1/n)\n" 为 11 字节，每页可放 5 行（5 * 99 + 4 = 499 字节）
+        assert len(segments) == 10
+        assert all(len(s.content.encode('utf-8')) <= 512 for s in segments)
+
+    def test_requires_total_page_mode(self):
+        """测试 compact 装箱不能与 streaming 页码同时使用"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        with pytest.raises(ValueError):
+            MessageSegmenter(page_indicator_mode="streaming", packing="compact")
+        with pytest.raises(ValueError):
+            MessageSegmenter(packing="bogus")
+
+
+class TestForceSplit:
+    """测试按字节强制截断"""
+
+    def test_utf8_boundaries(self):
+        """测试截断点不会落在多字节字符中间"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        text = "a中😀é" * 100
+        chunks = MessageSegmenter()._force_split(text, 7)
+
+        assert "".join(chunks) == text
+        assert all(len(c.encode('utf-8')) <= 7 for c in chunks)
+        # 贪心：除最后一段外，再加一个字符就会超限
+        for chunk, following in zip(chunks, chunks[1:]):
+            assert len((chunk + following[0]).encode('utf-8')) > 7
+
+    def test_char_wider_than_limit(self):
+        """测试单个字符超过限制时单独成段"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        assert MessageSegmenter()._force_split("a😀b", 2) == ["a", "😀", "b"]
+
+    def test_long_single_line_fast(self):
+        """测试 5MB 单行文本的截断耗时"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        line = "x" * (5 * 1024 * 1024)
+        start = time.perf_counter()
+        segments = MessageSegmenter().segment(line, "text")
+
+        assert time.perf_counter() - start < 1
+        assert sum(len(s.content) for s in segments) > len(line)
+
+
+class TestSegmentPerformance:
+    """测试大输入的分段耗时"""
+
+    def test_large_markdown_linear(self):
+        """测试 1MB Markdown 分段耗时与输入大小线性相关"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        segmenter = MessageSegmenter()
+        small = _report(250)
+        large = _report(1000)
+
+        start = time.perf_counter()
+        segmenter.segment(small, "markdown_v2")
+        small_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segmenter.segment(large, "markdown_v2")
+        large_time = time.perf_counter() - start
+
+        # 4 倍输入，二次复杂度约为 16 倍
+        assert large_time < max(small_time * 10, 0.5)
+
+    def test_many_code_blocks(self):
+        """测试大量代码块时分段耗时（每个段落不再遍历所有代码块）"""
+        from wecom_notifier.core.segmenter import MessageSegmenter
+
+        content = "\n\n".join(["执行结果：", "```bash\n$ uptime\nup 3 days\n```"] * 10000)
+
+        start = time.perf_counter()
+        segments = MessageSegmenter().segment(content, "markdown_v2")
+
+        assert time.perf_counter() - start < 2
+        for segment in segments:
+            assert segment.content.count("```") % 2 == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
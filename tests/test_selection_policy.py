@@ -0,0 +1,141 @@
+"""
+延迟/健康度感知的 webhook 选择策略测试
+"""
+import time
+
+import pytest
+from unittest.mock import Mock, patch
+
+
+def _resource(url):
+    from wecom_notifier.core.rate_limiter import RateLimiter
+    from wecom_notifier.platforms.wecom.resource import WebhookResource
+
+    return WebhookResource(url, RateLimiter())
+
+
+def _pool(resources, policy):
+    from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
+
+    return WeComWebhookPool(
+        resources=resources, sender=Mock(), segmenter=Mock(), selection_policy=policy
+    )
+
+
+class TestResourceEwma:
+    """测试 WebhookResource 的 EWMA 统计"""
+
+    def test_latency_ewma(self):
+        """测试延迟平滑"""
+        resource = _resource("https://example.com/hook")
+        assert resource.latency_ewma is None
+
+        resource.record_send(1.0, True)
+        assert resource.latency_ewma == pytest.approx(1.0)
+
+        resource.record_send(0.0, True)
+        assert resource.latency_ewma == pytest.approx(1.0 - resource.EWMA_ALPHA)
+
+    def test_health_score(self):
+        """测试健康度随延迟和错误率下降"""
+        fast = _resource("https://example.com/fast")
+        slow = _resource("https://example.com/slow")
+        flaky = _resource("https://example.com/flaky")
+
+        fast.record_send(0.08, True)
+        slow.record_send(3.0, True)
+        flaky.record_send(0.08, False)
+
+        assert fast.get_health_score() > slow.get_health_score()
+        assert fast.get_health_score() > flaky.get_health_score()
+        # 未发送过的 webhook 健康度最高，以便被尝试
+        assert _resource("https://example.com/new").get_health_score() == 1.0
+
+
+class TestSelectionPolicies:
+    """测试池的选择策略"""
+
+    def test_unknown_policy(self):
+        """测试未知策略报错"""
+        with pytest.raises(ValueError):
+            _pool([_resource("https://example.com/a")], "fastest")
+
+    def test_least_latency(self):
+        """测试最低延迟优先"""
+        fast = _resource("https://example.com/fast")
+        slow = _resource("https://example.com/slow")
+        fast.record_send(0.08, True)
+        slow.record_send(3.0, True)
+
+        pool = _pool([slow, fast], "least_latency")
+        assert pool._select_best_webhook() is fast
+        pool.stop()
+
+    def test_least_latency_skips_exhausted_quota(self):
+        """测试最快的 webhook 配额耗尽时选择其他有配额的 webhook"""
+        fast = _resource("https://example.com/fast")
+        slow = _resource("https://example.com/slow")
+        fast.record_send(0.08, True)
+        slow.record_send(3.0, True)
+        for _ in range(fast.rate_limiter.max_count):
+            fast.rate_limiter.acquire()
+
+        pool = _pool([slow, fast], "least_latency")
+        assert pool._select_best_webhook() is slow
+        pool.stop()
+
+    def test_p2c_prefers_healthier(self):
+        """测试 p2c 在两个候选中选健康度更高的"""
+        healthy = _resource("https://example.com/healthy")
+        unhealthy = _resource("https://example.com/unhealthy")
+        healthy.record_send(0.1, True)
+        unhealthy.record_send(2.0, False)
+
+        pool = _pool([unhealthy, healthy], "p2c")
+        for _ in range(5):
+            assert pool._choose_webhook([unhealthy, healthy]) is healthy
+        pool.stop()
+
+    def test_quota_health(self):
+        """测试配额 × 健康度"""
+        slow = _resource("https://example.com/slow")
+        fast = _resource("https://example.com/fast")
+        slow.record_send(3.0, True)
+        fast.record_send(0.08, True)
+        # 快的 webhook 已使用部分配额，但健康度优势更大
+        for _ in range(5):
+            fast.rate_limiter.acquire()
+
+        pool = _pool([slow, fast], "quota_health")
+        assert pool._select_best_webhook() is fast
+        pool.stop()
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_pool_follows_fastest_endpoint(self, mock_send):
+        """测试发送路径记录延迟，后续分段集中到最快的 webhook"""
+        from wecom_notifier import WeComNotifier
+
+        slow_url = "https://example.com/latency-slow"
+        fast_url = "https://example.com/latency-fast"
+        calls = []
+
+        def send(url, content, **kwargs):
+            calls.append(url)
+            time.sleep(0.1 if url == slow_url else 0.001)
+            return True, None
+
+        mock_send.side_effect = send
+        notifier = WeComNotifier(selection_policy="least_latency")
+
+        for i in range(6):
+            result = notifier.send_text([slow_url, fast_url], f"message {i}", async_send=False)
+            assert result.is_success()
+
+        # 每个 webhook 最多被探测一次，其余都走最快的
+        assert calls.count(slow_url) <= 1
+        assert calls.count(fast_url) >= 5
+        notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+"""
+增量分段与流式发送测试
+"""
+import io
+import time
+from unittest.mock import patch
+
+import pytest
+
+
+def _lines(count: int):
+    """逐行产出日志（每行带换行符）"""
+    for i in range(count):
+        yield f"2024-01-01 12:00:{i % 60:02d} INFO 处理任务 {i}\n"
+
+
+class TestStreamSegmenter:
+    """测试 StreamSegmenter"""
+
+    @pytest.mark.parametrize("msg_type", ["text", "markdown_v2"])
+    def test_pages_within_limit(self, msg_type):
+        """测试任意切分的输入逐页产出，每页不超过上限且内容完整"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter
+
+        content = "".join(_lines(300)) + "没有换行的结尾" * 200
+        segmenter = StreamSegmenter(max_bytes=500, msg_type=msg_type)
+
+        pages = []
+        for start in range(0, len(content), 37):
+            pages.extend(segmenter.feed(content[start:start + 37]))
+            # 缓冲区只保存当前页和不超过一页的未换行尾部
+            assert segmenter._bytes + segmenter._partial_bytes <= 2 * 500
+        pages.extend(segmenter.close())
+
+        assert len(pages) > 10
+        assert all(len(p.content.encode('utf-8')) <= 500 for p in pages)
+        assert pages[0].content.startswith("(Page 1)\n")
+        assert pages[-1].content.startswith(f"(Page {len(pages)}, end)\n")
+        body = "".join(p.content.split("\n", 1)[1] for p in pages).replace("\n", "")
+        assert body == content.replace("\n", "")
+
+    def test_single_page_unmarked(self):
+        """测试只有一页时不加页码"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter
+
+        segmenter = StreamSegmenter()
+        assert segmenter.feed("hello\nwor") == []
+        pages = segmenter.close()
+
+        assert [p.content for p in pages] == ["hello\nwor"]
+        with pytest.raises(ValueError):
+            segmenter.feed("more")
+
+    def test_flush_then_close(self):
+        """测试最后的内容已刷新产出时，结束时补发结束页"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter
+
+        segmenter = StreamSegmenter()
+        assert segmenter.feed("first\n") == []
+        flushed = segmenter.flush()
+        assert [p.content for p in flushed] == ["(Page 1)\nfirst"]
+        assert [p.content for p in segmenter.feed("second\n")] == []
+        flushed = segmenter.flush()
+        assert [(p.content, p.is_last) for p in flushed] == [("(Page 2)\nsecond", False)]
+
+        pages = segmenter.close()
+        assert [(p.content, p.is_last, p.page_number) for p in pages] == [("(Page 3, end)", True, 3)]
+
+    def test_code_block_reopened(self):
+        """测试代码块跨页时补结束标记并在下一页重新打开"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter
+
+        segmenter = StreamSegmenter(max_bytes=300, msg_type="markdown_v2")
+        pages = segmenter.feed("```python\n" + "".join(f"x = {i}\n" for i in range(100)) + "```\n")
+        pages.extend(segmenter.close())
+
+        assert len(pages) > 1
+        for page in pages:
+            assert page.content.count("```") % 2 == 0
+        assert all("```python" in p.content for p in pages)
+
+
+class TestIterStreamPages:
+    """测试 iter_stream_pages"""
+
+    def test_bytes_and_file_sources(self):
+        """测试 bytes（多字节字符被切开）和文件对象输入"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter, iter_stream_pages
+
+        data = "中文日志\n".encode('utf-8') * 3
+        chunks = [data[i:i + 5] for i in range(0, len(data), 5)]
+        pages = list(iter_stream_pages(chunks, StreamSegmenter()))
+        assert [p.content for p in pages] == ["中文日志\n中文日志\n中文日志"]
+
+        pages = list(iter_stream_pages(io.StringIO("a\nb\n"), StreamSegmenter()))
+        assert [p.content for p in pages] == ["a\nb"]
+
+    def test_flush_interval(self):
+        """测试数据源阻塞时按刷新间隔产出已缓冲的内容"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter, iter_stream_pages
+
+        def slow_source():
+            yield "first line\n"
+            time.sleep(0.5)
+            yield "second line\n"
+
+        received = []
+        start = time.monotonic()
+        for page in iter_stream_pages(slow_source(), StreamSegmenter(), flush_interval=0.1):
+            received.append((time.monotonic() - start, page.content))
+
+        assert len(received) == 2
+        assert received[0][0] < 0.4
+        assert received[0][1] == "(Page 1)\nfirst line"
+        assert received[1][1] == "(Page 2, end)\nsecond line"
+
+    def test_source_error_raised_after_pages(self):
+        """测试数据源异常在已缓冲内容产出后抛出"""
+        from wecom_notifier.core.stream_segmenter import StreamSegmenter, iter_stream_pages
+
+        def broken_source():
+            yield "partial\n"
+            raise IOError("connection lost")
+
+        pages = []
+        with pytest.raises(IOError):
+            for page in iter_stream_pages(broken_source(), StreamSegmenter()):
+                pages.append(page)
+
+        assert [p.content for p in pages] == ["partial"]
+
+
+class TestSendStream:
+    """测试 WeComNotifier.send_stream"""
+
+    @patch('wecom_notifier.sender.Sender.send_text')
+    def test_pages_sent_in_order(self, mock_send):
+        """测试每页作为一条消息按顺序发送"""
+        from wecom_notifier import WeComNotifier
+
+        sent = []
+        mock_send.side_effect = lambda url, content, *args, **kwargs: (sent.append(content), (True, None))[1]
+        notifier = WeComNotifier()
+        try:
+            results = notifier.send_stream("https://example.com/stream", _lines(300), async_send=False)
+        finally:
+            notifier.stop_all()
+
+        assert len(results) == len(sent) > 1
+        assert all(r.is_success() for r in results)
+        assert sent[0].startswith("(Page 1)\n")
+        assert sent[-1].startswith(f"(Page {len(sent)}, end)\n")
+
+    def test_invalid_parameters(self):
+        """测试不支持的消息类型和排队页数"""
+        from wecom_notifier import WeComNotifier
+        from wecom_notifier.exceptions import InvalidParameterError
+
+        notifier = WeComNotifier()
+        try:
+            with pytest.raises(InvalidParameterError):
+                notifier.send_stream("https://example.com/stream", ["a"], msg_type="image")
+            with pytest.raises(InvalidParameterError):
+                notifier.send_stream("https://example.com/stream", ["a"], max_pending=0)
+        finally:
+            notifier.stop_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -36,6 +36,8 @@ from wecom_notifier.core.constants import (
 from wecom_notifier.platforms.wecom.constants import (
     MSG_TYPE_MARKDOWN_V2,
     MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
     MAX_BYTES_PER_MESSAGE,
     RATE_LIMIT_MAX_RETRIES,
     RATE_LIMIT_WAIT_TIME,
@@ -64,6 +66,8 @@ __all__ = [
     # 企微特定常量
     "MSG_TYPE_MARKDOWN_V2",
     "MSG_TYPE_IMAGE",
+    "MSG_TYPE_FILE",
+    "MSG_TYPE_VOICE",
     "MAX_BYTES_PER_MESSAGE",
     "RATE_LIMIT_MAX_RETRIES",
     "RATE_LIMIT_WAIT_TIME",
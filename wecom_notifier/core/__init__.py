@@ -4,8 +4,18 @@ wecom_notifier.core - 核心模块
 此模块包含平台无关的核心功能：
 - 协议定义 (SenderProtocol, RateLimiterProtocol, MessageConverterProtocol)
 - Webhook 池基类 (WebhookPoolBase)
+- Webhook 资源与熔断器 (WebhookResource)
+- Webhook 调度索引 (WebhookScheduler)
+- 公平消息队列 (FairMessageQueue)
+- 重复消息去重 (DedupCache)
+- 幂等键存储 (IdempotencyStore)
+- 摘要聚合 (DigestAggregator)
+- 死信队列 (DeadLetterQueue)
 - 频率控制 (RateLimiter)
 - 消息分段 (MessageSegmenter)
+- 分段结果缓存 (SegmentCache)
+- 增量分段 (StreamSegmenter)
+- 预处理卸载 (PreprocessOffloader)
 - 数据模型 (Message, SendResult, SegmentInfo)
 - 日志系统 (logger utilities)
 - 核心常量和异常
@@ -17,8 +27,18 @@ from wecom_notifier.core.protocols import (
     MessageConverterProtocol,
 )
 from wecom_notifier.core.pool_base import WebhookPoolBase, AllWebhooksUnavailableError
+from wecom_notifier.core.resource import WebhookResource
+from wecom_notifier.core.scheduler import WebhookScheduler
+from wecom_notifier.core.fair_queue import FairMessageQueue
+from wecom_notifier.core.dedup import DedupCache
+from wecom_notifier.core.idempotency import IdempotencyStore
+from wecom_notifier.core.digest import DigestAggregator
+from wecom_notifier.core.dead_letter import DeadLetter, DeadLetterQueue
 from wecom_notifier.core.rate_limiter import RateLimiter
 from wecom_notifier.core.segmenter import MessageSegmenter
+from wecom_notifier.core.segment_cache import SegmentCache
+from wecom_notifier.core.stream_segmenter import StreamSegmenter
+from wecom_notifier.core.offload import PreprocessOffloader
 from wecom_notifier.core.models import Message, SendResult, SegmentInfo
 from wecom_notifier.core.logger import get_logger, setup_logger, disable_logger, enable_logger
 from wecom_notifier.core.exceptions import (
@@ -37,10 +57,27 @@ __all__ = [
     # Webhook 池基类
     "WebhookPoolBase",
     "AllWebhooksUnavailableError",
+    "WebhookResource",
+    "WebhookScheduler",
+    # 公平调度
+    "FairMessageQueue",
+    # 去重
+    "DedupCache",
+    # 幂等
+    "IdempotencyStore",
+    # 摘要
+    "DigestAggregator",
+    # 死信
+    "DeadLetter",
+    "DeadLetterQueue",
     # 频率控制
     "RateLimiter",
     # 分段器
     "MessageSegmenter",
+    "SegmentCache",
+    "StreamSegmenter",
+    # 预处理卸载
+    "PreprocessOffloader",
     # 数据模型
     "Message",
     "SendResult",
@@ -0,0 +1,119 @@
+"""
+准入控制 - 入队时估算预计送达时间（ETA）
+
+根据队列积压（预估分段数）和频率限制器的当前状态估算消息的送达时间，
+调用方可以通过 max_delay 在入队时就拒绝无法按时送达的消息，
+以便立即切换到其他通知渠道。
+"""
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+
+class AggregatePermitEstimate:
+    """
+    多个频率限制器的合计配额估算（webhook 池）
+
+    缓存所有限制器窗口槽位首次可用时间的合并排序结果，只有某个限制器获得配额、
+    进入锁定期或重置（version 变化）后才重建。查询只需比较各限制器的版本号，
+    再按槽位和轮次直接计算，不必每次入队都二分查找并逐个遍历槽位。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[Tuple[int, int], ...]] = None
+        self._slots: List[float] = []
+        self._window = 0.0
+
+    def permit_time(self, limiters: List[Any], n: int, now: float) -> Optional[float]:
+        """
+        估算第 n 个后续配额（从0开始计数）可用的时间戳
+
+        Args:
+            limiters: 频率限制器列表
+            n: 前面还有多少个请求排队
+            now: 当前时间戳
+
+        Returns:
+            Optional[float]: 预计可用的时间戳；限制器不支持合并估算时返回 None
+        """
+        if not all(hasattr(limiter, "get_slot_times") for limiter in limiters):
+            return None
+        windows = {limiter.time_window for limiter in limiters}
+        if len(windows) != 1:
+            return None
+
+        key = tuple((id(limiter), limiter.version) for limiter in limiters)
+        with self._lock:
+            if key != self._key:
+                self._slots = sorted(t for limiter in limiters for t in limiter.get_slot_times())
+                self._window = windows.pop()
+                self._key = key
+            slots, window = self._slots, self._window
+
+        if not slots:
+            return None
+        # 槽位时间跨度超过一个窗口（如较长的锁定期）时，按轮次计算不再准确
+        if max(slots[-1], now) - max(slots[0], now) > window:
+            return None
+
+        rounds, slot = divmod(max(0, n), len(slots))
+        return max(slots[slot], now) + rounds * window
+
+
+def estimate_delivery_time(
+    limiters: List[Any],
+    segments: int,
+    segment_interval: float = 0.0,
+    now: Optional[float] = None,
+    aggregate: Optional[AggregatePermitEstimate] = None
+) -> float:
+    """
+    估算 segments 个分段全部发出的时间戳
+
+    单个限制器直接计算第 segments 个配额的时间；
+    多个限制器（webhook 池）时优先使用 aggregate 缓存的合并槽位直接计算，
+    无法合并估算时二分查找累计配额数达到 segments 的最早时间。
+
+    Args:
+        limiters: 频率限制器列表（需实现 estimate_permit_time / count_permits_until）
+        segments: 需要发送的分段总数（含排在前面的积压）
+        segment_interval: 分段间隔（秒），作为串行发送的下界
+        now: 当前时间戳（默认 time.time()）
+        aggregate: 合计配额估算缓存（可选，池在多次估算间复用）
+
+    Returns:
+        float: 预计送达时间戳
+    """
+    now = time.time() if now is None else now
+    if segments <= 0 or not limiters:
+        return now
+
+    interval_bound = now + (segments - 1) * segment_interval
+
+    if len(limiters) == 1:
+        return max(limiters[0].estimate_permit_time(segments - 1), interval_bound)
+
+    if aggregate is not None:
+        permit_time = aggregate.permit_time(limiters, segments - 1, now)
+        if permit_time is not None:
+            return max(permit_time, interval_bound)
+
+    # 上界：只用其中任意一个限制器也能发完
+    high = min(limiter.estimate_permit_time(segments - 1) for limiter in limiters)
+    low = now
+    if sum(limiter.count_permits_until(low) for limiter in limiters) >= segments:
+        return max(low, interval_bound)
+
+    # 二分查找（精度 0.1 秒）
+    while high - low > 0.1:
+        mid = (low + high) / 2
+        if sum(limiter.count_permits_until(mid) for limiter in limiters) >= segments:
+            high = mid
+        else:
+            low = mid
+
+    return max(high, interval_bound)
+
+
+__all__ = ["AggregatePermitEstimate", "estimate_delivery_time"]
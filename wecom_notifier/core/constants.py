@@ -27,6 +27,42 @@ MARKDOWN_TABLE_ROW_PATTERN = r'^\|.*\|$'  # 表格行
 PAGE_INDICATOR_FORMAT = "(Page {current}/{total})\n"  # 页码格式
 MAX_PAGE_INDICATOR_BYTES = 20  # 页码标记预留字节数
 
+# 页码模式
+PAGE_INDICATOR_MODE_TOTAL = "total"          # (Page i/N)：需要先完成全部分段才能得到总页数（默认）
+PAGE_INDICATOR_MODE_STREAMING = "streaming"  # (Page i)，末页为 (Page i, end)：边分段边发送
+PAGE_INDICATOR_MODES = (
+    PAGE_INDICATOR_MODE_TOTAL,
+    PAGE_INDICATOR_MODE_STREAMING,
+)
+STREAMING_PAGE_INDICATOR_FORMAT = "(Page {current})\n"  # 流式页码格式
+STREAMING_LAST_PAGE_INDICATOR_FORMAT = "(Page {current}, end)\n"  # 流式末页页码格式
+
+# 分段装箱模式
+PACKING_GREEDY = "greedy"    # 逐段贪心填充，页码预留固定字节（默认）
+PACKING_COMPACT = "compact"  # 页数最少：按实际页码长度预留，表格行跨页续填，末页过短时并入前一页
+PACKING_MODES = (
+    PACKING_GREEDY,
+    PACKING_COMPACT,
+)
+
+# 公平调度设置
+DEFAULT_TENANT = "default"  # 未指定租户时的默认租户标识
+
+# Webhook 池选择策略
+SELECTION_POLICY_QUOTA = "quota"                  # 剩余配额最多优先（默认）
+SELECTION_POLICY_LEAST_LATENCY = "least_latency"  # 平滑延迟最低优先
+SELECTION_POLICY_P2C = "p2c"                      # 随机取两个，选健康度更高的（power of two choices）
+SELECTION_POLICY_QUOTA_HEALTH = "quota_health"    # 剩余配额 × 健康度
+SELECTION_POLICY_READY_TIME = "ready_time"        # 调度索引：有配额时最久未使用优先，选择为 O(log n)（大型池）
+SELECTION_POLICIES = (
+    SELECTION_POLICY_QUOTA,
+    SELECTION_POLICY_LEAST_LATENCY,
+    SELECTION_POLICY_P2C,
+    SELECTION_POLICY_QUOTA_HEALTH,
+    SELECTION_POLICY_READY_TIME,
+)
+DEFAULT_EWMA_ALPHA = 0.3  # 延迟和错误率的指数加权平滑系数（越大越偏重最近的发送）
+
 # 消息类型（通用）
 MSG_TYPE_TEXT = "text"
 MSG_TYPE_MARKDOWN = "markdown"  # 通用Markdown类型
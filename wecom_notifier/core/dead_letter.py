@@ -0,0 +1,301 @@
+"""
+死信队列 - 保存最终发送失败的消息，支持限速重放
+
+webhook 故障期间失败的消息不再只留下一行日志：
+死信中保存消息内容、已处理的分段、检查点、错误信息和尝试次数，
+故障恢复后可以按受控速率重新注入，避免集中补发触发服务端频控（45009）。
+
+存储在内存中（有界），可选持久化到 .wecom_cache/dead_letters.jsonl，进程重启后恢复。
+日志只追加：加入死信写一行记录，取出/删除写一行删除标记，日志过长时压缩重写。
+"""
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from .logger import get_logger
+from .models import SegmentInfo
+
+
+# 默认配置
+DEFAULT_DEAD_LETTER_MAX_SIZE = 1000  # 最多保存的死信数量（超出时丢弃最早的）
+DEFAULT_REPLAY_RATE = 10             # 默认重放速率（条/分钟）
+COMPACT_MIN_LINES = 1000             # 日志行数超过 max(此值, 2 × 死信数) 时压缩重写
+
+
+@dataclass
+class DeadLetter:
+    """一条死信"""
+    message_id: str
+    target: Union[str, List[str]]           # 发送目标（webhook URL 或 URL 列表）
+    msg_type: str
+    content: Any                            # 原始内容（图片为 (base64, md5)，文件/语音为 (文件名, 原始字节, sha256)）
+    error: str
+    attempts: int = 1                       # 已尝试的次数（首次发送 + 重放次数）
+    segments: Optional[List[SegmentInfo]] = None  # 已处理（分段、审核）的分段
+    delivered_segments: int = 0             # 已送达的分段数（重放时从此处续传）
+    options: Dict[str, Any] = field(default_factory=dict)  # 其他消息参数（@、租户等）
+    failed_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        # JSON 往返后，图片/文件内容的元组变成了列表；旧记录的分段只保存了内容
+        self.content = _restore_content(self.content)
+        if self.segments is not None:
+            self.segments = [_restore_segment(s) for s in self.segments]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（分段逐字段展开，保留首尾标记和页码）"""
+        data = asdict(self)
+        data["content"] = _dump_content(self.content)
+        if self.segments is not None:
+            data["segments"] = [
+                {
+                    "content": _dump_content(s.content),
+                    "is_first": s.is_first,
+                    "is_last": s.is_last,
+                    "page_number": s.page_number,
+                    "total_pages": s.total_pages,
+                }
+                for s in self.segments
+            ]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DeadLetter":
+        """从字典恢复（内容和分段在 __post_init__ 中还原）"""
+        return cls(**data)
+
+
+def _dump_content(content: Any) -> Any:
+    """元组内容转为列表，其中的字节（文件/语音内容）转为 {"base64": ...}"""
+    if not isinstance(content, tuple):
+        return content
+    return [
+        {"base64": base64.b64encode(part).decode('ascii')} if isinstance(part, bytes) else part
+        for part in content
+    ]
+
+
+def _restore_content(content: Any) -> Any:
+    """列表内容还原为元组（字节部分解码）"""
+    if not isinstance(content, list):
+        return content
+    return tuple(
+        base64.b64decode(part["base64"]) if isinstance(part, dict) else part
+        for part in content
+    )
+
+
+def _restore_segment(segment: Any) -> SegmentInfo:
+    """从字典（或旧格式的分段内容）还原分段"""
+    if isinstance(segment, SegmentInfo):
+        return segment
+    if isinstance(segment, dict):
+        return SegmentInfo(
+            content=_restore_content(segment["content"]),
+            is_first=segment.get("is_first", False),
+            is_last=segment.get("is_last", False),
+            page_number=segment.get("page_number"),
+            total_pages=segment.get("total_pages"),
+        )
+    return SegmentInfo(content=_restore_content(segment))
+
+
+class DeadLetterQueue:
+    """
+    死信队列（线程安全）
+
+    同一消息再次失败时覆盖旧记录（保留最新的检查点和错误）。
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化死信队列
+
+        Args:
+            config: 配置字典，包含：
+                - max_size: int - 最多保存的死信数量（默认1000）
+                - persist: bool - 是否持久化到 JSONL 文件（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+        """
+        config = config or {}
+        self.logger = get_logger()
+        self.max_size = config.get("max_size", DEFAULT_DEAD_LETTER_MAX_SIZE)
+        self.persist = config.get("persist", False)
+        self.cache_dir = config.get("cache_dir", ".wecom_cache")
+        self.cache_file = os.path.join(self.cache_dir, "dead_letters.jsonl")
+
+        if self.max_size <= 0:
+            raise ValueError("Dead letter max_size must be positive")
+
+        self._entries: "OrderedDict[str, DeadLetter]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lines = 0  # 持久化日志的当前行数
+
+        # 统计
+        self.total_added = 0
+        self.dropped_count = 0
+
+        if self.persist:
+            self._load()
+
+    def add(self, entry: DeadLetter) -> None:
+        """
+        加入死信
+
+        Args:
+            entry: 死信记录
+        """
+        with self._lock:
+            self._entries.pop(entry.message_id, None)
+            self._entries[entry.message_id] = entry
+            self.total_added += 1
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.dropped_count += 1
+
+            if self.persist:
+                self._append_line(entry.to_dict())
+
+        self.logger.warning(
+            f"Message {entry.message_id} moved to dead letter queue "
+            f"(attempts={entry.attempts}): {entry.error}"
+        )
+
+    def pop(self, count: Optional[int] = None) -> List[DeadLetter]:
+        """
+        按失败时间顺序取出死信
+
+        Args:
+            count: 最多取出的数量，None 表示全部
+
+        Returns:
+            List[DeadLetter]: 取出的死信
+        """
+        with self._lock:
+            entries = []
+            while self._entries and (count is None or len(entries) < count):
+                entries.append(self._entries.popitem(last=False)[1])
+            if self.persist:
+                for entry in entries:
+                    self._append_line({"message_id": entry.message_id, "removed": True})
+            return entries
+
+    def remove(self, message_id: str) -> Optional[DeadLetter]:
+        """
+        删除指定消息的死信
+
+        Args:
+            message_id: 消息ID
+
+        Returns:
+            Optional[DeadLetter]: 被删除的死信，不存在时返回 None
+        """
+        with self._lock:
+            entry = self._entries.pop(message_id, None)
+            if entry is not None and self.persist:
+                self._append_line({"message_id": message_id, "removed": True})
+            return entry
+
+    def discard(self, entry: DeadLetter) -> bool:
+        """
+        删除一条已重放的死信
+
+        只有队列中仍是这条记录时才删除：重放期间消息再次失败时已写入新记录（新的检查点和尝试次数），
+        此时保留新记录。
+
+        Args:
+            entry: 之前通过 list() 取得的死信
+
+        Returns:
+            bool: 是否删除
+        """
+        with self._lock:
+            if self._entries.get(entry.message_id) is not entry:
+                return False
+            del self._entries[entry.message_id]
+            if self.persist:
+                self._append_line({"message_id": entry.message_id, "removed": True})
+            return True
+
+    def get(self, message_id: str) -> Optional[DeadLetter]:
+        """查看指定消息的死信（不取出），不存在时返回 None"""
+        with self._lock:
+            return self._entries.get(message_id)
+
+    def list(self) -> List[DeadLetter]:
+        """查看所有死信（不取出）"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self) -> None:
+        """清空死信队列"""
+        with self._lock:
+            self._entries.clear()
+            if self.persist:
+                self._rewrite()
+
+    def _append_line(self, record: Dict[str, Any]) -> None:
+        """追加一行记录或删除标记（O(1)），日志中失效的行过多时压缩重写（调用方需持有锁）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.cache_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._log_lines += 1
+            if self._log_lines > max(COMPACT_MIN_LINES, 2 * len(self._entries)):
+                self._rewrite()
+        except Exception as e:
+            self.logger.error(f"Failed to write dead letter file: {e}")
+
+    def _rewrite(self) -> None:
+        """按当前内容重写 JSONL 文件（调用方需持有锁）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+            os.replace(tmp_file, self.cache_file)
+            self._log_lines = len(self._entries)
+        except Exception as e:
+            self.logger.error(f"Failed to rewrite dead letter file: {e}")
+
+    def _load(self) -> None:
+        """从 JSONL 文件恢复死信（同一消息以最后一行为准，删除标记移除之前的记录）"""
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._log_lines += 1
+                    record = json.loads(line)
+                    self._entries.pop(record["message_id"], None)
+                    if not record.get("removed"):
+                        self._entries[record["message_id"]] = DeadLetter.from_dict(record)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+            self.logger.debug(f"Loaded {len(self._entries)} dead letters from {self.cache_file}")
+
+        except Exception as e:
+            self.logger.error(f"Failed to load dead letter file: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __repr__(self):
+        return f"<DeadLetterQueue size={len(self)} persist={self.persist}>"
+
+
+__all__ = ["DeadLetter", "DeadLetterQueue", "DEFAULT_REPLAY_RATE"]
@@ -0,0 +1,248 @@
+"""
+消息去重缓存 - 时间窗口内相同告警只发送一次
+
+监控系统在告警风暴中会反复发送相同内容，每条都会消耗配额和分段开销。
+本模块按 (目标, 消息类型, 内容哈希) 在时间窗口内抑制重复消息，
+并统计被抑制的次数，可在下一次真正发送时附加 "(repeated N times)" 提示。
+
+重复消息的结果跟随原始消息：原始消息送达后才标记为 duplicate（成功）；
+原始消息失败、过期、被拒绝或被取代时，重复消息同样失败，且条目被释放，下一份副本会正常发送。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from wecom_notifier.core.models import SendResult
+
+
+# 默认配置
+DEFAULT_DEDUP_WINDOW = 60          # 去重时间窗口（秒）
+DEFAULT_DEDUP_MAX_SIZE = 1024      # 最多缓存的消息指纹数量（LRU 淘汰）
+DEFAULT_REPEAT_SUFFIX_FORMAT = "\n\n(repeated {count} times)"
+
+
+class _DedupEntry:
+    """去重缓存条目"""
+
+    __slots__ = ("first_seen", "message_id", "suppressed", "result", "waiters")
+
+    def __init__(self, first_seen: float, message_id: str):
+        self.first_seen = first_seen
+        self.message_id = message_id
+        self.suppressed = 0
+        self.result: Optional[SendResult] = None  # 原始消息的结果（bind() 后可用）
+        self.waiters: List[SendResult] = []       # bind() 之前到达的重复消息结果
+
+
+class DedupCache:
+    """
+    时间窗口去重缓存（线程安全，LRU 有界）
+
+    使用示例:
+        cache = DedupCache({"window": 30})
+        duplicate = SendResult(message_id)
+        is_dup, original_id, repeated = cache.check(target, "text", content, message_id, duplicate)
+        if is_dup:
+            return duplicate  # 抑制发送，随原始消息完成
+        result = send(...)
+        cache.bind(message_id, result)
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化去重缓存
+
+        Args:
+            config: 配置字典，包含：
+                - window: float - 去重时间窗口（秒，默认60）
+                - max_size: int - 最大缓存条目数（默认1024，超出时淘汰最久未使用的条目）
+                - repeat_suffix: bool - 是否在下一次发送时附加重复次数提示（默认True）
+                - suffix_format: str - 提示格式（默认 "\\n\\n(repeated {count} times)"）
+        """
+        config = config or {}
+        self.window = config.get("window", DEFAULT_DEDUP_WINDOW)
+        self.max_size = config.get("max_size", DEFAULT_DEDUP_MAX_SIZE)
+        self.repeat_suffix = config.get("repeat_suffix", True)
+        self.suffix_format = config.get("suffix_format", DEFAULT_REPEAT_SUFFIX_FORMAT)
+
+        if self.window <= 0:
+            raise ValueError("Dedup window must be positive")
+        if self.max_size <= 0:
+            raise ValueError("Dedup max_size must be positive")
+
+        self._entries: "OrderedDict[Tuple[str, str, str], _DedupEntry]" = OrderedDict()
+        self._keys: Dict[str, Tuple[str, str, str]] = {}  # 原始消息ID → 条目键
+        self._lock = threading.Lock()
+
+        # 统计
+        self.suppressed_total = 0
+        self.evicted_total = 0
+
+    @staticmethod
+    def fingerprint(content: Any) -> str:
+        """
+        计算消息内容指纹
+
+        Args:
+            content: 消息内容（文本，图片的 (base64, md5) 元组，或文件/语音的 (文件名, 原始字节, sha256) 元组）
+
+        Returns:
+            str: 内容哈希
+        """
+        if isinstance(content, tuple) and len(content) == 2:
+            # 图片消息已带 MD5
+            return str(content[1])
+        if isinstance(content, tuple) and len(content) == 3:
+            # 文件/语音消息已带 SHA-256
+            return str(content[2])
+        if isinstance(content, bytes):
+            data = content
+        else:
+            data = str(content).encode("utf-8")
+        return hashlib.sha1(data).hexdigest()
+
+    def check(
+        self,
+        target: str,
+        msg_type: str,
+        content: Any,
+        message_id: str,
+        duplicate_result: Optional[SendResult] = None
+    ) -> Tuple[bool, Optional[str], int]:
+        """
+        检查消息是否为时间窗口内的重复消息
+
+        Args:
+            target: 发送目标（webhook URL 或池的 key）
+            msg_type: 消息类型
+            content: 消息内容
+            message_id: 当前消息ID（非重复时登记为原始消息，发送后需调用 bind()）
+            duplicate_result: 当前消息的结果对象（可选），重复时随原始消息的结果完成
+
+        Returns:
+            Tuple[bool, Optional[str], int]:
+                - 是否重复（True 表示应抑制）
+                - 重复时为窗口内原始消息的ID，否则为 None
+                - 非重复时，上一个窗口内被抑制的次数（用于附加提示）
+        """
+        key = (target, msg_type, self.fingerprint(content))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or now - entry.first_seen >= self.window:
+                repeated = entry.suppressed if entry is not None else 0
+                if entry is not None:
+                    self._keys.pop(entry.message_id, None)
+                self._entries[key] = _DedupEntry(now, message_id)
+                self._entries.move_to_end(key)
+                self._keys[message_id] = key
+
+                while len(self._entries) > self.max_size:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._keys.pop(evicted.message_id, None)
+                    self.evicted_total += 1
+
+                return False, None, repeated
+
+            entry.suppressed += 1
+            self.suppressed_total += 1
+            self._entries.move_to_end(key)
+            original = entry.result
+            if original is None and duplicate_result is not None:
+                entry.waiters.append(duplicate_result)
+
+        if original is not None and duplicate_result is not None:
+            self._link(original, duplicate_result)
+        return True, entry.message_id, 0
+
+    def bind(self, message_id: str, result: SendResult) -> None:
+        """
+        登记原始消息的结果
+
+        已到达的重复消息随该结果完成；原始消息未成功时释放条目，
+        窗口内的下一份副本会正常发送。
+
+        Args:
+            message_id: check() 登记的原始消息ID
+            result: 原始消息的结果对象
+        """
+        with self._lock:
+            key = self._keys.get(message_id)
+            entry = self._entries.get(key) if key is not None else None
+            waiters = []
+            if entry is not None:
+                entry.result = result
+                waiters, entry.waiters = entry.waiters, []
+
+        for duplicate in waiters:
+            self._link(result, duplicate)
+        result.add_done_callback(lambda done: self._on_original_done(message_id, done))
+
+    def _on_original_done(self, message_id: str, result: SendResult) -> None:
+        """原始消息完成：未成功时释放条目"""
+        if result.is_success():
+            return
+        with self._lock:
+            key = self._keys.pop(message_id, None)
+            if key is not None:
+                self._entries.pop(key, None)
+
+    @staticmethod
+    def _link(original: SendResult, duplicate: SendResult) -> None:
+        """重复消息的结果随原始消息完成"""
+        duplicate.duplicate_of = original.message_id
+
+        def complete(done: SendResult):
+            if done.is_success():
+                duplicate.mark_duplicate(done.message_id)
+            else:
+                duplicate.mark_failed(f"Original message {done.message_id} was not delivered: {done.error}")
+
+        original.add_done_callback(complete)
+
+    def format_suffix(self, repeated: int) -> str:
+        """
+        生成重复次数提示
+
+        Args:
+            repeated: 上一个窗口内被抑制的次数
+
+        Returns:
+            str: 提示文本（未启用或次数为0时返回空字符串）
+        """
+        if not self.repeat_suffix or repeated <= 0:
+            return ""
+        return self.suffix_format.format(count=repeated)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: size / suppressed_total / evicted_total
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "suppressed_total": self.suppressed_total,
+                "evicted_total": self.evicted_total,
+            }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def __repr__(self):
+        return (
+            f"<DedupCache window={self.window}s size={len(self._entries)}/{self.max_size} "
+            f"suppressed={self.suppressed_total}>"
+        )
+
+
+__all__ = ["DedupCache"]
@@ -0,0 +1,291 @@
+"""
+摘要聚合 - 将告警风暴合并为少量汇总消息
+
+设置了 digest_group 的消息不会立即发送，而是按发送目标缓冲：
+- 自第一条消息起经过 window 秒，或
+- 缓冲内容达到 max_bytes 字节
+时，将缓冲区渲染为一条汇总 Markdown 消息（每组计数、前 K 条样例、详情链接）发送。
+成员消息的 SendResult 在汇总消息发送完成后一并完成。
+
+成员设置了截止时间（ttl/deadline）时，缓冲区最迟在最早的截止时间发送，汇总消息沿用该截止时间；
+汇总过期时成员结果同样为 expired。
+
+渲染函数可插拔：renderer(groups, window_start, window_end) -> str。
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .logger import get_logger
+from .models import SendResult
+
+
+# 默认配置
+DEFAULT_DIGEST_WINDOW = 30          # 聚合时间窗口（秒）
+DEFAULT_DIGEST_MAX_BYTES = 16384    # 缓冲区字节预算，达到后立即发送
+DEFAULT_DIGEST_MAX_SAMPLES = 5      # 每组展示的样例条数
+DEFAULT_DIGEST_SAMPLE_LENGTH = 200  # 单条样例最大字符数
+
+
+@dataclass
+class DigestItem:
+    """缓冲中的一条消息"""
+    message: Any
+    result: SendResult
+    received_at: float = field(default_factory=time.time)
+
+    @property
+    def content(self) -> str:
+        return str(self.message.content)
+
+
+@dataclass
+class _DigestBuffer:
+    """单个发送目标的缓冲区"""
+    target: Any                     # 发送目标（webhook URL 或 URL 列表）
+    opened_at: float                # 第一条消息的时间
+    due_at: float                   # 发送时间（窗口到期或成员最早截止时间，取较早者）
+    groups: Dict[str, List[DigestItem]] = field(default_factory=dict)
+    size_bytes: int = 0
+
+
+DigestRenderer = Callable[[Dict[str, List[DigestItem]], float, float], str]
+
+
+def make_markdown_renderer(
+    max_samples: int = DEFAULT_DIGEST_MAX_SAMPLES,
+    sample_length: int = DEFAULT_DIGEST_SAMPLE_LENGTH,
+    link_template: Optional[str] = None
+) -> DigestRenderer:
+    """
+    创建默认的 Markdown 汇总渲染函数
+
+    Args:
+        max_samples: 每组展示的样例条数
+        sample_length: 单条样例最大字符数（超出截断）
+        link_template: 详情链接模板（支持 {group} 占位符），None 表示不显示链接
+
+    Returns:
+        DigestRenderer: 渲染函数
+    """
+    def render(groups: Dict[str, List[DigestItem]], window_start: float, window_end: float) -> str:
+        total = sum(len(items) for items in groups.values())
+        start = datetime.fromtimestamp(window_start).strftime("%H:%M:%S")
+        end = datetime.fromtimestamp(window_end).strftime("%H:%M:%S")
+
+        lines = [f"## 消息汇总（共 {total} 条）", f"> 时间窗口：{start} - {end}", ""]
+
+        for group, items in groups.items():
+            lines.append(f"### {group}（{len(items)} 条）")
+            for item in items[:max_samples]:
+                sample = " ".join(item.content.split())
+                if len(sample) > sample_length:
+                    sample = sample[:sample_length] + "..."
+                lines.append(f"- {sample}")
+            if len(items) > max_samples:
+                lines.append(f"- ……其余 {len(items) - max_samples} 条已省略")
+            if link_template:
+                lines.append(f"[查看详情]({link_template.format(group=group)})")
+            lines.append("")
+
+        return "\n".join(lines).rstrip()
+
+    return render
+
+
+class DigestAggregator:
+    """
+    摘要聚合器（线程安全）
+
+    后台线程在窗口到期时发送汇总；字节预算填满时在调用线程中立即发送。
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[Any, str, List[DigestItem]], SendResult],
+        config: Optional[dict] = None
+    ):
+        """
+        初始化摘要聚合器
+
+        Args:
+            flush_func: 发送汇总的函数，参数为 (发送目标, 汇总内容, 成员列表)，返回汇总消息的 SendResult
+            config: 配置字典，包含：
+                - window: float - 聚合时间窗口（秒，默认30）
+                - max_bytes: int - 缓冲区字节预算（默认16384）
+                - max_samples: int - 每组样例条数（默认5）
+                - sample_length: int - 单条样例最大字符数（默认200）
+                - link_template: str - 详情链接模板（支持 {group}，默认不显示）
+                - renderer: Callable - 自定义渲染函数 (groups, window_start, window_end) -> str
+        """
+        config = config or {}
+        self.logger = get_logger()
+        self.flush_func = flush_func
+        self.window = config.get("window", DEFAULT_DIGEST_WINDOW)
+        self.max_bytes = config.get("max_bytes", DEFAULT_DIGEST_MAX_BYTES)
+        self.renderer: DigestRenderer = config.get("renderer") or make_markdown_renderer(
+            max_samples=config.get("max_samples", DEFAULT_DIGEST_MAX_SAMPLES),
+            sample_length=config.get("sample_length", DEFAULT_DIGEST_SAMPLE_LENGTH),
+            link_template=config.get("link_template"),
+        )
+
+        if self.window <= 0:
+            raise ValueError("Digest window must be positive")
+        if self.max_bytes <= 0:
+            raise ValueError("Digest max_bytes must be positive")
+
+        # 目标key → 缓冲区
+        self._buffers: Dict[str, _DigestBuffer] = {}
+        self._cond = threading.Condition()
+        self._stop_flag = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.digest_count = 0
+        self.message_count = 0
+
+    def add(self, target_key: str, target: Any, message: Any) -> SendResult:
+        """
+        将消息加入目标的缓冲区
+
+        Args:
+            target_key: 目标唯一key
+            target: 发送目标（传给 flush_func）
+            message: 消息对象（需包含 digest_group 和 content）
+
+        Returns:
+            SendResult: 成员消息的结果对象（汇总发送后完成）
+        """
+        result = SendResult(message.id)
+        item = DigestItem(message=message, result=result)
+        size = len(item.content.encode("utf-8"))
+
+        to_flush = None
+        with self._cond:
+            self._ensure_thread()
+            buffer = self._buffers.get(target_key)
+            if buffer is None:
+                now = time.time()
+                buffer = _DigestBuffer(target=target, opened_at=now, due_at=now + self.window)
+                self._buffers[target_key] = buffer
+                self._cond.notify()
+
+            # 成员截止时间早于窗口到期时提前发送，避免成员在缓冲中过期
+            deadline = getattr(message, "deadline", None)
+            if deadline is not None and deadline < buffer.due_at:
+                buffer.due_at = deadline
+                self._cond.notify()
+
+            buffer.groups.setdefault(message.digest_group, []).append(item)
+            buffer.size_bytes += size
+            self.message_count += 1
+
+            if buffer.size_bytes >= self.max_bytes:
+                to_flush = self._buffers.pop(target_key)
+
+        if to_flush is not None:
+            self._flush_buffer(to_flush)
+
+        return result
+
+    def flush_all(self) -> int:
+        """
+        立即发送所有缓冲区
+
+        Returns:
+            int: 发送的汇总消息数
+        """
+        with self._cond:
+            buffers = list(self._buffers.values())
+            self._buffers.clear()
+
+        for buffer in buffers:
+            self._flush_buffer(buffer)
+        return len(buffers)
+
+    def _ensure_thread(self) -> None:
+        """按需启动后台线程（调用方需持有锁）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_flag = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="DigestAggregator")
+            self._thread.start()
+
+    def _run(self) -> None:
+        """后台线程：等待最早的窗口到期并发送"""
+        while True:
+            due: List[_DigestBuffer] = []
+            with self._cond:
+                if self._stop_flag:
+                    return
+
+                now = time.time()
+                next_due = None
+                for key, buffer in list(self._buffers.items()):
+                    if buffer.due_at <= now:
+                        due.append(self._buffers.pop(key))
+                    elif next_due is None or buffer.due_at < next_due:
+                        next_due = buffer.due_at
+
+                if not due:
+                    self._cond.wait(None if next_due is None else next_due - now)
+                    continue
+
+            for buffer in due:
+                self._flush_buffer(buffer)
+
+    def _flush_buffer(self, buffer: _DigestBuffer) -> None:
+        """渲染并发送一个缓冲区，汇总完成后完成所有成员结果"""
+        items = [item for items in buffer.groups.values() for item in items]
+        window_end = max(item.received_at for item in items)
+
+        try:
+            content = self.renderer(buffer.groups, buffer.opened_at, window_end)
+            digest_result = self.flush_func(buffer.target, content, items)
+        except Exception as e:
+            self.logger.error(f"Failed to send digest: {e}")
+            for item in items:
+                item.result.mark_failed(f"Digest failed: {e}")
+            return
+
+        self.digest_count += 1
+        self.logger.debug(
+            f"Digest {digest_result.message_id} created from {len(items)} messages "
+            f"in {len(buffer.groups)} groups"
+        )
+        digest_result.add_done_callback(lambda done: self._complete_members(done, items))
+
+    @staticmethod
+    def _complete_members(digest_result: SendResult, items: List[DigestItem]) -> None:
+        """根据汇总消息的结果完成成员结果"""
+        for item in items:
+            item.result.digest_id = digest_result.message_id
+            item.result.used_webhooks = list(digest_result.used_webhooks)
+            if digest_result.is_success():
+                item.result.mark_success()
+            elif digest_result.is_expired():
+                item.result.mark_expired(digest_result.error or "Digest expired before delivery")
+            else:
+                item.result.mark_failed(digest_result.error or "Digest delivery failed")
+
+    def stop(self, flush: bool = True) -> None:
+        """
+        停止后台线程
+
+        Args:
+            flush: 是否先发送所有缓冲区
+        """
+        if flush:
+            self.flush_all()
+        with self._cond:
+            self._stop_flag = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __repr__(self):
+        return f"<DigestAggregator window={self.window}s buffers={len(self._buffers)} digests={self.digest_count}>"
+
+
+__all__ = ["DigestAggregator", "DigestItem", "make_markdown_renderer"]
@@ -0,0 +1,387 @@
+"""
+公平消息队列 - 按租户加权的赤字轮转（DRR）调度
+
+多个业务方（租户）共用同一个 webhook 或 webhook 池时，
+使用普通 FIFO 队列会让突发流量的租户占满全部配额。
+本队列为每个租户维护独立子队列，按权重轮转出队，
+保证每个租户都能获得与权重成比例的吞吐份额。
+
+同时维护按截止时间排序的最小堆，过期消息在入队/出队时被批量清理，
+无需遍历整个积压队列。
+
+设置了 conflate_key 的消息采用"最新值优先"语义：队列中已有相同 key 的消息时，
+新消息原地替换旧消息（保留排队位置），旧消息不再发送。
+"""
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .constants import DEFAULT_TENANT
+
+
+class FairMessageQueue:
+    """
+    加权公平消息队列（Deficit Round Robin）
+
+    接口与 queue.Queue 保持一致（put / get / task_done / qsize / empty / join），
+    可直接替换 WebhookManager 和 WebhookPoolBase 中的消息队列。
+
+    调度规则：
+    - 消息按 message.tenant 分组（未设置时归入默认租户）
+    - 每轮为租户补充 quantum * weight 的额度
+    - 出队消耗额度 = cost_func(message)（默认每条消息为1）
+    - 同一租户内部保持 FIFO 顺序
+    - 设置了 message.deadline 的消息过期后不再出队，并通过 on_expired 回调通知
+    - 设置了 message.conflate_key 的消息会原地替换排队中的同 key 消息，
+      并通过 on_superseded 回调通知
+    """
+
+    # 队列条目字段索引：[message, cost, alive, deadline]
+    _MESSAGE, _COST, _ALIVE, _DEADLINE = 0, 1, 2, 3
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+        quantum: float = 1.0,
+        cost_func: Optional[Callable[[Any], float]] = None,
+        on_expired: Optional[Callable[[Any], None]] = None,
+        on_superseded: Optional[Callable[[Any, Any], None]] = None
+    ):
+        """
+        初始化公平队列
+
+        Args:
+            weights: 租户权重字典（tenant → weight），未配置的租户使用 default_weight
+            default_weight: 默认权重
+            quantum: 每轮补充的基础额度
+            cost_func: 计算消息出队成本的函数（如预估分段数），默认每条消息为1
+            on_expired: 消息过期回调（在锁外调用），参数为过期的消息对象
+            on_superseded: 消息被替换回调（在锁外调用），参数为 (旧消息, 新消息)
+        """
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.quantum = quantum
+        self.cost_func = cost_func or (lambda message: 1)
+        self.on_expired = on_expired
+        self.on_superseded = on_superseded
+
+        for tenant, weight in self.weights.items():
+            if weight <= 0:
+                raise ValueError(f"Weight for tenant '{tenant}' must be positive")
+        if default_weight <= 0:
+            raise ValueError("default_weight must be positive")
+
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._all_tasks_done = threading.Condition(self._mutex)
+
+        # 租户子队列：tenant → deque[[message, cost, alive]]
+        self._queues: Dict[str, Deque[list]] = {}
+        # 租户剩余额度
+        self._deficits: Dict[str, float] = {}
+        # 有积压的租户（轮转顺序）
+        self._active: Deque[str] = deque()
+
+        # 截止时间最小堆：(deadline, seq, entry)
+        self._deadline_heap: List[tuple] = []
+        self._seq = itertools.count()
+
+        # 排队中的可合并消息：(tenant, conflate_key) → entry（合并只在同一租户内进行）
+        self._conflated: Dict[Any, list] = {}
+
+        self._size = 0
+        self._pending_cost = 0.0
+        self._unfinished_tasks = 0
+        self.expired_count = 0
+        self.superseded_count = 0
+
+    def get_weight(self, tenant: str) -> float:
+        """获取租户权重"""
+        return self.weights.get(tenant, self.default_weight)
+
+    def set_weight(self, tenant: str, weight: float) -> None:
+        """
+        设置租户权重（运行时可调整）
+
+        Args:
+            tenant: 租户标识
+            weight: 权重（必须为正数）
+        """
+        if weight <= 0:
+            raise ValueError(f"Weight for tenant '{tenant}' must be positive")
+        with self._mutex:
+            self.weights[tenant] = weight
+
+    @staticmethod
+    def _tenant_of(message: Any) -> str:
+        return getattr(message, "tenant", None) or DEFAULT_TENANT
+
+    def put(self, message: Any) -> None:
+        """
+        将消息加入所属租户的子队列
+
+        如果消息设置了 conflate_key 且同一租户的队列中已有相同 key 的消息，
+        则原地替换旧消息（保留其排队位置），不增加队列长度。
+        不同租户的相同 key 互不影响，替换后的成本始终计入消息所属的租户。
+
+        Args:
+            message: 消息对象（通过 message.tenant 识别租户）
+        """
+        tenant = self._tenant_of(message)
+        cost = self.cost_func(message)
+        deadline = getattr(message, "deadline", None)
+        conflate_key = getattr(message, "conflate_key", None)
+
+        with self._mutex:
+            expired = self._sweep_expired()
+
+            superseded = None
+            existing = self._conflated.get((tenant, conflate_key)) if conflate_key is not None else None
+
+            if existing is not None and existing[self._ALIVE]:
+                # 原地替换：保留排队位置，旧消息被取代
+                superseded = existing[self._MESSAGE]
+                self._pending_cost += cost - existing[self._COST]
+                existing[self._MESSAGE] = message
+                existing[self._COST] = cost
+                existing[self._DEADLINE] = deadline
+                if deadline is not None:
+                    heapq.heappush(self._deadline_heap, (deadline, next(self._seq), existing))
+                self.superseded_count += 1
+            else:
+                self._append_locked(tenant, [message, cost, True, deadline])
+
+        self._notify_expired(expired)
+        if superseded is not None and self.on_superseded is not None:
+            self.on_superseded(superseded, message)
+
+    def _append_locked(self, tenant: str, entry: list) -> None:
+        """将新条目追加到租户子队列（调用方需持有锁）"""
+        message, cost, _, deadline = entry
+
+        tenant_queue = self._queues.get(tenant)
+        if tenant_queue is None:
+            tenant_queue = deque()
+            self._queues[tenant] = tenant_queue
+
+        if not tenant_queue:
+            # 租户从空闲变为活跃，加入轮转
+            self._deficits[tenant] = 0.0
+            self._active.append(tenant)
+
+        tenant_queue.append(entry)
+        if deadline is not None:
+            heapq.heappush(self._deadline_heap, (deadline, next(self._seq), entry))
+
+        conflate_key = getattr(message, "conflate_key", None)
+        if conflate_key is not None:
+            self._conflated[(tenant, conflate_key)] = entry
+
+        self._size += 1
+        self._pending_cost += cost
+        self._unfinished_tasks += 1
+        self._not_empty.notify()
+
+    def _retire_locked(self, entry: list) -> None:
+        """将条目标记为已离开队列（出队或过期，调用方需持有锁）"""
+        entry[self._ALIVE] = False
+        self._size -= 1
+        self._pending_cost -= entry[self._COST]
+
+        message = entry[self._MESSAGE]
+        conflate_key = getattr(message, "conflate_key", None)
+        if conflate_key is not None:
+            key = (self._tenant_of(message), conflate_key)
+            if self._conflated.get(key) is entry:
+                del self._conflated[key]
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """
+        按 DRR 规则取出下一条消息
+
+        Args:
+            block: 是否阻塞等待
+            timeout: 最长等待时间（秒），None 表示无限等待
+
+        Returns:
+            消息对象
+
+        Raises:
+            queue.Empty: 队列为空（非阻塞或等待超时）
+        """
+        expired: List[Any] = []
+        try:
+            with self._not_empty:
+                expired = self._sweep_expired()
+                if not block:
+                    if not self._size:
+                        raise queue.Empty
+                elif timeout is None:
+                    while not self._size:
+                        self._not_empty.wait()
+                        expired.extend(self._sweep_expired())
+                else:
+                    if timeout < 0:
+                        raise ValueError("'timeout' must be a non-negative number")
+                    end_time = time.monotonic() + timeout
+                    while not self._size:
+                        remaining = end_time - time.monotonic()
+                        if remaining <= 0.0:
+                            raise queue.Empty
+                        self._not_empty.wait(remaining)
+                        expired.extend(self._sweep_expired())
+
+                return self._pop_next()
+        finally:
+            self._notify_expired(expired)
+
+    def get_nowait(self) -> Any:
+        """非阻塞获取消息"""
+        return self.get(block=False)
+
+    def _pop_next(self) -> Any:
+        """按赤字轮转选出下一条消息（调用方需持有锁）"""
+        while True:
+            tenant = self._active[0]
+            tenant_queue = self._queues[tenant]
+            entry = tenant_queue[0]
+
+            if not entry[self._ALIVE]:
+                # 已过期的条目（惰性删除）
+                tenant_queue.popleft()
+                if not tenant_queue:
+                    self._deficits[tenant] = 0.0
+                    self._active.popleft()
+                continue
+
+            message, cost = entry[self._MESSAGE], entry[self._COST]
+
+            if self._deficits[tenant] >= cost:
+                tenant_queue.popleft()
+                self._retire_locked(entry)
+                self._deficits[tenant] -= cost
+
+                if not tenant_queue:
+                    # 租户队列已清空，退出轮转并清零额度（DRR 规则）
+                    self._deficits[tenant] = 0.0
+                    self._active.popleft()
+
+                return message
+
+            # 额度不足：为当前租户补充额度后轮转到下一个租户
+            self._deficits[tenant] += self.quantum * self.get_weight(tenant)
+            self._active.rotate(-1)
+
+    def _sweep_expired(self) -> List[Any]:
+        """
+        清理已过期的消息（调用方需持有锁）
+
+        只弹出堆顶已过期的条目，复杂度 O(k log n)，k 为本次过期数量。
+        过期条目在子队列中仅做标记，出队时惰性移除。
+
+        Returns:
+            List[Any]: 本次过期的消息列表
+        """
+        heap = self._deadline_heap
+        if not heap or heap[0][0] > time.time():
+            return []
+
+        now = time.time()
+        expired = []
+        while heap and heap[0][0] <= now:
+            deadline, _, entry = heapq.heappop(heap)
+            if not entry[self._ALIVE] or entry[self._DEADLINE] != deadline:
+                # 已出队，或消息已被替换（截止时间变化）的过时堆条目
+                continue
+            self._retire_locked(entry)
+            self._unfinished_tasks -= 1
+            expired.append(entry[self._MESSAGE])
+
+        if expired:
+            self.expired_count += len(expired)
+            if self._unfinished_tasks <= 0:
+                self._all_tasks_done.notify_all()
+
+        return expired
+
+    def _notify_expired(self, expired: List[Any]) -> None:
+        """在锁外触发过期回调"""
+        if not expired or self.on_expired is None:
+            return
+        for message in expired:
+            self.on_expired(message)
+
+    def purge_expired(self) -> int:
+        """
+        主动清理过期消息
+
+        Returns:
+            int: 本次清理的消息数
+        """
+        with self._mutex:
+            expired = self._sweep_expired()
+        self._notify_expired(expired)
+        return len(expired)
+
+    def task_done(self) -> None:
+        """标记一条消息处理完成"""
+        with self._all_tasks_done:
+            unfinished = self._unfinished_tasks - 1
+            if unfinished <= 0:
+                if unfinished < 0:
+                    raise ValueError("task_done() called too many times")
+                self._all_tasks_done.notify_all()
+            self._unfinished_tasks = unfinished
+
+    def join(self) -> None:
+        """阻塞直到所有消息处理完成"""
+        with self._all_tasks_done:
+            while self._unfinished_tasks:
+                self._all_tasks_done.wait()
+
+    def qsize(self) -> int:
+        """队列中的消息总数"""
+        with self._mutex:
+            return self._size
+
+    def pending_cost(self) -> float:
+        """
+        队列中所有消息的成本总和（如预估分段总数）
+
+        Returns:
+            float: 积压成本
+        """
+        with self._mutex:
+            return max(0.0, self._pending_cost)
+
+    def empty(self) -> bool:
+        """队列是否为空"""
+        with self._mutex:
+            return not self._size
+
+    def tenant_sizes(self) -> Dict[str, int]:
+        """
+        各租户的积压消息数
+
+        Returns:
+            Dict[str, int]: tenant → 积压数量
+        """
+        with self._mutex:
+            sizes = {}
+            for tenant, tenant_queue in self._queues.items():
+                alive = sum(1 for entry in tenant_queue if entry[self._ALIVE])
+                if alive:
+                    sizes[tenant] = alive
+            return sizes
+
+    def __repr__(self):
+        with self._mutex:
+            return f"<FairMessageQueue size={self._size} active_tenants={len(self._active)}>"
+
+
+__all__ = ["FairMessageQueue"]
@@ -0,0 +1,240 @@
+"""
+幂等键存储 - 丢弃上游重试产生的重复发送
+
+上游任务整体重试时会再次调用发送接口，导致同一份报告发送多次。
+调用方为每次逻辑发送指定 idempotency_key，相同 key 的重复请求直接返回原始的 SendResult。
+
+- 查找 O(1)（OrderedDict，按登记时间排序，过期和容量淘汰都从头部进行）
+- 条目保留 retention 秒
+- 发送失败的 key 会被释放，允许调用方重试
+- 可选持久化到 .wecom_cache/idempotency.jsonl（每次成功追加一行，日志过长时压缩重写），
+  进程重启后仍然有效
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from .logger import get_logger
+from .models import SendResult
+
+
+# 默认配置
+DEFAULT_IDEMPOTENCY_RETENTION = 24 * 3600  # 默认保留24小时
+DEFAULT_IDEMPOTENCY_MAX_SIZE = 10000       # 最大条目数
+COMPACT_MIN_LINES = 1000                   # 日志行数超过 max(此值, 2 × 条目数) 时压缩重写
+
+
+class IdempotencyStore:
+    """
+    幂等键存储（线程安全）
+
+    使用示例:
+        store = IdempotencyStore({"retention": 3600, "persist": True})
+        result, created = store.get_or_create("daily-report-2026-01-01", lambda: notifier_enqueue())
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化幂等键存储
+
+        Args:
+            config: 配置字典，包含：
+                - retention: float - 幂等键保留时间（秒，默认86400）
+                - max_size: int - 最大条目数（默认10000，超出时淘汰最早的条目）
+                - persist: bool - 是否持久化到磁盘（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+        """
+        config = config or {}
+        self.logger = get_logger()
+        self.retention = config.get("retention", DEFAULT_IDEMPOTENCY_RETENTION)
+        self.max_size = config.get("max_size", DEFAULT_IDEMPOTENCY_MAX_SIZE)
+        self.persist = config.get("persist", False)
+        self.cache_dir = config.get("cache_dir", ".wecom_cache")
+        self.cache_file = os.path.join(self.cache_dir, "idempotency.jsonl")
+
+        if self.retention <= 0:
+            raise ValueError("Idempotency retention must be positive")
+        if self.max_size <= 0:
+            raise ValueError("Idempotency max_size must be positive")
+
+        # key → (登记时间, SendResult)
+        self._entries: "OrderedDict[str, Tuple[float, SendResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 已预留、正在创建的 key（并发的相同请求等待创建完成）
+        self._pending: Dict[str, threading.Event] = {}
+        self._save_lock = threading.Lock()
+        self._log_lines = 0  # 持久化日志的当前行数
+
+        if self.persist:
+            self._load()
+
+    def get(self, key: str) -> Optional[SendResult]:
+        """
+        查找幂等键对应的结果
+
+        Args:
+            key: 幂等键
+
+        Returns:
+            Optional[SendResult]: 原始结果，不存在或已过期时返回 None
+        """
+        with self._lock:
+            self._purge_locked(time.time())
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def get_or_create(
+        self,
+        key: str,
+        factory: Callable[[], SendResult]
+    ) -> Tuple[SendResult, bool]:
+        """
+        查找幂等键，不存在时调用 factory 创建并登记
+
+        先在存储锁内预留 key，再在锁外调用 factory（入队不阻塞其他 key 的查找）；
+        并发的相同请求等待预留方创建完成后返回同一结果，保证只有一个请求会真正入队。
+
+        Args:
+            key: 幂等键
+            factory: 创建 SendResult 的函数（通常为消息入队）
+
+        Returns:
+            Tuple[SendResult, bool]: (结果对象, 是否为新创建)
+        """
+        while True:
+            with self._lock:
+                self._purge_locked(time.time())
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return entry[1], False
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            # 其他请求正在创建：等待后重新查找（创建失败或结果已失败释放时由本请求重新创建）
+            pending.wait()
+
+        try:
+            result = factory()
+            with self._lock:
+                self._entries[key] = (time.time(), result)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+        result.add_done_callback(lambda done: self._on_result_done(key, done))
+        return result, True
+
+    def _on_result_done(self, key: str, result: SendResult) -> None:
+        """结果完成回调：失败则释放 key，成功则追加到持久化日志"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] is not result:
+                return
+            if result.success is False:
+                del self._entries[key]
+
+        if result.success is False:
+            self.logger.debug(f"Idempotency key '{key}' released after failed send: {result.error}")
+            return
+
+        if self.persist:
+            self._append_line(key, entry[0], result)
+
+    def _purge_locked(self, now: float) -> None:
+        """清理过期条目（调用方需持有锁）"""
+        expire_before = now - self.retention
+        while self._entries:
+            key, (created_at, _) = next(iter(self._entries.items()))
+            if created_at > expire_before:
+                break
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _to_record(key: str, created_at: float, result: SendResult) -> str:
+        """序列化为日志中的一行"""
+        return json.dumps({
+            "key": key,
+            "created_at": created_at,
+            "message_id": result.message_id,
+            "status": result.status,
+            "segment_count": result.segment_count,
+            "used_webhooks": list(result.used_webhooks),
+        }, ensure_ascii=False) + "\n"
+
+    def _append_line(self, key: str, created_at: float, result: SendResult) -> None:
+        """追加一条成功记录（O(1)），日志中过期和淘汰的行过多时压缩重写"""
+        with self._save_lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self.cache_file, 'a', encoding='utf-8') as f:
+                    f.write(self._to_record(key, created_at, result))
+                self._log_lines += 1
+                if self._log_lines > max(COMPACT_MIN_LINES, 2 * len(self)):
+                    self._compact()
+            except Exception as e:
+                self.logger.error(f"Failed to save idempotency cache: {e}")
+
+    def _compact(self) -> None:
+        """按当前已成功的条目重写日志（调用方需持有 _save_lock）"""
+        with self._lock:
+            entries = [
+                (key, created_at, result)
+                for key, (created_at, result) in self._entries.items()
+                if result.success is True
+            ]
+
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for key, created_at, result in entries:
+                f.write(self._to_record(key, created_at, result))
+        os.replace(tmp_file, self.cache_file)
+        self._log_lines = len(entries)
+
+    def _load(self) -> None:
+        """从日志文件恢复未过期的条目（同一 key 以最后一行为准）"""
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+
+            expire_before = time.time() - self.retention
+            items = {}
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._log_lines += 1
+                    item = json.loads(line)
+                    if item["created_at"] > expire_before:
+                        items[item["key"]] = item
+
+            # 日志按完成顺序追加，按登记时间排序后恢复（过期淘汰从头部进行）
+            for item in sorted(items.values(), key=lambda i: i["created_at"])[-self.max_size:]:
+                result = SendResult(item["message_id"])
+                result.segment_count = item.get("segment_count", 0)
+                result.used_webhooks = item.get("used_webhooks", [])
+                result.mark_success()
+                result.status = item.get("status", result.status)
+                self._entries[item["key"]] = (item["created_at"], result)
+
+            self.logger.debug(f"Loaded {len(self._entries)} idempotency keys from cache")
+
+        except Exception as e:
+            self.logger.error(f"Failed to load idempotency cache: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __repr__(self):
+        return f"<IdempotencyStore size={len(self)} retention={self.retention}s persist={self.persist}>"
+
+
+__all__ = ["IdempotencyStore"]
@@ -2,14 +2,42 @@
 核心数据模型 - 平台无关
 """
 import threading
+import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Callable
 
 
 # 核心消息类型常量
 MSG_TYPE_TEXT = "text"
 
+# 发送结果状态
+RESULT_STATUS_PENDING = "pending"    # 进行中
+RESULT_STATUS_SUCCESS = "success"    # 发送成功
+RESULT_STATUS_FAILED = "failed"      # 发送失败
+RESULT_STATUS_EXPIRED = "expired"    # 超过截止时间未发送（未消耗配额）
+RESULT_STATUS_REJECTED = "rejected"  # 入队时预计无法在 max_delay 内送达，被准入控制拒绝
+RESULT_STATUS_SUPERSEDED = "superseded"  # 排队期间被相同 conflate_key 的新消息取代
+RESULT_STATUS_DUPLICATE = "duplicate"  # 去重窗口内的重复消息，已被抑制（未消耗配额）
+RESULT_STATUS_BLOCKED = "blocked"      # 被内容审核拒绝
+
+
+def resolve_deadline(ttl: Optional[float] = None, deadline: Optional[float] = None) -> Optional[float]:
+    """
+    根据 ttl / deadline 计算消息的绝对截止时间
+
+    Args:
+        ttl: 存活时间（秒，相对当前时间）
+        deadline: 绝对截止时间戳
+
+    Returns:
+        Optional[float]: 截止时间戳（两者都设置时取较早者），None 表示永不过期
+    """
+    if ttl is not None:
+        ttl_deadline = time.time() + ttl
+        deadline = ttl_deadline if deadline is None else min(deadline, ttl_deadline)
+    return deadline
+
 
 @dataclass
 class Message:
@@ -34,6 +62,26 @@ class Message:
     # 发送配置
     segment_interval: int = 1000  # 毫秒
 
+    # 公平调度：消息所属租户/来源（None 表示默认租户）
+    tenant: Optional[str] = None
+
+    # 过期控制：存活时间（秒）或绝对截止时间戳，过期后不再发送
+    ttl: Optional[float] = None
+    deadline: Optional[float] = None
+
+    # 准入控制：可接受的最大送达延迟（秒），预计超出时入队即拒绝
+    max_delay: Optional[float] = None
+
+    # 合并键：排队中相同 key 的旧消息会被新消息取代（最新值优先）
+    conflate_key: Optional[str] = None
+
+    # 断点续传：已确认送达的分段数，以及首次处理时缓存的分段（重试时原样重发未送达部分）
+    delivered_segments: int = 0
+    segments: Optional[List["SegmentInfo"]] = field(default=None, repr=False)
+
+    # 入队时估算的分段数（缓存，估算 ETA、公平队列计费和发送时不再重复分段计数）
+    estimated_segments: Optional[int] = field(default=None, repr=False)
+
     # 向后兼容字段（企微）
     mentioned_list: Optional[List[str]] = None
     mentioned_mobile_list: Optional[List[str]] = None
@@ -47,6 +95,9 @@ class Message:
         if self.platform_extras is None:
             self.platform_extras = {}
 
+        # ttl 转换为绝对截止时间
+        self.deadline = resolve_deadline(self.ttl, self.deadline)
+
         # 如果设置了 mentioned_list，自动放入 platform_extras
         if self.mentioned_list or self.mentioned_mobile_list:
             if 'wecom' not in self.platform_extras:
@@ -64,6 +115,12 @@ class Message:
         """
         return False
 
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """是否已超过截止时间"""
+        if self.deadline is None:
+            return False
+        return (now if now is not None else time.time()) >= self.deadline
+
 
 class SendResult:
     """发送结果对象（平台无关）"""
@@ -71,12 +128,29 @@ class SendResult:
     def __init__(self, message_id: str):
         self.message_id = message_id
         self.success: Optional[bool] = None  # None=进行中, True=成功, False=失败
+        self.status: str = RESULT_STATUS_PENDING  # 详细状态（见 RESULT_STATUS_*）
         self.error: Optional[str] = None
         self._event = threading.Event()
+        self._done = False  # 已完成（回调可能尚未执行完，此时 wait() 仍会阻塞）
+        self._callbacks: List[Callable[["SendResult"], None]] = []
+        self._callback_lock = threading.Lock()
 
         # 池模式的额外信息（可选）
         self.used_webhooks: List[str] = []  # 实际使用的webhook URL列表
         self.segment_count: int = 0         # 分段数量
+        self.delivered_segments: int = 0    # 已确认送达的分段数（断点续传检查点）
+
+        # 入队时估算的预计送达时间戳（None 表示未估算）
+        self.eta: Optional[float] = None
+
+        # 被取代时，取代者的消息ID
+        self.superseded_by: Optional[str] = None
+
+        # 被去重抑制时，窗口内原始消息的ID
+        self.duplicate_of: Optional[str] = None
+
+        # 合并到摘要发送时，摘要消息的ID
+        self.digest_id: Optional[str] = None
 
     def wait(self, timeout: Optional[float] = None) -> bool:
         """
@@ -90,30 +164,131 @@ class SendResult:
         """
         return self._event.wait(timeout)
 
+    def is_done(self) -> bool:
+        """是否已完成（成功或失败）"""
+        return self._event.is_set()
+
+    def add_done_callback(self, callback: Callable[["SendResult"], None]) -> None:
+        """
+        注册完成回调
+
+        结果完成时调用 callback(result)；如果已经完成，则立即调用。
+
+        Args:
+            callback: 回调函数
+        """
+        with self._callback_lock:
+            if not self._done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _set_done(self):
+        """设置完成状态并触发回调（回调执行完后 wait() 才返回，调用方能看到回调的结果，如死信记录）"""
+        with self._callback_lock:
+            self._done = True
+            callbacks, self._callbacks = self._callbacks, []
+        try:
+            for callback in callbacks:
+                callback(self)
+        finally:
+            self._event.set()
+
     def is_success(self) -> bool:
         """是否发送成功"""
         return self.success is True
 
+    def is_expired(self) -> bool:
+        """是否因超过截止时间而未发送"""
+        return self.status == RESULT_STATUS_EXPIRED
+
     def mark_success(self):
         """标记为成功"""
         self.success = True
+        self.status = RESULT_STATUS_SUCCESS
         self.error = None
-        self._event.set()
+        self._set_done()
+
+    def mark_failed(self, error: str, status: str = RESULT_STATUS_FAILED):
+        """
+        标记为失败
 
-    def mark_failed(self, error: str):
-        """标记为失败"""
+        Args:
+            error: 错误信息
+            status: 失败状态（默认 failed，可指定 expired 等细分状态）
+        """
         self.success = False
+        self.status = status
         self.error = error
-        self._event.set()
+        self._set_done()
+
+    def mark_expired(self, error: str = "Message expired before delivery"):
+        """标记为过期（在截止时间前未能发送）"""
+        self.mark_failed(error, status=RESULT_STATUS_EXPIRED)
+
+    def mark_rejected(self, error: str):
+        """标记为被准入控制拒绝（未入队）"""
+        self.mark_failed(error, status=RESULT_STATUS_REJECTED)
+
+    def is_rejected(self) -> bool:
+        """是否在入队时被准入控制拒绝"""
+        return self.status == RESULT_STATUS_REJECTED
+
+    def mark_blocked(self, error: str = "Content blocked by moderator"):
+        """标记为被内容审核拒绝"""
+        self.mark_failed(error, status=RESULT_STATUS_BLOCKED)
+
+    def is_blocked(self) -> bool:
+        """是否被内容审核拒绝"""
+        return self.status == RESULT_STATUS_BLOCKED
+
+    def mark_superseded(self, new_message_id: str):
+        """
+        标记为被取代（排队期间有相同 conflate_key 的新消息）
+
+        Args:
+            new_message_id: 取代本消息的新消息ID
+        """
+        self.superseded_by = new_message_id
+        self.mark_failed(f"Superseded by message {new_message_id}", status=RESULT_STATUS_SUPERSEDED)
+
+    def is_superseded(self) -> bool:
+        """是否被相同 conflate_key 的新消息取代"""
+        return self.status == RESULT_STATUS_SUPERSEDED
+
+    def mark_duplicate(self, original_message_id: str):
+        """
+        标记为重复消息（去重窗口内已发送过相同内容）
+
+        重复消息不会再次发送，原始消息送达后视为成功（原始消息未送达时重复消息标记为失败）。
+
+        Args:
+            original_message_id: 窗口内原始消息的ID
+        """
+        self.duplicate_of = original_message_id
+        self.success = True
+        self.status = RESULT_STATUS_DUPLICATE
+        self.error = None
+        self._set_done()
+
+    def is_duplicate(self) -> bool:
+        """是否为被去重抑制的重复消息"""
+        return self.status == RESULT_STATUS_DUPLICATE
+
+    @property
+    def estimated_delay(self) -> Optional[float]:
+        """预计剩余送达延迟（秒），未估算时返回 None"""
+        if self.eta is None:
+            return None
+        return max(0.0, self.eta - time.time())
 
     def __repr__(self):
-        status = "pending" if self.success is None else ("success" if self.success else "failed")
-        return f"<SendResult message_id={self.message_id} status={status} error={self.error}>"
+        return f"<SendResult message_id={self.message_id} status={self.status} error={self.error}>"
 
 
-@dataclass
+@dataclass(frozen=True)
 class SegmentInfo:
-    """分段信息"""
+    """分段信息（不可变，分段缓存中的同一对象会被多条消息共享）"""
     content: str
     is_first: bool = False
     is_last: bool = False
@@ -132,5 +307,7 @@ class SegmentInfo:
         page_info = ""
         if self.page_number is not None and self.total_pages is not None:
             page_info = f" page={self.page_number}/{self.total_pages}"
+        elif self.page_number is not None:
+            page_info = f" page={self.page_number}"
 
         return f"<SegmentInfo length={len(self.content)}{flag_str}{page_info}>"
@@ -43,6 +43,16 @@ class ContentFilter:
         self.automaton = None
         self.word_count = 0
 
+    def __getstate__(self):
+        """序列化时不包含 logger（用于传递到预处理子进程）"""
+        state = self.__dict__.copy()
+        state.pop("logger", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_logger()
+
     def load_words(self, words: List[str]):
         """
         加载敏感词列表
@@ -3,7 +3,7 @@
 
 整合敏感词加载、检测和策略应用
 """
-from typing import Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 from ..logger import get_logger
@@ -122,38 +122,72 @@ class ContentModerator:
         Returns:
             Optional[str]: 审核后的内容，None表示拒绝发送
         """
-        if not self.enabled:
-            return content
+        moderated_content, detected_words = self.review(content)
 
-        if not content:
-            return content
+        if detected_words:
+            self.logger.warning(f"Detected {len(detected_words)} sensitive word(s) in content")
+            self.log_detection(message_id, content, detected_words, msg_type)
+
+        return moderated_content
+
+    def review(self, content: str) -> Tuple[Optional[str], List[str]]:
+        """
+        检测敏感词并应用策略（纯计算，不记录敏感消息日志，可在预处理子进程中执行）
+
+        Args:
+            content: 待审核内容
+
+        Returns:
+            Tuple[Optional[str], List[str]]: (审核后的内容，None表示拒绝发送；检测到的敏感词（去重）)
+        """
+        if not self.enabled or not content:
+            return content, []
 
         # 检测敏感词
         matches = self.filter.detect(content)
 
         if not matches:
             # 没有敏感词，直接返回
-            return content
+            return content, []
 
         # 有敏感词，应用策略
-        self.logger.warning(f"Detected {len(matches)} sensitive word(s) in content")
         moderated_content = self.strategy.apply(content, matches)
+        return moderated_content, list(set(match.word for match in matches))
 
-        # 记录到日志
-        if self.sensitive_logger and message_id:
-            detected_words = list(set(match.word for match in matches))
-            try:
-                self.sensitive_logger.log_sensitive_message(
-                    message_id=message_id,
-                    content=content,
-                    detected_words=detected_words,
-                    strategy=self.strategy_name,
-                    msg_type=msg_type
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to log sensitive message: {e}")
+    def log_detection(self, message_id: Optional[str], content: str, detected_words: List[str], msg_type: str):
+        """
+        记录敏感消息日志
 
-        return moderated_content
+        Args:
+            message_id: 消息ID（为空时不记录）
+            content: 原始内容
+            detected_words: 检测到的敏感词
+            msg_type: 消息类型
+        """
+        if not self.sensitive_logger or not message_id:
+            return
+
+        try:
+            self.sensitive_logger.log_sensitive_message(
+                message_id=message_id,
+                content=content,
+                detected_words=detected_words,
+                strategy=self.strategy_name,
+                msg_type=msg_type
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to log sensitive message: {e}")
+
+    def __getstate__(self):
+        """序列化时不包含 logger 和敏感消息日志记录器（子进程只做检测，日志在主进程中记录）"""
+        state = self.__dict__.copy()
+        state.pop("logger", None)
+        state["sensitive_logger"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_logger()
 
     def create_block_alert(self, content: str, message_id: str) -> str:
         """
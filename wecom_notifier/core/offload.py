@@ -0,0 +1,341 @@
+"""
+预处理卸载 - 在进程池/线程池中执行 CPU 密集的分段和内容审核
+
+1MB 的 LLM 报告在 MessageSegmenter 和 ContentModerator 中耗时明显，原本在 webhook 工作线程中
+持有 GIL 执行，会拖慢同一进程内其他 webhook 的发送。启用卸载后，超过大小阈值的消息的分段和审核
+提交到执行器中完成，工作线程只等待结果（等待期间不持有 GIL），结果回到原工作线程继续发送。
+
+执行器类型：
+- "process": ProcessPoolExecutor（spawn 启动），有 GIL 的解释器上真正并行
+- "thread": ThreadPoolExecutor，适用于 free-threaded 构建
+- "auto": free-threaded 构建（GIL 已关闭）上使用线程池，否则使用进程池（默认）
+
+子进程只执行纯计算（分段、敏感词检测和替换），敏感消息日志和分段缓存仍在主进程中更新。
+执行器异常（如子进程崩溃）时自动回退到在当前线程中处理；执行器已损坏（BrokenProcessPool）时丢弃，
+下一条消息重新创建。
+"""
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .logger import get_logger
+from .models import SegmentInfo
+from .segmenter import MessageSegmenter
+
+if TYPE_CHECKING:
+    from .moderation import ContentModerator
+
+
+# 执行器类型
+EXECUTOR_AUTO = "auto"
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_TYPES = (EXECUTOR_AUTO, EXECUTOR_PROCESS, EXECUTOR_THREAD)
+
+# 默认配置
+DEFAULT_OFFLOAD_MIN_BYTES = 64 * 1024   # 小于该字节数的消息在工作线程中直接处理
+DEFAULT_OFFLOAD_MAX_WORKERS = 2
+
+# 审核结果：(审核后的内容，None 表示拒绝发送；检测到的敏感词)
+Review = Tuple[Optional[str], List[str]]
+
+
+@dataclass
+class PreparedSegments:
+    """预处理结果"""
+    segments: List[SegmentInfo]              # 审核后的分段
+    blocked: Optional[SegmentInfo] = None    # 被审核拒绝的分段（原始内容），None 表示未拒绝
+
+
+def _gil_disabled() -> bool:
+    """当前解释器是否为关闭了 GIL 的 free-threaded 构建"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _preprocess(
+    segmenter: MessageSegmenter,
+    moderator: Optional["ContentModerator"],
+    content: str,
+    msg_type: str,
+    segments: Optional[List[SegmentInfo]] = None
+) -> Tuple[List[SegmentInfo], List[Review]]:
+    """
+    分段并审核（纯计算，可在子进程中执行）
+
+    Args:
+        segmenter: 分段器
+        moderator: 审核器（None 表示不审核）
+        content: 消息内容
+        msg_type: 消息类型
+        segments: 已有的分段（如主进程的分段缓存命中），传入时跳过分段
+
+    Returns:
+        Tuple[List[SegmentInfo], List[Review]]: 分段列表和逐段审核结果（遇到拒绝即停止）
+    """
+    if segments is None:
+        segments = segmenter.segment(content, msg_type)
+
+    reviews = []
+    if moderator is not None:
+        for segment in segments:
+            review = moderator.review(segment.content)
+            reviews.append(review)
+            if review[0] is None:
+                break
+
+    return segments, reviews
+
+
+# 子进程中的分段器和审核器（由进程池的 initializer 设置）
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(segmenter: MessageSegmenter, moderator: Optional["ContentModerator"]):
+    """子进程初始化：保存分段器和审核器，后续任务只传递消息内容"""
+    _worker_state["segmenter"] = segmenter
+    _worker_state["moderator"] = moderator
+
+
+def _preprocess_in_worker(
+    content: str,
+    msg_type: str,
+    moderate: bool,
+    segments: Optional[List[SegmentInfo]]
+) -> Tuple[List[SegmentInfo], List[Review]]:
+    """子进程任务入口"""
+    moderator = _worker_state["moderator"] if moderate else None
+    return _preprocess(_worker_state["segmenter"], moderator, content, msg_type, segments)
+
+
+class PreprocessOffloader:
+    """
+    预处理卸载器（线程安全，同一通知器的所有管理器和池共享）
+
+    使用示例:
+        offloader = PreprocessOffloader(segmenter, moderator, {"min_bytes": 128 * 1024})
+        if offloader.should_offload(content):
+            prepared = offloader.prepare(content, "markdown_v2", message_id, moderate=True)
+    """
+
+    def __init__(
+        self,
+        segmenter: MessageSegmenter,
+        content_moderator: Optional["ContentModerator"] = None,
+        config: Optional[dict] = None
+    ):
+        """
+        初始化预处理卸载器
+
+        Args:
+            segmenter: 消息分段器（通知器共享的分段器，分段缓存在主进程中更新）
+            content_moderator: 内容审核器（可选）
+            config: 配置字典，包含：
+                - executor: str - 执行器类型（"auto" | "process" | "thread"，默认 "auto"）
+                - max_workers: int - 最大工作进程/线程数（默认2）
+                - min_bytes: int - 卸载的消息大小阈值（UTF-8 字节，默认 64KB）
+        """
+        config = config or {}
+        executor = config.get("executor", EXECUTOR_AUTO)
+        self.max_workers = config.get("max_workers", DEFAULT_OFFLOAD_MAX_WORKERS)
+        self.min_bytes = config.get("min_bytes", DEFAULT_OFFLOAD_MIN_BYTES)
+
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(
+                f"Unknown offload executor: {executor} (expected one of {', '.join(EXECUTOR_TYPES)})"
+            )
+        if self.max_workers <= 0:
+            raise ValueError("Offload max_workers must be positive")
+        if self.min_bytes < 0:
+            raise ValueError("Offload min_bytes must be non-negative")
+
+        if executor == EXECUTOR_AUTO:
+            executor = EXECUTOR_THREAD if _gil_disabled() else EXECUTOR_PROCESS
+        self.executor_type = executor
+
+        self.logger = get_logger()
+        self.segmenter = segmenter
+        self.content_moderator = content_moderator
+
+        # 执行器在第一条需要卸载的消息到达时创建
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # 统计（由 _lock 保护，多个工作线程并发更新）
+        self.offloaded = 0
+        self.fallbacks = 0
+        self.restarts = 0
+
+    def should_offload(self, content: Any) -> bool:
+        """
+        消息是否需要卸载（只处理超过阈值的文本）
+
+        Args:
+            content: 消息内容
+
+        Returns:
+            bool: True 表示应调用 prepare()
+        """
+        if not isinstance(content, str):
+            return False
+        if len(content) >= self.min_bytes:
+            return True
+        # UTF-8 每个字符最多 4 字节
+        if len(content) * 4 < self.min_bytes:
+            return False
+        return len(content.encode('utf-8')) >= self.min_bytes
+
+    def prepare(
+        self,
+        content: str,
+        msg_type: str,
+        message_id: Optional[str] = None,
+        moderate: bool = False
+    ) -> PreparedSegments:
+        """
+        在执行器中分段并审核，阻塞等待结果
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+            message_id: 消息ID（用于敏感消息日志）
+            moderate: 是否审核
+
+        Returns:
+            PreparedSegments: 审核后的分段；被拒绝时 blocked 为被拒绝的分段
+        """
+        moderator = self.content_moderator if moderate else None
+        if moderator is not None and not moderator.enabled:
+            moderator = None
+
+        try:
+            segments, reviews = self._run(content, msg_type, moderator)
+            with self._lock:
+                self.offloaded += 1
+        except Exception as e:
+            self.logger.warning(f"Offloaded preprocessing failed, processing in current thread: {e}")
+            with self._lock:
+                self.fallbacks += 1
+            segments, reviews = _preprocess(self.segmenter, moderator, content, msg_type)
+
+        return self._apply_reviews(segments, reviews, message_id, msg_type)
+
+    def _run(
+        self,
+        content: str,
+        msg_type: str,
+        moderator: Optional["ContentModerator"]
+    ) -> Tuple[List[SegmentInfo], List[Review]]:
+        """提交到执行器并等待结果（执行器已损坏时丢弃，下次调用重新创建）"""
+        executor = self._get_executor()
+        try:
+            if self.executor_type == EXECUTOR_THREAD:
+                return executor.submit(
+                    _preprocess, self.segmenter, moderator, content, msg_type
+                ).result()
+
+            # 子进程的分段器不带缓存：先在主进程查询缓存，未命中时把子进程的结果写回缓存
+            cached = self.segmenter.get_cached(content, msg_type)
+            if cached is not None and moderator is None:
+                return cached, []
+            segments, reviews = executor.submit(
+                _preprocess_in_worker, content, msg_type, moderator is not None, cached
+            ).result()
+        except BrokenExecutor:
+            self._discard_executor(executor)
+            raise
+
+        if cached is None:
+            self.segmenter.store_cached(content, msg_type, segments)
+        return segments, reviews
+
+    def _discard_executor(self, executor: Executor) -> None:
+        """丢弃已损坏的执行器（如子进程被杀死），下一条消息重新创建"""
+        with self._lock:
+            if self._executor is not executor:
+                # 其他工作线程已经丢弃并重新创建
+                return
+            self._executor = None
+            self.restarts += 1
+        self.logger.warning(f"Preprocess executor is broken, it will be recreated ({self.executor_type})")
+        executor.shutdown(wait=False)
+
+    def _apply_reviews(
+        self,
+        segments: List[SegmentInfo],
+        reviews: List[Review],
+        message_id: Optional[str],
+        msg_type: str
+    ) -> PreparedSegments:
+        """应用审核结果：记录敏感消息日志，替换分段内容"""
+        if not reviews:
+            return PreparedSegments(list(segments))
+
+        moderated_segments = []
+        for segment, (moderated_content, detected_words) in zip(segments, reviews):
+            if detected_words:
+                self.content_moderator.log_detection(message_id, segment.content, detected_words, msg_type)
+            if moderated_content is None:
+                return PreparedSegments(moderated_segments, blocked=segment)
+            moderated_segments.append(replace(segment, content=moderated_content))
+        return PreparedSegments(moderated_segments)
+
+    def _get_executor(self) -> Executor:
+        """获取执行器（首次调用时创建）"""
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == EXECUTOR_THREAD:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="wecom-preprocess"
+                    )
+                else:
+                    # spawn 启动：通知器的工作线程持有的锁不会被复制到子进程
+                    worker_segmenter = MessageSegmenter(
+                        max_bytes=self.segmenter.max_bytes,
+                        page_indicator_mode=self.segmenter.page_indicator_mode,
+                        packing=self.segmenter.packing
+                    )
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(worker_segmenter, self.content_moderator)
+                    )
+                self.logger.info(
+                    f"Preprocess offload started ({self.executor_type}, max_workers={self.max_workers})"
+                )
+            return self._executor
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: offloaded / fallbacks / restarts
+        """
+        with self._lock:
+            return {
+                "offloaded": self.offloaded,
+                "fallbacks": self.fallbacks,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self) -> None:
+        """关闭执行器（等待进行中的任务完成）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __repr__(self):
+        return (
+            f"<PreprocessOffloader executor={self.executor_type} min_bytes={self.min_bytes} "
+            f"offloaded={self.offloaded}>"
+        )
+
+
+__all__ = ["PreprocessOffloader", "PreparedSegments"]
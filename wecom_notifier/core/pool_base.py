@@ -2,28 +2,43 @@
 Webhook 池基类 - 通用调度逻辑
 
 提供平台无关的消息调度能力：
-- 全局消息队列（保证顺序）
+- 全局消息队列（同一租户内保证顺序，多租户加权公平调度）
 - 单线程调度器（串行处理）
-- 智能 webhook 选择（最空闲优先）
-- 自动容错和恢复
+- 智能 webhook 选择（最空闲优先，或按延迟/健康度选择，见 selection_policy）
+- 调度索引（ready_time 策略按就绪时间维护最小堆，大型池选择为 O(log n)）
+- 自动容错和恢复（熔断器半开探测，永久失效的 webhook 不再参与调度）
+- 断点续传（重试时跳过已送达的分段）
 
 平台特定逻辑通过抽象方法由子类实现。
 """
 import queue
+import random
 import threading
 import time
 from abc import ABC, abstractmethod
-from typing import List, Optional, Set, Tuple, Any, TYPE_CHECKING
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Any, Dict, TYPE_CHECKING
 
 from wecom_notifier.core.protocols import SenderProtocol, MessageConverterProtocol
 from wecom_notifier.core.segmenter import MessageSegmenter
+from wecom_notifier.core.fair_queue import FairMessageQueue
+from wecom_notifier.core.admission import AggregatePermitEstimate, estimate_delivery_time
+from wecom_notifier.core.scheduler import WebhookScheduler
+from wecom_notifier.core.constants import (
+    SELECTION_POLICIES,
+    SELECTION_POLICY_QUOTA,
+    SELECTION_POLICY_LEAST_LATENCY,
+    SELECTION_POLICY_P2C,
+    SELECTION_POLICY_READY_TIME,
+)
 from wecom_notifier.core.models import Message, SendResult, SegmentInfo
 from wecom_notifier.core.logger import get_logger
 from wecom_notifier.core.exceptions import NotificationError
 
 if TYPE_CHECKING:
-    from wecom_notifier.webhook_resource import WebhookResource
+    from wecom_notifier.core.resource import WebhookResource
     from wecom_notifier.core.moderation import ContentModerator
+    from wecom_notifier.core.offload import PreprocessOffloader
 
 
 class AllWebhooksUnavailableError(NotificationError):
@@ -50,13 +65,19 @@ class WebhookPoolBase(ABC):
                 return True
     """
 
+    # 保留的可续传失败消息上限（超出时丢弃最早的）
+    MAX_RETRYABLE_MESSAGES = 1000
+
     def __init__(
         self,
         resources: List["WebhookResource"],
         sender: SenderProtocol,
         segmenter: MessageSegmenter,
         converter: MessageConverterProtocol,
-        content_moderator: Optional["ContentModerator"] = None
+        content_moderator: Optional["ContentModerator"] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        selection_policy: str = SELECTION_POLICY_QUOTA,
+        offloader: Optional["PreprocessOffloader"] = None
     ):
         """
         初始化 Webhook 池
@@ -67,6 +88,14 @@ class WebhookPoolBase(ABC):
             segmenter: 消息分段器
             converter: 实现 MessageConverterProtocol 的消息转换器
             content_moderator: 内容审核器（可选）
+            tenant_weights: 租户权重（tenant → weight），用于多租户公平调度
+            selection_policy: webhook 选择策略
+                - "quota": 剩余配额最多优先（默认）
+                - "least_latency": 平滑延迟最低优先
+                - "p2c": 随机取两个有配额的 webhook，选健康度更高的
+                - "quota_health": 剩余配额 × 健康度最高优先
+                - "ready_time": 调度索引（最小堆），有配额时最久未使用优先，适合数百个 webhook 的池
+            offloader: 预处理卸载器（可选），大消息的分段和审核在进程池/线程池中执行
         """
         self.logger = get_logger()
         self.resources = resources
@@ -74,16 +103,41 @@ class WebhookPoolBase(ABC):
         self.segmenter = segmenter
         self.converter = converter
         self.content_moderator = content_moderator
+        self.offloader = offloader
 
         if not self.resources:
             raise ValueError("Webhook pool must have at least one resource")
+        if selection_policy not in SELECTION_POLICIES:
+            raise ValueError(
+                f"Unknown selection policy: {selection_policy} "
+                f"(expected one of {', '.join(SELECTION_POLICIES)})"
+            )
+        self.selection_policy = selection_policy
 
-        # 消息队列
-        self.message_queue: queue.Queue = queue.Queue()
+        # 调度索引（ready_time 策略使用，首次选择时创建）
+        self._scheduler: Optional[WebhookScheduler] = None
+
+        # 消息队列（按租户加权公平调度，成本为预估分段数）
+        self.message_queue = FairMessageQueue(
+            weights=tenant_weights,
+            cost_func=self._estimate_message_cost,
+            on_expired=self._on_message_expired,
+            on_superseded=self._on_message_superseded
+        )
 
         # 结果字典
         self.results: dict = {}
 
+        # 当前正在发送的消息剩余分段数（用于 ETA 估算）
+        self._inflight_segments = 0
+
+        # 所有 webhook 的合计配额估算（限制器状态变化时才重建）
+        self._permit_estimate = AggregatePermitEstimate()
+
+        # 发送失败、可断点续传的消息（message_id → Message）
+        self._retryable: "OrderedDict[str, Message]" = OrderedDict()
+        self._retryable_lock = threading.Lock()
+
         # 停止标志
         self._stop_flag = threading.Event()
 
@@ -104,15 +158,139 @@ class WebhookPoolBase(ABC):
             message: 消息对象
 
         Returns:
-            SendResult: 发送结果对象
+            SendResult: 发送结果对象（result.eta 为预计送达时间；
+                预计超出 message.max_delay 时直接返回 rejected 状态的结果）
         """
         result = SendResult(message.id)
+        result.eta = self.estimate_eta(message)
+
+        # 准入控制：预计无法在 max_delay 内送达则立即拒绝
+        max_delay = getattr(message, "max_delay", None)
+        if max_delay is not None and result.eta - time.time() > max_delay:
+            delay = result.eta - time.time()
+            self.logger.warning(
+                f"Message {message.id} rejected by pool: estimated delay {delay:.1f}s "
+                f"exceeds max_delay {max_delay}s"
+            )
+            result.mark_rejected(
+                f"Estimated delivery in {delay:.1f}s exceeds max_delay {max_delay}s"
+            )
+            return result
+
         self.results[message.id] = result
         self.message_queue.put(message)
 
         self.logger.debug(f"Message {message.id} enqueued to pool (type={message.msg_type})")
         return result
 
+    def retry(self, result: SendResult) -> Optional[SendResult]:
+        """
+        重试发送失败的消息（断点续传）
+
+        从第一个未送达的分段继续发送，已送达的分段不会重发。
+
+        Args:
+            result: 发送失败的结果对象
+
+        Returns:
+            Optional[SendResult]: 新的结果对象；消息不可重试（不属于本池或未失败）时返回 None
+        """
+        with self._retryable_lock:
+            message = self._retryable.pop(result.message_id, None)
+        if message is None:
+            return None
+
+        new_result = SendResult(message.id)
+        new_result.delivered_segments = getattr(message, "delivered_segments", 0)
+        new_result.eta = self.estimate_eta(message)
+        self.results[message.id] = new_result
+        self.message_queue.put(message)
+
+        self.logger.info(
+            f"Message {message.id} re-enqueued to pool for retry "
+            f"({new_result.delivered_segments} segments already delivered)"
+        )
+        return new_result
+
+    def can_retry(self, result: SendResult) -> bool:
+        """消息是否可以通过 retry() 断点续传"""
+        with self._retryable_lock:
+            return result.message_id in self._retryable
+
+    def get_failed_message(self, message_id: str) -> Optional[Message]:
+        """获取可续传的失败消息（含分段和检查点），不存在时返回 None"""
+        with self._retryable_lock:
+            return self._retryable.get(message_id)
+
+    def _fail_resumable(self, message: Message, result: SendResult, error: str):
+        """标记失败，并保留消息（含检查点和分段）以便 retry() 续传"""
+        with self._retryable_lock:
+            self._retryable[message.id] = message
+            while len(self._retryable) > self.MAX_RETRYABLE_MESSAGES:
+                self._retryable.popitem(last=False)
+        result.mark_failed(error)
+
+    def estimate_eta(self, message: Message) -> float:
+        """
+        估算消息的预计送达时间
+
+        考虑：队列积压的预估分段数、正在发送的剩余分段、本消息的分段数，
+        以及所有可用 webhook 频率限制器的合计配额。
+
+        Args:
+            message: 消息对象
+
+        Returns:
+            float: 预计送达时间戳
+        """
+        segments = (
+            self.message_queue.pending_cost()
+            + self._inflight_segments
+            + self._estimate_message_cost(message)
+        )
+        limiters = [w.rate_limiter for w in self.resources if w.is_available()]
+        if not limiters:
+            limiters = [w.rate_limiter for w in self.resources]
+
+        return estimate_delivery_time(
+            limiters,
+            int(segments),
+            segment_interval=message.segment_interval / 1000.0,
+            aggregate=self._permit_estimate
+        )
+
+    def _on_message_expired(self, message: Message):
+        """队列中的消息过期回调（未消耗配额）"""
+        self.logger.warning(f"Message {message.id} expired in pool queue, dropped without sending")
+        result = self.results.get(message.id)
+        if result:
+            result.mark_expired()
+
+    def _on_message_superseded(self, old_message: Message, new_message: Message):
+        """队列中的消息被相同 conflate_key 的新消息取代"""
+        self.logger.debug(
+            f"Message {old_message.id} superseded by {new_message.id} in pool "
+            f"(conflate_key={new_message.conflate_key})"
+        )
+        result = self.results.get(old_message.id)
+        if result:
+            result.mark_superseded(new_message.id)
+
+    def _estimate_message_cost(self, message: Message) -> int:
+        """估算消息消耗的配额（预估分段数），用于公平调度"""
+        segments = getattr(message, "segments", None)
+        if segments is not None:
+            # 续传的消息只需发送剩余分段
+            return max(1, len(segments) - getattr(message, "delivered_segments", 0))
+        if getattr(message, "estimated_segments", None) is None:
+            if self.should_skip_segmentation(message.msg_type):
+                message.estimated_segments = 1
+            else:
+                message.estimated_segments = self.segmenter.estimate_segment_count(
+                    message.content, message.msg_type
+                )
+        return message.estimated_segments
+
     def _schedule_messages(self):
         """调度线程 - 串行处理消息"""
         self.logger.info("WebhookPoolBase scheduler thread started")
@@ -132,6 +310,7 @@ class WebhookPoolBase(ABC):
                 if result:
                     result.mark_failed(f"Internal error: {e}")
             finally:
+                self._inflight_segments = 0
                 self.message_queue.task_done()
 
     def _process_message(self, message: Message):
@@ -139,69 +318,115 @@ class WebhookPoolBase(ABC):
         处理单条消息（通用流程）
 
         流程:
+        0. 截止时间检查（过期消息直接丢弃）
         1. 分段（可由子类跳过）
         2. 审核（可由子类跳过）
-        3. 发送每个分段
+        3. 发送每个分段（从检查点 message.delivered_segments 开始）
         4. 平台特定后处理
+
+        分段和审核结果缓存在 message.segments 中，续传时不会重新分段。
+        分段器为流式页码模式且无需审核时，边分段边发送（见 _can_stream）。
         """
         result = self.results.get(message.id)
         if not result:
             self.logger.error(f"Result not found for message {message.id}")
             return
 
-        self.logger.info(f"Processing message {message.id} in pool (type={message.msg_type})")
-
-        # 1. 分段
-        segments = self._get_segments(message)
-        total_segments = len(segments)
-
-        self.logger.debug(f"Message {message.id} split into {total_segments} segments")
+        # 出队时检查截止时间（分段前，过期消息不消耗配额）
+        if getattr(message, "deadline", None) is not None and message.is_expired():
+            self.logger.warning(
+                f"Message {message.id} expired before processing in pool, dropped without sending"
+            )
+            result.mark_expired()
+            return
 
-        # 2. 审核（如果启用且不跳过）
-        if (self.content_moderator and
-            self.content_moderator.enabled and
-            not self.should_skip_moderation(message.msg_type)):
+        self.logger.info(f"Processing message {message.id} in pool (type={message.msg_type})")
 
-            moderated_result = self._moderate_segments(message, segments)
-            if moderated_result is None:
-                # 被拒绝
-                result.mark_failed("Content blocked by moderator")
+        segments = getattr(message, "segments", None)
+        # 流式分段时 1-2 步随发送逐页进行，第一页无需等待整篇文档分段完成
+        streaming = segments is None and self._can_stream(message)
+        if segments is None and not streaming and self._should_offload(message):
+            # 1-2. 大消息的分段和审核卸载到执行器，调度线程只等待结果
+            prepared = self.offloader.prepare(
+                message.content,
+                message.msg_type,
+                message.id,
+                moderate=not self.should_skip_moderation(message.msg_type)
+            )
+            if prepared.blocked is not None:
+                self.logger.warning(f"Message {message.id} blocked by content moderator in pool")
+                self._send_block_alert(message, prepared.blocked)
+                result.mark_blocked()
                 return
-            segments = moderated_result
+            self.logger.debug(f"Message {message.id} split into {len(prepared.segments)} segments (offloaded)")
+            segments = message.segments = self._transform_segments(message, prepared.segments)
+        elif segments is None and not streaming:
+            # 1. 分段
+            segments = self._get_segments(message)
+
+            self.logger.debug(f"Message {message.id} split into {len(segments)} segments")
+
+            # 2. 审核（如果启用且不跳过）
+            if (self.content_moderator and
+                self.content_moderator.enabled and
+                not self.should_skip_moderation(message.msg_type)):
+
+                moderated_result = self._moderate_segments(message, segments)
+                if moderated_result is None:
+                    # 被拒绝
+                    result.mark_blocked()
+                    return
+                segments = moderated_result
+
+            segments = message.segments = self._transform_segments(message, segments)
+
+        start_index = getattr(message, "delivered_segments", 0)
+        if streaming:
+            segment_iter = self._stream_segments(message)
+            expected_segments = self._estimate_message_cost(message)
+            total_segments = "?"
+        else:
+            segment_iter = iter(segments[start_index:])
+            expected_segments = total_segments = len(segments)
+
+        if start_index:
+            self.logger.info(
+                f"Resuming message {message.id} from segment {start_index + 1}/{total_segments}"
+            )
 
         # 记录使用的 webhooks
         used_webhooks: Set[str] = set()
 
-        # 3. 发送每个分段
-        for i, segment in enumerate(segments):
+        # 3. 发送每个分段（跳过已送达的分段）
+        for i, segment in enumerate(segment_iter, start_index):
+            self._inflight_segments = max(1, expected_segments - i)
+
+            # 转换消息参数（在占用 webhook 之前，参数错误不影响 webhook 状态）
+            msg_type, content, metadata = self._prepare_segment_params(
+                message, segment, i
+            )
+
             # 选择最佳 webhook
             try:
                 webhook = self._select_best_webhook()
             except AllWebhooksUnavailableError as e:
                 self.logger.error(f"All webhooks unavailable for message {message.id}")
-                result.mark_failed(str(e))
+                self._drain_segments(segment_iter)
+                self._fail_resumable(message, result, str(e))
                 return
 
-            # 频率控制
-            webhook.rate_limiter.acquire()
-
-            # 转换消息参数
-            msg_type, content, metadata = self._prepare_segment_params(
-                message, segment, i
+            # 频率控制 + 发送
+            success, error = self._send_acquired(
+                webhook, lambda: self._send_via(webhook, msg_type, content, metadata)
             )
 
-            # 发送
-            success, error = self.sender.send(webhook.url, msg_type, content, metadata)
-
             if success:
-                webhook.mark_success()
                 used_webhooks.add(webhook.url)
                 self.logger.debug(
                     f"Segment {i + 1}/{total_segments} sent via {webhook.url[:30]}... "
                     f"for message {message.id}"
                 )
             else:
-                webhook.mark_failure()
                 self.logger.warning(
                     f"Segment {i + 1}/{total_segments} failed via {webhook.url[:30]}...: {error}"
                 )
@@ -212,23 +437,31 @@ class WebhookPoolBase(ABC):
                 )
 
                 if not retry_success:
+                    self._drain_segments(segment_iter)
                     self.logger.error(
                         f"Segment {i + 1}/{total_segments} failed on all webhooks "
                         f"for message {message.id}"
                     )
-                    result.mark_failed(
+                    self._fail_resumable(
+                        message, result,
                         f"Segment {i + 1}/{total_segments} failed on all webhooks"
                     )
                     return
 
+            # 更新检查点
+            message.delivered_segments = i + 1
+            result.delivered_segments = i + 1
+
             # 分段间延迟
-            if i < total_segments - 1:
+            if not segment.is_last:
                 time.sleep(message.segment_interval / 1000.0)
 
+        total_segments = len(message.segments)
+
         # 4. 平台特定后处理
         post_success = self._post_send_hook(message, used_webhooks)
         if not post_success:
-            result.mark_failed("Post-send hook failed")
+            self._fail_resumable(message, result, "Post-send hook failed")
             return
 
         # 所有分段发送成功
@@ -241,6 +474,47 @@ class WebhookPoolBase(ABC):
         result.segment_count = total_segments
         result.mark_success()
 
+    def _can_stream(self, message: Message) -> bool:
+        """
+        是否可以边分段边发送
+
+        需要分段器使用流式页码模式；启用内容审核时需在发送前审核全部分段，不能流式发送。
+        """
+        return (
+            self.segmenter.is_streaming
+            and not self.should_skip_segmentation(message.msg_type)
+            and not (self.content_moderator and self.content_moderator.enabled)
+        )
+
+    def _stream_segments(self, message: Message) -> Iterator[SegmentInfo]:
+        """逐页产出分段，并将已产出的分段缓存到 message.segments（用于断点续传）"""
+        message.segments = []
+        for segment in self.segmenter.iter_segments(message.content, message.msg_type):
+            message.segments.append(segment)
+            yield segment
+
+    @staticmethod
+    def _drain_segments(segment_iter: Iterator[SegmentInfo]):
+        """发送中断时消费剩余分段（流式分段会随之补齐 message.segments，续传时原样重发）"""
+        for _ in segment_iter:
+            pass
+
+    def _should_offload(self, message: Message) -> bool:
+        """是否将分段和审核卸载到执行器（配置了卸载器、需要分段且超过大小阈值）"""
+        return (
+            self.offloader is not None
+            and not self.should_skip_segmentation(message.msg_type)
+            and self.offloader.should_offload(message.content)
+        )
+
+    def _transform_segments(self, message: Message, segments: List[SegmentInfo]) -> List[SegmentInfo]:
+        """
+        分段和审核完成后、发送前的平台特定处理
+
+        子类可覆盖此方法替换分段（如企微将超长内容改为附件发送）。默认原样返回。
+        """
+        return segments
+
     def _get_segments(self, message: Message) -> List[SegmentInfo]:
         """
         获取消息分段
@@ -298,16 +572,14 @@ class WebhookPoolBase(ABC):
         )
 
         try:
-            webhook = self._select_best_webhook()
-            webhook.rate_limiter.acquire()
-
             # 使用转换器准备文本消息
             msg_type, content, metadata = self.converter.prepare_send_params(
                 msg_type="text",
                 content=alert_msg,
                 message_metadata={}
             )
-            self.sender.send(webhook.url, msg_type, content, metadata)
+            webhook = self._select_best_webhook()
+            self._send_acquired(webhook, lambda: self._send_via(webhook, msg_type, content, metadata))
         except Exception as e:
             self.logger.error(f"Failed to send block alert: {e}")
 
@@ -361,46 +633,186 @@ class WebhookPoolBase(ABC):
         """
         重试发送分段（尝试其他可用的 webhook）
         """
-        available = [
-            w for w in self.resources
-            if w.is_available() and w.url not in exclude_webhooks
-        ]
+        if self.selection_policy == SELECTION_POLICY_READY_TIME:
+            available = self._get_scheduler().candidates(exclude_webhooks)
+        else:
+            available = [
+                w for w in self.resources
+                if w.is_available() and w.url not in exclude_webhooks
+            ]
+            available.sort(key=self._selection_score, reverse=True)
 
         if not available:
             return False
 
-        available.sort(key=lambda w: w.get_priority_score(), reverse=True)
-
         for webhook in available:
-            webhook.rate_limiter.acquire()
-            success, error = self.sender.send(webhook.url, msg_type, content, metadata)
+            # 熔断器：半开状态只允许一个探测分段
+            if not webhook.try_acquire():
+                continue
+
+            success, error = self._send_acquired(
+                webhook, lambda: self._send_via(webhook, msg_type, content, metadata)
+            )
 
             if success:
-                webhook.mark_success()
                 exclude_webhooks.add(webhook.url)
                 self.logger.info(
                     f"Segment {segment_index} retry succeeded via {webhook.url[:30]}..."
                 )
                 return True
             else:
-                webhook.mark_failure()
                 self.logger.warning(
                     f"Segment {segment_index} retry failed via {webhook.url[:30]}..."
                 )
 
         return False
 
+    def _send_acquired(
+        self,
+        webhook: "WebhookResource",
+        send_func: Callable[[], Tuple[bool, Optional[str]]]
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        在已通过 try_acquire() 的 webhook 上发送：频率控制 → 发送 → 记录结果
+
+        频率控制或发送抛出异常时同样记录为失败并返回错误，保证半开状态的探测名额被释放
+        （否则该 webhook 将一直处于探测中，不再参与调度）。
+
+        Args:
+            webhook: 已占用的 webhook
+            send_func: 执行发送的函数，返回 (success, error)
+
+        Returns:
+            Tuple[bool, Optional[str]]: (success, error)
+        """
+        try:
+            webhook.rate_limiter.acquire()
+            success, error = send_func()
+        except Exception as e:
+            success, error = False, f"Send raised {type(e).__name__}: {e}"
+            self.logger.error(f"Send via {webhook.url[:30]}... raised: {e}")
+
+        if success:
+            self._record_success(webhook)
+        else:
+            self._record_failure(webhook, error)
+        return success, error
+
+    def _send_via(
+        self,
+        webhook: "WebhookResource",
+        msg_type: str,
+        content: Any,
+        metadata: dict
+    ) -> Tuple[bool, Optional[str]]:
+        """通过指定 webhook 发送，并记录延迟和结果（用于延迟/健康度感知的选择）"""
+        start = time.monotonic()
+        success, error = self.sender.send(webhook.url, msg_type, content, metadata)
+        webhook.record_send(time.monotonic() - start, success)
+        return success, error
+
+    def _record_success(self, webhook: "WebhookResource"):
+        """记录 webhook 发送成功（闭合熔断器并更新调度索引）"""
+        webhook.mark_success()
+        if self._scheduler is not None:
+            self._scheduler.mark_used(webhook)
+
+    def _record_failure(self, webhook: "WebhookResource", error: Optional[str]):
+        """
+        记录 webhook 发送失败
+
+        永久性错误（见 _is_permanent_failure）将 webhook 标记为失效，
+        不再占用后续消息的配额和重试时间；其他错误触发熔断冷却。
+        """
+        if self._is_permanent_failure(error):
+            self.logger.error(f"Webhook {webhook.url[:30]}... marked as permanently dead: {error}")
+            webhook.mark_dead(error or "")
+        else:
+            webhook.mark_failure()
+        if self._scheduler is not None:
+            self._scheduler.mark_used(webhook)
+
+    def _is_permanent_failure(self, error: Optional[str]) -> bool:
+        """
+        是否为永久性错误（webhook 本身无效）
+
+        子类可覆盖此方法识别平台特定的错误码。默认所有错误都是暂时性的。
+
+        Args:
+            error: 发送返回的错误信息
+
+        Returns:
+            bool: True 表示 webhook 永久失效
+        """
+        return False
+
     def _select_best_webhook(self) -> "WebhookResource":
         """
-        选择最佳 webhook（最空闲优先策略）
+        选择最佳 webhook（按 selection_policy）
+
+        选中的 webhook 已通过熔断器的 try_acquire()（半开状态下本次发送即为探测）。
 
         Raises:
             AllWebhooksUnavailableError: 所有 webhook 都不可用
         """
+        if self.selection_policy == SELECTION_POLICY_READY_TIME:
+            return self._select_indexed_webhook()
+
+        while True:
+            webhook = self._pick_best_webhook()
+            if webhook.try_acquire():
+                return webhook
+            # 探测名额被其他发送者占用，重新选择
+
+    def _get_scheduler(self) -> WebhookScheduler:
+        """获取调度索引（首次使用时创建）"""
+        if self._scheduler is None:
+            self._scheduler = WebhookScheduler(self.resources)
+        return self._scheduler
+
+    def _select_indexed_webhook(self) -> "WebhookResource":
+        """
+        通过调度索引选择 webhook（O(log n)）
+
+        取就绪时间最早的 webhook：有配额时为最久未使用的，
+        都没有配额或都在冷却时，等待到最早就绪的时间。
+        """
+        scheduler = self._get_scheduler()
+
+        while True:
+            webhook, ready_at = scheduler.peek()
+
+            if webhook is None or ready_at == float("inf"):
+                if scheduler.all_dead():
+                    raise AllWebhooksUnavailableError("All webhooks are permanently dead")
+                raise AllWebhooksUnavailableError("All webhooks are unavailable")
+
+            # 校验堆顶（限制器可能被单 webhook 模式共享消耗）
+            if not scheduler.refresh(webhook, ready_at):
+                continue
+
+            wait_time = ready_at - time.time()
+            if wait_time > 0:
+                self.logger.debug(f"Waiting {wait_time:.1f}s for webhook quota or cooldown")
+                time.sleep(wait_time)
+                scheduler.update(webhook)
+                continue
+
+            if webhook.try_acquire():
+                return webhook
+            # 探测名额被其他发送者占用，更新索引后重新选择
+            scheduler.update(webhook)
+
+    def _pick_best_webhook(self) -> "WebhookResource":
+        """按配额和冷却状态挑选 webhook（不占用熔断器探测名额）"""
         available = [w for w in self.resources if w.is_available()]
 
         if not available:
-            min_cooldown = min(w.get_cooldown_remaining() for w in self.resources)
+            cooldowns = [w.get_cooldown_remaining() for w in self.resources]
+            cooldowns = [c for c in cooldowns if c != float("inf")]
+            if not cooldowns:
+                raise AllWebhooksUnavailableError("All webhooks are permanently dead")
+            min_cooldown = min(cooldowns)
 
             if min_cooldown > 0:
                 self.logger.warning(
@@ -415,7 +827,7 @@ class WebhookPoolBase(ABC):
                     "All webhooks are unavailable after waiting"
                 )
 
-        best = max(available, key=lambda w: w.get_priority_score())
+        best = self._choose_webhook(available)
 
         if best.rate_limiter.get_available_count() == 0:
             next_times = [
@@ -433,6 +845,35 @@ class WebhookPoolBase(ABC):
 
         return best
 
+    def _choose_webhook(self, available: List["WebhookResource"]) -> "WebhookResource":
+        """
+        按选择策略从可用 webhook 中挑选一个
+
+        除 quota 策略外，优先在仍有配额的 webhook 中选择，避免为最快的 webhook 排队等待配额。
+        """
+        if self.selection_policy == SELECTION_POLICY_QUOTA:
+            return max(available, key=lambda w: w.get_priority_score())
+
+        candidates = [w for w in available if w.rate_limiter.get_available_count() > 0]
+        if not candidates:
+            candidates = available
+
+        if self.selection_policy == SELECTION_POLICY_P2C and len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+
+        return max(candidates, key=self._selection_score)
+
+    def _selection_score(self, webhook: "WebhookResource") -> float:
+        """按选择策略计算 webhook 的分数（越高越优先）"""
+        if self.selection_policy == SELECTION_POLICY_QUOTA:
+            return webhook.get_priority_score()
+        if self.selection_policy == SELECTION_POLICY_LEAST_LATENCY:
+            return -(webhook.latency_ewma or 0.0)
+        if self.selection_policy == SELECTION_POLICY_P2C:
+            return webhook.get_health_score()
+        # quota_health
+        return webhook.get_priority_score() * webhook.get_health_score()
+
     def stop(self):
         """停止池"""
         self.logger.info("Stopping WebhookPool")
@@ -1,9 +1,14 @@
 """
 频率限制器 - 滑动窗口算法
+
+同一个 URL 的限制器被单 webhook 模式和池模式共享，是该 URL 唯一的发送调度点：
+等待配额的调用方按到达顺序（FIFO）排队，只有队首被唤醒并在配额可用时获得许可，
+混合流量的等待时间有界，也不会出现多个线程同时醒来争抢配额的情况。
 """
 import threading
 import time
 from collections import deque
+from typing import List
 from .constants import DEFAULT_RATE_LIMIT, DEFAULT_TIME_WINDOW
 
 
@@ -11,7 +16,7 @@ class RateLimiter:
     """
     频率限制器，使用滑动窗口算法
 
-    限制在指定时间窗口内的请求数量
+    限制在指定时间窗口内的请求数量。acquire() 按调用顺序公平分配配额。
     """
 
     def __init__(self, max_count: int = DEFAULT_RATE_LIMIT, time_window: int = DEFAULT_TIME_WINDOW):
@@ -27,6 +32,10 @@ class RateLimiter:
         self.timestamps = deque()
         self.lock = threading.Lock()
         self.lockout_until = 0.0  # 服务端频控锁定期（时间戳）
+        self.version = 0  # 配额状态版本（获得配额、进入锁定期、重置时递增），用于缓存合计配额估算
+
+        # 等待配额的调用方（FIFO，每个等待者一个条件变量，只唤醒队首）
+        self._waiters = deque()
 
     def acquire(self) -> None:
         """
@@ -35,42 +44,53 @@ class RateLimiter:
         这个方法是线程安全的，会考虑：
         1. 本地频率限制（滑动窗口）
         2. 服务端频控锁定期（如果服务端返回过频控错误）
+        3. 公平性：多个调用方（如单 webhook 管理器和池的调度线程）按到达顺序获得配额
         """
-        while True:
-            with self.lock:
-                now = time.time()
+        waiter = threading.Condition(self.lock)
 
-                # 检查是否处于服务端频控锁定期
-                if now < self.lockout_until:
-                    lockout_remaining = self.lockout_until - now
-                    # 在锁外等待
-                else:
-                    lockout_remaining = 0
+        with self.lock:
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    # 非队首：等待前一个调用方获得配额后唤醒
+                    if self._waiters[0] is not waiter:
+                        waiter.wait()
+                        continue
 
-            # 如果处于锁定期，先等待锁定期结束
-            if lockout_remaining > 0:
-                time.sleep(lockout_remaining)
-                continue
+                    now = time.time()
 
-            with self.lock:
-                now = time.time()
+                    # 检查是否处于服务端频控锁定期
+                    if now < self.lockout_until:
+                        waiter.wait(self.lockout_until - now)
+                        continue
 
-                # 清理过期的时间戳
-                self._clean_expired_timestamps(now)
+                    # 清理过期的时间戳
+                    self._clean_expired_timestamps(now)
 
-                # 如果还有配额，直接使用
-                if len(self.timestamps) < self.max_count:
-                    self.timestamps.append(now)
-                    return
+                    # 如果还有配额，直接使用
+                    if len(self.timestamps) < self.max_count:
+                        self.timestamps.append(now)
+                        self.version += 1
+                        return
 
-                # 达到限制，计算需要等待的时间
-                oldest_timestamp = self.timestamps[0]
-                sleep_time = self.time_window - (now - oldest_timestamp) + 0.1  # 额外加0.1秒确保安全
+                    # 达到限制，等待最老的时间戳过期（等待期间释放锁）
+                    oldest_timestamp = self.timestamps[0]
+                    sleep_time = self.time_window - (now - oldest_timestamp) + 0.1  # 额外加0.1秒确保安全
+                    waiter.wait(sleep_time)
+            finally:
+                self._waiters.remove(waiter)
+                if self._waiters:
+                    self._waiters[0].notify()
+
+    def get_waiting_count(self) -> int:
+        """
+        获取正在等待配额的调用方数量
 
-            # 在锁外等待（避免阻塞其他线程）
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            # 循环重试
+        Returns:
+            int: 等待中的调用方数量
+        """
+        with self.lock:
+            return len(self._waiters)
 
     def _clean_expired_timestamps(self, now: float) -> None:
         """
@@ -113,6 +133,79 @@ class RateLimiter:
             oldest_timestamp = self.timestamps[0]
             return oldest_timestamp + self.time_window
 
+    def estimate_permit_time(self, n: int) -> float:
+        """
+        估算第 n 个后续配额（从0开始计数）可用的时间戳
+
+        假设之后的请求都由当前调用方按顺序消耗，
+        每个窗口槽位在被占用后 time_window 秒释放。
+        直接按槽位和轮次计算，均摊 O(1)（清理过期时间戳的开销均摊到每次请求）。
+
+        Args:
+            n: 前面还有多少个请求排队（0 表示下一个请求）
+
+        Returns:
+            float: 预计可用的时间戳
+        """
+        with self.lock:
+            now = time.time()
+            self._clean_expired_timestamps(now)
+            return self._permit_time_locked(n, now)
+
+    def count_permits_until(self, until: float) -> int:
+        """
+        估算截至某一时刻累计可获得的配额数量
+
+        需要遍历所有窗口槽位，复杂度 O(max_count)。
+
+        Args:
+            until: 目标时间戳
+
+        Returns:
+            int: 截至 until 可获得的配额数
+        """
+        with self.lock:
+            now = time.time()
+            self._clean_expired_timestamps(now)
+            if until < max(now, self.lockout_until):
+                return 0
+
+            count = 0
+            for slot in range(self.max_count):
+                first = max(self._slot_base_time(slot, now), self.lockout_until)
+                if first <= until:
+                    count += 1 + int((until - first) // self.time_window)
+            return count
+
+    def get_slot_times(self) -> List[float]:
+        """
+        获取各窗口槽位首次可用的时间（升序，已考虑锁定期）
+
+        空闲槽位为锁定期结束时间（未锁定时为 0），调用方需按当前时间截断。
+        复杂度 O(max_count)，结果在 version 变化前保持有效。
+
+        Returns:
+            List[float]: 槽位时间戳列表（长度为 max_count）
+        """
+        with self.lock:
+            free = self.max_count - len(self.timestamps)
+            return [self.lockout_until] * free + [
+                max(timestamp + self.time_window, self.lockout_until) for timestamp in self.timestamps
+            ]
+
+    def _slot_base_time(self, slot: int, now: float) -> float:
+        """窗口槽位首次可用的时间（调用方需持有锁）"""
+        available = self.max_count - len(self.timestamps)
+        if slot < available:
+            return now
+        return self.timestamps[slot - available] + self.time_window
+
+    def _permit_time_locked(self, n: int, now: float) -> float:
+        """计算第 n 个配额的可用时间（调用方需持有锁）"""
+        rounds, slot = divmod(max(0, n), self.max_count)
+        permit_time = self._slot_base_time(slot, now) + rounds * self.time_window
+        return max(permit_time, self.lockout_until)
+
     def is_available_now(self) -> bool:
         """
         检查当前是否有可用配额（不考虑服务端锁定期）
@@ -144,12 +237,17 @@ class RateLimiter:
             # 清空本地时间戳记录，因为它们可能不准确
             # （服务端的频控可能是由其他程序触发的）
             self.timestamps.clear()
+            self.version += 1
 
     def reset(self) -> None:
         """重置限制器"""
         with self.lock:
             self.timestamps.clear()
             self.lockout_until = 0.0
+            self.version += 1
+            # 唤醒队首，立即重新检查配额
+            if self._waiters:
+                self._waiters[0].notify()
 
     def __repr__(self):
         with self.lock:
@@ -0,0 +1,274 @@
+"""
+Webhook 资源 - 管理单个 webhook 的状态和容错（平台无关）
+
+企微和飞书的 webhook 池共用此实现，频率限制器由各平台提供
+（企微为 RateLimiter，飞书为 DualRateLimiter）。
+"""
+import threading
+import time
+from typing import Optional
+
+from wecom_notifier.core.constants import DEFAULT_EWMA_ALPHA
+from wecom_notifier.core.protocols import RateLimiterProtocol
+
+
+# 熔断器状态
+CIRCUIT_CLOSED = "closed"        # 正常：流量正常通过
+CIRCUIT_OPEN = "open"            # 熔断：冷却期内拒绝流量
+CIRCUIT_HALF_OPEN = "half_open"  # 半开：冷却期结束，只允许一个探测分段通过
+CIRCUIT_DEAD = "dead"            # 永久失效：webhook 无效（如企微 93000），不再参与调度
+
+
+class WebhookResource:
+    """
+    Webhook资源
+
+    管理单个webhook的：
+    - 频率限制
+    - 熔断器（closed → open → half_open → closed，线程安全）
+    - 发送延迟和错误率（EWMA 平滑，用于延迟/健康度感知的选择策略）
+    - 可用性判断
+
+    熔断规则：
+    - 发送失败进入 open 状态，冷却时间指数退避（10秒、20秒、40秒…最多60秒）
+    - 冷却结束后，第一个通过 try_acquire() 的发送者成为探测者（half_open），
+      探测进行中其他发送者不可使用该 webhook
+    - 探测成功恢复 closed，探测失败重新进入 open（冷却时间继续递增）
+    - 探测超过 PROBE_TIMEOUT 仍未记录结果时视为丢失，允许重新探测
+    - mark_dead() 将 webhook 永久标记为失效
+    """
+
+    # 冷却策略配置
+    COOLDOWN_BASE = 10  # 基础冷却时间（秒）
+    COOLDOWN_MAX = 60   # 最大冷却时间（秒）
+    PROBE_TIMEOUT = 600  # 探测超时（秒），需大于单次发送的最长耗时（45009 重试约 5 分钟）
+
+    # EWMA 平滑系数
+    EWMA_ALPHA = DEFAULT_EWMA_ALPHA
+
+    def __init__(self, url: str, rate_limiter: RateLimiterProtocol):
+        """
+        初始化Webhook资源
+
+        Args:
+            url: Webhook地址
+            rate_limiter: 频率限制器（全局共享）
+        """
+        self.url = url
+        self.rate_limiter = rate_limiter
+
+        # 错误跟踪（受 _lock 保护）
+        self.consecutive_failures = 0
+        self.last_failure_time = 0.0
+
+        # 发送质量（EWMA，受 _lock 保护）
+        self.latency_ewma: Optional[float] = None  # 平滑延迟（秒），尚未发送过为 None
+        self.error_rate_ewma = 0.0                  # 平滑错误率（0~1）
+
+        # 熔断器状态
+        self.state = CIRCUIT_CLOSED
+        self.dead_reason: Optional[str] = None
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """
+        判断webhook是否可用
+
+        考虑因素：
+        1. 是否永久失效
+        2. 是否在冷却期（因为连续失败）
+        3. 半开状态下是否已有探测在进行
+
+        Returns:
+            bool: 是否可用
+        """
+        with self._lock:
+            return self._is_available_locked(time.time())
+
+    def _is_available_locked(self, now: float) -> bool:
+        """可用性判断（调用方需持有锁）"""
+        if self.state == CIRCUIT_CLOSED:
+            return True
+        if self.state == CIRCUIT_DEAD:
+            return False
+        if self._probe_in_flight and now - self._probe_started_at < self.PROBE_TIMEOUT:
+            # 半开状态：已有探测分段在发送
+            return False
+        # open 状态：冷却结束后允许探测
+        return now - self.last_failure_time >= self._calculate_cooldown()
+
+    def try_acquire(self) -> bool:
+        """
+        尝试占用webhook发送一个分段
+
+        closed 状态直接通过；冷却结束的 open 状态转为 half_open，
+        调用方成为唯一的探测者。
+
+        Returns:
+            bool: 是否可以发送
+        """
+        with self._lock:
+            now = time.time()
+            if not self._is_available_locked(now):
+                return False
+            if self.state != CIRCUIT_CLOSED:
+                self.state = CIRCUIT_HALF_OPEN
+                self._probe_in_flight = True
+                self._probe_started_at = now
+            return True
+
+    def is_dead(self) -> bool:
+        """是否已被永久标记为失效"""
+        return self.state == CIRCUIT_DEAD
+
+    def _calculate_cooldown(self) -> float:
+        """
+        计算冷却时间（指数退避）
+
+        Returns:
+            float: 冷却时间（秒）
+        """
+        # 指数退避：10秒、20秒、40秒... 最多60秒
+        cooldown = min(
+            self.COOLDOWN_MAX,
+            self.COOLDOWN_BASE * (2 ** (self.consecutive_failures - 1))
+        )
+        return cooldown
+
+    def get_cooldown_remaining(self) -> float:
+        """
+        获取剩余冷却时间
+
+        Returns:
+            float: 剩余冷却时间（秒），如果不在冷却期则返回0；永久失效返回 inf
+        """
+        with self._lock:
+            if self.state == CIRCUIT_DEAD:
+                return float("inf")
+            if self.consecutive_failures == 0:
+                return 0.0
+
+            cooldown = self._calculate_cooldown()
+            elapsed = time.time() - self.last_failure_time
+            return max(0.0, cooldown - elapsed)
+
+    def get_probe_remaining(self) -> float:
+        """
+        获取进行中的探测距超时的剩余时间
+
+        Returns:
+            float: 剩余时间（秒），没有进行中的探测时返回0
+        """
+        with self._lock:
+            if not self._probe_in_flight:
+                return 0.0
+            return max(0.0, self._probe_started_at + self.PROBE_TIMEOUT - time.time())
+
+    def mark_success(self):
+        """标记发送成功，重置失败计数并闭合熔断器"""
+        with self._lock:
+            if self.state == CIRCUIT_DEAD:
+                return
+            self.consecutive_failures = 0
+            self.last_failure_time = 0.0
+            self.state = CIRCUIT_CLOSED
+            self._probe_in_flight = False
+
+    def mark_failure(self):
+        """标记发送失败，增加失败计数并进入冷却期（熔断）"""
+        with self._lock:
+            if self.state == CIRCUIT_DEAD:
+                return
+            self.consecutive_failures += 1
+            self.last_failure_time = time.time()
+            self.state = CIRCUIT_OPEN
+            self._probe_in_flight = False
+
+    def mark_dead(self, reason: str = ""):
+        """
+        将webhook永久标记为失效（如企微返回 93000 webhook 不存在）
+
+        Args:
+            reason: 失效原因
+        """
+        with self._lock:
+            self.state = CIRCUIT_DEAD
+            self.dead_reason = reason
+            self._probe_in_flight = False
+
+    def record_send(self, latency: float, success: bool):
+        """
+        记录一次发送的延迟和结果（更新 EWMA）
+
+        Args:
+            latency: 发送耗时（秒，含 HTTP 重试）
+            success: 是否发送成功
+        """
+        alpha = self.EWMA_ALPHA
+        with self._lock:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = alpha * latency + (1 - alpha) * self.latency_ewma
+            error = 0.0 if success else 1.0
+            self.error_rate_ewma = alpha * error + (1 - alpha) * self.error_rate_ewma
+
+    def get_health_score(self) -> float:
+        """
+        获取健康度分数（0~1，越高越健康）
+
+        健康度 = (1 - 平滑错误率) / (1 + 平滑延迟秒数)。
+        尚未发送过的 webhook 视为延迟为0，以便新加入的 webhook 能被尝试。
+
+        Returns:
+            float: 健康度分数
+        """
+        with self._lock:
+            latency = self.latency_ewma or 0.0
+            return (1.0 - self.error_rate_ewma) / (1.0 + latency)
+
+    def get_priority_score(self) -> float:
+        """
+        获取优先级分数（用于选择最佳webhook）
+
+        分数越高越优先。考虑因素：
+        1. 可用配额数量（主要因素）
+        2. 是否在冷却期（次要因素）
+
+        Returns:
+            float: 优先级分数
+        """
+        if not self.is_available():
+            # 不可用的webhook分数为负数（冷却剩余时间）
+            return -self.get_cooldown_remaining()
+
+        # 可用配额数量作为分数
+        available_count = self.rate_limiter.get_available_count()
+
+        return float(available_count)
+
+    def __repr__(self):
+        if self.state == CIRCUIT_DEAD:
+            return f"<WebhookResource url={self.url[:30]}... status=失效 reason={self.dead_reason}>"
+
+        available = "可用" if self.is_available() else "冷却中"
+        cooldown = self.get_cooldown_remaining()
+        quota = self.rate_limiter.get_available_count()
+
+        latency = f" latency={self.latency_ewma * 1000:.0f}ms" if self.latency_ewma is not None else ""
+
+        if cooldown > 0:
+            return f"<WebhookResource url={self.url[:30]}... status={available} cooldown={cooldown:.1f}s{latency}>"
+        else:
+            return f"<WebhookResource url={self.url[:30]}... status={available} quota={quota}{latency}>"
+
+
+__all__ = [
+    "WebhookResource",
+    "CIRCUIT_CLOSED",
+    "CIRCUIT_OPEN",
+    "CIRCUIT_HALF_OPEN",
+    "CIRCUIT_DEAD",
+]
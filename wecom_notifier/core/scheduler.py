@@ -0,0 +1,195 @@
+"""
+Webhook 调度索引 - 按下一次可用时间组织的最小堆
+
+大型池（数百个 webhook）中，逐个查询每个 webhook 的可用性和配额需要 O(n) 次加锁。
+调度索引为每个 webhook 维护一个"就绪时间"，只在该 webhook 发送成功、失败或消耗配额时更新，
+选择时只需查看堆顶，复杂度 O(log n)。
+
+就绪时间的定义：
+- 有配额且未熔断：上次使用时间（越久未使用越优先，近似"最空闲优先"）
+- 配额耗尽：频率限制器下次有配额的时间（含服务端频控锁定期）
+- 熔断冷却中：冷却结束时间
+- 探测进行中：探测超时时间
+- 永久失效：inf
+
+堆中的旧条目采用惰性失效：更新时压入新条目，弹出时丢弃版本不匹配的条目。
+由于频率限制器可能被单 webhook 模式共享，调用方在使用堆顶前应调用 refresh() 校验。
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from wecom_notifier.core.resource import WebhookResource
+
+
+INF = float("inf")
+
+
+class WebhookScheduler:
+    """
+    Webhook 调度索引（线程安全）
+
+    使用方式:
+        scheduler = WebhookScheduler(resources)
+        webhook, ready_at = scheduler.peek()
+        ...
+        scheduler.mark_used(webhook)  # 发送后更新
+    """
+
+    def __init__(self, resources: List["WebhookResource"]):
+        """
+        初始化调度索引
+
+        Args:
+            resources: Webhook 资源列表
+        """
+        self._resources = list(resources)
+        self._index: Dict[int, int] = {id(r): i for i, r in enumerate(self._resources)}
+        self._current: List[Optional[Tuple[float, int]]] = [None] * len(self._resources)
+        self._last_used: List[float] = [0.0] * len(self._resources)
+        self._heap: List[Tuple[float, int, int]] = []  # (ready_at, seq, index)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+        for resource in self._resources:
+            self.update(resource)
+
+    def update(self, resource: "WebhookResource") -> float:
+        """
+        重新计算 webhook 的就绪时间并更新索引
+
+        Args:
+            resource: Webhook 资源
+
+        Returns:
+            float: 新的就绪时间
+        """
+        i = self._index[id(resource)]
+        ready_at = self._ready_time(resource, self._last_used[i])
+        with self._lock:
+            self._push(i, ready_at)
+        return ready_at
+
+    def mark_used(self, resource: "WebhookResource") -> float:
+        """
+        记录 webhook 刚被使用（发送成功或失败后调用）并更新索引
+
+        Args:
+            resource: Webhook 资源
+
+        Returns:
+            float: 新的就绪时间
+        """
+        self._last_used[self._index[id(resource)]] = time.time()
+        return self.update(resource)
+
+    def refresh(self, resource: "WebhookResource", ready_at: float) -> bool:
+        """
+        校验堆顶条目是否仍然有效
+
+        频率限制器被外部（如单 webhook 模式）消耗、或冷却状态变化时，
+        重新计算的就绪时间会晚于索引中的值，此时更新索引。
+
+        Args:
+            resource: 堆顶的 webhook
+            ready_at: 索引中的就绪时间
+
+        Returns:
+            bool: True 表示索引中的就绪时间仍然准确
+        """
+        return self.update(resource) <= ready_at
+
+    def peek(self) -> Tuple[Optional["WebhookResource"], float]:
+        """
+        获取就绪时间最早的 webhook
+
+        Returns:
+            Tuple[Optional[WebhookResource], float]: (webhook, 就绪时间)，池为空时返回 (None, inf)
+        """
+        with self._lock:
+            while self._heap:
+                ready_at, seq, i = self._heap[0]
+                if self._current[i] != (ready_at, seq):
+                    heapq.heappop(self._heap)
+                    continue
+                return self._resources[i], ready_at
+            return None, INF
+
+    def candidates(self, exclude: Optional[Set[str]] = None) -> List["WebhookResource"]:
+        """
+        按就绪时间顺序列出所有可调度的 webhook（不含永久失效的）
+
+        用于失败重试等低频路径。只读遍历堆（从堆顶按层扩展，不弹出条目），
+        复杂度 O(m log m)，m 为就绪时间有限的条目数。
+
+        Args:
+            exclude: 排除的 webhook URL 集合
+
+        Returns:
+            List[WebhookResource]: webhook 列表
+        """
+        exclude = exclude or set()
+        with self._lock:
+            heap = self._heap
+            result = []
+            # 前沿：(条目, 堆中位置)；子节点不小于父节点，按前沿最小值弹出即为有序遍历
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier:
+                (ready_at, seq, i), pos = heapq.heappop(frontier)
+                if ready_at == INF:
+                    break
+                if self._current[i] == (ready_at, seq) and self._resources[i].url not in exclude:
+                    result.append(self._resources[i])
+                for child in (2 * pos + 1, 2 * pos + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+            return result
+
+    def all_dead(self) -> bool:
+        """是否所有 webhook 都已永久失效"""
+        return all(r.is_dead() for r in self._resources)
+
+    def _push(self, i: int, ready_at: float):
+        """压入新条目（调用方需持有锁），旧条目惰性失效"""
+        seq = next(self._seq)
+        self._current[i] = (ready_at, seq)
+        heapq.heappush(self._heap, (ready_at, seq, i))
+
+        # 失效条目过多时重建堆，避免无限增长
+        if len(self._heap) > 4 * len(self._resources) + 16:
+            self._heap = [
+                (key[0], key[1], j) for j, key in enumerate(self._current) if key is not None
+            ]
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _ready_time(resource: "WebhookResource", last_used: float) -> float:
+        """计算 webhook 的就绪时间"""
+        if resource.is_dead():
+            return INF
+
+        if not resource.is_available():
+            remaining = resource.get_cooldown_remaining()
+            if remaining > 0:
+                return time.time() + remaining
+            # 半开状态，探测进行中：等待探测结果更新，超时后允许重新探测
+            return time.time() + resource.get_probe_remaining()
+
+        limiter = resource.rate_limiter
+        next_time = max(limiter.get_next_available_time(), getattr(limiter, "lockout_until", 0.0))
+        # 有配额时限制器返回其内部的当前时间，需在其之后取 now
+        if next_time <= time.time():
+            return last_used
+        return next_time
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __repr__(self):
+        return f"<WebhookScheduler webhooks={len(self._resources)} heap={len(self._heap)}>"
+
+
+__all__ = ["WebhookScheduler"]
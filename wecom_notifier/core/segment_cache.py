@@ -0,0 +1,159 @@
+"""
+分段结果缓存 - 相同内容只分段一次
+
+每日模板、重复告警、广播内容会以相同的文本反复发送，每次都要重新执行 Markdown 切分、
+正则匹配和 UTF-8 编码。本模块按 (内容哈希, 消息类型, 每页字节上限, 页码模式, 装箱模式)
+缓存分段结果（不可变元组），LRU 有界，同一通知器的所有管理器和池共享。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+from .models import SegmentInfo
+
+
+# 默认配置
+DEFAULT_SEGMENT_CACHE_MAX_SIZE = 128             # 最多缓存的分段结果数量（LRU 淘汰）
+DEFAULT_SEGMENT_CACHE_MAX_CHARS = 8 * 1024 * 1024  # 缓存分段内容的总字符数上限
+
+
+class SegmentCache:
+    """
+    分段结果缓存（线程安全，LRU 有界）
+
+    使用示例:
+        cache = SegmentCache({"max_size": 256})
+        segmenter = MessageSegmenter(cache=cache)
+        segmenter.segment(report, "markdown_v2")  # 未命中，执行分段
+        segmenter.segment(report, "markdown_v2")  # 命中，直接返回缓存的分段
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化分段缓存
+
+        Args:
+            config: 配置字典，包含：
+                - max_size: int - 最大缓存条目数（默认128，超出时淘汰最久未使用的条目）
+                - max_chars: int - 缓存分段内容的总字符数上限（默认 8M，超出时淘汰最久未使用的条目，
+                  单条超过上限的结果不缓存）
+        """
+        config = config or {}
+        self.max_size = config.get("max_size", DEFAULT_SEGMENT_CACHE_MAX_SIZE)
+        self.max_chars = config.get("max_chars", DEFAULT_SEGMENT_CACHE_MAX_CHARS)
+
+        if self.max_size <= 0:
+            raise ValueError("Segment cache max_size must be positive")
+        if self.max_chars <= 0:
+            raise ValueError("Segment cache max_chars must be positive")
+
+        self._entries: "OrderedDict[Hashable, Tuple[SegmentInfo, ...]]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evicted_total = 0
+
+    @staticmethod
+    def make_key(data: bytes, msg_type: str, *options: Hashable) -> tuple:
+        """
+        计算缓存键
+
+        Args:
+            data: 消息内容的 UTF-8 编码（分段器判断长度时已编码，这里复用）
+            msg_type: 消息类型
+            *options: 影响分段结果的分段器参数（每页字节上限、页码模式、装箱模式）
+
+        Returns:
+            tuple: 缓存键
+        """
+        return (hashlib.sha1(data).hexdigest(), msg_type) + options
+
+    def get(self, key: Hashable) -> Optional[Tuple[SegmentInfo, ...]]:
+        """
+        查询缓存
+
+        Args:
+            key: make_key() 计算的缓存键
+
+        Returns:
+            Optional[Tuple[SegmentInfo, ...]]: 命中时返回分段元组，否则返回 None
+        """
+        with self._lock:
+            segments = self._entries.get(key)
+            if segments is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return segments
+
+    def put(self, key: Hashable, segments: Sequence[SegmentInfo]) -> Tuple[SegmentInfo, ...]:
+        """
+        写入缓存
+
+        Args:
+            key: make_key() 计算的缓存键
+            segments: 分段结果
+
+        Returns:
+            Tuple[SegmentInfo, ...]: 不可变的分段元组
+        """
+        segments = tuple(segments)
+        size = sum(len(s.content) for s in segments)
+        if size > self.max_chars:
+            return segments
+
+        with self._lock:
+            if key in self._entries:
+                self._total_chars -= self._sizes[key]
+            self._entries[key] = segments
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._total_chars += size
+
+            while len(self._entries) > self.max_size or self._total_chars > self.max_chars:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_chars -= self._sizes.pop(old_key)
+                self.evicted_total += 1
+
+        return segments
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: size / chars / hits / misses / evicted_total
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "chars": self._total_chars,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted_total": self.evicted_total,
+            }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_chars = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (
+            f"<SegmentCache size={len(self._entries)}/{self.max_size} "
+            f"hits={self.hits} misses={self.misses}>"
+        )
+
+
+__all__ = ["SegmentCache"]
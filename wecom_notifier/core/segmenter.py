@@ -1,32 +1,299 @@
 """
 消息分段器 - 智能分段逻辑
+
+分段过程中对当前分段、行、段落维护累计字节数，每段文本只编码一次，
+整体耗时与输入大小呈线性关系（见 tests/benchmark_segmenter.py）。
+
+Markdown 先经过一次扫描切分为带类型（代码块、表格、标题、列表、段落）和字节数的块，
+再对块序列做装箱，代码块再多也保持线性。
+
+传入 SegmentCache 时，相同内容（按内容哈希）的分段结果只计算一次，以不可变元组缓存。
+
+packing="compact" 时改为页数最少的装箱（每页消耗一次频率配额）：页码按总页数的实际长度预留，
+表格行从当前页的剩余空间开始续填，末页过短时并入前一页。
+
+分段逻辑以生成器实现，iter_segments() 逐页产出分段；配合 streaming 页码模式
+（"(Page i)"，末页 "(Page i, end)"），调用方无需等待整篇文档分段完成即可发送第一页。
 """
 import re
-from typing import List
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, TYPE_CHECKING
 from .models import SegmentInfo
 from .constants import (
     MSG_TYPE_TEXT,
     MSG_TYPE_MARKDOWN,
+    MARKDOWN_CODE_BLOCK_PATTERN,
     MARKDOWN_TABLE_ROW_PATTERN,
     PAGE_INDICATOR_FORMAT,
-    MAX_PAGE_INDICATOR_BYTES
+    MAX_PAGE_INDICATOR_BYTES,
+    PAGE_INDICATOR_MODE_TOTAL,
+    PAGE_INDICATOR_MODES,
+    PACKING_GREEDY,
+    PACKING_COMPACT,
+    PACKING_MODES,
+    STREAMING_PAGE_INDICATOR_FORMAT,
+    STREAMING_LAST_PAGE_INDICATOR_FORMAT,
 )
 
+if TYPE_CHECKING:
+    from .segment_cache import SegmentCache
+
 # 默认最大字节数（可被平台覆盖）
 DEFAULT_MAX_BYTES = 3800
 
+# 预编译的 Markdown 语法正则
+_CODE_BLOCK_RE = re.compile(MARKDOWN_CODE_BLOCK_PATTERN)
+_TABLE_ROW_RE = re.compile(MARKDOWN_TABLE_ROW_PATTERN)
+_TABLE_SEPARATOR_RE = re.compile(r'^\|[\s:-]+\|')
+_HEADING_RE = re.compile(r'^#{1,6}\s+')
+_LIST_ITEM_RE = re.compile(r'^(?:[-*+]|\d+\.)\s')
+_IMAGE_RE = re.compile(r'^!\[.*?\]\(.*?\)$')
+
+# Markdown 块类型
+BLOCK_FENCE = "fence"
+BLOCK_TABLE = "table"
+BLOCK_HEADING = "heading"
+BLOCK_LIST = "list"
+BLOCK_PARAGRAPH = "paragraph"
+
+
+@dataclass(frozen=True)
+class MarkdownBlock:
+    """Markdown 块（按双换行符切分，代码块内部的空行不切分）"""
+    kind: str
+    text: str
+    nbytes: int  # text 的 UTF-8 字节数
+    table_line: int = -1  # 表格起始行索引（0 表示块以表格开头，-1 表示不含表格）
+    is_table_row: bool = False  # 是否为单行表格行（表格被空行隔开时用于续接）
+    protected: bool = False  # 是否为不可按行拆分的元素（代码块、图片）
+
+
+def utf8_len(text: str) -> int:
+    """文本的 UTF-8 字节数"""
+    return len(text.encode('utf-8'))
+
+
+def _utf8_boundary(data: bytes, start: int, end: int) -> int:
+    """
+    将切分位置 end 回退到 UTF-8 字符边界（跳过延续字节 10xxxxxx）
+
+    如果 [start, end) 内连一个完整字符都放不下，返回 start 之后第一个字符的结束位置，
+    保证每次切分至少前进一个字符。
+    """
+    if end >= len(data):
+        return len(data)
+
+    boundary = end
+    while boundary > start and (data[boundary] & 0xC0) == 0x80:
+        boundary -= 1
+
+    if boundary == start:
+        # 单个字符就超限（max_bytes 小于字符宽度），整个字符单独成段
+        boundary = start + 1
+        while boundary < len(data) and (data[boundary] & 0xC0) == 0x80:
+            boundary += 1
+
+    return boundary
+
+
+def utf8_prefix(text: str, max_bytes: int) -> str:
+    """
+    截取不超过 max_bytes 字节的最长前缀（按字符边界）
+
+    每个字符至少占 1 字节，只需编码前 max_bytes 个字符，耗时与 max_bytes 成正比。
+    """
+    if max_bytes <= 0:
+        return ""
+    data = text[:max_bytes].encode('utf-8')
+    if len(data) <= max_bytes:
+        return text[:max_bytes]
+
+    end = max_bytes
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return data[:end].decode('utf-8')
+
+
+def split_utf8(text: str, max_bytes: int) -> List[str]:
+    """
+    强制按字节截断文本
+
+    只编码一次，在字节缓冲区上按 max_bytes 切分，切分点回退到 UTF-8 字符边界后再解码，
+    耗时与文本长度成正比（5MB 的单行文本也只需几毫秒）。
+
+    Args:
+        text: 文本内容
+        max_bytes: 最大字节数
+
+    Returns:
+        List[str]: 分段列表
+    """
+    data = text.encode('utf-8')
+    segments = []
+    start = 0
+
+    while start < len(data):
+        end = _utf8_boundary(data, start, start + max(max_bytes, 0))
+        segments.append(data[start:end].decode('utf-8'))
+        start = end
+
+    return segments
+
+
+def build_page_segment(
+    seg: str,
+    page_number: int,
+    total_pages: Optional[int],
+    is_last: bool
+) -> SegmentInfo:
+    """
+    为单个分段添加页码标记
+
+    Args:
+        seg: 原始分段
+        page_number: 页码（从1开始）
+        total_pages: 总页数（streaming 模式下为 None）
+        is_last: 是否为最后一页
+
+    Returns:
+        SegmentInfo: 带标记的分段
+    """
+    is_first = (page_number == 1)
+
+    # 仅当总页数 > 1 时添加页码标记
+    if is_first and is_last:
+        return SegmentInfo(content=seg, is_first=True, is_last=True)
+
+    if total_pages is not None:
+        page_indicator = PAGE_INDICATOR_FORMAT.format(current=page_number, total=total_pages)
+    elif is_last:
+        # streaming 模式下到末页才知道总页数
+        page_indicator = STREAMING_LAST_PAGE_INDICATOR_FORMAT.format(current=page_number)
+        total_pages = page_number
+    else:
+        page_indicator = STREAMING_PAGE_INDICATOR_FORMAT.format(current=page_number)
+
+    # 创建 SegmentInfo，包含页码信息（方便调试）
+    return SegmentInfo(
+        content=page_indicator + seg,
+        is_first=is_first,
+        is_last=is_last,
+        page_number=page_number,
+        total_pages=total_pages
+    )
+
+
+class _PagePacker:
+    """
+    按顺序装箱（compact 模式）
+
+    内容的顺序不能改变，此时"能放下就放进当前页"的贪心策略页数最少。
+    每页记录首个单元与前一页的衔接方式，用于末页并入前一页。
+    """
+
+    def __init__(self, available_bytes: int):
+        self.available = available_bytes
+        self.pages: List[str] = []
+        self.parts: List[str] = []
+        self.nbytes = 0
+        # 当前页首个单元：(与上一单元的分隔符, 不含重复表头的文本, 文本在页内的长度)
+        self.lead: Optional[tuple] = None
+        self.last_lead: Optional[tuple] = None
+        self.last_parts: List[str] = []
+
+    def fits(self, nbytes: int, sep: str) -> bool:
+        """当前页能否再放入 nbytes 字节的单元"""
+        if not self.parts:
+            return nbytes <= self.available
+        return self.nbytes + len(sep.encode('utf-8')) + nbytes <= self.available
+
+    def add(self, text: str, nbytes: int, sep: str, join_text: Optional[str] = None):
+        """
+        放入当前页（调用方已确认放得下，或单元本身超限只能独占一页）
+
+        Args:
+            text: 单元文本
+            nbytes: 单元字节数
+            sep: 与上一单元的分隔符
+            join_text: 并入前一页时使用的文本（表格续页去掉重复的表头）
+        """
+        if self.parts:
+            self.parts.append(sep)
+            self.parts.append(text)
+            self.nbytes += len(sep.encode('utf-8')) + nbytes
+        elif text:
+            # 页首的空段落直接丢弃（与贪心模式一致）
+            self.parts.append(text)
+            self.nbytes = nbytes
+            self.lead = (sep, text if join_text is None else join_text)
+
+    def place(self, text: str, nbytes: int, sep: str, join_text: Optional[str] = None):
+        """放入当前页，放不下时换页"""
+        if not self.fits(nbytes, sep):
+            self.flush()
+        self.add(text, nbytes, sep, join_text)
+
+    def flush(self):
+        """结束当前页"""
+        if self.parts:
+            self.pages.append(''.join(self.parts))
+            self.last_parts, self.last_lead = self.parts, self.lead
+            self.parts, self.nbytes, self.lead = [], 0, None
+
+    def finish(self) -> List[str]:
+        """结束装箱，末页过短时并入前一页"""
+        self.flush()
+        if len(self.pages) >= 2 and self.last_lead is not None:
+            sep, join_text = self.last_lead
+            merged = self.pages[-2] + sep + join_text + ''.join(self.last_parts[1:])
+            if utf8_len(merged) <= self.available:
+                self.pages[-2:] = [merged]
+        return self.pages
+
 
 class MessageSegmenter:
     """消息分段器"""
 
-    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        page_indicator_mode: str = PAGE_INDICATOR_MODE_TOTAL,
+        packing: str = PACKING_GREEDY,
+        cache: Optional["SegmentCache"] = None
+    ):
         """
         初始化分段器
 
         Args:
             max_bytes: 每条消息的最大字节数
+            page_indicator_mode: 页码模式
+                - "total": (Page i/N)（默认）
+                - "streaming": (Page i)，末页为 (Page i, end)，不需要预先知道总页数
+            packing: 装箱模式
+                - "greedy": 逐段贪心填充（默认）
+                - "compact": 页数最少（需要总页数，不能与 streaming 页码同时使用）
+            cache: 分段结果缓存（可选，可被多个分段器共享）
         """
+        if page_indicator_mode not in PAGE_INDICATOR_MODES:
+            raise ValueError(
+                f"Unknown page indicator mode: {page_indicator_mode} "
+                f"(expected one of {', '.join(PAGE_INDICATOR_MODES)})"
+            )
+        if packing not in PACKING_MODES:
+            raise ValueError(
+                f"Unknown packing mode: {packing} (expected one of {', '.join(PACKING_MODES)})"
+            )
+        if packing == PACKING_COMPACT and page_indicator_mode != PAGE_INDICATOR_MODE_TOTAL:
+            raise ValueError("Compact packing needs the total page count, use page_indicator_mode='total'")
         self.max_bytes = max_bytes
+        self.page_indicator_mode = page_indicator_mode
+        self.packing = packing
+        self.cache = cache
+
+    @property
+    def is_streaming(self) -> bool:
+        """页码是否为流式模式（可以边分段边发送）"""
+        return self.page_indicator_mode != PAGE_INDICATOR_MODE_TOTAL
 
     def segment(self, content: str, msg_type: str) -> List[SegmentInfo]:
         """
@@ -40,153 +307,304 @@ class MessageSegmenter:
             List[SegmentInfo]: 分段列表
         """
         # 检查是否需要分段
-        if len(content.encode('utf-8')) <= self.max_bytes:
+        data = content.encode('utf-8')
+        if len(data) <= self.max_bytes:
             return [SegmentInfo(content, is_first=True, is_last=True)]
 
-        # 根据消息类型选择分段策略
+        if self.cache is None:
+            return self._segment_uncached(content, msg_type)
+
+        key = self._cache_key(data, msg_type)
+        segments = self.cache.get(key)
+        if segments is None:
+            segments = self.cache.put(key, self._segment_uncached(content, msg_type))
+        return list(segments)
+
+    def get_cached(self, content: str, msg_type: str) -> Optional[List[SegmentInfo]]:
+        """
+        查询分段缓存（不执行分段）
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+
+        Returns:
+            Optional[List[SegmentInfo]]: 命中时返回分段列表；未配置缓存、未命中或内容无需分段时返回 None
+        """
+        if self.cache is None:
+            return None
+        data = content.encode('utf-8')
+        if len(data) <= self.max_bytes:
+            return None
+        segments = self.cache.get(self._cache_key(data, msg_type))
+        return list(segments) if segments is not None else None
+
+    def store_cached(self, content: str, msg_type: str, segments: List[SegmentInfo]) -> None:
+        """
+        写入分段缓存（用于在其他进程中完成的分段）
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+            segments: 由相同参数的分段器得到的分段结果
+        """
+        if self.cache is None:
+            return
+        data = content.encode('utf-8')
+        if len(data) > self.max_bytes:
+            self.cache.put(self._cache_key(data, msg_type), segments)
+
+    def _segment_uncached(self, content: str, msg_type: str) -> List[SegmentInfo]:
+        """执行分段（不查询缓存，调用方已确认内容超过上限）"""
+        if self.is_streaming:
+            return list(self._iter_streaming_segments(content, msg_type))
+
+        if self.packing == PACKING_COMPACT:
+            return self._mark_segments(self._pack_compact(content, msg_type))
+
+        # 标记首尾
+        return self._mark_segments(list(self._iter_raw_segments(content, msg_type)))
+
+    def iter_segments(self, content: str, msg_type: str) -> Iterator[SegmentInfo]:
+        """
+        逐页产出分段
+
+        - streaming 模式：只向前多看一个分段（用于判断末页），
+          第一页无需等待整篇文档处理完即可产出
+        - total 模式：先执行一遍只计数、不保存的预扫描确定总页数，再逐页产出，
+          内存中只保留当前分段（compact 装箱需要整体计算，直接返回 segment() 的结果）
+        - 配置了缓存时：命中则直接产出缓存的分段；total 模式改用 segment() 以便写入缓存，
+          streaming 模式照常逐页产出，全部产出后写入缓存
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+
+        Yields:
+            SegmentInfo: 分段（内容已带页码标记）
+        """
+        data = content.encode('utf-8')
+        if len(data) <= self.max_bytes:
+            yield SegmentInfo(content, is_first=True, is_last=True)
+            return
+
+        if self.packing == PACKING_COMPACT or (self.cache is not None and not self.is_streaming):
+            yield from self.segment(content, msg_type)
+            return
+
+        if self.cache is not None:
+            key = self._cache_key(data, msg_type)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield from cached
+                return
+            produced = []
+            for segment in self._iter_streaming_segments(content, msg_type):
+                produced.append(segment)
+                yield segment
+            self.cache.put(key, produced)
+            return
+
+        if not self.is_streaming:
+            total_pages = sum(1 for _ in self._iter_raw_segments(content, msg_type))
+            for i, seg in enumerate(self._iter_raw_segments(content, msg_type)):
+                yield self._build_segment(seg, i + 1, total_pages, is_last=(i + 1 == total_pages))
+            return
+
+        yield from self._iter_streaming_segments(content, msg_type)
+
+    def _iter_streaming_segments(self, content: str, msg_type: str) -> Iterator[SegmentInfo]:
+        """streaming 模式逐页产出分段，只向前多看一个分段用于判断末页"""
+        segments = self._iter_raw_segments(content, msg_type)
+        previous = next(segments, None)
+        if previous is None:
+            return
+
+        page_number = 1
+        for seg in segments:
+            yield self._build_segment(previous, page_number, None, is_last=False)
+            previous = seg
+            page_number += 1
+        yield self._build_segment(previous, page_number, None, is_last=True)
+
+    def _cache_key(self, data: bytes, msg_type: str) -> tuple:
+        """分段缓存键：内容哈希 + 消息类型 + 影响分段结果的参数"""
+        return self.cache.make_key(data, msg_type, self.max_bytes, self.page_indicator_mode, self.packing)
+
+    def _iter_raw_segments(self, content: str, msg_type: str) -> Iterator[str]:
+        """按消息类型选择分段策略，逐段产出原始分段（不含页码）"""
         # 支持通用类型和平台特定类型
         if msg_type == MSG_TYPE_TEXT:
-            segments = self._segment_text(content)
-        elif msg_type == MSG_TYPE_MARKDOWN or msg_type == "markdown_v2":
+            return self._iter_text_segments(content)
+        if msg_type == MSG_TYPE_MARKDOWN or msg_type == "markdown_v2":
             # 支持 markdown 和 markdown_v2（企微特定）
-            segments = self._segment_markdown(content)
-        else:
-            # 其他类型（如image）不需要文本分段
-            segments = [content]
+            return self._iter_markdown_segments(content)
+        # 其他类型（如image）不需要文本分段
+        return iter([content])
 
-        # 标记首尾
-        return self._mark_segments(segments)
+    def estimate_segment_count(self, content: Any, msg_type: str) -> int:
+        """
+        快速估算分段数量（不执行实际分段）
+
+        按字节数粗略估算，用于调度成本计算等场景。
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+
+        Returns:
+            int: 预估分段数（至少为1）
+        """
+        if msg_type not in (MSG_TYPE_TEXT, MSG_TYPE_MARKDOWN, "markdown_v2") or not isinstance(content, str):
+            return 1
+
+        available_bytes = self.max_bytes - MAX_PAGE_INDICATOR_BYTES
+        total_bytes = len(content.encode('utf-8'))
+        if total_bytes <= self.max_bytes:
+            return 1
+
+        return -(-total_bytes // available_bytes)
 
     def _segment_text(self, content: str) -> List[str]:
+        """文本类型的简单分段（见 _iter_text_segments）"""
+        return list(self._iter_text_segments(content))
+
+    def _segment_markdown(self, content: str) -> List[str]:
+        """Markdown类型的智能分段（见 _iter_markdown_segments）"""
+        return list(self._iter_markdown_segments(content))
+
+    def _iter_text_segments(self, content: str) -> Iterator[str]:
         """
-        文本类型的简单分段
+        文本类型的简单分段（逐段产出）
 
         策略：按行分割，尽量填满每个分段
         """
-        segments = []
-        current = ""
-        lines = content.split('\n')
+        # 当前分段的行及其累计字节数（行间换行符计入）
+        current_lines: List[str] = []
+        current_bytes = 0
 
         # 预留页码标记的空间
         reserved_bytes = MAX_PAGE_INDICATOR_BYTES
         available_bytes = self.max_bytes - reserved_bytes
 
-        for line in lines:
-            test_content = current + ('\n' if current else '') + line
+        for line in content.split('\n'):
+            line_bytes = utf8_len(line)
 
-            if len(test_content.encode('utf-8')) > available_bytes:
-                # 当前行加入会超限
-                if current:
-                    segments.append(current)
-                    current = line
+            if current_bytes:
+                if current_bytes + 1 + line_bytes > available_bytes:
+                    # 当前行加入会超限
+                    yield '\n'.join(current_lines)
+                    current_lines = [line]
+                    current_bytes = line_bytes
                 else:
-                    # 单行就超过限制，强制截断
-                    chunks = self._force_split(line, available_bytes)
-                    segments.extend(chunks[:-1])
-                    current = chunks[-1]
+                    current_lines.append(line)
+                    current_bytes += 1 + line_bytes
+            elif line_bytes > available_bytes:
+                # 单行就超过限制，强制截断
+                chunks = self._force_split(line, available_bytes)
+                yield from chunks[:-1]
+                current_lines = [chunks[-1]]
+                current_bytes = utf8_len(chunks[-1])
             else:
-                current = test_content
-
-        if current:
-            segments.append(current)
+                current_lines = [line]
+                current_bytes = line_bytes
 
-        return segments
+        if current_bytes:
+            yield '\n'.join(current_lines)
 
-    def _segment_markdown(self, content: str) -> List[str]:
+    def _iter_markdown_segments(self, content: str) -> Iterator[str]:
         """
-        Markdown类型的智能分段
+        Markdown类型的智能分段（逐段产出）
 
         策略：
-        1. 按双换行符分段（段落）
+        1. 一次扫描切分为块（见 _tokenize_markdown）
         2. 识别特殊元素（表格、代码块）并保护
         3. 尽量填满每个分段，但不破坏语法
         """
-        segments = []
         current = ""
+        current_bytes = 0  # current 的字节数（增量维护，避免重复编码）
 
         # 预留页码标记的空间
         reserved_bytes = MAX_PAGE_INDICATOR_BYTES
         available_bytes = self.max_bytes - reserved_bytes
 
-        # 先处理代码块（暂时替换为占位符）
-        code_blocks = []
-        content = self._extract_code_blocks(content, code_blocks)
-
-        # 按段落分割
-        paragraphs = content.split('\n\n')
+        blocks = self._tokenize_markdown(content)
 
         i = 0
-        while i < len(paragraphs):
-            para = paragraphs[i]
-
-            # 还原代码块
-            para = self._restore_code_blocks(para, code_blocks)
+        while i < len(blocks):
+            block = blocks[i]
+            para = block.text
 
             # 检查是否是表格（段落开头就是表格）
-            if self._is_table_start(para):
+            if block.table_line == 0:
                 # 处理表格
                 table_paras = [para]
                 i += 1
-                while i < len(paragraphs) and self._is_table_row(paragraphs[i]):
-                    table_paras.append(paragraphs[i])
+                while i < len(blocks) and blocks[i].is_table_row:
+                    table_paras.append(blocks[i].text)
                     i += 1
 
                 table_content = '\n\n'.join(table_paras)
-                table_content = self._restore_code_blocks(table_content, code_blocks)
 
                 # 处理表格分段
                 table_segments = self._segment_table(table_content)
                 for seg in table_segments:
-                    if current and len((current + '\n\n' + seg).encode('utf-8')) > available_bytes:
-                        segments.append(current)
-                        current = seg
+                    seg_bytes = utf8_len(seg)
+                    if current and current_bytes + 2 + seg_bytes > available_bytes:
+                        yield current
+                        current, current_bytes = seg, seg_bytes
                     elif not current:
-                        current = seg
+                        current, current_bytes = seg, seg_bytes
                     else:
                         current += '\n\n' + seg
+                        current_bytes += 2 + seg_bytes
                 continue
 
             # 检查段落中间是否包含表格（表格前有文字的情况）
-            table_start_idx = self._find_table_in_paragraph(para)
-            if table_start_idx > 0:
+            if block.table_line > 0:
                 # 分离表格前的文字和表格部分
                 lines = para.split('\n')
-                prefix_text = '\n'.join(lines[:table_start_idx])
-                table_content = '\n'.join(lines[table_start_idx:])
+                prefix_text = '\n'.join(lines[:block.table_line])
+                table_paras = ['\n'.join(lines[block.table_line:])]
 
                 # 收集后续的表格行
                 i += 1
-                while i < len(paragraphs) and self._is_table_row(paragraphs[i]):
-                    table_content += '\n\n' + paragraphs[i]
+                while i < len(blocks) and blocks[i].is_table_row:
+                    table_paras.append(blocks[i].text)
                     i += 1
 
-                table_content = self._restore_code_blocks(table_content, code_blocks)
+                table_content = '\n\n'.join(table_paras)
 
                 # 先处理前缀文字
-                test_content = current + ('\n\n' if current else '') + prefix_text
-                if len(test_content.encode('utf-8')) > available_bytes:
+                prefix_bytes = utf8_len(prefix_text)
+                if current_bytes + (2 if current else 0) + prefix_bytes > available_bytes:
                     if current:
-                        segments.append(current)
-                    current = prefix_text
+                        yield current
+                    current, current_bytes = prefix_text, prefix_bytes
+                elif current:
+                    current += '\n\n' + prefix_text
+                    current_bytes += 2 + prefix_bytes
                 else:
-                    current = test_content
+                    current, current_bytes = prefix_text, prefix_bytes
 
                 # 处理表格分段（保留表头）
                 table_segments = self._segment_table(table_content)
                 for seg in table_segments:
-                    if current and len((current + '\n' + seg).encode('utf-8')) > available_bytes:
-                        segments.append(current)
-                        current = seg
+                    seg_bytes = utf8_len(seg)
+                    if current and current_bytes + 1 + seg_bytes > available_bytes:
+                        yield current
+                        current, current_bytes = seg, seg_bytes
                     elif not current:
-                        current = seg
+                        current, current_bytes = seg, seg_bytes
                     else:
                         current += '\n' + seg
+                        current_bytes += 1 + seg_bytes
                 continue
 
             # 普通段落
-            test_content = current + ('\n\n' if current else '') + para
+            para_bytes = block.nbytes
 
-            if len(test_content.encode('utf-8')) > available_bytes:
+            if current_bytes + (2 if current else 0) + para_bytes > available_bytes:
                 if current:
                     # 检查 current 末尾是否有孤立标题，避免标题与正文分离
                     content_without_heading, trailing_heading = self._extract_trailing_heading(current)
@@ -197,8 +615,9 @@ class MessageSegmenter:
                         # 如果是，不进行回溯，避免把标题单独分段
                         if not self._is_only_headings(content_without_heading):
                             # 前面有非标题内容，可以安全地回溯
-                            segments.append(content_without_heading)
+                            yield content_without_heading
                             current = trailing_heading
+                            current_bytes = utf8_len(trailing_heading)
                             # 不增加 i，重新处理当前 para（让标题和正文有机会合并）
                             continue
                         # 否则 content_without_heading 也是标题，走下面的 elif 逻辑
@@ -207,21 +626,24 @@ class MessageSegmenter:
                         # current 整体就是一个标题，尝试与 para 部分内容合并
                         # 避免标题单独成为一个分段
                         para_lines = para.split('\n')
-                        merged_content = current  # 从标题开始
+                        merged_parts = [current]  # 从标题开始
+                        merged_bytes = current_bytes
                         remaining_start = 0
 
                         for idx, line in enumerate(para_lines):
                             separator = '\n\n' if idx == 0 else '\n'
-                            test_merge = merged_content + separator + line
-                            if len(test_merge.encode('utf-8')) <= available_bytes:
-                                merged_content = test_merge
+                            line_bytes = len(separator) + utf8_len(line)
+                            if merged_bytes + line_bytes <= available_bytes:
+                                merged_parts.append(separator + line)
+                                merged_bytes += line_bytes
                                 remaining_start = idx + 1
                             else:
                                 break
+                        merged_content = ''.join(merged_parts)
 
                         if remaining_start > 0:
                             # 成功合并了部分内容
-                            segments.append(merged_content)
+                            yield merged_content
                             remaining_lines = para_lines[remaining_start:]
                             current = '\n'.join(remaining_lines) if remaining_lines else ""
                         else:
@@ -229,21 +651,15 @@ class MessageSegmenter:
                             # 尝试将第一行按字符拆分，让标题与部分内容合并
                             first_line = para_lines[0]
                             header_with_sep = current + '\n\n'
-                            available_for_content = available_bytes - len(header_with_sep.encode('utf-8'))
+                            available_for_content = available_bytes - (current_bytes + 2)
 
                             if available_for_content > 0:
-                                # 将 first_line 按字符截断
-                                merged_chars = ""
-                                for char in first_line:
-                                    test = merged_chars + char
-                                    if len(test.encode('utf-8')) <= available_for_content:
-                                        merged_chars = test
-                                    else:
-                                        break
+                                # 将 first_line 按字节截断（回退到字符边界）
+                                merged_chars = utf8_prefix(first_line, available_for_content)
 
                                 if merged_chars:
                                     # 成功合并了部分内容
-                                    segments.append(header_with_sep + merged_chars)
+                                    yield header_with_sep + merged_chars
                                     # 剩余内容
                                     remaining_first_line = first_line[len(merged_chars):]
                                     if remaining_first_line:
@@ -253,53 +669,296 @@ class MessageSegmenter:
                                     current = '\n'.join(remaining_lines) if remaining_lines else ""
                                 else:
                                     # 极端情况：标题本身接近限制，无法合并任何字符
-                                    segments.append(current)
+                                    yield current
                                     current = para
                             else:
                                 # 极端情况：标题本身超过限制
-                                segments.append(current)
+                                yield current
                                 current = para
 
+                        current_bytes = utf8_len(current)
                         i += 1
                         continue
 
                     # 没有需要回溯的标题，正常分段
-                    segments.append(current)
+                    yield current
                     current = ""
                     # 重新检查para本身是否超限
-                    if len(para.encode('utf-8')) > available_bytes:
+                    if para_bytes > available_bytes:
                         # para本身超限，需要分段
-                        if self._is_protected_element(para):
+                        if block.protected:
                             chunks = self._force_split(para, available_bytes)
-                            segments.extend(chunks[:-1])
+                            yield from chunks[:-1]
                             current = chunks[-1]
                         else:
                             line_segments = self._segment_text(para)
-                            segments.extend(line_segments[:-1])
+                            yield from line_segments[:-1]
                             current = line_segments[-1]
+                        current_bytes = utf8_len(current)
                     else:
-                        current = para
+                        current, current_bytes = para, para_bytes
                 else:
                     # 单个段落就超过限制
-                    if self._is_protected_element(para):
+                    if block.protected:
                         # 保护元素，强制截断
                         chunks = self._force_split(para, available_bytes)
-                        segments.extend(chunks[:-1])
+                        yield from chunks[:-1]
                         current = chunks[-1]
                     else:
                         # 普通段落，按行分割
                         line_segments = self._segment_text(para)
-                        segments.extend(line_segments[:-1])
+                        yield from line_segments[:-1]
                         current = line_segments[-1]
+                    current_bytes = utf8_len(current)
+            elif current:
+                current += '\n\n' + para
+                current_bytes += 2 + para_bytes
             else:
-                current = test_content
+                current, current_bytes = para, para_bytes
 
             i += 1
 
         if current:
-            segments.append(current)
+            yield current
 
-        return segments
+    def _pack_compact(self, content: str, msg_type: str) -> List[str]:
+        """
+        页数最少的装箱（compact 模式）
+
+        页码标记按总页数的实际长度预留：先按一位数页码（"(Page 9/9)"）装箱，
+        得到的页数需要更长的页码时加大预留重新装箱，直到预留足够。
+
+        Args:
+            content: 消息内容
+            msg_type: 消息类型
+
+        Returns:
+            List[str]: 原始分段列表（不含页码）
+        """
+        if msg_type == MSG_TYPE_TEXT:
+            units = [MarkdownBlock(BLOCK_PARAGRAPH, line, utf8_len(line)) for line in content.split('\n')]
+            pack = lambda available: self._pack_lines(units, available)  # noqa: E731
+        elif msg_type == MSG_TYPE_MARKDOWN or msg_type == "markdown_v2":
+            blocks = self._tokenize_markdown(content)
+            pack = lambda available: self._pack_blocks(blocks, available)  # noqa: E731
+        else:
+            return [content]
+
+        reserved_bytes = utf8_len(PAGE_INDICATOR_FORMAT.format(current=9, total=9))
+        while True:
+            pages = pack(self.max_bytes - reserved_bytes)
+            needed = utf8_len(PAGE_INDICATOR_FORMAT.format(current=len(pages), total=len(pages)))
+            if needed <= reserved_bytes:
+                return pages
+            reserved_bytes = needed
+
+    def _pack_lines(self, lines: List[MarkdownBlock], available_bytes: int) -> List[str]:
+        """文本按行装箱"""
+        packer = _PagePacker(available_bytes)
+        for line in lines:
+            self._pack_text(packer, line.text, line.nbytes, '\n', by_lines=False)
+        return packer.finish()
+
+    def _pack_blocks(self, blocks: List[MarkdownBlock], available_bytes: int) -> List[str]:
+        """Markdown 块装箱：标题与后续内容同页，表格行从当前页剩余空间开始续填"""
+        packer = _PagePacker(available_bytes)
+
+        i = 0
+        while i < len(blocks):
+            block = blocks[i]
+
+            if block.table_line >= 0:
+                # 收集以空行隔开的后续表格行
+                table_paras = [block.text]
+                i += 1
+                while i < len(blocks) and blocks[i].is_table_row:
+                    table_paras.append(blocks[i].text)
+                    i += 1
+                lines = '\n\n'.join(table_paras).split('\n')
+
+                sep = '\n\n'
+                if block.table_line > 0:
+                    prefix = '\n'.join(lines[:block.table_line])
+                    self._pack_text(packer, prefix, utf8_len(prefix), sep, by_lines=True)
+                    lines = lines[block.table_line:]
+                    sep = '\n'
+                self._pack_table(packer, lines, sep)
+                continue
+
+            if block.kind == BLOCK_HEADING and packer.parts and i + 1 < len(blocks):
+                # 避免标题成为页尾：放不下标题和后续内容的第一个单元时提前换页
+                following = self._first_unit_bytes(blocks[i + 1], available_bytes)
+                if following is not None and not packer.fits(block.nbytes + 2 + following, '\n\n'):
+                    packer.flush()
+
+            if block.protected and block.nbytes > available_bytes:
+                # 代码块、图片超限：独占若干页强制截断，最后一块与后续内容同页
+                self._pack_chunks(packer, block.text, '\n\n')
+            else:
+                self._pack_text(packer, block.text, block.nbytes, '\n\n', by_lines=True)
+            i += 1
+
+        return packer.finish()
+
+    def _pack_text(self, packer: _PagePacker, text: str, nbytes: int, sep: str, by_lines: bool):
+        """放入一段文本，放不下时按行拆分，单行超限时强制截断"""
+        if packer.fits(nbytes, sep):
+            packer.add(text, nbytes, sep)
+            return
+
+        if by_lines and '\n' in text:
+            for line in text.split('\n'):
+                self._pack_text(packer, line, utf8_len(line), sep, by_lines=False)
+                sep = '\n'
+            return
+
+        if nbytes <= packer.available:
+            packer.flush()
+            packer.add(text, nbytes, sep)
+            return
+
+        self._pack_chunks(packer, text, sep)
+
+    def _pack_chunks(self, packer: _PagePacker, text: str, sep: str):
+        """强制截断超限文本：前面的块各占一页，最后一块与后续内容同页"""
+        packer.flush()
+        for chunk in self._force_split(text, packer.available):
+            packer.flush()
+            packer.add(chunk, utf8_len(chunk), sep)
+            sep = ''  # 截断的各块首尾相接
+
+    def _pack_table(self, packer: _PagePacker, lines: List[str], sep: str):
+        """表格装箱：数据行从当前页剩余空间开始填充，换页时重复表头"""
+        # 表格前的空行不影响渲染，去掉以免被当作表头
+        start = 0
+        while start < len(lines) - 1 and not lines[start].strip():
+            start += 1
+        lines = lines[start:]
+        table = '\n'.join(lines)
+        if len(lines) < 3:
+            self._pack_text(packer, table, utf8_len(table), sep, by_lines=True)
+            return
+
+        header = '\n'.join(lines[:2])
+        header_bytes = utf8_len(header)
+        if header_bytes + 1 > packer.available:
+            # 表头本身就超限，强制截断
+            self._pack_text(packer, table, utf8_len(table), sep, by_lines=False)
+            return
+
+        first = True
+        for row in lines[2:]:
+            row_bytes = utf8_len(row)
+            if first:
+                packer.place(header + '\n' + row, header_bytes + 1 + row_bytes, sep)
+                first = False
+            elif packer.fits(row_bytes, '\n'):
+                packer.add(row, row_bytes, '\n')
+            else:
+                # 换页时重复表头；单行就超限时该行独占一页（与贪心模式一致）
+                packer.flush()
+                packer.add(header + '\n' + row, header_bytes + 1 + row_bytes, '\n', join_text=row)
+
+    def _first_unit_bytes(self, block: MarkdownBlock, available_bytes: int) -> Optional[int]:
+        """块的第一个不可拆分单元的字节数（块会强制截断、必然另起一页时返回 None）"""
+        if block.table_line == 0:
+            lines = block.text.split('\n', 3)
+            return utf8_len('\n'.join(lines[:3]))
+        if block.nbytes <= available_bytes:
+            return block.nbytes
+        if block.protected:
+            return None
+        first_line_bytes = utf8_len(block.text.split('\n', 1)[0])
+        return first_line_bytes if first_line_bytes <= available_bytes else None
+
+    def _tokenize_markdown(self, content: str) -> List[MarkdownBlock]:
+        """
+        一次扫描将 Markdown 切分为块
+
+        按双换行符切分段落，代码块内部的双换行不切分；同时计算每个块的类型、
+        字节数和表格特征，装箱时不再重复编码或匹配正则。
+
+        Args:
+            content: Markdown 内容
+
+        Returns:
+            List[MarkdownBlock]: 块列表
+        """
+        blocks = []
+        start = 0  # 当前块的起始位置
+        pos = 0  # 下一次查找分隔符的起始位置
+        # 判断表格行时代码块视为单个字符（代码块可能跨行，不能让它把一行表格拆开）
+        shape_parts: List[str] = []
+
+        for fence in _CODE_BLOCK_RE.finditer(content):
+            start, pos, shape_parts = self._split_paragraphs(
+                content, start, pos, fence.start(), shape_parts, blocks
+            )
+            shape_parts.append(content[pos:fence.start()])
+            shape_parts.append('_')
+            pos = fence.end()
+
+        start, pos, shape_parts = self._split_paragraphs(
+            content, start, pos, len(content), shape_parts, blocks
+        )
+        shape_parts.append(content[pos:])
+        blocks.append(self._make_block(content[start:], shape_parts))
+
+        return blocks
+
+    def _split_paragraphs(
+        self,
+        content: str,
+        start: int,
+        pos: int,
+        end: int,
+        shape_parts: List[str],
+        blocks: List[MarkdownBlock]
+    ) -> tuple:
+        """在代码块之间的普通文本 [pos, end) 中按双换行符切出完整的块"""
+        sep = content.find('\n\n', pos, end)
+        while sep != -1:
+            shape_parts.append(content[pos:sep])
+            blocks.append(self._make_block(content[start:sep], shape_parts))
+            start = pos = sep + 2
+            shape_parts = []
+            sep = content.find('\n\n', pos, end)
+        return start, pos, shape_parts
+
+    def _make_block(self, text: str, shape_parts: List[str]) -> MarkdownBlock:
+        """根据块文本（及代码块视为单个字符后的形态）计算块的类型和特征"""
+        # 表格相关的判断都要求包含 "|"，普通段落跳过
+        if '|' not in text:
+            is_table_row = False
+            table_line = -1
+        else:
+            shape = ''.join(shape_parts) if len(shape_parts) > 1 else text
+            is_table_row = bool(_TABLE_ROW_RE.match(shape.strip()))
+            if self._is_table_start(text):
+                table_line = 0
+            else:
+                table_line = self._find_table_in_paragraph(text)
+
+        stripped = text.strip()
+        if table_line >= 0:
+            kind = BLOCK_TABLE
+        elif stripped.startswith('```') and stripped.endswith('```'):
+            kind = BLOCK_FENCE
+        elif _HEADING_RE.match(stripped):
+            kind = BLOCK_HEADING
+        elif _LIST_ITEM_RE.match(stripped):
+            kind = BLOCK_LIST
+        else:
+            kind = BLOCK_PARAGRAPH
+
+        return MarkdownBlock(
+            kind=kind,
+            text=text,
+            nbytes=utf8_len(text),
+            table_line=table_line,
+            is_table_row=is_table_row,
+            protected=self._is_protected_element(text)
+        )
 
     def _segment_table(self, table_content: str) -> List[str]:
         """
@@ -321,31 +980,34 @@ class MessageSegmenter:
         data_rows = lines[2:]
 
         # 检查表头大小
-        header_bytes = len(header.encode('utf-8'))
+        header_bytes = utf8_len(header)
         if header_bytes > self.max_bytes:
             # 表头本身就超限，强制截断
             return self._force_split(table_content, self.max_bytes)
 
         segments = []
         current_rows = []
+        current_rows_bytes = 0  # current_rows 的累计字节数（每行含换行符）
 
         # 预留页码标记的空间
         reserved_bytes = MAX_PAGE_INDICATOR_BYTES
 
         # 可用字节数 = 总限制 - 表头 - 换行符 - 页码标记
-        available_bytes = self.max_bytes - header_bytes - len('\n'.encode('utf-8')) - reserved_bytes
+        available_bytes = self.max_bytes - header_bytes - 1 - reserved_bytes
 
         for row in data_rows:
-            row_bytes = len(row.encode('utf-8')) + len('\n'.encode('utf-8'))
+            row_bytes = utf8_len(row) + 1
 
-            if sum(len(r.encode('utf-8')) + len('\n'.encode('utf-8')) for r in current_rows) + row_bytes <= available_bytes:
+            if current_rows_bytes + row_bytes <= available_bytes:
                 current_rows.append(row)
+                current_rows_bytes += row_bytes
             else:
                 if current_rows:
                     # 生成分段
                     seg = header + '\n' + '\n'.join(current_rows)
                     segments.append(seg)
                     current_rows = [row]
+                    current_rows_bytes = row_bytes
                 else:
                     # 单行就超限，强制截断
                     segments.append(header + '\n' + row)
@@ -356,25 +1018,9 @@ class MessageSegmenter:
 
         return segments
 
-    def _extract_code_blocks(self, content: str, code_blocks: List[str]) -> str:
-        """提取代码块，替换为占位符"""
-
-        def replacer(match):
-            code_blocks.append(match.group(0))
-            return f"__CODE_BLOCK_{len(code_blocks) - 1}__"
-
-        return re.sub(r'```[\s\S]*?```', replacer, content)
-
-    def _restore_code_blocks(self, content: str, code_blocks: List[str]) -> str:
-        """还原代码块"""
-        for i, block in enumerate(code_blocks):
-            content = content.replace(f"__CODE_BLOCK_{i}__", block)
-        return content
-
     def _is_heading(self, text: str) -> bool:
         """判断文本是否是 Markdown 标题（# 到 ###### 开头）"""
-        stripped = text.strip()
-        return bool(re.match(r'^#{1,6}\s+', stripped))
+        return bool(_HEADING_RE.match(text.strip()))
 
     def _is_only_headings(self, content: str) -> bool:
         """
@@ -437,8 +1083,8 @@ class MessageSegmenter:
 
         # 检查第一行和第二行是否都是表格行
         # 第二行应该是分隔行（如 |---|---|）
-        return (re.match(MARKDOWN_TABLE_ROW_PATTERN, lines[0].strip()) and
-                re.match(r'^\|[\s:-]+\|', lines[1].strip()))
+        return bool(_TABLE_ROW_RE.match(lines[0].strip()) and
+                    _TABLE_SEPARATOR_RE.match(lines[1].strip()))
 
     def _find_table_in_paragraph(self, para: str) -> int:
         """
@@ -453,57 +1099,29 @@ class MessageSegmenter:
         lines = para.split('\n')
         for i in range(len(lines) - 1):
             # 检查第 i 行是否是表格标题行，第 i+1 行是否是分隔行
-            if (re.match(MARKDOWN_TABLE_ROW_PATTERN, lines[i].strip()) and
-                re.match(r'^\|[\s:-]+\|', lines[i + 1].strip())):
+            if (_TABLE_ROW_RE.match(lines[i].strip()) and
+                    _TABLE_SEPARATOR_RE.match(lines[i + 1].strip())):
                 return i
         return -1
 
     def _is_table_row(self, para: str) -> bool:
         """判断是否是表格行"""
-        return bool(re.match(MARKDOWN_TABLE_ROW_PATTERN, para.strip()))
+        return bool(_TABLE_ROW_RE.match(para.strip()))
 
     def _is_protected_element(self, para: str) -> bool:
         """判断是否是需要保护的元素（链接、图片、代码块）"""
+        stripped = para.strip()
+
         # 代码块
-        if para.strip().startswith('```') and para.strip().endswith('```'):
+        if stripped.startswith('```') and stripped.endswith('```'):
             return True
 
         # 图片
-        if re.match(r'^!\[.*?\]\(.*?\)$', para.strip()):
-            return True
-
-        return False
+        return bool(_IMAGE_RE.match(stripped))
 
     def _force_split(self, text: str, max_bytes: int) -> List[str]:
-        """
-        强制按字节截断文本
-
-        Args:
-            text: 文本内容
-            max_bytes: 最大字节数
-
-        Returns:
-            List[str]: 分段列表
-        """
-        segments = []
-        current = ""
-
-        for char in text:
-            test = current + char
-            if len(test.encode('utf-8')) > max_bytes:
-                if current:
-                    segments.append(current)
-                    current = char
-                else:
-                    # 单个字符就超限（理论上不会发生）
-                    segments.append(char)
-            else:
-                current = test
-
-        if current:
-            segments.append(current)
-
-        return segments
+        """强制按字节截断文本（见 split_utf8）"""
+        return split_utf8(text, max_bytes)
 
     def _mark_segments(self, segments: List[str]) -> List[SegmentInfo]:
         """
@@ -515,34 +1133,18 @@ class MessageSegmenter:
         Returns:
             List[SegmentInfo]: 带标记的分段列表
         """
-        if not segments:
-            return []
-
         total_pages = len(segments)
-        result = []
-
-        for i, seg in enumerate(segments):
-            is_first = (i == 0)
-            is_last = (i == len(segments) - 1)
-            page_number = i + 1  # 页码从1开始
-
-            # 仅当总页数 > 1 时添加页码标记
-            content = seg
-            if total_pages > 1:
-                page_indicator = PAGE_INDICATOR_FORMAT.format(
-                    current=page_number,
-                    total=total_pages
-                )
-                content = page_indicator + content
-
-            # 创建 SegmentInfo，包含页码信息（方便调试）
-            segment_info = SegmentInfo(
-                content=content,
-                is_first=is_first,
-                is_last=is_last,
-                page_number=page_number if total_pages > 1 else None,
-                total_pages=total_pages if total_pages > 1 else None
-            )
-            result.append(segment_info)
-
-        return result
+        return [
+            self._build_segment(seg, i + 1, total_pages, is_last=(i == total_pages - 1))
+            for i, seg in enumerate(segments)
+        ]
+
+    def _build_segment(
+        self,
+        seg: str,
+        page_number: int,
+        total_pages: Optional[int],
+        is_last: bool
+    ) -> SegmentInfo:
+        """为单个分段添加页码标记（见 build_page_segment）"""
+        return build_page_segment(seg, page_number, total_pages, is_last)
@@ -0,0 +1,367 @@
+"""
+增量分段器 - 对持续产生的文本流（日志 tail、LLM 流式输出）逐块分页
+
+MessageSegmenter 需要完整的文档；StreamSegmenter 接收任意切分的文本块，内部只缓存当前页
+（已完成的行 + 未换行的尾部），页面填满时立即产出，内存占用与页面大小成正比，而不是与文档大小成正比。
+
+页码使用 streaming 格式：(Page i)，流结束时的最后一页为 (Page i, end)。
+整个流只有一页时不加页码；最后的内容已被刷新产出时，结束时补发一页只有 (Page i, end) 的结束页。Markdown 代码块跨页时在页尾补上结束标记，下一页重新打开代码块。
+
+iter_stream_pages() 在后台线程中读取数据源（可迭代对象或文件对象），通过有界队列交给调用方，
+页面填满或距上次产出超过刷新间隔时产出，数据源阻塞（如 tail -f 暂无新日志）时也能按时刷新。
+"""
+import codecs
+import queue
+import re
+import threading
+import time
+from dataclasses import replace
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from .models import SegmentInfo
+from .segmenter import DEFAULT_MAX_BYTES, build_page_segment, split_utf8, utf8_len, utf8_prefix
+from .constants import (
+    MSG_TYPE_TEXT,
+    MSG_TYPE_MARKDOWN,
+    MAX_PAGE_INDICATOR_BYTES,
+)
+
+# 代码块的开始/结束行，以及跨页时补在页尾的结束标记
+_FENCE_RE = re.compile(r'^\s*```')
+_FENCE_CLOSE = "\n```"
+
+# 读取线程与分段之间的队列容量（块数），数据源产生得比发送快时读取线程阻塞
+DEFAULT_STREAM_QUEUE_SIZE = 64
+
+# 队列中的结束标记
+_END = object()
+
+
+class StreamSegmenter:
+    """
+    增量分段器（非线程安全，每个流一个实例）
+
+    使用示例:
+        segmenter = StreamSegmenter(msg_type="text")
+        for chunk in source:
+            for page in segmenter.feed(chunk):
+                send(page.content)
+        for page in segmenter.close():
+            send(page.content)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, msg_type: str = MSG_TYPE_TEXT):
+        """
+        初始化增量分段器
+
+        Args:
+            max_bytes: 每页最大字节数（含页码标记）
+            msg_type: 消息类型（markdown / markdown_v2 时处理跨页的代码块）
+        """
+        self.max_bytes = max_bytes
+        self.msg_type = msg_type
+        self.is_markdown = msg_type in (MSG_TYPE_MARKDOWN, "markdown_v2")
+        # 每页正文可用字节数（预留页码标记）
+        self.available = max_bytes - MAX_PAGE_INDICATOR_BYTES
+        if self.available <= len(_FENCE_CLOSE) * 2:
+            raise ValueError(f"max_bytes too small for stream segmentation: {max_bytes}")
+
+        # 当前页已完成的行及其字节数（含行间的换行符）
+        self._lines: List[str] = []
+        self._bytes = 0
+        # 尚未遇到换行符的尾部文本
+        self._partial: List[str] = []
+        self._partial_bytes = 0
+        # 当前所在代码块的起始行（不在代码块中时为 None）
+        self._fence: Optional[str] = None
+        # 当前页是否只有跨页重新打开的代码块起始行
+        self._reopened = False
+
+        self.pages_emitted = 0
+        self.closed = False
+
+    @property
+    def has_pending(self) -> bool:
+        """是否有尚未产出的内容"""
+        return bool(self._lines) or self._partial_bytes > 0
+
+    def feed(self, chunk: str) -> List[SegmentInfo]:
+        """
+        追加文本块
+
+        Args:
+            chunk: 文本块（可以在任意位置切分，包括行中间）
+
+        Returns:
+            List[SegmentInfo]: 本次填满的页面（通常为空或一页）
+        """
+        if self.closed:
+            raise ValueError("Stream segmenter already closed")
+
+        pages: List[SegmentInfo] = []
+        parts = chunk.split("\n")
+
+        # 最后一部分没有换行符，留在尾部缓冲区
+        for part in parts[:-1]:
+            if self._partial:
+                self._partial.append(part)
+                part = "".join(self._partial)
+                self._reset_partial()
+            self._add_line(part, pages)
+
+        tail = parts[-1]
+        if tail:
+            self._partial.append(tail)
+            self._partial_bytes += utf8_len(tail)
+            # 超长的尾部（如没有换行的 LLM 输出）直接按字节切成整页，缓冲区不会无限增长
+            if self._partial_bytes > self._line_budget():
+                text = "".join(self._partial)
+                self._reset_partial()
+                self._add_long_line(text, pages, keep_tail=True)
+
+        return pages
+
+    def flush(self) -> List[SegmentInfo]:
+        """
+        立即产出当前缓冲的内容（刷新间隔到期时调用）
+
+        Returns:
+            List[SegmentInfo]: 产出的页面，没有待发送内容时为空
+        """
+        pages: List[SegmentInfo] = []
+        self._flush_partial(pages)
+        self._emit(pages, is_last=False)
+        return pages
+
+    def close(self) -> List[SegmentInfo]:
+        """
+        结束输入，产出剩余的页面
+
+        整个流只有一页时不加页码，否则最后一页为 (Page i, end)。
+        最后一页已被填满或刷新产出时（结束标记无法补到已产出的页面上），
+        产出一页只有 (Page i, end) 的结束页。
+
+        Returns:
+            List[SegmentInfo]: 剩余的页面
+        """
+        pages: List[SegmentInfo] = []
+        self._flush_partial(pages)
+        self.closed = True
+        self._emit(pages, is_last=True)
+
+        if self.pages_emitted and not (pages and pages[-1].is_last):
+            self.pages_emitted += 1
+            end_page = build_page_segment("", self.pages_emitted, None, is_last=True)
+            pages.append(replace(end_page, content=end_page.content.rstrip("\n")))
+        return pages
+
+    def _reset_partial(self):
+        """清空尾部缓冲区"""
+        self._partial = []
+        self._partial_bytes = 0
+
+    def _flush_partial(self, pages: List[SegmentInfo]):
+        """把尾部缓冲区作为一行加入当前页"""
+        if self._partial:
+            text = "".join(self._partial)
+            self._reset_partial()
+            self._add_line(text, pages)
+
+    def _line_budget(self) -> int:
+        """当前页正文的可用字节数（在代码块中时预留结束标记）"""
+        if self._fence is not None:
+            return self.available - len(_FENCE_CLOSE)
+        return self.available
+
+    def _add_line(self, line: str, pages: List[SegmentInfo]):
+        """加入一个完整的行，当前页放不下时先产出当前页"""
+        line_bytes = utf8_len(line)
+        if line_bytes > self._line_budget():
+            self._add_long_line(line, pages, keep_tail=False)
+            self._update_fence(line)
+            return
+
+        joined = line_bytes + (1 if self._lines else 0)
+        if self._bytes + joined > self._line_budget():
+            self._emit(pages, is_last=False)
+            joined = line_bytes + (1 if self._lines else 0)
+
+        self._lines.append(line)
+        self._bytes += joined
+        self._reopened = False
+        self._update_fence(line)
+
+    def _add_long_line(self, text: str, pages: List[SegmentInfo], keep_tail: bool):
+        """
+        按字节切分超长的行：先填满当前页的剩余空间，其余部分除最后一块外都单独成页
+
+        Args:
+            text: 行内容
+            pages: 产出的页面
+            keep_tail: True 表示最后一块仍未换行，放回尾部缓冲区；否则作为完整的行加入当前页
+        """
+        if self._lines and not self._reopened:
+            room = self._line_budget() - self._bytes - 1
+            head = utf8_prefix(text, room)
+            if head:
+                self._lines.append(head)
+                self._bytes += 1 + utf8_len(head)
+                text = text[len(head):]
+            self._emit(pages, is_last=False)
+            if not text:
+                return
+
+        # 产出当前页后最多剩下重新打开的代码块起始行，每页都以它开头
+        prefix = self._lines
+        overhead = self._bytes + (1 if prefix else 0)
+        # 每块至少 4 字节（一个 UTF-8 字符），保证切分能推进
+        chunks = split_utf8(text, max(self._line_budget() - overhead, 4))
+        for piece in chunks[:-1]:
+            self._lines = prefix + [piece]
+            self._bytes = overhead + utf8_len(piece)
+            self._reopened = False
+            self._emit(pages, is_last=False)
+
+        last = chunks[-1] if chunks else ""
+        if keep_tail:
+            if last:
+                self._partial = [last]
+                self._partial_bytes = utf8_len(last)
+        else:
+            self._lines = prefix + [last]
+            self._bytes = overhead + utf8_len(last)
+            self._reopened = False
+
+    def _update_fence(self, line: str):
+        """跟踪 Markdown 代码块的开闭状态"""
+        if not self.is_markdown or not _FENCE_RE.match(line):
+            return
+        self._fence = line if self._fence is None else None
+
+    def _emit(self, pages: List[SegmentInfo], is_last: bool):
+        """产出当前页（只有空白内容、或只有重新打开的代码块起始行时不产出）"""
+        if self._reopened and not is_last:
+            return
+
+        content = "\n".join(self._lines)
+        fence = self._fence
+        self._lines = []
+        self._bytes = 0
+        self._reopened = False
+
+        if not content.strip() or (is_last and content == fence and self.pages_emitted):
+            return
+
+        if fence is not None and not is_last:
+            # 代码块跨页：本页补结束标记，下一页重新打开
+            content += _FENCE_CLOSE
+            self._lines = [fence]
+            self._bytes = utf8_len(fence)
+            self._reopened = True
+
+        self.pages_emitted += 1
+        if is_last and self.pages_emitted == 1:
+            pages.append(SegmentInfo(content, is_first=True, is_last=True))
+            return
+        pages.append(build_page_segment(content, self.pages_emitted, None, is_last=is_last))
+
+    def __repr__(self):
+        return f"<StreamSegmenter pages={self.pages_emitted} pending={self._bytes + self._partial_bytes}B>"
+
+
+class _SourceError:
+    """读取线程捕获的数据源异常（在调用方线程中重新抛出）"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_stream_pages(
+    source: Union[Iterable[Union[str, bytes]], IO],
+    segmenter: StreamSegmenter,
+    flush_interval: Optional[float] = None,
+    queue_size: int = DEFAULT_STREAM_QUEUE_SIZE
+) -> Iterator[SegmentInfo]:
+    """
+    从数据源逐页产出分段
+
+    Args:
+        source: 数据源：产出 str 或 bytes 的可迭代对象（如生成器、LLM 流式响应），或文件对象（按行读取）；
+            bytes 按 UTF-8 增量解码，多字节字符被切开也不会出错
+        segmenter: 增量分段器
+        flush_interval: 刷新间隔（秒），缓冲区有内容且距上次产出超过该时间时立即产出；None 表示只在页面填满和结束时产出
+        queue_size: 读取线程与分段之间的队列容量
+
+    Yields:
+        SegmentInfo: 分段（内容已带页码标记）
+
+    Raises:
+        读取数据源时的异常（已缓冲的内容先产出）
+    """
+    chunks: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # 调用方提前结束迭代时不再阻塞
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            for chunk in source:
+                if not put(chunk):
+                    return
+        except BaseException as e:
+            put(_SourceError(e))
+        put(_END)
+
+    reader = threading.Thread(target=read, name="wecom-stream-reader", daemon=True)
+    reader.start()
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    deadline: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = chunks.get(timeout=timeout)
+            except queue.Empty:
+                # 刷新间隔到期
+                yield from segmenter.flush()
+                deadline = None
+                continue
+
+            if item is _END:
+                break
+            if isinstance(item, _SourceError):
+                error = item.error
+                break
+
+            text = decoder.decode(item) if isinstance(item, (bytes, bytearray)) else item
+            pages = segmenter.feed(text)
+            yield from pages
+
+            if not segmenter.has_pending:
+                deadline = None
+            elif flush_interval is not None and (deadline is None or pages):
+                deadline = time.monotonic() + flush_interval
+
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield from segmenter.feed(tail)
+        yield from segmenter.close()
+    finally:
+        stop.set()
+
+    if error is not None:
+        raise error
+
+
+__all__ = ["StreamSegmenter", "iter_stream_pages"]
@@ -5,6 +5,7 @@ wecom_notifier.platforms.feishu - 飞书平台模块
 - FeishuNotifier: 飞书通知器主类
 - FeishuSender: HTTP 发送器
 - FeishuSenderAdapter: 协议适配器
+- FeishuWebhookPool: 多 webhook 池
 - DualRateLimiter: 双层频率控制器
 
 使用示例:
@@ -20,6 +21,9 @@ wecom_notifier.platforms.feishu - 飞书平台模块
     # 发送卡片
     result = notifier.send_card(webhook, "# 标题\\n内容", title="通知")
     result.wait()
+
+    # 多 webhook 池
+    result = notifier.send_text([webhook1, webhook2], "Hello!")
 """
 
 from wecom_notifier.platforms.feishu.notifier import FeishuNotifier, FeishuMessage
@@ -28,6 +32,7 @@ from wecom_notifier.platforms.feishu.adapter import (
     FeishuSenderAdapter,
     FeishuMessageConverter,
 )
+from wecom_notifier.platforms.feishu.pool import FeishuWebhookPool
 from wecom_notifier.platforms.feishu.rate_limiter import DualRateLimiter
 from wecom_notifier.platforms.feishu.exceptions import (
     FeishuError,
@@ -49,6 +54,8 @@ __all__ = [
     # 适配器
     "FeishuSenderAdapter",
     "FeishuMessageConverter",
+    # 池
+    "FeishuWebhookPool",
     # 频率控制
     "DualRateLimiter",
     # 异常
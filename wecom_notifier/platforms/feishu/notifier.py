@@ -7,18 +7,25 @@
 - @ 功能
 - 频率控制
 - 签名校验（可选）
+- 多 webhook 池（传入 URL 列表，负载均衡发送）
 """
+import hashlib
 import threading
 import queue
 import time
 from typing import Optional, List, Union, Dict, Any
 
 from wecom_notifier.core.logger import get_logger
-from wecom_notifier.core.models import SendResult
+from wecom_notifier.core.models import Message, SendResult
 from wecom_notifier.core.segmenter import MessageSegmenter
+from wecom_notifier.core.segment_cache import SegmentCache
+from wecom_notifier.core.offload import PreprocessOffloader
+from wecom_notifier.core.resource import WebhookResource
+from wecom_notifier.core.constants import SELECTION_POLICY_QUOTA, PAGE_INDICATOR_MODE_TOTAL, PACKING_GREEDY
 
 from .sender import FeishuSender, FeishuRetryConfig
 from .rate_limiter import DualRateLimiter
+from .pool import FeishuWebhookPool
 from .constants import (
     MSG_TYPE_TEXT,
     MSG_TYPE_INTERACTIVE,
@@ -54,6 +61,23 @@ class FeishuMessage:
         """飞书不需要 @all workaround，直接在文本中处理"""
         return False
 
+    def to_message(self) -> Message:
+        """转换为通用 Message（池模式使用，飞书参数放入 platform_extras）"""
+        return Message(
+            content=self.content,
+            msg_type=self.msg_type,
+            id=self.id,
+            mention_all=self.mention_all,
+            segment_interval=self.segment_interval,
+            platform_extras={
+                "feishu": {
+                    "title": self.title,
+                    "template": self.template,
+                    "mentions": list(self.mentions),
+                }
+            }
+        )
+
 
 class FeishuNotifier:
     """
@@ -74,13 +98,22 @@ class FeishuNotifier:
             title="通知标题"
         )
         result.wait()
+
+        # 多 webhook 池（负载均衡，吞吐量随机器人数量扩展）
+        result = notifier.send_text([webhook1, webhook2, webhook3], "告警")
     """
 
     def __init__(
         self,
         max_retries: int = 3,
         retry_delay: float = 2.0,
-        secret: Optional[str] = None
+        secret: Optional[str] = None,
+        selection_policy: str = SELECTION_POLICY_QUOTA,
+        page_indicator_mode: str = PAGE_INDICATOR_MODE_TOTAL,
+        segment_packing: str = PACKING_GREEDY,
+        enable_segment_cache: bool = False,
+        segment_cache_config: Optional[Dict] = None,
+        offload_config: Optional[Dict] = None
     ):
         """
         初始化飞书通知器
@@ -89,11 +122,26 @@ class FeishuNotifier:
             max_retries: 最大重试次数
             retry_delay: 重试延迟（秒）
             secret: 签名密钥（如果机器人启用了签名校验）
+            selection_policy: 多webhook池的选择策略（quota / least_latency / p2c / quota_health / ready_time）
+            page_indicator_mode: 长消息分页的页码模式（total: (Page i/N)；streaming: (Page i)，边分段边发送）
+            segment_packing: 长消息分段的装箱模式（greedy: 贪心填充；compact: 页数最少）
+            enable_segment_cache: 是否缓存分段结果（默认False，开启后相同内容只分段一次）
+            segment_cache_config: 分段缓存配置字典（max_size / max_chars，见 SegmentCache）
+            offload_config: 预处理卸载配置字典（executor / max_workers / min_bytes，见 PreprocessOffloader），
+                不传则不卸载；超过阈值的消息在进程池/线程池中分段
         """
         self.logger = get_logger()
 
         # 核心组件
-        self.segmenter = MessageSegmenter(max_bytes=MAX_BYTES_PER_MESSAGE)
+        self.segment_cache: Optional[SegmentCache] = None
+        if enable_segment_cache:
+            self.segment_cache = SegmentCache(segment_cache_config)
+        self.segmenter = MessageSegmenter(
+            max_bytes=MAX_BYTES_PER_MESSAGE,
+            page_indicator_mode=page_indicator_mode,
+            packing=segment_packing,
+            cache=self.segment_cache
+        )
         self.sender = FeishuSender(
             retry_config=FeishuRetryConfig(
                 max_retries=max_retries,
@@ -102,15 +150,27 @@ class FeishuNotifier:
             secret=secret
         )
 
+        # 预处理卸载器（可选，所有管理器和池共享）
+        self.offloader: Optional[PreprocessOffloader] = None
+        if offload_config is not None:
+            self.offloader = PreprocessOffloader(self.segmenter, config=offload_config)
+
+        # 频率限制器（URL → DualRateLimiter），单 webhook 和池模式共享
+        self._rate_limiters: Dict[str, DualRateLimiter] = {}
+
         # 管理器缓存（每个 webhook 一个）
         self._managers: Dict[str, "_FeishuWebhookManager"] = {}
         self._managers_lock = threading.Lock()
 
+        # 池缓存（多 webhook 模式）
+        self._pools: Dict[str, FeishuWebhookPool] = {}
+        self.selection_policy = selection_policy
+
         self.logger.info("FeishuNotifier initialized")
 
     def send_text(
         self,
-        webhook_url: str,
+        webhook_url: Union[str, List[str]],
         content: str,
         mention_all: bool = False,
         mentions: Optional[List[str]] = None,
@@ -120,7 +180,7 @@ class FeishuNotifier:
         发送文本消息
 
         Args:
-            webhook_url: Webhook 地址
+            webhook_url: Webhook 地址（单个或列表，列表时使用池模式）
             content: 文本内容
             mention_all: 是否 @ 所有人
             mentions: 要 @ 的用户 ID 列表
@@ -140,7 +200,7 @@ class FeishuNotifier:
 
     def send_card(
         self,
-        webhook_url: str,
+        webhook_url: Union[str, List[str]],
         content: str,
         title: str = "通知",
         template: str = DEFAULT_CARD_TEMPLATE,
@@ -150,7 +210,7 @@ class FeishuNotifier:
         发送卡片消息（使用 Markdown 内容）
 
         Args:
-            webhook_url: Webhook 地址
+            webhook_url: Webhook 地址（单个或列表，列表时使用池模式）
             content: Markdown 内容
             title: 卡片标题
             template: 卡片模板颜色
@@ -170,7 +230,7 @@ class FeishuNotifier:
 
     def _send_message(
         self,
-        webhook_url: str,
+        webhook_url: Union[str, List[str]],
         message: FeishuMessage,
         async_send: bool = True
     ) -> SendResult:
@@ -178,15 +238,21 @@ class FeishuNotifier:
         发送消息
 
         Args:
-            webhook_url: Webhook 地址
+            webhook_url: Webhook 地址（单个或列表）
             message: 消息对象
             async_send: 是否异步发送
 
         Returns:
             SendResult: 发送结果
         """
-        manager = self._get_or_create_manager(webhook_url)
-        result = manager.enqueue(message)
+        if isinstance(webhook_url, list):
+            if not webhook_url:
+                raise ValueError("webhook_url list cannot be empty")
+            pool = self._get_or_create_pool(webhook_url)
+            result = pool.enqueue(message.to_message())
+        else:
+            manager = self._get_or_create_manager(webhook_url)
+            result = manager.enqueue(message)
 
         if not async_send:
             result.wait()
@@ -200,15 +266,57 @@ class FeishuNotifier:
                 self._managers[webhook_url] = _FeishuWebhookManager(
                     webhook_url=webhook_url,
                     sender=self.sender,
-                    segmenter=self.segmenter
+                    segmenter=self.segmenter,
+                    rate_limiter=self._get_or_create_rate_limiter(webhook_url),
+                    offloader=self.offloader
                 )
             return self._managers[webhook_url]
 
+    def _get_or_create_rate_limiter(self, webhook_url: str) -> DualRateLimiter:
+        """
+        获取或创建频率限制器（调用方需持有 _managers_lock）
+
+        同一个 URL 在单 webhook 和池模式下共享同一个限制器。
+        """
+        if webhook_url not in self._rate_limiters:
+            self._rate_limiters[webhook_url] = DualRateLimiter()
+        return self._rate_limiters[webhook_url]
+
+    def _get_or_create_pool(self, webhook_urls: List[str]) -> FeishuWebhookPool:
+        """获取或创建 webhook 池（按排序后的 URL 列表缓存）"""
+        pool_key = self._make_pool_key(webhook_urls)
+
+        with self._managers_lock:
+            if pool_key not in self._pools:
+                resources = [
+                    WebhookResource(url, self._get_or_create_rate_limiter(url))
+                    for url in webhook_urls
+                ]
+                self._pools[pool_key] = FeishuWebhookPool(
+                    resources=resources,
+                    sender=self.sender,
+                    segmenter=self.segmenter,
+                    selection_policy=self.selection_policy,
+                    offloader=self.offloader
+                )
+            return self._pools[pool_key]
+
+    @staticmethod
+    def _make_pool_key(webhook_urls: List[str]) -> str:
+        """生成池的唯一key（排序后hash，确保顺序无关）"""
+        key_string = "||".join(sorted(webhook_urls))
+        return hashlib.md5(key_string.encode()).hexdigest()
+
     def stop_all(self):
-        """停止所有 Webhook 管理器"""
+        """停止所有 Webhook 管理器和池"""
         with self._managers_lock:
             for manager in self._managers.values():
                 manager.stop()
+            for pool in self._pools.values():
+                pool.stop()
+
+        if getattr(self, 'offloader', None) is not None:
+            self.offloader.shutdown()
 
     def __del__(self):
         """析构函数"""
@@ -227,13 +335,16 @@ class _FeishuWebhookManager:
         self,
         webhook_url: str,
         sender: FeishuSender,
-        segmenter: MessageSegmenter
+        segmenter: MessageSegmenter,
+        rate_limiter: Optional[DualRateLimiter] = None,
+        offloader: Optional[PreprocessOffloader] = None
     ):
         self.logger = get_logger()
         self.webhook_url = webhook_url
         self.sender = sender
         self.segmenter = segmenter
-        self.rate_limiter = DualRateLimiter()
+        self.offloader = offloader
+        self.rate_limiter = rate_limiter or DualRateLimiter()
 
         # 消息队列
         self.message_queue: queue.Queue = queue.Queue()
@@ -302,15 +413,22 @@ class _FeishuWebhookManager:
             content = self._add_mentions(content, message)
 
         # 分段（卡片消息也可能需要分段）
-        segments = self.segmenter.segment(content, message.msg_type)
-        total_segments = len(segments)
-
-        self.logger.debug(
-            f"Feishu message {message.id} split into {total_segments} segments"
-        )
+        # 流式页码模式下边分段边发送，否则先完成分段以得到总页数
+        if self.segmenter.is_streaming:
+            segments = self.segmenter.iter_segments(content, message.msg_type)
+        elif self.offloader is not None and self.offloader.should_offload(content):
+            # 大消息在执行器中分段，工作线程只等待结果
+            segments = self.offloader.prepare(content, message.msg_type, message.id).segments
+        else:
+            segments = self.segmenter.segment(content, message.msg_type)
+            self.logger.debug(
+                f"Feishu message {message.id} split into {len(segments)} segments"
+            )
 
         # 发送每个分段
+        total_segments = 0
         for i, segment in enumerate(segments):
+            total_segments = i + 1
             # 频率控制
             self.rate_limiter.acquire()
 
@@ -330,17 +448,17 @@ class _FeishuWebhookManager:
 
             if success:
                 self.logger.debug(
-                    f"Feishu segment {i + 1}/{total_segments} sent for message {message.id}"
+                    f"Feishu segment {i + 1} sent for message {message.id}"
                 )
             else:
                 self.logger.error(
-                    f"Feishu segment {i + 1}/{total_segments} failed: {error}"
+                    f"Feishu segment {i + 1} failed: {error}"
                 )
                 result.mark_failed(error)
                 return
 
             # 分段间延迟
-            if i < total_segments - 1:
+            if not segment.is_last:
                 time.sleep(message.segment_interval / 1000.0)
 
         # 成功
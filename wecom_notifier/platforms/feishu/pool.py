@@ -0,0 +1,110 @@
+"""
+飞书 Webhook 池
+
+继承 WebhookPoolBase，实现飞书特定的调度逻辑。
+多个机器人共同分担消息，吞吐量可超过单个机器人 100 条/分钟的限制。
+"""
+from typing import List, Optional, Set, Dict, TYPE_CHECKING
+
+from wecom_notifier.core.pool_base import WebhookPoolBase
+from wecom_notifier.core.segmenter import MessageSegmenter
+from wecom_notifier.core.constants import SELECTION_POLICY_QUOTA
+from wecom_notifier.core.models import Message
+
+from .adapter import FeishuSenderAdapter, FeishuMessageConverter
+from .constants import MSG_TYPE_IMAGE
+
+if TYPE_CHECKING:
+    from wecom_notifier.core.resource import WebhookResource
+    from wecom_notifier.core.moderation import ContentModerator
+    from wecom_notifier.core.offload import PreprocessOffloader
+    from .sender import FeishuSender
+
+
+class FeishuWebhookPool(WebhookPoolBase):
+    """
+    飞书 Webhook 池
+
+    实现飞书特定的调度行为：
+    - 图片消息跳过分段和审核
+    - @ 标签直接写入首个分段的文本，无需额外发送 @all 消息
+    - 资源使用 DualRateLimiter（100 条/分钟 + 5 条/秒）
+    """
+
+    def __init__(
+        self,
+        resources: List["WebhookResource"],
+        sender: "FeishuSender",
+        segmenter: MessageSegmenter,
+        content_moderator: Optional["ContentModerator"] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        selection_policy: str = SELECTION_POLICY_QUOTA,
+        offloader: Optional["PreprocessOffloader"] = None
+    ):
+        """
+        初始化飞书 Webhook 池
+
+        Args:
+            resources: Webhook 资源列表（频率限制器为 DualRateLimiter）
+            sender: 飞书原生 FeishuSender（会被包装为适配器）
+            segmenter: 消息分段器
+            content_moderator: 内容审核器（可选）
+            tenant_weights: 租户权重（tenant → weight），用于多租户公平调度
+            selection_policy: webhook 选择策略（quota / least_latency / p2c / quota_health / ready_time）
+            offloader: 预处理卸载器（可选），大消息的分段和审核在进程池/线程池中执行
+        """
+        # 保存原生 sender 引用
+        self._native_sender = sender
+
+        super().__init__(
+            resources=resources,
+            sender=FeishuSenderAdapter(sender),
+            segmenter=segmenter,
+            converter=FeishuMessageConverter(),
+            content_moderator=content_moderator,
+            tenant_weights=tenant_weights,
+            selection_policy=selection_policy,
+            offloader=offloader
+        )
+
+    def should_skip_segmentation(self, msg_type: str) -> bool:
+        """
+        是否跳过分段
+
+        飞书的图片消息不需要分段。
+        """
+        return msg_type == MSG_TYPE_IMAGE
+
+    def should_skip_moderation(self, msg_type: str) -> bool:
+        """
+        是否跳过审核
+
+        飞书的图片消息不需要审核。
+        """
+        return msg_type == MSG_TYPE_IMAGE
+
+    def _build_message_metadata(self, message: Message, segment_index: int) -> dict:
+        """
+        构建飞书消息元数据
+
+        与单 webhook 模式一致，@ 标签只加在第一个分段。
+        """
+        metadata = super()._build_message_metadata(message, segment_index)
+
+        if segment_index > 0 and metadata.get("feishu", {}).get("mentions"):
+            feishu_extras = dict(metadata["feishu"])
+            feishu_extras.pop("mentions")
+            metadata["feishu"] = feishu_extras
+
+        return metadata
+
+    def _post_send_hook(self, message: Message, used_webhooks: Set[str]) -> bool:
+        """
+        发送后钩子
+
+        飞书的 @ 功能直接在文本中处理，无需额外发送。
+        """
+        return True
+
+
+__all__ = ["FeishuWebhookPool"]
@@ -81,6 +81,30 @@ class DualRateLimiter:
             self.second_limiter.get_next_available_time()
         )
 
+    def estimate_permit_time(self, n: int) -> float:
+        """
+        估算第 n 个后续配额（从0开始计数）可用的时间戳
+
+        Returns:
+            float: 两个限制中较晚的可用时间
+        """
+        return max(
+            self.minute_limiter.estimate_permit_time(n),
+            self.second_limiter.estimate_permit_time(n)
+        )
+
+    def count_permits_until(self, until: float) -> int:
+        """
+        估算截至某一时刻累计可获得的配额数量
+
+        Returns:
+            int: 两个限制中较小的配额数
+        """
+        return min(
+            self.minute_limiter.count_permits_until(until),
+            self.second_limiter.count_permits_until(until)
+        )
+
     def reset(self) -> None:
         """重置两个限制器"""
         self.minute_limiter.reset()
@@ -31,6 +31,15 @@ from wecom_notifier.platforms.wecom.resource import WebhookResource
 # 池
 from wecom_notifier.platforms.wecom.pool import WeComWebhookPool
 
+# 超长内容转附件
+from wecom_notifier.platforms.wecom.attachment import AttachmentPolicy
+
+# 素材ID缓存
+from wecom_notifier.platforms.wecom.media_cache import MediaCache
+
+# 图片准备结果缓存
+from wecom_notifier.platforms.wecom.image_cache import ImageCache
+
 # 适配器
 from wecom_notifier.platforms.wecom.adapter import (
     WeComSenderAdapter,
@@ -56,6 +65,8 @@ from wecom_notifier.platforms.wecom.constants import (
     MSG_TYPE_MARKDOWN,
     MSG_TYPE_MARKDOWN_V2,
     MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
     MAX_BYTES_PER_MESSAGE,
     ERRCODE_SUCCESS,
     ERRCODE_WEBHOOK_INVALID,
@@ -74,6 +85,12 @@ __all__ = [
     "WebhookResource",
     # 池
     "WeComWebhookPool",
+    # 超长内容转附件
+    "AttachmentPolicy",
+    # 素材ID缓存
+    "MediaCache",
+    # 图片准备结果缓存
+    "ImageCache",
     # 适配器
     "WeComSenderAdapter",
     "WeComMessageConverter",
@@ -91,6 +108,8 @@ __all__ = [
     "MSG_TYPE_MARKDOWN",
     "MSG_TYPE_MARKDOWN_V2",
     "MSG_TYPE_IMAGE",
+    "MSG_TYPE_FILE",
+    "MSG_TYPE_VOICE",
     "MAX_BYTES_PER_MESSAGE",
     "ERRCODE_SUCCESS",
     "ERRCODE_WEBHOOK_INVALID",
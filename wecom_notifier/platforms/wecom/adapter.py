@@ -10,6 +10,8 @@ from wecom_notifier.constants import (
     MSG_TYPE_TEXT,
     MSG_TYPE_MARKDOWN_V2,
     MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
 )
 
 if TYPE_CHECKING:
@@ -63,12 +65,13 @@ class WeComSenderAdapter:
 
         Args:
             webhook_url: Webhook地址
-            msg_type: 消息类型（text, markdown_v2, image）
+            msg_type: 消息类型（text, markdown_v2, image, file, voice）
             content: 消息内容
             metadata: 平台特定元数据，支持的字段：
                 - mentioned_list: @的用户列表
                 - mentioned_mobile_list: @的手机号列表
                 - image_md5: 图片MD5值（image类型必需）
+              file / voice 类型的 content 为 (文件名, 原始字节, sha256)，发送时上传素材
 
         Returns:
             Tuple[bool, Optional[str]]: (是否成功, 错误信息)
@@ -90,6 +93,10 @@ class WeComSenderAdapter:
             image_md5 = metadata.get("image_md5", "")
             return self._sender.send_image(webhook_url, content, image_md5)
 
+        elif msg_type in (MSG_TYPE_FILE, MSG_TYPE_VOICE):
+            filename, data, digest = content
+            return self._sender.send_media(webhook_url, msg_type, data, filename, digest)
+
         else:
             return False, f"Unsupported message type: {msg_type}"
 
@@ -0,0 +1,166 @@
+"""
+超长内容转附件 - 分段数过多时改为上传文件发送
+
+60 页的报告需要 60 次请求、约 3 分钟的频率配额。启用后，分段数超过阈值的消息
+整篇上传为 .txt / .md 文件（upload_media），再发送一条 file 消息，请求数从 N 降为 2。
+
+分段完成后判断（页数为实际分段数）；流式页码模式下按预估分段数判断是否放弃边分段边发送。
+附件分段的内容与 send_file() 相同，为 (文件名, 原始字节, sha256)，池中换用其他 webhook 重试时
+使用该 webhook 的 key 重新上传（配置了素材ID缓存时同一 webhook 只上传一次）。
+"""
+import hashlib
+import threading
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from wecom_notifier.core.models import SegmentInfo
+
+from .constants import (
+    MSG_TYPE_TEXT,
+    MSG_TYPE_MARKDOWN_V2,
+    MSG_TYPE_FILE,
+    MIN_UPLOAD_FILE_BYTES,
+    MAX_UPLOAD_FILE_BYTES,
+    DEFAULT_ATTACHMENT_MAX_PAGES,
+    DEFAULT_ATTACHMENT_FILENAME,
+)
+from .models import Message
+
+if TYPE_CHECKING:
+    from wecom_notifier.core.moderation import ContentModerator
+
+
+# 可以转为附件的消息类型及其文件扩展名
+ATTACHMENT_EXTENSIONS = {
+    MSG_TYPE_TEXT: ".txt",
+    MSG_TYPE_MARKDOWN_V2: ".md",
+}
+
+
+class AttachmentPolicy:
+    """
+    超长内容转附件策略（线程安全，同一通知器的所有管理器和池共享）
+
+    使用示例:
+        policy = AttachmentPolicy({"max_pages": 5, "msg_types": ["markdown_v2"]})
+        segments = policy.apply(message, segments, content_moderator)
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化转附件策略
+
+        Args:
+            config: 配置字典，包含：
+                - max_pages: int - 分段数超过该值时转为附件（默认10）
+                - msg_types: List[str] - 适用的消息类型（默认 ["text", "markdown_v2"]）
+                - filename: str - 附件文件名，不含扩展名（默认 "message"，按消息类型追加 .txt / .md）
+        """
+        config = config or {}
+        self.max_pages = config.get("max_pages", DEFAULT_ATTACHMENT_MAX_PAGES)
+        self.msg_types = tuple(config.get("msg_types", tuple(ATTACHMENT_EXTENSIONS)))
+        self.filename = config.get("filename", DEFAULT_ATTACHMENT_FILENAME)
+
+        if self.max_pages < 1:
+            raise ValueError("Attachment max_pages must be at least 1")
+        unsupported = [t for t in self.msg_types if t not in ATTACHMENT_EXTENSIONS]
+        if unsupported:
+            raise ValueError(f"Unsupported attachment msg_types: {unsupported}")
+        if not self.filename:
+            raise ValueError("Attachment filename must not be empty")
+
+        self._lock = threading.Lock()
+
+        # 统计
+        self.attached = 0
+        self.skipped = 0
+
+    def applies_to(self, message: Message) -> bool:
+        """
+        消息类型是否适用
+
+        单独 @ 用户的文本消息不转附件（文件消息不支持 mentioned_list）。
+        """
+        return (
+            message.msg_type in self.msg_types
+            and not message.mentioned_list
+            and not message.mentioned_mobile_list
+        )
+
+    def should_attach(self, message: Message, page_count: int) -> bool:
+        """
+        是否转为附件
+
+        Args:
+            message: 消息对象
+            page_count: 分段数（实际或预估）
+
+        Returns:
+            bool: True 表示应改为上传文件发送
+        """
+        return page_count > self.max_pages and self.applies_to(message)
+
+    def apply(
+        self,
+        message: Message,
+        segments: List[SegmentInfo],
+        content_moderator: Optional["ContentModerator"] = None
+    ) -> List[SegmentInfo]:
+        """
+        分段数超过阈值时替换为单个附件分段，并将消息类型改为 file
+
+        Args:
+            message: 消息对象（转为附件时 msg_type 被改为 "file"）
+            segments: 已分段（并审核）的分段
+            content_moderator: 内容审核器（启用时附件内容同样经过审核替换）
+
+        Returns:
+            List[SegmentInfo]: 附件分段，或原分段（不需要或无法转附件时）
+        """
+        if not self.should_attach(message, len(segments)):
+            return segments
+
+        content = message.content
+        if content_moderator is not None and content_moderator.enabled:
+            content, _ = content_moderator.review(content)
+            if content is None:
+                # 整篇被拒绝（跨分段边界的敏感词），保留已通过审核的分段
+                return self._skip(segments)
+
+        data = content.encode('utf-8')
+        if not MIN_UPLOAD_FILE_BYTES <= len(data) <= MAX_UPLOAD_FILE_BYTES:
+            return self._skip(segments)
+
+        filename = self.filename + ATTACHMENT_EXTENSIONS[message.msg_type]
+        attachment = (filename, data, hashlib.sha256(data).hexdigest())
+        message.msg_type = MSG_TYPE_FILE
+        with self._lock:
+            self.attached += 1
+        return [SegmentInfo(attachment, is_first=True, is_last=True)]
+
+    def _skip(self, segments: List[SegmentInfo]) -> List[SegmentInfo]:
+        """无法转附件，按原分段发送"""
+        with self._lock:
+            self.skipped += 1
+        return segments
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: attached / skipped
+        """
+        with self._lock:
+            return {
+                "attached": self.attached,
+                "skipped": self.skipped,
+            }
+
+    def __repr__(self):
+        return (
+            f"<AttachmentPolicy max_pages={self.max_pages} "
+            f"msg_types={list(self.msg_types)} attached={self.attached}>"
+        )
+
+
+__all__ = ["AttachmentPolicy"]
@@ -33,10 +33,41 @@ from wecom_notifier.core.constants import (
 # 消息类型
 MSG_TYPE_MARKDOWN_V2 = "markdown_v2"  # 企微特有
 MSG_TYPE_IMAGE = "image"
+MSG_TYPE_FILE = "file"
+MSG_TYPE_VOICE = "voice"
+
+# 不分段、不审核的消息类型
+MEDIA_MSG_TYPES = (MSG_TYPE_IMAGE, MSG_TYPE_FILE, MSG_TYPE_VOICE)
+
+# 素材上传（upload_media）设置
+UPLOAD_MEDIA_PATH = "upload_media"  # 上传接口路径（与 webhook 的 send 接口同级，使用同一个 key）
+MEDIA_TYPE_FILE = "file"
+MEDIA_TYPE_VOICE = "voice"
+MIN_UPLOAD_FILE_BYTES = 5  # 上传文件最小字节数
+MAX_UPLOAD_FILE_BYTES = 20 * 1024 * 1024  # 上传文件最大字节数（20MB）
+MAX_UPLOAD_VOICE_BYTES = 2 * 1024 * 1024  # 上传语音最大字节数（2MB，仅支持 AMR 格式）
+VOICE_FILE_EXTENSION = ".amr"
+
+# 素材ID缓存设置（企微的 media_id 有效期为3天）
+DEFAULT_MEDIA_CACHE_TTL = 3 * 24 * 3600 - 3600  # 缓存有效期（秒，预留1小时余量）
+DEFAULT_MEDIA_CACHE_MAX_SIZE = 1000  # 最大缓存条目数
+
+# 图片准备结果缓存设置
+DEFAULT_IMAGE_CACHE_MAX_SIZE = 16  # 最多缓存的图片数量（LRU 淘汰）
+DEFAULT_IMAGE_CACHE_MAX_CHARS = 16 * 1024 * 1024  # 缓存的 base64 总字符数上限
+IMAGE_PREPARE_CHUNK_BYTES = 3 * 64 * 1024  # 流式编码的块大小（3 的倍数，块之间不产生 base64 填充）
+
+# 超长内容转附件设置
+DEFAULT_ATTACHMENT_MAX_PAGES = 10  # 分段数超过该值时改为上传文件发送
+DEFAULT_ATTACHMENT_FILENAME = "message"  # 附件文件名（不含扩展名，按消息类型追加 .txt / .md）
 
 # 分段设置（企微特定）
 MAX_BYTES_PER_MESSAGE = 3800  # 每条消息最大字节数（留安全余量，实际限制4096）
 
+# 流式输入（send_stream）设置
+DEFAULT_STREAM_FLUSH_INTERVAL = 5.0  # 缓冲区有内容时最长等待多久发出一页（秒）
+DEFAULT_STREAM_MAX_PENDING = 3  # 最多同时排队的页数，超出时等待最早的一页发送完成
+
 # 服务端频控重试设置
 RATE_LIMIT_MAX_RETRIES = 5  # 服务端频控最大重试次数
 RATE_LIMIT_WAIT_TIME = 65  # 服务端频控等待时间（秒），略大于60秒以确保安全
@@ -45,6 +76,10 @@ RATE_LIMIT_WAIT_TIME = 65  # 服务端频控等待时间（秒），略大于60
 ERRCODE_SUCCESS = 0  # 成功
 ERRCODE_WEBHOOK_INVALID = 93000  # webhook不存在
 ERRCODE_RATE_LIMIT = 45009  # 频率限制
+ERRCODE_INVALID_MEDIA_ID = 40007  # media_id 无效（已过期）
+
+# webhook 无效（93000）时 Sender 返回的错误信息前缀，池据此将 webhook 永久标记为失效
+WEBHOOK_INVALID_ERROR_PREFIX = "Invalid webhook"
 
 __all__ = [
     # 从核心导入的通用常量
@@ -66,10 +101,31 @@ __all__ = [
     # 企微特定常量
     "MSG_TYPE_MARKDOWN_V2",
     "MSG_TYPE_IMAGE",
+    "MSG_TYPE_FILE",
+    "MSG_TYPE_VOICE",
+    "MEDIA_MSG_TYPES",
+    "UPLOAD_MEDIA_PATH",
+    "MEDIA_TYPE_FILE",
+    "MEDIA_TYPE_VOICE",
+    "MIN_UPLOAD_FILE_BYTES",
+    "MAX_UPLOAD_FILE_BYTES",
+    "MAX_UPLOAD_VOICE_BYTES",
+    "VOICE_FILE_EXTENSION",
+    "DEFAULT_MEDIA_CACHE_TTL",
+    "DEFAULT_MEDIA_CACHE_MAX_SIZE",
+    "DEFAULT_IMAGE_CACHE_MAX_SIZE",
+    "DEFAULT_IMAGE_CACHE_MAX_CHARS",
+    "IMAGE_PREPARE_CHUNK_BYTES",
+    "DEFAULT_ATTACHMENT_MAX_PAGES",
+    "DEFAULT_ATTACHMENT_FILENAME",
     "MAX_BYTES_PER_MESSAGE",
+    "DEFAULT_STREAM_FLUSH_INTERVAL",
+    "DEFAULT_STREAM_MAX_PENDING",
     "RATE_LIMIT_MAX_RETRIES",
     "RATE_LIMIT_WAIT_TIME",
     "ERRCODE_SUCCESS",
     "ERRCODE_WEBHOOK_INVALID",
     "ERRCODE_RATE_LIMIT",
+    "ERRCODE_INVALID_MEDIA_ID",
+    "WEBHOOK_INVALID_ERROR_PREFIX",
 ]
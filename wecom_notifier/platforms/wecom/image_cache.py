@@ -0,0 +1,133 @@
+"""
+图片准备结果缓存 - 相同图片只编码一次
+
+同一张看板截图发到 30 个群时，send_image 每次都要读取文件、计算 base64 和 MD5。
+本模块缓存 Sender.prepare_image() 的结果 (base64, md5)，LRU 有界，同一通知器的所有发送共享：
+
+- 文件路径按 (真实路径, 文件大小, 修改时间, 状态变更时间) 缓存，文件被修改后自动失效。
+  键只反映文件的元数据：在时间戳精度较粗的文件系统（如 FAT 为 2 秒）上，
+  同一精度区间内原地改写为相同大小的新内容时，仍会返回旧图片。此类场景请关闭缓存或改用新文件名
+- base64 输入按字符串本身缓存（字符串的哈希值由解释器缓存，同一对象重复发送时查找为 O(1)），
+  命中时跳过解码和 MD5 计算
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from .constants import DEFAULT_IMAGE_CACHE_MAX_SIZE, DEFAULT_IMAGE_CACHE_MAX_CHARS
+
+
+class ImageCache:
+    """
+    图片准备结果缓存（线程安全，LRU 有界）
+
+    使用示例:
+        cache = ImageCache({"max_size": 16})
+        base64_data, md5 = Sender.prepare_image("dashboard.png", cache=cache)  # 未命中，读取并编码
+        base64_data, md5 = Sender.prepare_image("dashboard.png", cache=cache)  # 命中
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化图片缓存
+
+        Args:
+            config: 配置字典，包含：
+                - max_size: int - 最大缓存图片数（默认16，超出时淘汰最久未使用的条目）
+                - max_chars: int - 缓存的 base64 总字符数上限（默认 16M，超出时淘汰最久未使用的条目，
+                  单张超过上限的图片不缓存）
+        """
+        config = config or {}
+        self.max_size = config.get("max_size", DEFAULT_IMAGE_CACHE_MAX_SIZE)
+        self.max_chars = config.get("max_chars", DEFAULT_IMAGE_CACHE_MAX_CHARS)
+
+        if self.max_size <= 0:
+            raise ValueError("Image cache max_size must be positive")
+        if self.max_chars <= 0:
+            raise ValueError("Image cache max_chars must be positive")
+
+        self._entries: "OrderedDict[Hashable, Tuple[str, str]]" = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evicted_total = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键（见 Sender.prepare_image）
+
+        Returns:
+            Optional[Tuple[str, str]]: 命中时返回 (base64, md5)，否则返回 None
+        """
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return prepared
+
+    def put(self, key: Hashable, prepared: Tuple[str, str]) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            prepared: (base64, md5)
+        """
+        size = len(prepared[0])
+        if size > self.max_chars:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_chars -= len(old[0])
+            self._entries[key] = prepared
+            self._total_chars += size
+
+            while len(self._entries) > self.max_size or self._total_chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_chars -= len(evicted[0])
+                self.evicted_total += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: size / chars / hits / misses / evicted_total
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "chars": self._total_chars,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted_total": self.evicted_total,
+            }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._total_chars = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (
+            f"<ImageCache size={len(self._entries)}/{self.max_size} "
+            f"hits={self.hits} misses={self.misses}>"
+        )
+
+
+__all__ = ["ImageCache"]
@@ -4,19 +4,31 @@
 import queue
 import threading
 import time
-from typing import Optional, TYPE_CHECKING
+from collections import OrderedDict
+from typing import Iterator, Optional, Dict, TYPE_CHECKING
 
 from wecom_notifier.core.logger import get_logger
 from wecom_notifier.core.models import SendResult, SegmentInfo
+from wecom_notifier.core.fair_queue import FairMessageQueue
+from wecom_notifier.core.admission import estimate_delivery_time
 from wecom_notifier.core.rate_limiter import RateLimiter
 from wecom_notifier.core.segmenter import MessageSegmenter
 
 from .sender import Sender
 from .models import Message
-from .constants import MSG_TYPE_TEXT, MSG_TYPE_MARKDOWN_V2, MSG_TYPE_IMAGE
+from .constants import (
+    MSG_TYPE_TEXT,
+    MSG_TYPE_MARKDOWN_V2,
+    MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
+    MEDIA_MSG_TYPES,
+)
 
 if TYPE_CHECKING:
+    from .attachment import AttachmentPolicy
     from wecom_notifier.core.moderation import ContentModerator
+    from wecom_notifier.core.offload import PreprocessOffloader
 
 
 class WebhookManager:
@@ -26,13 +38,19 @@ class WebhookManager:
     为每个webhook维护独立的消息队列、频率限制器和发送线程
     """
 
+    # 保留的可续传失败消息上限（超出时丢弃最早的）
+    MAX_RETRYABLE_MESSAGES = 1000
+
     def __init__(
             self,
             webhook_url: str,
             sender: Sender,
             segmenter: MessageSegmenter,
             rate_limiter: RateLimiter,
-            content_moderator: Optional["ContentModerator"] = None
+            content_moderator: Optional["ContentModerator"] = None,
+            tenant_weights: Optional[Dict[str, float]] = None,
+            offloader: Optional["PreprocessOffloader"] = None,
+            attachment_policy: Optional["AttachmentPolicy"] = None
     ):
         """
         初始化Webhook管理器
@@ -43,6 +61,9 @@ class WebhookManager:
             segmenter: 消息分段器
             rate_limiter: 频率限制器
             content_moderator: 内容审核器（可选）
+            tenant_weights: 租户权重（tenant → weight），用于多租户公平调度
+            offloader: 预处理卸载器（可选），大消息的分段和审核在进程池/线程池中执行
+            attachment_policy: 超长内容转附件策略（可选），分段数过多的消息改为上传文件发送
         """
         self.logger = get_logger()
         self.webhook_url = webhook_url
@@ -50,13 +71,27 @@ class WebhookManager:
         self.segmenter = segmenter
         self.rate_limiter = rate_limiter
         self.content_moderator = content_moderator
+        self.offloader = offloader
+        self.attachment_policy = attachment_policy
 
-        # 消息队列
-        self.message_queue = queue.Queue()
+        # 消息队列（按租户加权公平调度，成本为预估分段数）
+        self.message_queue = FairMessageQueue(
+            weights=tenant_weights,
+            cost_func=self._estimate_message_cost,
+            on_expired=self._on_message_expired,
+            on_superseded=self._on_message_superseded
+        )
 
         # 结果字典，用于存储SendResult
         self.results = {}
 
+        # 当前正在发送的消息剩余分段数（用于 ETA 估算）
+        self._inflight_segments = 0
+
+        # 发送失败、可断点续传的消息（message_id → Message）
+        self._retryable: "OrderedDict[str, Message]" = OrderedDict()
+        self._retryable_lock = threading.Lock()
+
         # 停止标志（必须在启动线程前初始化）
         self._stop_flag = threading.Event()
 
@@ -74,15 +109,132 @@ class WebhookManager:
             message: 消息对象
 
         Returns:
-            SendResult: 发送结果对象
+            SendResult: 发送结果对象（result.eta 为预计送达时间；
+                预计超出 message.max_delay 时直接返回 rejected 状态的结果）
         """
         result = SendResult(message.id)
+        result.eta = self.estimate_eta(message)
+
+        # 准入控制：预计无法在 max_delay 内送达则立即拒绝
+        max_delay = getattr(message, "max_delay", None)
+        if max_delay is not None and result.eta - time.time() > max_delay:
+            delay = result.eta - time.time()
+            self.logger.warning(
+                f"Message {message.id} rejected: estimated delay {delay:.1f}s exceeds max_delay {max_delay}s"
+            )
+            result.mark_rejected(
+                f"Estimated delivery in {delay:.1f}s exceeds max_delay {max_delay}s"
+            )
+            return result
+
         self.results[message.id] = result
         self.message_queue.put(message)
 
         self.logger.debug(f"Message {message.id} enqueued (type={message.msg_type})")
         return result
 
+    def retry(self, result: SendResult) -> Optional[SendResult]:
+        """
+        重试发送失败的消息（断点续传）
+
+        从第一个未送达的分段继续发送，已送达的分段不会重发。
+
+        Args:
+            result: 发送失败的结果对象
+
+        Returns:
+            Optional[SendResult]: 新的结果对象；消息不可重试（不属于本管理器或未失败）时返回 None
+        """
+        with self._retryable_lock:
+            message = self._retryable.pop(result.message_id, None)
+        if message is None:
+            return None
+
+        new_result = SendResult(message.id)
+        new_result.delivered_segments = message.delivered_segments
+        new_result.eta = self.estimate_eta(message)
+        self.results[message.id] = new_result
+        self.message_queue.put(message)
+
+        self.logger.info(
+            f"Message {message.id} re-enqueued for retry "
+            f"({message.delivered_segments} segments already delivered)"
+        )
+        return new_result
+
+    def can_retry(self, result: SendResult) -> bool:
+        """消息是否可以通过 retry() 断点续传"""
+        with self._retryable_lock:
+            return result.message_id in self._retryable
+
+    def get_failed_message(self, message_id: str) -> Optional[Message]:
+        """获取可续传的失败消息（含分段和检查点），不存在时返回 None"""
+        with self._retryable_lock:
+            return self._retryable.get(message_id)
+
+    def _fail_resumable(self, message: Message, result: SendResult, error: str):
+        """标记失败，并保留消息（含检查点和分段）以便 retry() 续传"""
+        with self._retryable_lock:
+            self._retryable[message.id] = message
+            while len(self._retryable) > self.MAX_RETRYABLE_MESSAGES:
+                self._retryable.popitem(last=False)
+        result.mark_failed(error)
+
+    def estimate_eta(self, message: Message) -> float:
+        """
+        估算消息的预计送达时间
+
+        考虑：队列积压的预估分段数、正在发送的剩余分段、本消息的分段数、频率限制器状态。
+
+        Args:
+            message: 消息对象
+
+        Returns:
+            float: 预计送达时间戳
+        """
+        segments = (
+            self.message_queue.pending_cost()
+            + self._inflight_segments
+            + self._estimate_message_cost(message)
+        )
+        return estimate_delivery_time(
+            [self.rate_limiter],
+            int(segments),
+            segment_interval=message.segment_interval / 1000.0
+        )
+
+    def _on_message_expired(self, message: Message):
+        """队列中的消息过期回调（未消耗配额）"""
+        self.logger.warning(f"Message {message.id} expired in queue, dropped without sending")
+        result = self.results.get(message.id)
+        if result:
+            result.mark_expired()
+
+    def _on_message_superseded(self, old_message: Message, new_message: Message):
+        """队列中的消息被相同 conflate_key 的新消息取代"""
+        self.logger.debug(
+            f"Message {old_message.id} superseded by {new_message.id} "
+            f"(conflate_key={new_message.conflate_key})"
+        )
+        result = self.results.get(old_message.id)
+        if result:
+            result.mark_superseded(new_message.id)
+
+    def _estimate_message_cost(self, message: Message) -> int:
+        """估算消息消耗的配额（预估分段数），用于公平调度"""
+        if message.segments is not None:
+            # 续传的消息只需发送剩余分段
+            return max(1, len(message.segments) - message.delivered_segments)
+        if message.estimated_segments is None:
+            if message.msg_type in MEDIA_MSG_TYPES:
+                count = 1
+            else:
+                count = self.segmenter.estimate_segment_count(message.content, message.msg_type)
+                if self.attachment_policy is not None and self.attachment_policy.should_attach(message, count):
+                    count = 1
+            message.estimated_segments = count
+        return message.estimated_segments
+
     def _process_queue(self):
         """处理消息队列的工作线程"""
         self.logger.info(f"Worker thread started for {self.webhook_url}")
@@ -104,6 +256,7 @@ class WebhookManager:
                 if result:
                     result.mark_failed(f"Internal error: {e}")
             finally:
+                self._inflight_segments = 0
                 self.message_queue.task_done()
 
     def _process_message(self, message: Message):
@@ -118,20 +271,124 @@ class WebhookManager:
             self.logger.error(f"Result not found for message {message.id}")
             return
 
+        # 出队时检查截止时间（分段前，过期消息不消耗配额）
+        if message.is_expired():
+            self.logger.warning(f"Message {message.id} expired before processing, dropped without sending")
+            result.mark_expired()
+            return
+
         self.logger.info(f"Processing message {message.id} (type={message.msg_type})")
 
+        streaming = message.segments is None and self._can_stream(message)
+        if streaming:
+            # 流式页码：边分段边发送，第一页无需等待整篇文档分段完成
+            segments = self._stream_segments(message)
+            expected_segments = self._estimate_message_cost(message)
+            total_label = "?"
+        else:
+            # 续传的消息直接使用首次处理时缓存的分段
+            if message.segments is None:
+                prepared = self._prepare_segments(message, result)
+                if prepared is None:
+                    return
+                if self.attachment_policy is not None:
+                    # 分段数过多时改为上传文件发送（msg_type 变为 file）
+                    prepared = self.attachment_policy.apply(message, prepared, self.content_moderator)
+                message.segments = prepared
+
+            segments = iter(message.segments[message.delivered_segments:])
+            expected_segments = len(message.segments)
+            total_label = str(expected_segments)
+
+        start_index = message.delivered_segments
+        if start_index:
+            self.logger.info(f"Resuming message {message.id} from segment {start_index + 1}/{total_label}")
+
+        # 发送每个分段（跳过已送达的分段）
+        for i, segment in enumerate(segments, start_index):
+            self._inflight_segments = max(1, expected_segments - i)
+
+            # 频率控制
+            self.rate_limiter.acquire()
+
+            # 发送
+            success, error = self._send_segment(message, segment.content, i)
+
+            if not success:
+                # 发送失败，立即停止（保留检查点以便续传）
+                if streaming:
+                    # 补齐剩余分段，续传时原样重发
+                    for _ in segments:
+                        pass
+                    total_label = str(len(message.segments))
+                self.logger.error(f"Segment {i + 1}/{total_label} failed for message {message.id}: {error}")
+                self._fail_resumable(message, result, f"Segment {i + 1}/{total_label} failed: {error}")
+                return
+
+            # 更新检查点
+            message.delivered_segments = i + 1
+            result.delivered_segments = i + 1
+
+            self.logger.debug(f"Segment {i + 1}/{total_label} sent successfully for message {message.id}")
+
+            # 分段间延迟（最后一个分段不需要延迟）
+            if not segment.is_last:
+                time.sleep(message.segment_interval / 1000.0)
+
+        total_segments = len(message.segments)
+
+        # 处理@all workaround（针对markdown_v2和image）
+        if message.needs_mention_all_workaround():
+            self.logger.debug(f"Sending @all workaround for message {message.id}")
+
+            self.rate_limiter.acquire()
+            success, error = self.sender.send_mention_all(self.webhook_url)
+
+            if not success:
+                self.logger.error(f"@all workaround failed for message {message.id}: {error}")
+                self._fail_resumable(message, result, f"@all workaround failed: {error}")
+                return
+
+        # 所有分段发送成功
+        self.logger.info(f"Message {message.id} sent successfully ({total_segments} segments)")
+        result.segment_count = total_segments
+        result.mark_success()
+
+    def _prepare_segments(self, message: Message, result: SendResult):
+        """
+        分段并审核
+
+        Args:
+            message: 消息对象
+            result: 发送结果对象（被审核拒绝时标记失败）
+
+        Returns:
+            Optional[List[SegmentInfo]]: 分段列表，被审核拒绝时返回 None
+        """
+        moderation_enabled = bool(self.content_moderator and self.content_moderator.enabled)
+
+        # 大消息的分段和审核卸载到执行器，工作线程只等待结果
+        if self.offloader is not None and self.offloader.should_offload(message.content):
+            prepared = self.offloader.prepare(
+                message.content, message.msg_type, message.id, moderate=moderation_enabled
+            )
+            if prepared.blocked is not None:
+                self._block_message(message, result, prepared.blocked)
+                return None
+            self.logger.debug(f"Message {message.id} split into {len(prepared.segments)} segments (offloaded)")
+            return prepared.segments
+
         # 分段
         segments = self._get_segments(message)
-        total_segments = len(segments)
 
-        self.logger.debug(f"Message {message.id} split into {total_segments} segments")
+        self.logger.debug(f"Message {message.id} split into {len(segments)} segments")
 
         # 审核分段（如果启用）
-        if self.content_moderator and self.content_moderator.enabled:
+        if moderation_enabled:
             moderated_segments = []
             for segment in segments:
-                # 跳过图片类型的审核
-                if message.msg_type == MSG_TYPE_IMAGE:
+                # 跳过图片、文件、语音类型的审核
+                if message.msg_type in MEDIA_MSG_TYPES:
                     moderated_segments.append(segment)
                     continue
 
@@ -143,16 +400,8 @@ class WebhookManager:
                 )
 
                 if moderated_content is None:
-                    # 被拒绝，发送敏感词提示
-                    self.logger.warning(f"Message {message.id} blocked by content moderator")
-                    alert_msg = self.content_moderator.create_block_alert(segment.content, message.id)
-
-                    # 发送提示消息
-                    self.rate_limiter.acquire()
-                    self.sender.send_text(self.webhook_url, alert_msg)
-
-                    result.mark_failed("Content blocked by moderator")
-                    return
+                    self._block_message(message, result, segment)
+                    return None
 
                 # 使用审核后的内容
                 moderated_segment = SegmentInfo(
@@ -166,41 +415,52 @@ class WebhookManager:
 
             segments = moderated_segments
 
-        # 发送每个分段
-        for i, segment in enumerate(segments):
-            # 频率控制
-            self.rate_limiter.acquire()
+        return segments
 
-            # 发送
-            success, error = self._send_segment(message, segment.content, i)
+    def _block_message(self, message: Message, result: SendResult, segment: SegmentInfo):
+        """消息被审核拒绝：发送敏感词提示并标记失败"""
+        self.logger.warning(f"Message {message.id} blocked by content moderator")
+        alert_msg = self.content_moderator.create_block_alert(segment.content, message.id)
 
-            if not success:
-                # 发送失败，立即停止
-                self.logger.error(f"Segment {i + 1}/{total_segments} failed for message {message.id}: {error}")
-                result.mark_failed(f"Segment {i + 1}/{total_segments} failed: {error}")
-                return
+        # 发送提示消息
+        self.rate_limiter.acquire()
+        self.sender.send_text(self.webhook_url, alert_msg)
 
-            self.logger.debug(f"Segment {i + 1}/{total_segments} sent successfully for message {message.id}")
+        result.mark_blocked()
 
-            # 分段间延迟（最后一个分段不需要延迟）
-            if i < total_segments - 1:
-                time.sleep(message.segment_interval / 1000.0)
+    def _can_stream(self, message: Message) -> bool:
+        """
+        是否可以边分段边发送
 
-        # 处理@all workaround（针对markdown_v2和image）
-        if message.needs_mention_all_workaround():
-            self.logger.debug(f"Sending @all workaround for message {message.id}")
+        需要分段器使用流式页码模式；启用内容审核时需在发送前审核全部分段，不能流式发送。
+        预估分段数超过转附件阈值时先完成分段，再决定是否改为上传文件发送。
+        """
+        return (
+            self.segmenter.is_streaming
+            and message.msg_type not in MEDIA_MSG_TYPES
+            and not (self.content_moderator and self.content_moderator.enabled)
+            and not (
+                self.attachment_policy is not None
+                and self.attachment_policy.should_attach(
+                    message, self.segmenter.estimate_segment_count(message.content, message.msg_type)
+                )
+            )
+        )
 
-            self.rate_limiter.acquire()
-            success, error = self.sender.send_mention_all(self.webhook_url)
+    def _stream_segments(self, message: Message) -> Iterator[SegmentInfo]:
+        """
+        逐页产出分段，并将已产出的分段缓存到 message.segments（用于断点续传）
 
-            if not success:
-                self.logger.error(f"@all workaround failed for message {message.id}: {error}")
-                result.mark_failed(f"@all workaround failed: {error}")
-                return
+        Args:
+            message: 消息对象
 
-        # 所有分段发送成功
-        self.logger.info(f"Message {message.id} sent successfully ({total_segments} segments)")
-        result.mark_success()
+        Yields:
+            SegmentInfo: 分段
+        """
+        message.segments = []
+        for segment in self.segmenter.iter_segments(message.content, message.msg_type):
+            message.segments.append(segment)
+            yield segment
 
     def _get_segments(self, message: Message):
         """
@@ -212,8 +472,8 @@ class WebhookManager:
         Returns:
             List[SegmentInfo]: 分段列表
         """
-        # 对于图片类型，不需要分段
-        if message.msg_type == MSG_TYPE_IMAGE:
+        # 对于图片、文件、语音类型，不需要分段
+        if message.msg_type in MEDIA_MSG_TYPES:
             return [SegmentInfo(message.content, is_first=True, is_last=True)]
 
         # 文本和Markdown需要分段
@@ -251,6 +511,11 @@ class WebhookManager:
                 # content 应该是已经准备好的图片数据
                 return self.sender.send_image(self.webhook_url, content[0], content[1])
 
+        elif message.msg_type in (MSG_TYPE_FILE, MSG_TYPE_VOICE):
+            # 文件/语音内容为 (文件名, 原始字节, sha256) 元组，上传后发送
+            filename, data, digest = content
+            return self.sender.send_media(self.webhook_url, message.msg_type, data, filename, digest)
+
         else:
             return False, f"Unsupported message type: {message.msg_type}"
 
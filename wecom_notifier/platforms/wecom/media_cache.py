@@ -0,0 +1,224 @@
+"""
+素材ID缓存 - 相同文件在同一 webhook 上只上传一次
+
+每天把同一份 PDF 或图表发到几十个群时，每次都要通过 upload_media 上传数 MB 的数据。
+企微的 media_id 有效期为 3 天，本模块按 (webhook key, 素材类型, 文件名, 内容哈希) 缓存 media_id：
+
+- 查找 O(1)（OrderedDict，LRU 顺序，超过容量时淘汰最久未使用的条目）
+- 条目在有效期（默认 3 天减 1 小时余量）后失效，查询时惰性清理
+- 发送时 media_id 被判定无效（40007）会作废条目并重新上传
+- 可选持久化到 .wecom_cache/media_ids.json，进程重启后仍然有效
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from wecom_notifier.core.logger import get_logger
+
+from .constants import DEFAULT_MEDIA_CACHE_TTL, DEFAULT_MEDIA_CACHE_MAX_SIZE
+
+
+class MediaCache:
+    """
+    素材ID缓存（线程安全）
+
+    使用示例:
+        cache = MediaCache({"persist": True})
+        key = cache.make_key(webhook_url, "file", hashlib.sha256(data).hexdigest(), "report.pdf")
+        media_id = cache.get(key)
+        if media_id is None:
+            media_id = upload(...)
+            cache.put(key, media_id)
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化素材ID缓存
+
+        Args:
+            config: 配置字典，包含：
+                - ttl: float - 缓存有效期（秒，默认 3 天减 1 小时，不应超过企微的 3 天有效期）
+                - max_size: int - 最大条目数（默认1000，超出时淘汰最久未使用的条目）
+                - persist: bool - 是否持久化到磁盘（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+        """
+        config = config or {}
+        self.logger = get_logger()
+        self.ttl = config.get("ttl", DEFAULT_MEDIA_CACHE_TTL)
+        self.max_size = config.get("max_size", DEFAULT_MEDIA_CACHE_MAX_SIZE)
+        self.persist = config.get("persist", False)
+        self.cache_dir = config.get("cache_dir", ".wecom_cache")
+        self.cache_file = os.path.join(self.cache_dir, "media_ids.json")
+
+        if self.ttl <= 0:
+            raise ValueError("Media cache ttl must be positive")
+        if self.max_size <= 0:
+            raise ValueError("Media cache max_size must be positive")
+
+        # key → (media_id, 失效时间)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.expired_total = 0
+        self.evicted_total = 0
+
+        if self.persist:
+            self._load()
+
+    @staticmethod
+    def make_key(webhook_url: str, media_type: str, digest: str, filename: str) -> str:
+        """
+        计算缓存键
+
+        media_id 只能由上传它的机器人使用，键中包含 webhook 的 key（URL 中没有 key 参数时使用整个 URL）；
+        群聊中显示的文件名在上传时确定，文件名不同时分别上传。
+
+        Args:
+            webhook_url: Webhook地址
+            media_type: 素材类型（file / voice）
+            digest: 文件内容的 SHA-256 十六进制摘要
+            filename: 文件名
+
+        Returns:
+            str: 缓存键
+        """
+        webhook_key = parse_qs(urlsplit(webhook_url).query).get("key", [webhook_url])[0]
+        return f"{webhook_key}:{media_type}:{filename}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查询缓存
+
+        Args:
+            key: make_key() 计算的缓存键
+
+        Returns:
+            Optional[str]: 未失效的 media_id，不存在或已失效时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                self.expired_total += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, media_id: str) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: make_key() 计算的缓存键
+            media_id: 上传得到的 media_id
+        """
+        with self._lock:
+            self._entries[key] = (media_id, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted_total += 1
+
+        if self.persist:
+            self._save()
+
+    def invalidate(self, key: str) -> None:
+        """
+        作废条目（企微判定 media_id 无效时调用）
+
+        Args:
+            key: make_key() 计算的缓存键
+        """
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+
+        if removed and self.persist:
+            self._save()
+
+    def _save(self) -> None:
+        """将未失效的条目保存到缓存文件"""
+        now = time.time()
+        with self._lock:
+            entries = [
+                {"key": key, "media_id": media_id, "expires_at": expires_at}
+                for key, (media_id, expires_at) in self._entries.items()
+                if expires_at > now
+            ]
+
+        with self._save_lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_file = f"{self.cache_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({"version": "1.0", "entries": entries}, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+            except Exception as e:
+                self.logger.error(f"Failed to save media cache: {e}")
+
+    def _load(self) -> None:
+        """从缓存文件恢复未失效的条目（按保存时的 LRU 顺序）"""
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+
+            now = time.time()
+            for item in cache_data.get("entries", [])[-self.max_size:]:
+                if item["expires_at"] > now:
+                    self._entries[item["key"]] = (item["media_id"], item["expires_at"])
+
+            self.logger.debug(f"Loaded {len(self._entries)} media ids from cache")
+
+        except Exception as e:
+            self.logger.error(f"Failed to load media cache: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            Dict[str, int]: size / hits / misses / expired_total / evicted_total
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired_total": self.expired_total,
+                "evicted_total": self.evicted_total,
+            }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+        if self.persist:
+            self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __repr__(self):
+        return (
+            f"<MediaCache size={len(self)}/{self.max_size} ttl={self.ttl}s "
+            f"hits={self.hits} persist={self.persist}>"
+        )
+
+
+__all__ = ["MediaCache"]
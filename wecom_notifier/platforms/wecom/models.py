@@ -1,12 +1,17 @@
 """
 企业微信消息模型
 """
+import time
 import uuid
 from typing import Optional, List, Any
 
+from wecom_notifier.core.models import resolve_deadline
+
 from .constants import (
     MSG_TYPE_MARKDOWN_V2,
     MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
     DEFAULT_SEGMENT_INTERVAL
 )
 
@@ -24,6 +29,13 @@ class Message:
             mentioned_list: Optional[List[str]] = None,
             mentioned_mobile_list: Optional[List[str]] = None,
             segment_interval: int = DEFAULT_SEGMENT_INTERVAL,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            max_delay: Optional[float] = None,
+            conflate_key: Optional[str] = None,
+            idempotency_key: Optional[str] = None,
+            digest_group: Optional[str] = None,
             **kwargs
     ):
         self.id = str(uuid.uuid4())
@@ -33,11 +45,26 @@ class Message:
         self.mentioned_list = mentioned_list or []
         self.mentioned_mobile_list = mentioned_mobile_list or []
         self.segment_interval = segment_interval
+        self.tenant = tenant  # 公平调度的租户标识（None 表示默认租户）
+        self.deadline = resolve_deadline(ttl, deadline)  # 截止时间戳（None 表示永不过期）
+        self.max_delay = max_delay  # 可接受的最大送达延迟（秒），None 表示不限制
+        self.conflate_key = conflate_key  # 合并键（排队中相同 key 的旧消息被取代）
+        self.idempotency_key = idempotency_key  # 幂等键（重复请求返回原始结果）
+        self.digest_group = digest_group  # 摘要分组（设置后缓冲并合并为汇总消息发送）
+        self.delivered_segments = 0  # 已确认送达的分段数（断点续传检查点）
+        self.segments = None  # 首次处理时缓存的分段（重试时原样重发未送达部分）
+        self.estimated_segments = None  # 入队时估算的分段数（缓存，避免重复分段计数）
         self.extra_params = kwargs
 
     def needs_mention_all_workaround(self) -> bool:
-        """是否需要额外发送@all消息（针对markdown_v2和image）"""
-        return self.mention_all and self.msg_type in [MSG_TYPE_MARKDOWN_V2, MSG_TYPE_IMAGE]
+        """是否需要额外发送@all消息（针对markdown_v2、image、file和voice）"""
+        return self.mention_all and self.msg_type in [MSG_TYPE_MARKDOWN_V2, MSG_TYPE_IMAGE, MSG_TYPE_FILE, MSG_TYPE_VOICE]
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """是否已超过截止时间"""
+        if self.deadline is None:
+            return False
+        return (now if now is not None else time.time()) >= self.deadline
 
 
 __all__ = ["Message"]
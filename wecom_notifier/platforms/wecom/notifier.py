@@ -2,19 +2,35 @@
 企业微信通知器 - 主类
 """
 import hashlib
-from typing import Optional, List, Dict, Union, TYPE_CHECKING
+import time
+from typing import IO, Iterable, Optional, List, Dict, Union, TYPE_CHECKING
 
 from wecom_notifier.core.logger import get_logger
 from wecom_notifier.core.rate_limiter import RateLimiter
 from wecom_notifier.core.segmenter import MessageSegmenter
-from wecom_notifier.core.models import SendResult
+from wecom_notifier.core.segment_cache import SegmentCache
+from wecom_notifier.core.offload import PreprocessOffloader
+from wecom_notifier.core.stream_segmenter import StreamSegmenter, iter_stream_pages
+from wecom_notifier.core.models import SendResult, RESULT_STATUS_FAILED
+from wecom_notifier.core.dedup import DedupCache
+from wecom_notifier.core.idempotency import IdempotencyStore
+from wecom_notifier.core.digest import DigestAggregator, DigestItem
+from wecom_notifier.core.dead_letter import DeadLetter, DeadLetterQueue, DEFAULT_REPLAY_RATE
+from wecom_notifier.core.constants import SELECTION_POLICY_QUOTA, PAGE_INDICATOR_MODE_TOTAL, PACKING_GREEDY
 
 from .constants import (
     MSG_TYPE_TEXT,
     MSG_TYPE_MARKDOWN_V2,
     MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
+    DEFAULT_STREAM_FLUSH_INTERVAL,
+    DEFAULT_STREAM_MAX_PENDING,
 )
 from .models import Message
+from .attachment import AttachmentPolicy
+from .media_cache import MediaCache
+from .image_cache import ImageCache
 from .sender import Sender, RetryConfig
 from .manager import WebhookManager
 from .pool import WeComWebhookPool
@@ -34,6 +50,11 @@ class WeComNotifier:
     - 频率控制（20条/分钟）
     - 长文本自动分段
     - 同步/异步发送
+    - 多租户加权公平调度
+    - 时间窗口内重复告警去重（可选）
+    - 幂等键（丢弃上游重试产生的重复发送）
+    - 告警风暴摘要聚合
+    - 死信队列与限速重放
 
     日志说明：
         本库使用 loguru 进行日志记录，库名为 'wecom_notifier'。
@@ -58,7 +79,24 @@ class WeComNotifier:
             max_retries: int = 3,
             retry_delay: float = 2.0,
             enable_content_moderation: bool = False,
-            moderation_config: Optional[Dict] = None
+            moderation_config: Optional[Dict] = None,
+            tenant_weights: Optional[Dict[str, float]] = None,
+            enable_dedup: bool = False,
+            dedup_config: Optional[Dict] = None,
+            idempotency_config: Optional[Dict] = None,
+            digest_config: Optional[Dict] = None,
+            dead_letter_config: Optional[Dict] = None,
+            selection_policy: str = SELECTION_POLICY_QUOTA,
+            page_indicator_mode: str = PAGE_INDICATOR_MODE_TOTAL,
+            segment_packing: str = PACKING_GREEDY,
+            enable_segment_cache: bool = False,
+            segment_cache_config: Optional[Dict] = None,
+            offload_config: Optional[Dict] = None,
+            attachment_config: Optional[Dict] = None,
+            enable_media_cache: bool = False,
+            media_cache_config: Optional[Dict] = None,
+            enable_image_cache: bool = False,
+            image_cache_config: Optional[Dict] = None
     ):
         """
         初始化通知器
@@ -76,6 +114,74 @@ class WeComNotifier:
                 - log_file: str - 日志文件路径（默认 ".wecom_cache/moderation.log"）
                 - log_max_bytes: int - 单个日志文件最大字节数（默认10MB）
                 - log_backup_count: int - 保留的备份文件数量（默认5）
+            tenant_weights: 租户权重字典（tenant → weight）
+                多个业务方共用 webhook 时，按权重公平分配吞吐量（未配置的租户权重为1）
+            enable_dedup: 是否启用重复消息去重
+                同一目标（webhook 或池）在时间窗口内收到相同类型、相同内容的消息只发送一次
+            dedup_config: 去重配置字典
+                - window: float - 去重时间窗口（秒，默认60）
+                - max_size: int - 最大缓存条目数（默认1024，LRU淘汰）
+                - repeat_suffix: bool - 是否在下一次发送时附加 "(repeated N times)"（默认True）
+                - suffix_format: str - 提示格式（需包含 {count}）
+            idempotency_config: 幂等键存储配置字典
+                - retention: float - 幂等键保留时间（秒，默认86400）
+                - max_size: int - 最大条目数（默认10000）
+                - persist: bool - 是否持久化到磁盘，进程重启后仍然有效（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+            digest_config: 摘要聚合配置字典（作用于设置了 digest_group 的消息）
+                - window: float - 聚合时间窗口（秒，默认30）
+                - max_bytes: int - 缓冲区字节预算，达到后立即发送（默认16384）
+                - max_samples: int - 每组展示的样例条数（默认5）
+                - sample_length: int - 单条样例最大字符数（默认200）
+                - link_template: str - 详情链接模板（支持 {group} 占位符）
+                - renderer: Callable - 自定义渲染函数 (groups, window_start, window_end) -> str
+            dead_letter_config: 死信队列配置字典
+                - max_size: int - 最多保存的死信数量（默认1000）
+                - persist: bool - 是否持久化到 .wecom_cache/dead_letters.jsonl（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+            selection_policy: 多webhook池的选择策略
+                - "quota": 剩余配额最多优先（默认）
+                - "least_latency": 平滑延迟最低优先
+                - "p2c": 随机取两个有配额的 webhook，选健康度（延迟和错误率）更好的
+                - "quota_health": 剩余配额 × 健康度最高优先
+                - "ready_time": 调度索引（最小堆），有配额时最久未使用优先，适合数百个 webhook 的池
+            page_indicator_mode: 长消息分页的页码模式
+                - "total": (Page i/N)，分段全部完成后才开始发送（默认）
+                - "streaming": (Page i)，末页为 (Page i, end)；未启用内容审核时边分段边发送，
+                  长报告的第一页可以立即发出
+            segment_packing: 长消息分段的装箱模式
+                - "greedy": 逐段贪心填充（默认）
+                - "compact": 页数最少（每页消耗一次频率配额），页码按实际长度预留、
+                  表格行跨页续填、末页过短时并入前一页；需要 page_indicator_mode="total"
+            enable_segment_cache: 是否缓存分段结果（默认False）
+                开启后相同内容（每日模板、重复告警、广播）只分段一次，所有 webhook 管理器和池共享
+            segment_cache_config: 分段缓存配置字典
+                - max_size: int - 最大缓存条目数（默认128，LRU淘汰）
+                - max_chars: int - 缓存分段内容的总字符数上限（默认 8M）
+            offload_config: 预处理卸载配置字典（不传则不卸载）
+                超过阈值的消息的分段和审核在进程池/线程池中执行，不占用 webhook 工作线程的 GIL
+                （流式页码模式边分段边发送的消息不卸载）
+                - executor: str - "auto"（默认，free-threaded 构建用线程池，否则用进程池）| "process" | "thread"
+                - max_workers: int - 最大工作进程/线程数（默认2）
+                - min_bytes: int - 卸载的消息大小阈值（默认 64KB）
+            attachment_config: 超长内容转附件配置字典（不传则始终分页发送）
+                分段数超过阈值的消息整篇上传为文件（upload_media），只发送一条 file 消息
+                - max_pages: int - 分段数超过该值时转为附件（默认10）
+                - msg_types: List[str] - 适用的消息类型（默认 ["text", "markdown_v2"]）
+                - filename: str - 附件文件名，不含扩展名（默认 "message"）
+            enable_media_cache: 是否缓存上传素材的 media_id（默认False）
+                开启后同一 webhook 上相同内容的文件/语音（含转成的附件）在有效期内只上传一次
+            media_cache_config: 素材ID缓存配置字典
+                - ttl: float - 缓存有效期（秒，默认 3 天减 1 小时）
+                - max_size: int - 最大缓存条目数（默认1000，LRU淘汰）
+                - persist: bool - 是否持久化到 .wecom_cache/media_ids.json（默认False）
+                - cache_dir: str - 持久化目录（默认 ".wecom_cache"）
+            enable_image_cache: 是否缓存图片的 base64 和 MD5（默认False）
+                开启后同一图片重复 send_image（如同一截图发到多个群）只读取和编码一次。
+                文件按路径、大小和修改时间识别，时间戳精度内原地改写为相同大小的内容时可能发送旧图片
+            image_cache_config: 图片准备结果缓存配置字典
+                - max_size: int - 最多缓存的图片数（默认16，LRU淘汰）
+                - max_chars: int - 缓存的 base64 总字符数上限（默认 16M）
         """
         # 获取库专属的 logger
         self.logger = get_logger()
@@ -83,9 +189,29 @@ class WeComNotifier:
         # 重试配置
         self.retry_config = RetryConfig(max_retries=max_retries, retry_delay=retry_delay)
 
+        # 素材ID缓存（可选，上传文件/语音时复用 media_id）
+        self.media_cache: Optional[MediaCache] = None
+        if enable_media_cache:
+            self.media_cache = MediaCache(media_cache_config)
+
+        # 图片准备结果缓存（可选，send_image 复用 base64 和 MD5）
+        self.image_cache: Optional[ImageCache] = None
+        if enable_image_cache:
+            self.image_cache = ImageCache(image_cache_config)
+
         # 组件
-        self.sender = Sender(retry_config=self.retry_config)
-        self.segmenter = MessageSegmenter()
+        self.sender = Sender(retry_config=self.retry_config, media_cache=self.media_cache)
+
+        # 分段结果缓存（可选，所有管理器和池共享同一个分段器）
+        self.segment_cache: Optional[SegmentCache] = None
+        if enable_segment_cache:
+            self.segment_cache = SegmentCache(segment_cache_config)
+
+        self.segmenter = MessageSegmenter(
+            page_indicator_mode=page_indicator_mode,
+            packing=segment_packing,
+            cache=self.segment_cache
+        )
 
         # 全局RateLimiter字典（URL → RateLimiter映射）
         # 确保同一个URL在单webhook和多webhook模式下共享同一个限制器
@@ -97,6 +223,27 @@ class WeComNotifier:
         # Webhook池字典（多webhook模式）
         self.webhook_pools: Dict[str, WeComWebhookPool] = {}
 
+        # 租户权重（公平调度）
+        self.tenant_weights: Dict[str, float] = dict(tenant_weights or {})
+
+        # 多webhook池的选择策略
+        self.selection_policy = selection_policy
+
+        # 重复消息去重（可选）
+        self.dedup_cache: Optional[DedupCache] = None
+        if enable_dedup:
+            self.dedup_cache = DedupCache(dedup_config)
+            self.logger.info(f"Message dedup enabled (window={self.dedup_cache.window}s)")
+
+        # 幂等键存储
+        self.idempotency_store = IdempotencyStore(idempotency_config)
+
+        # 摘要聚合器（后台线程在首条 digest_group 消息到达时启动）
+        self.digest_aggregator = DigestAggregator(self._send_digest, digest_config)
+
+        # 死信队列（发送失败的消息）
+        self.dead_letters = DeadLetterQueue(dead_letter_config)
+
         # 内容审核器（可选）
         self.content_moderator: Optional["ContentModerator"] = None
         if enable_content_moderation:
@@ -114,6 +261,16 @@ class WeComNotifier:
                 self.logger.error(f"Failed to initialize content moderator: {e}")
                 self.content_moderator = None
 
+        # 预处理卸载器（可选，所有管理器和池共享）
+        self.offloader: Optional[PreprocessOffloader] = None
+        if offload_config is not None:
+            self.offloader = PreprocessOffloader(self.segmenter, self.content_moderator, offload_config)
+
+        # 超长内容转附件策略（可选，所有管理器和池共享）
+        self.attachment_policy: Optional[AttachmentPolicy] = None
+        if attachment_config is not None:
+            self.attachment_policy = AttachmentPolicy(attachment_config)
+
         self.logger.info("WeComNotifier initialized")
 
     def send_text(
@@ -122,7 +279,14 @@ class WeComNotifier:
             content: str,
             mentioned_list: Optional[List[str]] = None,
             mentioned_mobile_list: Optional[List[str]] = None,
-            async_send: bool = True
+            async_send: bool = True,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            max_delay: Optional[float] = None,
+            conflate_key: Optional[str] = None,
+            idempotency_key: Optional[str] = None,
+            digest_group: Optional[str] = None
     ) -> SendResult:
         """
         发送文本消息
@@ -133,6 +297,17 @@ class WeComNotifier:
             mentioned_list: @的用户ID列表（如 ["user1", "@all"]）
             mentioned_mobile_list: @的手机号列表
             async_send: 是否异步发送（默认True）
+            tenant: 租户/来源标识（用于多租户公平调度）
+            ttl: 存活时间（秒），排队超过该时间仍未发送则放弃（状态为 expired，不消耗配额）
+            deadline: 绝对截止时间戳（与 ttl 同时设置时取较早者）
+            max_delay: 可接受的最大送达延迟（秒），入队时预计超出则立即返回 rejected 状态
+            conflate_key: 合并键（如 "deploy-42-progress"），同一租户排队中相同 key 的旧消息会被本消息
+                原地取代（旧结果状态为 superseded），适合只关心最新值的状态类消息
+            idempotency_key: 幂等键（如 "daily-report-2026-01-31"），同一目标的重复请求直接返回
+                原始的 SendResult，不会再次入队；原始发送失败时 key 被释放，允许重试
+            digest_group: 摘要分组（如 "disk-alerts"），设置后消息先缓冲，窗口到期或字节预算填满时
+                与同一目标的其他缓冲消息合并为一条汇总 Markdown 发送（@all 合并保留，截止时间取最早者；
+                设置了 mentioned_list/mentioned_mobile_list 的消息不参与汇总，直接发送）
 
         Returns:
             SendResult: 发送结果对象
@@ -141,7 +316,14 @@ class WeComNotifier:
             content=content,
             msg_type=MSG_TYPE_TEXT,
             mentioned_list=mentioned_list,
-            mentioned_mobile_list=mentioned_mobile_list
+            mentioned_mobile_list=mentioned_mobile_list,
+            tenant=tenant,
+            ttl=ttl,
+            deadline=deadline,
+            max_delay=max_delay,
+            conflate_key=conflate_key,
+            idempotency_key=idempotency_key,
+            digest_group=digest_group
         )
 
         return self._send_message(webhook_url, message, async_send)
@@ -151,7 +333,14 @@ class WeComNotifier:
             webhook_url: Union[str, List[str]],
             content: str,
             mention_all: bool = False,
-            async_send: bool = True
+            async_send: bool = True,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            max_delay: Optional[float] = None,
+            conflate_key: Optional[str] = None,
+            idempotency_key: Optional[str] = None,
+            digest_group: Optional[str] = None
     ) -> SendResult:
         """
         发送Markdown v2消息
@@ -161,6 +350,17 @@ class WeComNotifier:
             content: Markdown内容
             mention_all: 是否@所有人（会额外发送一条text消息）
             async_send: 是否异步发送（默认True）
+            tenant: 租户/来源标识（用于多租户公平调度）
+            ttl: 存活时间（秒），排队超过该时间仍未发送则放弃（状态为 expired，不消耗配额）
+            deadline: 绝对截止时间戳（与 ttl 同时设置时取较早者）
+            max_delay: 可接受的最大送达延迟（秒），入队时预计超出则立即返回 rejected 状态
+            conflate_key: 合并键（如 "deploy-42-progress"），同一租户排队中相同 key 的旧消息会被本消息
+                原地取代（旧结果状态为 superseded），适合只关心最新值的状态类消息
+            idempotency_key: 幂等键（如 "daily-report-2026-01-31"），同一目标的重复请求直接返回
+                原始的 SendResult，不会再次入队；原始发送失败时 key 被释放，允许重试
+            digest_group: 摘要分组（如 "disk-alerts"），设置后消息先缓冲，窗口到期或字节预算填满时
+                与同一目标的其他缓冲消息合并为一条汇总 Markdown 发送（@all 合并保留，截止时间取最早者；
+                设置了 mentioned_list/mentioned_mobile_list 的消息不参与汇总，直接发送）
 
         Returns:
             SendResult: 发送结果对象
@@ -168,7 +368,14 @@ class WeComNotifier:
         message = Message(
             content=content,
             msg_type=MSG_TYPE_MARKDOWN_V2,
-            mention_all=mention_all
+            mention_all=mention_all,
+            tenant=tenant,
+            ttl=ttl,
+            deadline=deadline,
+            max_delay=max_delay,
+            conflate_key=conflate_key,
+            idempotency_key=idempotency_key,
+            digest_group=digest_group
         )
 
         return self._send_message(webhook_url, message, async_send)
@@ -179,7 +386,13 @@ class WeComNotifier:
             image_path: Optional[str] = None,
             image_base64: Optional[str] = None,
             mention_all: bool = False,
-            async_send: bool = True
+            async_send: bool = True,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            max_delay: Optional[float] = None,
+            conflate_key: Optional[str] = None,
+            idempotency_key: Optional[str] = None
     ) -> SendResult:
         """
         发送图片消息
@@ -190,6 +403,14 @@ class WeComNotifier:
             image_base64: 图片base64编码（二选一）
             mention_all: 是否@所有人（会额外发送一条text消息）
             async_send: 是否异步发送（默认True）
+            tenant: 租户/来源标识（用于多租户公平调度）
+            ttl: 存活时间（秒），排队超过该时间仍未发送则放弃（状态为 expired，不消耗配额）
+            deadline: 绝对截止时间戳（与 ttl 同时设置时取较早者）
+            max_delay: 可接受的最大送达延迟（秒），入队时预计超出则立即返回 rejected 状态
+            conflate_key: 合并键（如 "deploy-42-progress"），同一租户排队中相同 key 的旧消息会被本消息
+                原地取代（旧结果状态为 superseded），适合只关心最新值的状态类消息
+            idempotency_key: 幂等键（如 "daily-report-2026-01-31"），同一目标的重复请求直接返回
+                原始的 SendResult，不会再次入队；原始发送失败时 key 被释放，允许重试
 
         Returns:
             SendResult: 发送结果对象
@@ -198,16 +419,182 @@ class WeComNotifier:
             InvalidParameterError: 参数错误
         """
         # 准备图片数据
-        base64_data, md5_value = Sender.prepare_image(image_path, image_base64)
+        base64_data, md5_value = Sender.prepare_image(image_path, image_base64, cache=self.image_cache)
 
         message = Message(
             content=(base64_data, md5_value),
             msg_type=MSG_TYPE_IMAGE,
-            mention_all=mention_all
+            mention_all=mention_all,
+            tenant=tenant,
+            ttl=ttl,
+            deadline=deadline,
+            max_delay=max_delay,
+            conflate_key=conflate_key,
+            idempotency_key=idempotency_key
+        )
+
+        return self._send_message(webhook_url, message, async_send)
+
+    def send_file(
+            self,
+            webhook_url: Union[str, List[str]],
+            file_path: Optional[str] = None,
+            file_data: Optional[bytes] = None,
+            filename: Optional[str] = None,
+            mention_all: bool = False,
+            async_send: bool = True,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            idempotency_key: Optional[str] = None
+    ) -> SendResult:
+        """
+        发送文件消息（先通过 upload_media 上传，再发送 file 消息）
+
+        启用素材ID缓存时，同一 webhook 上相同内容的文件在有效期内只上传一次，
+        同一份日报发到多个群时每个群只上传一次、之后重复发送直接复用 media_id。
+
+        Args:
+            webhook_url: Webhook地址（单个URL或URL列表）
+            file_path: 文件路径
+            file_data: 文件内容（二选一，需同时提供 filename）
+            filename: 群聊中显示的文件名（默认取 file_path 的文件名）
+            mention_all: 是否@所有人（会额外发送一条text消息）
+            async_send: 是否异步发送（默认True）
+            tenant: 租户/来源标识（用于多租户公平调度）
+            ttl: 存活时间（秒），排队超过该时间仍未发送则放弃（状态为 expired，不消耗配额）
+            deadline: 绝对截止时间戳（与 ttl 同时设置时取较早者）
+            idempotency_key: 幂等键，同一目标的重复请求直接返回原始的 SendResult
+
+        Returns:
+            SendResult: 发送结果对象
+
+        Raises:
+            InvalidParameterError: 参数错误（缺少内容、大小超出 5B~20MB）
+        """
+        content = Sender.prepare_media(MSG_TYPE_FILE, file_path, file_data, filename)
+
+        message = Message(
+            content=content,
+            msg_type=MSG_TYPE_FILE,
+            mention_all=mention_all,
+            tenant=tenant,
+            ttl=ttl,
+            deadline=deadline,
+            idempotency_key=idempotency_key
+        )
+
+        return self._send_message(webhook_url, message, async_send)
+
+    def send_voice(
+            self,
+            webhook_url: Union[str, List[str]],
+            voice_path: Optional[str] = None,
+            voice_data: Optional[bytes] = None,
+            filename: Optional[str] = None,
+            mention_all: bool = False,
+            async_send: bool = True,
+            tenant: Optional[str] = None,
+            ttl: Optional[float] = None,
+            deadline: Optional[float] = None,
+            idempotency_key: Optional[str] = None
+    ) -> SendResult:
+        """
+        发送语音消息（AMR 格式，不超过 2MB、60 秒）
+
+        与 send_file() 相同，启用素材ID缓存时相同内容在同一 webhook 上只上传一次。
+
+        Args:
+            webhook_url: Webhook地址（单个URL或URL列表）
+            voice_path: 语音文件路径（.amr）
+            voice_data: 语音内容（二选一，需同时提供 filename）
+            filename: 文件名（默认取 voice_path 的文件名）
+            mention_all: 是否@所有人（会额外发送一条text消息）
+            async_send: 是否异步发送（默认True）
+            tenant: 租户/来源标识（用于多租户公平调度）
+            ttl: 存活时间（秒），排队超过该时间仍未发送则放弃（状态为 expired，不消耗配额）
+            deadline: 绝对截止时间戳（与 ttl 同时设置时取较早者）
+            idempotency_key: 幂等键，同一目标的重复请求直接返回原始的 SendResult
+
+        Returns:
+            SendResult: 发送结果对象
+
+        Raises:
+            InvalidParameterError: 参数错误（缺少内容、不是 AMR 文件、大小超出 5B~2MB）
+        """
+        content = Sender.prepare_media(MSG_TYPE_VOICE, voice_path, voice_data, filename)
+
+        message = Message(
+            content=content,
+            msg_type=MSG_TYPE_VOICE,
+            mention_all=mention_all,
+            tenant=tenant,
+            ttl=ttl,
+            deadline=deadline,
+            idempotency_key=idempotency_key
         )
 
         return self._send_message(webhook_url, message, async_send)
 
+    def send_stream(
+            self,
+            webhook_url: Union[str, List[str]],
+            source: Union[Iterable[Union[str, bytes]], IO],
+            msg_type: str = MSG_TYPE_TEXT,
+            flush_interval: Optional[float] = DEFAULT_STREAM_FLUSH_INTERVAL,
+            max_pending: int = DEFAULT_STREAM_MAX_PENDING,
+            async_send: bool = True,
+            tenant: Optional[str] = None
+    ) -> List[SendResult]:
+        """
+        发送流式输入（日志 tail、LLM 流式输出等）
+
+        边读取边分页，每页填满或缓冲区内容等待超过 flush_interval 时立即作为一条消息发送，
+        第一页在数据源仍在产生时就能送达。内存中只保留当前页和最多 max_pending 个排队中的页，
+        与数据源总大小无关。页码为 (Page i)，流结束时的最后一页为 (Page i, end)；只有一页时不加页码。
+
+        本方法在调用线程中读取完整个数据源后返回。
+
+        Args:
+            webhook_url: Webhook地址（单个URL或URL列表）
+            source: 数据源：产出 str/bytes 的可迭代对象（生成器、LLM 流式响应），或文件对象（按行读取）
+            msg_type: 消息类型（"text" 或 "markdown_v2"，默认 "text"）
+            flush_interval: 刷新间隔（秒，默认5），None 表示只在页面填满和数据源结束时发送
+            max_pending: 最多同时排队的页数（默认3），超出时等待最早的一页发送完成（背压）
+            async_send: 是否异步发送（默认True）；False 时等待所有页发送完成后返回
+            tenant: 租户/来源标识（用于多租户公平调度）
+
+        Returns:
+            List[SendResult]: 每页的发送结果（按页码顺序）
+
+        Raises:
+            InvalidParameterError: 参数错误
+            读取数据源时的异常（已读取的内容先发送）
+        """
+        if msg_type not in (MSG_TYPE_TEXT, MSG_TYPE_MARKDOWN_V2):
+            raise InvalidParameterError(f"send_stream does not support msg_type: {msg_type}")
+        if max_pending < 1:
+            raise InvalidParameterError("max_pending must be at least 1")
+
+        segmenter = StreamSegmenter(self.segmenter.max_bytes, msg_type)
+        results: List[SendResult] = []
+
+        for page in iter_stream_pages(source, segmenter, flush_interval):
+            message = Message(content=page.content, msg_type=msg_type, tenant=tenant)
+            results.append(self._send_message(webhook_url, message, async_send=True))
+
+            # 背压：排队中的页过多时等待最早的一页，数据源的读取随之暂停
+            if len(results) > max_pending:
+                results[-max_pending - 1].wait()
+
+        self.logger.info(f"Stream sent as {len(results)} page(s)")
+
+        if not async_send:
+            for result in results:
+                result.wait()
+
+        return results
+
     def _send_message(
             self,
             webhook_url: Union[str, List[str]],
@@ -225,17 +612,314 @@ class WeComNotifier:
         Returns:
             SendResult: 发送结果对象
         """
+        if isinstance(webhook_url, list) and not webhook_url:
+            raise InvalidParameterError("webhook_url list cannot be empty")
+        if not isinstance(webhook_url, (str, list)):
+            raise InvalidParameterError("webhook_url must be str or list")
+
+        idempotency_key = getattr(message, "idempotency_key", None)
+        if idempotency_key is None:
+            return self._dispatch(webhook_url, message, async_send)
+
+        # 幂等：同一目标的相同 key 直接返回原始结果
+        scoped_key = f"{self._make_target_key(webhook_url)}:{idempotency_key}"
+        result, created = self.idempotency_store.get_or_create(
+            scoped_key,
+            lambda: self._dispatch(webhook_url, message, async_send=True)
+        )
+        if not created:
+            self.logger.debug(
+                f"Idempotency key '{idempotency_key}' already used, returning result of message {result.message_id}"
+            )
+
+        if not async_send:
+            result.wait()
+
+        return result
+
+    def _dispatch(
+            self,
+            webhook_url: Union[str, List[str]],
+            message: Message,
+            async_send: bool
+    ) -> SendResult:
+        """
+        去重后按模式分发消息（内部方法）
+
+        Args:
+            webhook_url: Webhook地址（单个或列表）
+            message: 消息对象
+            async_send: 是否异步发送
+
+        Returns:
+            SendResult: 发送结果对象
+        """
+        # 去重：窗口内的重复消息直接返回，不进入队列（结果随原始消息完成）
+        if self.dedup_cache is not None:
+            duplicate = self._apply_dedup(webhook_url, message)
+            if duplicate is not None:
+                if not async_send:
+                    duplicate.wait()
+                return duplicate
+
+        try:
+            result = self._route(webhook_url, message, async_send)
+        except Exception as e:
+            if self.dedup_cache is not None:
+                # 原始消息未能入队：释放去重条目，已抑制的副本随之失败
+                failed = SendResult(message.id)
+                failed.mark_failed(str(e))
+                self.dedup_cache.bind(message.id, failed)
+            raise
+
+        if self.dedup_cache is not None:
+            self.dedup_cache.bind(message.id, result)
+        return result
+
+    def _route(
+            self,
+            webhook_url: Union[str, List[str]],
+            message: Message,
+            async_send: bool
+    ) -> SendResult:
+        """
+        按模式分发消息：摘要缓冲区、单 webhook 或池（内部方法）
+
+        Args:
+            webhook_url: Webhook地址（单个或列表）
+            message: 消息对象
+            async_send: 是否异步发送
+
+        Returns:
+            SendResult: 发送结果对象
+        """
+        # 摘要：设置了 digest_group 的文本/Markdown 消息先进入缓冲区
+        # （汇总为 markdown_v2，不支持 @指定成员，带 mentioned_list/mentioned_mobile_list 的消息直接发送）
+        if (
+            getattr(message, "digest_group", None) is not None
+            and message.msg_type != MSG_TYPE_IMAGE
+            and not message.mentioned_list
+            and not message.mentioned_mobile_list
+        ):
+            result = self.digest_aggregator.add(self._make_target_key(webhook_url), webhook_url, message)
+            if not async_send:
+                result.wait()
+            return result
+
         # 根据类型选择模式
         if isinstance(webhook_url, str):
             # 单webhook模式
             return self._send_single(webhook_url, message, async_send)
-        elif isinstance(webhook_url, list):
+        else:
             # 多webhook池模式
-            if not webhook_url:
-                raise InvalidParameterError("webhook_url list cannot be empty")
             return self._send_pool(webhook_url, message, async_send)
-        else:
-            raise InvalidParameterError("webhook_url must be str or list")
+
+    def retry(self, result: SendResult, async_send: bool = True) -> SendResult:
+        """
+        重试发送失败的消息（断点续传）
+
+        多分段消息部分送达后失败时，从第一个未送达的分段继续发送，
+        已送达的分段不会重复发送（节省配额，避免群里出现重复页）。
+
+        Args:
+            result: 发送失败的结果对象
+            async_send: 是否异步发送（默认True）
+
+        Returns:
+            SendResult: 新的结果对象
+
+        Raises:
+            InvalidParameterError: 消息不可重试（未失败、已重试过、或不是由本通知器发送）
+        """
+        for owner in list(self.webhook_managers.values()) + list(self.webhook_pools.values()):
+            message = owner.get_failed_message(result.message_id)
+            new_result = owner.retry(result)
+            if new_result is not None:
+                # 手动重试后，死信队列中的记录不再需要
+                previous = self.dead_letters.remove(result.message_id)
+                attempts = (previous.attempts if previous else 1) + 1
+                self._watch_dead_letter(owner, self._owner_target(owner), message, new_result, attempts)
+                if not async_send:
+                    new_result.wait()
+                return new_result
+
+        raise InvalidParameterError(f"Message {result.message_id} is not retryable")
+
+    def replay_dead_letters(
+            self,
+            rate: Optional[float] = DEFAULT_REPLAY_RATE,
+            limit: Optional[int] = None
+    ) -> List[SendResult]:
+        """
+        重放死信队列中的消息（限速）
+
+        按失败时间顺序逐条重新注入，每条消息都会等到目标 webhook 的频率限制器
+        有足够配额时才入队，并且注入速率不超过 rate，避免故障恢复后集中补发触发频控。
+        多分段消息从检查点续传，已送达的分段不会重发。再次失败的消息会重新进入死信队列。
+        死信在重新入队后才从队列中删除，等待期间进程退出不会丢失死信。
+
+        此方法会阻塞直到所有死信都已注入（不等待发送完成），可在后台线程中调用。
+
+        Args:
+            rate: 注入速率上限（条/分钟，默认10），None 表示只受频率限制器约束
+            limit: 最多重放的条数，None 表示全部
+
+        Returns:
+            List[SendResult]: 重放消息的结果对象列表
+        """
+        interval = 60.0 / rate if rate else 0.0
+        results: List[SendResult] = []
+
+        entries = self.dead_letters.list()
+        if limit is not None:
+            entries = entries[:limit]
+
+        for entry in entries:
+            if results and interval > 0:
+                time.sleep(interval)
+
+            if isinstance(entry.target, str):
+                owner = self._get_or_create_manager(entry.target)
+            else:
+                owner = self._get_or_create_pool(entry.target)
+
+            message = owner.get_failed_message(entry.message_id) or self._restore_dead_letter_message(entry)
+
+            # 等待目标的频率限制器能够立即发送本消息
+            wait = owner.estimate_eta(message) - time.time()
+            if wait > 0:
+                self.logger.debug(f"Waiting {wait:.1f}s for quota before replaying {entry.message_id}")
+                time.sleep(wait)
+
+            if self.dead_letters.get(entry.message_id) is not entry:
+                # 等待期间已被 retry() 取走或再次失败更新
+                continue
+
+            result = owner.retry(SendResult(entry.message_id))
+            if result is None:
+                result = owner.enqueue(message)
+            # 先删除再登记监听：重放再次失败时写入的新记录不会被删除
+            self.dead_letters.discard(entry)
+            self._watch_dead_letter(owner, entry.target, message, result, entry.attempts + 1)
+            results.append(result)
+
+            self.logger.info(
+                f"Replayed dead letter {entry.message_id} (attempt {entry.attempts + 1}, "
+                f"resuming from segment {message.delivered_segments + 1})"
+            )
+
+        return results
+
+    def _watch_dead_letter(
+            self,
+            owner: Union[WebhookManager, WeComWebhookPool],
+            webhook_url: Union[str, List[str]],
+            message: Message,
+            result: SendResult,
+            attempts: int = 1
+    ):
+        """
+        发送最终失败时将消息加入死信队列（可续传的失败带上分段和检查点）
+
+        只记录发送失败（failed）的消息：被取代、过期、准入拒绝和审核拒绝的消息是有意放弃的，
+        重放它们会送达过时或不该发送的内容。
+        """
+        def on_done(done: SendResult):
+            if done.status == RESULT_STATUS_FAILED:
+                self.dead_letters.add(DeadLetter(
+                    message_id=message.id,
+                    target=webhook_url,
+                    msg_type=message.msg_type,
+                    content=message.content,
+                    error=done.error or "",
+                    attempts=attempts,
+                    segments=list(message.segments) if message.segments is not None else None,
+                    delivered_segments=message.delivered_segments,
+                    options={
+                        "mention_all": message.mention_all,
+                        "mentioned_list": message.mentioned_list,
+                        "mentioned_mobile_list": message.mentioned_mobile_list,
+                        "segment_interval": message.segment_interval,
+                        "tenant": message.tenant,
+                    },
+                ))
+
+        result.add_done_callback(on_done)
+
+    @staticmethod
+    def _restore_dead_letter_message(entry: DeadLetter) -> Message:
+        """根据死信记录重建消息（保留原消息ID、分段和检查点）"""
+        message = Message(content=entry.content, msg_type=entry.msg_type, **entry.options)
+        message.id = entry.message_id
+        if entry.segments is not None:
+            message.segments = list(entry.segments)
+            message.delivered_segments = entry.delivered_segments
+        return message
+
+    @staticmethod
+    def _owner_target(owner: Union[WebhookManager, WeComWebhookPool]) -> Union[str, List[str]]:
+        """管理器或池对应的发送目标"""
+        if isinstance(owner, WebhookManager):
+            return owner.webhook_url
+        return [resource.url for resource in owner.resources]
+
+    def _send_digest(
+            self,
+            webhook_url: Union[str, List[str]],
+            content: str,
+            items: List[DigestItem]
+    ) -> SendResult:
+        """
+        发送汇总消息（摘要聚合器回调）
+
+        Args:
+            webhook_url: Webhook地址（单个或列表）
+            content: 渲染后的汇总 Markdown
+            items: 被合并的成员消息
+
+        Returns:
+            SendResult: 汇总消息的结果对象
+        """
+        # 汇总沿用成员中最早的截止时间：过期后整体放弃，成员结果为 expired
+        deadlines = [item.message.deadline for item in items if item.message.deadline is not None]
+        digest_message = Message(
+            content=content,
+            msg_type=MSG_TYPE_MARKDOWN_V2,
+            mention_all=any(item.message.mention_all for item in items),
+            tenant=items[0].message.tenant,
+            deadline=min(deadlines, default=None)
+        )
+        return self._dispatch(webhook_url, digest_message, async_send=True)
+
+    def _apply_dedup(self, webhook_url: Union[str, List[str]], message: Message) -> Optional[SendResult]:
+        """
+        检查消息是否重复（内部方法）
+
+        重复消息返回随原始消息完成的结果（原始消息送达后为 duplicate 状态，未送达则为失败）；
+        非重复消息如果上一个窗口内有被抑制的副本，则在文本/Markdown 内容末尾附加重复次数提示。
+
+        Args:
+            webhook_url: Webhook地址（单个或列表）
+            message: 消息对象
+
+        Returns:
+            Optional[SendResult]: 重复时返回结果对象，否则返回 None
+        """
+        target = self._make_target_key(webhook_url)
+        result = SendResult(message.id)
+        is_duplicate, original_id, repeated = self.dedup_cache.check(
+            target, message.msg_type, message.content, message.id, result
+        )
+
+        if is_duplicate:
+            self.logger.debug(f"Message {message.id} suppressed as duplicate of {original_id}")
+            return result
+
+        suffix = self.dedup_cache.format_suffix(repeated)
+        if suffix and message.msg_type in (MSG_TYPE_TEXT, MSG_TYPE_MARKDOWN_V2):
+            message.content = f"{message.content}{suffix}"
+
+        return None
 
     def _send_single(self, webhook_url: str, message: Message, async_send: bool) -> SendResult:
         """
@@ -254,6 +938,7 @@ class WeComNotifier:
 
         # 将消息加入队列
         result = manager.enqueue(message)
+        self._watch_dead_letter(manager, webhook_url, message, result)
 
         # 如果是同步发送，等待结果
         if not async_send:
@@ -278,6 +963,7 @@ class WeComNotifier:
 
         # 将消息加入队列
         result = pool.enqueue(message)
+        self._watch_dead_letter(pool, webhook_urls, message, result)
 
         # 如果是同步发送，等待结果
         if not async_send:
@@ -305,7 +991,10 @@ class WeComNotifier:
                 sender=self.sender,
                 segmenter=self.segmenter,
                 rate_limiter=rate_limiter,
-                content_moderator=self.content_moderator
+                content_moderator=self.content_moderator,
+                tenant_weights=self.tenant_weights,
+                offloader=self.offloader,
+                attachment_policy=self.attachment_policy
             )
             self.webhook_managers[webhook_url] = manager
 
@@ -352,12 +1041,31 @@ class WeComNotifier:
                 resources=resources,
                 sender=self.sender,
                 segmenter=self.segmenter,
-                content_moderator=self.content_moderator
+                content_moderator=self.content_moderator,
+                tenant_weights=self.tenant_weights,
+                selection_policy=self.selection_policy,
+                offloader=self.offloader,
+                attachment_policy=self.attachment_policy
             )
             self.webhook_pools[pool_key] = pool
 
         return self.webhook_pools[pool_key]
 
+    @classmethod
+    def _make_target_key(cls, webhook_url: Union[str, List[str]]) -> str:
+        """
+        生成发送目标的key（单webhook为URL本身，池为池的key）
+
+        Args:
+            webhook_url: Webhook地址（单个或列表）
+
+        Returns:
+            str: 目标key
+        """
+        if isinstance(webhook_url, str):
+            return webhook_url
+        return cls._make_pool_key(webhook_url)
+
     @staticmethod
     def _make_pool_key(webhook_urls: List[str]) -> str:
         """
@@ -374,13 +1082,19 @@ class WeComNotifier:
         return hashlib.md5(key_string.encode()).hexdigest()
 
     def stop_all(self):
-        """停止所有Webhook管理器和池"""
+        """停止所有Webhook管理器和池（先发送摘要缓冲区中的消息）"""
+        if getattr(self, 'digest_aggregator', None) is not None:
+            self.digest_aggregator.stop()
+
         for manager in self.webhook_managers.values():
             manager.stop()
 
         for pool in self.webhook_pools.values():
             pool.stop()
 
+        if getattr(self, 'offloader', None) is not None:
+            self.offloader.shutdown()
+
     def __del__(self):
         """析构函数"""
         if hasattr(self, 'webhook_managers') or hasattr(self, 'webhook_pools'):
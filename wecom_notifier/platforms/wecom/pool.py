@@ -3,19 +3,28 @@
 
 继承 WebhookPoolBase，实现企微特定的调度逻辑。
 """
-from typing import List, Optional, Set, Tuple, Any, TYPE_CHECKING
+from typing import List, Optional, Set, Tuple, Any, Dict, TYPE_CHECKING
 
 from wecom_notifier.core.pool_base import WebhookPoolBase
+from wecom_notifier.core.constants import SELECTION_POLICY_QUOTA
 from wecom_notifier.core.segmenter import MessageSegmenter
 from wecom_notifier.core.models import SegmentInfo
-from wecom_notifier.platforms.wecom.constants import MSG_TYPE_TEXT, MSG_TYPE_MARKDOWN_V2, MSG_TYPE_IMAGE
+from wecom_notifier.platforms.wecom.constants import (
+    MSG_TYPE_TEXT,
+    MSG_TYPE_MARKDOWN_V2,
+    MSG_TYPE_IMAGE,
+    MEDIA_MSG_TYPES,
+    WEBHOOK_INVALID_ERROR_PREFIX,
+)
 from wecom_notifier.platforms.wecom.adapter import WeComSenderAdapter, WeComMessageConverter
 from wecom_notifier.platforms.wecom.models import Message
 
 if TYPE_CHECKING:
-    from wecom_notifier.platforms.wecom.resource import WebhookResource
+    from wecom_notifier.core.resource import WebhookResource
     from wecom_notifier.platforms.wecom.sender import Sender
     from wecom_notifier.core.moderation import ContentModerator
+    from wecom_notifier.core.offload import PreprocessOffloader
+    from wecom_notifier.platforms.wecom.attachment import AttachmentPolicy
 
 
 class WeComWebhookPool(WebhookPoolBase):
@@ -23,9 +32,10 @@ class WeComWebhookPool(WebhookPoolBase):
     企业微信 Webhook 池
 
     实现企微特定的调度行为：
-    - 图片消息跳过分段和审核
+    - 图片、文件、语音消息跳过分段和审核
     - @all workaround（markdown_v2 和 image 类型）
     - 企微特定的 mention 处理
+    - 分段数过多时改为上传文件发送（可选）
     """
 
     def __init__(
@@ -33,7 +43,11 @@ class WeComWebhookPool(WebhookPoolBase):
         resources: List["WebhookResource"],
         sender: "Sender",
         segmenter: MessageSegmenter,
-        content_moderator: Optional["ContentModerator"] = None
+        content_moderator: Optional["ContentModerator"] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        selection_policy: str = SELECTION_POLICY_QUOTA,
+        offloader: Optional["PreprocessOffloader"] = None,
+        attachment_policy: Optional["AttachmentPolicy"] = None
     ):
         """
         初始化企微 Webhook 池
@@ -43,9 +57,14 @@ class WeComWebhookPool(WebhookPoolBase):
             sender: 企微原生 Sender（会被包装为适配器）
             segmenter: 消息分段器
             content_moderator: 内容审核器（可选）
+            tenant_weights: 租户权重（tenant → weight），用于多租户公平调度
+            selection_policy: webhook 选择策略（quota / least_latency / p2c / quota_health / ready_time）
+            offloader: 预处理卸载器（可选），大消息的分段和审核在进程池/线程池中执行
+            attachment_policy: 超长内容转附件策略（可选）
         """
         # 保存原生 sender 引用
         self._native_sender = sender
+        self.attachment_policy = attachment_policy
 
         # 创建适配器和转换器
         adapter = WeComSenderAdapter(sender)
@@ -56,24 +75,52 @@ class WeComWebhookPool(WebhookPoolBase):
             sender=adapter,
             segmenter=segmenter,
             converter=converter,
-            content_moderator=content_moderator
+            content_moderator=content_moderator,
+            tenant_weights=tenant_weights,
+            selection_policy=selection_policy,
+            offloader=offloader
         )
 
     def should_skip_segmentation(self, msg_type: str) -> bool:
         """
         是否跳过分段
 
-        企微的图片消息不需要分段。
+        企微的图片、文件、语音消息不需要分段。
         """
-        return msg_type == MSG_TYPE_IMAGE
+        return msg_type in MEDIA_MSG_TYPES
 
     def should_skip_moderation(self, msg_type: str) -> bool:
         """
         是否跳过审核
 
-        企微的图片消息不需要内容审核。
+        企微的图片、文件、语音消息不需要内容审核。
         """
-        return msg_type == MSG_TYPE_IMAGE
+        return msg_type in MEDIA_MSG_TYPES
+
+    def _transform_segments(self, message: Message, segments: List[SegmentInfo]) -> List[SegmentInfo]:
+        """
+        分段数过多时改为上传文件发送
+
+        附件分段的内容为 (文件名, base64, md5)，message.msg_type 变为 file。
+        """
+        if self.attachment_policy is None:
+            return segments
+        return self.attachment_policy.apply(message, segments, self.content_moderator)
+
+    def _can_stream(self, message: Message) -> bool:
+        """
+        是否可以边分段边发送
+
+        预估分段数超过转附件阈值时先完成分段，再决定是否改为上传文件发送。
+        """
+        if not super()._can_stream(message):
+            return False
+        return not (
+            self.attachment_policy is not None
+            and self.attachment_policy.should_attach(
+                message, self.segmenter.estimate_segment_count(message.content, message.msg_type)
+            )
+        )
 
     def _post_send_hook(self, message: Message, used_webhooks: Set[str]) -> bool:
         """
@@ -89,17 +136,16 @@ class WeComWebhookPool(WebhookPoolBase):
 
         try:
             webhook = self._select_best_webhook()
-            webhook.rate_limiter.acquire()
 
             # 使用原生 sender 的 send_mention_all 方法
-            success, error = self._native_sender.send_mention_all(webhook.url)
+            success, error = self._send_acquired(
+                webhook, lambda: self._native_sender.send_mention_all(webhook.url)
+            )
 
             if success:
-                webhook.mark_success()
                 used_webhooks.add(webhook.url)
                 return True
             else:
-                webhook.mark_failure()
                 self.logger.error(
                     f"@all workaround failed for message {message.id}: {error}"
                 )
@@ -109,6 +155,14 @@ class WeComWebhookPool(WebhookPoolBase):
             self.logger.error(f"@all workaround failed with exception: {e}")
             return False
 
+    def _is_permanent_failure(self, error: Optional[str]) -> bool:
+        """
+        是否为永久性错误
+
+        企微返回 93000（webhook 不存在）时，该 webhook 永久失效。
+        """
+        return bool(error) and error.startswith(WEBHOOK_INVALID_ERROR_PREFIX)
+
     def _build_message_metadata(self, message: Message, segment_index: int) -> dict:
         """
         构建企微消息元数据
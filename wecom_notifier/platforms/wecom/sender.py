@@ -2,9 +2,13 @@
 企业微信 HTTP 发送器
 """
 import base64
+import binascii
 import hashlib
+import mmap
+import os
 import time
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional, TYPE_CHECKING
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import requests
 
 from wecom_notifier.core.logger import get_logger
@@ -25,11 +29,27 @@ from .constants import (
     ERRCODE_RATE_LIMIT,
     RATE_LIMIT_MAX_RETRIES,
     RATE_LIMIT_WAIT_TIME,
+    WEBHOOK_INVALID_ERROR_PREFIX,
     MSG_TYPE_TEXT,
     MSG_TYPE_MARKDOWN_V2,
-    MSG_TYPE_IMAGE
+    MSG_TYPE_IMAGE,
+    MSG_TYPE_FILE,
+    MSG_TYPE_VOICE,
+    UPLOAD_MEDIA_PATH,
+    MEDIA_TYPE_FILE,
+    MEDIA_TYPE_VOICE,
+    MIN_UPLOAD_FILE_BYTES,
+    MAX_UPLOAD_FILE_BYTES,
+    MAX_UPLOAD_VOICE_BYTES,
+    VOICE_FILE_EXTENSION,
+    ERRCODE_INVALID_MEDIA_ID,
+    IMAGE_PREPARE_CHUNK_BYTES,
 )
 
+if TYPE_CHECKING:
+    from .image_cache import ImageCache
+    from .media_cache import MediaCache
+
 
 class RetryConfig:
     """重试配置"""
@@ -51,7 +71,8 @@ class Sender:
     def __init__(
             self,
             retry_config: Optional[RetryConfig] = None,
-            timeout: int = DEFAULT_TIMEOUT
+            timeout: int = DEFAULT_TIMEOUT,
+            media_cache: Optional["MediaCache"] = None
     ):
         """
         初始化发送器
@@ -59,10 +80,12 @@ class Sender:
         Args:
             retry_config: 重试配置
             timeout: HTTP请求超时时间
+            media_cache: 素材ID缓存（可选），send_media() 复用已上传文件的 media_id
         """
         self.logger = get_logger()
         self.retry_config = retry_config or RetryConfig()
         self.timeout = timeout
+        self.media_cache = media_cache
 
     def send_text(
             self,
@@ -148,6 +171,157 @@ class Sender:
 
         return self._send_request(webhook_url, data)
 
+    def send_file(
+            self,
+            webhook_url: str,
+            media_id: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        发送文件消息
+
+        Args:
+            webhook_url: Webhook地址
+            media_id: upload_media() 返回的素材ID
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否成功, 错误信息)
+        """
+        data = {
+            "msgtype": MSG_TYPE_FILE,
+            "file": {
+                "media_id": media_id
+            }
+        }
+
+        return self._send_request(webhook_url, data)
+
+    def send_voice(
+            self,
+            webhook_url: str,
+            media_id: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        发送语音消息
+
+        Args:
+            webhook_url: Webhook地址
+            media_id: upload_media() 返回的素材ID（voice 类型）
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否成功, 错误信息)
+        """
+        data = {
+            "msgtype": MSG_TYPE_VOICE,
+            "voice": {
+                "media_id": media_id
+            }
+        }
+
+        return self._send_request(webhook_url, data)
+
+    def upload_media(
+            self,
+            webhook_url: str,
+            data: bytes,
+            filename: str,
+            media_type: str = MEDIA_TYPE_FILE
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        上传素材（使用 webhook 的 key 调用 upload_media 接口）
+
+        Args:
+            webhook_url: Webhook地址
+            data: 文件内容
+            filename: 文件名（群聊中显示的名称）
+            media_type: 素材类型（"file" 或 "voice"，默认 "file"）
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (素材ID, 错误信息)，失败时素材ID为 None
+        """
+        max_bytes = MAX_UPLOAD_VOICE_BYTES if media_type == MEDIA_TYPE_VOICE else MAX_UPLOAD_FILE_BYTES
+        if not MIN_UPLOAD_FILE_BYTES <= len(data) <= max_bytes:
+            return None, (
+                f"Media size {len(data)} bytes out of range "
+                f"[{MIN_UPLOAD_FILE_BYTES}, {max_bytes}]"
+            )
+
+        upload_url = self._upload_url(webhook_url, media_type)
+        files = {"media": (filename, data, "application/octet-stream")}
+        result, error = self._request(upload_url, files=files)
+        if result is None:
+            return None, error
+
+        media_id = result.get("media_id")
+        if not media_id:
+            return None, f"Upload response missing media_id: {result}"
+
+        self.logger.info(f"Media uploaded ({media_type}, {len(data)} bytes)")
+        return media_id, None
+
+    def send_media(
+            self,
+            webhook_url: str,
+            media_type: str,
+            data: bytes,
+            filename: str,
+            digest: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        上传素材并发送文件/语音消息
+
+        配置了素材ID缓存时，同一 webhook 上相同内容的素材在有效期内只上传一次；
+        缓存的 media_id 被企微判定无效时作废并重新上传。
+
+        Args:
+            webhook_url: Webhook地址
+            media_type: 素材类型（"file" 或 "voice"）
+            data: 文件内容
+            filename: 文件名
+            digest: 文件内容的 SHA-256 十六进制摘要（prepare_media() 已计算，None 时按需计算）
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否成功, 错误信息)
+        """
+        send = self.send_voice if media_type == MEDIA_TYPE_VOICE else self.send_file
+
+        cache_key = None
+        if self.media_cache is not None:
+            digest = digest or hashlib.sha256(data).hexdigest()
+            cache_key = self.media_cache.make_key(webhook_url, media_type, digest, filename)
+            media_id = self.media_cache.get(cache_key)
+            if media_id is not None:
+                success, error = send(webhook_url, media_id)
+                if success or not self._is_invalid_media_error(error):
+                    return success, error
+                self.logger.info(f"Cached media_id rejected, uploading {filename} again")
+                self.media_cache.invalidate(cache_key)
+
+        media_id, error = self.upload_media(webhook_url, data, filename, media_type)
+        if media_id is None:
+            return False, f"Upload failed: {error}"
+        if cache_key is not None:
+            self.media_cache.put(cache_key, media_id)
+
+        return send(webhook_url, media_id)
+
+    @staticmethod
+    def _is_invalid_media_error(error: Optional[str]) -> bool:
+        """发送失败是否因为 media_id 无效（已过期）"""
+        return bool(error) and error.startswith(f"API error {ERRCODE_INVALID_MEDIA_ID}:")
+
+    @staticmethod
+    def _upload_url(webhook_url: str, media_type: str) -> str:
+        """
+        根据 webhook 地址生成上传接口地址
+
+        .../webhook/send?key=KEY → .../webhook/upload_media?key=KEY&type=file
+        """
+        parts = urlsplit(webhook_url)
+        path = parts.path.rsplit("/", 1)[0] + "/" + UPLOAD_MEDIA_PATH
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k != "type"]
+        query.append(("type", media_type))
+        return urlunsplit((parts.scheme, parts.netloc, path, urlencode(query), ""))
+
     def send_mention_all(self, webhook_url: str) -> Tuple[bool, Optional[str]]:
         """
         发送@all消息（用于markdown_v2和image的workaround）
@@ -161,6 +335,29 @@ class Sender:
         return self.send_text(webhook_url, "", mentioned_list=["@all"])
 
     def _send_request(self, webhook_url: str, data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """
+        发送消息请求（带智能重试，见 _request）
+
+        Args:
+            webhook_url: Webhook地址
+            data: 请求数据
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否成功, 错误信息)
+        """
+        result, error = self._request(webhook_url, data=data)
+        if result is None:
+            return False, error
+
+        self.logger.info(f"Message sent successfully")
+        return True, None
+
+    def _request(
+            self,
+            url: str,
+            data: Optional[Dict[str, Any]] = None,
+            files: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
         发送HTTP请求（带智能重试）
 
@@ -170,11 +367,12 @@ class Sender:
         3. 其他错误（webhook无效等）：立即失败
 
         Args:
-            webhook_url: Webhook地址
-            data: 请求数据
+            url: 请求地址（webhook 或上传接口）
+            data: JSON 请求数据
+            files: multipart 上传的文件（传入时忽略 data）
 
         Returns:
-            Tuple[bool, Optional[str]]: (是否成功, 错误信息)
+            Tuple[Optional[Dict[str, Any]], Optional[str]]: (成功时的响应数据, 错误信息)
         """
         network_retry_count = 0  # 网络错误重试计数
         rate_limit_retry_count = 0  # 频控重试计数
@@ -183,14 +381,17 @@ class Sender:
         while True:
             try:
                 attempt_desc = f"network_retry={network_retry_count}, rate_limit_retry={rate_limit_retry_count}"
-                self.logger.debug(f"Sending request to {webhook_url} ({attempt_desc})")
+                self.logger.debug(f"Sending request to {url} ({attempt_desc})")
 
-                response = requests.post(
-                    webhook_url,
-                    json=data,
-                    timeout=self.timeout,
-                    headers={"Content-Type": "application/json"}
-                )
+                if files is not None:
+                    response = requests.post(url, files=files, timeout=self.timeout)
+                else:
+                    response = requests.post(
+                        url,
+                        json=data,
+                        timeout=self.timeout,
+                        headers={"Content-Type": "application/json"}
+                    )
 
                 # 企微API返回格式: {"errcode": 0, "errmsg": "ok"}
                 result = response.json()
@@ -199,14 +400,13 @@ class Sender:
                 errmsg = result.get('errmsg', 'Unknown error')
 
                 if errcode == ERRCODE_SUCCESS:
-                    self.logger.info(f"Message sent successfully")
-                    return True, None
+                    return result, None
 
                 # 处理不同错误码
                 if errcode == ERRCODE_WEBHOOK_INVALID:
-                    error = WebhookInvalidError(f"Invalid webhook: {errmsg}")
+                    error = WebhookInvalidError(f"{WEBHOOK_INVALID_ERROR_PREFIX}: {errmsg}")
                     self.logger.error(f"Webhook invalid: {errmsg}")
-                    return False, str(error)
+                    return None, str(error)
 
                 elif errcode == ERRCODE_RATE_LIMIT:
                     # 服务端频控：可能是其他程序触发的，需要等待足够长的时间
@@ -229,12 +429,12 @@ class Sender:
                             f"Rate limit retry exhausted ({RATE_LIMIT_MAX_RETRIES} times, "
                             f"waited {RATE_LIMIT_MAX_RETRIES * RATE_LIMIT_WAIT_TIME}s total)"
                         )
-                        return False, str(error)
+                        return None, str(error)
 
                 else:
                     error = WeComError(f"API error {errcode}: {errmsg}")
                     self.logger.error(f"API error: {errcode} - {errmsg}")
-                    return False, str(error)
+                    return None, str(error)
 
             except requests.Timeout as e:
                 last_error = NetworkError(f"Request timeout: {e}")
@@ -248,7 +448,7 @@ class Sender:
                 last_error = WeComError(f"Unexpected error: {e}")
                 self.logger.error(f"Unexpected error: {e}")
                 self.logger.exception(e)
-                return False, str(last_error)
+                return None, str(last_error)
 
             # 处理网络错误重试
             if isinstance(last_error, NetworkError):
@@ -263,20 +463,30 @@ class Sender:
                     continue
                 else:
                     self.logger.error(f"Network retry exhausted ({self.retry_config.max_retries} times)")
-                    return False, str(last_error)
+                    return None, str(last_error)
 
             # 其他未处理的错误
             self.logger.error(f"Unhandled error: {last_error}")
-            return False, str(last_error)
+            return None, str(last_error)
 
     @staticmethod
-    def prepare_image(image_path: Optional[str] = None, image_base64: Optional[str] = None) -> Tuple[str, str]:
+    def prepare_image(
+            image_path: Optional[str] = None,
+            image_base64: Optional[str] = None,
+            cache: Optional["ImageCache"] = None
+    ) -> Tuple[str, str]:
         """
         准备图片数据（base64和MD5）
 
+        文件分块读取（mmap），一次遍历同时计算 MD5 和 base64；base64 输入分块解码计算 MD5，
+        不生成完整的解码副本。传入 cache 时相同图片只准备一次：文件按 (真实路径, 大小, 修改时间,
+        状态变更时间) 命中（时间戳精度内原地改写为相同大小的内容时可能命中旧结果，见 ImageCache），
+        base64 输入按字符串本身命中。
+
         Args:
             image_path: 图片文件路径
             image_base64: 图片base64编码（二选一）
+            cache: 图片准备结果缓存（可选）
 
         Returns:
             Tuple[str, str]: (base64编码, MD5值)
@@ -285,21 +495,125 @@ class Sender:
             InvalidParameterError: 参数错误
         """
         if image_path:
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
+            stat = os.stat(image_path)
+            # ctime 无法被 touch/cp -p 回拨，修改时间被保留时也能失效
+            key = ("path", os.path.realpath(image_path), stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
         elif image_base64:
-            try:
-                image_data = base64.b64decode(image_base64)
-            except Exception as e:
-                raise InvalidParameterError(f"Invalid base64 data: {e}")
+            key = ("base64", image_base64)
         else:
             raise InvalidParameterError("Either image_path or image_base64 must be provided")
 
-        # 计算MD5
-        md5 = hashlib.md5(image_data).hexdigest()
+        if cache is not None:
+            prepared = cache.get(key)
+            if prepared is not None:
+                return prepared
 
-        return image_base64, md5
+        if image_path:
+            prepared = Sender._encode_image_file(image_path)
+        else:
+            prepared = (image_base64, Sender._hash_image_base64(image_base64))
+        if cache is not None:
+            cache.put(key, prepared)
+        return prepared
+
+    @staticmethod
+    def _encode_image_file(image_path: str) -> Tuple[str, str]:
+        """
+        读取图片文件，一次遍历计算 base64 和 MD5
+
+        按 IMAGE_PREPARE_CHUNK_BYTES（3 的倍数）分块，各块的 base64 直接拼接即为整体编码。
+
+        Returns:
+            Tuple[str, str]: (base64编码, MD5值)
+        """
+        md5 = hashlib.md5()
+        parts = []
+        with open(image_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # 空文件无法 mmap
+                return "", md5.hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # 切片不复制数据；关闭 mmap 前须释放所有 memoryview
+                with memoryview(mapped) as view:
+                    for start in range(0, size, IMAGE_PREPARE_CHUNK_BYTES):
+                        with view[start:start + IMAGE_PREPARE_CHUNK_BYTES] as chunk:
+                            md5.update(chunk)
+                            parts.append(base64.b64encode(chunk))
+
+        return b"".join(parts).decode('ascii'), md5.hexdigest()
+
+    @staticmethod
+    def _hash_image_base64(image_base64: str) -> str:
+        """
+        计算 base64 图片的 MD5
+
+        规范的 base64（长度为 4 的倍数，不含换行等字符）分块解码并累计 MD5；
+        其他输入按原方式整体解码（非字母表字符被忽略）。
+
+        Raises:
+            InvalidParameterError: base64 无效
+        """
+        md5 = hashlib.md5()
+        if len(image_base64) % 4 == 0:
+            # 每个 base64 块对应 IMAGE_PREPARE_CHUNK_BYTES 字节
+            chunk_chars = IMAGE_PREPARE_CHUNK_BYTES // 3 * 4
+            try:
+                for start in range(0, len(image_base64), chunk_chars):
+                    md5.update(base64.b64decode(image_base64[start:start + chunk_chars], validate=True))
+                return md5.hexdigest()
+            except (binascii.Error, ValueError):
+                md5 = hashlib.md5()
+
+        try:
+            md5.update(base64.b64decode(image_base64))
+        except Exception as e:
+            raise InvalidParameterError(f"Invalid base64 data: {e}")
+        return md5.hexdigest()
+
+    @staticmethod
+    def prepare_media(
+            media_type: str,
+            file_path: Optional[str] = None,
+            data: Optional[bytes] = None,
+            filename: Optional[str] = None
+    ) -> Tuple[str, bytes, str]:
+        """
+        准备文件/语音数据（文件名、原始内容和 SHA-256）
+
+        内容保留为原始字节，上传时直接使用，不再经过 base64 编码/解码；
+        SHA-256 只计算一次，作为素材ID缓存键和去重指纹。
+
+        Args:
+            media_type: 素材类型（"file" 或 "voice"）
+            file_path: 文件路径
+            data: 文件内容（二选一，需同时提供 filename）
+            filename: 文件名（默认取 file_path 的文件名）
+
+        Returns:
+            Tuple[str, bytes, str]: (文件名, 文件内容, SHA-256 十六进制摘要)
+
+        Raises:
+            InvalidParameterError: 参数错误
+        """
+        if file_path:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            filename = filename or os.path.basename(file_path)
+        elif data is None:
+            raise InvalidParameterError("Either file_path or data must be provided")
+        elif not filename:
+            raise InvalidParameterError("filename is required when sending raw data")
+
+        max_bytes = MAX_UPLOAD_VOICE_BYTES if media_type == MEDIA_TYPE_VOICE else MAX_UPLOAD_FILE_BYTES
+        if not MIN_UPLOAD_FILE_BYTES <= len(data) <= max_bytes:
+            raise InvalidParameterError(
+                f"{media_type} size must be between {MIN_UPLOAD_FILE_BYTES} and {max_bytes} bytes, got {len(data)}"
+            )
+        if media_type == MEDIA_TYPE_VOICE and not filename.lower().endswith(VOICE_FILE_EXTENSION):
+            raise InvalidParameterError(f"Voice must be an AMR file: {filename}")
+
+        return filename, data, hashlib.sha256(data).hexdigest()
 
 
 __all__ = ["Sender", "RetryConfig"]